@@ -0,0 +1,367 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: apod_index.py                                         |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+import sqlite3
+import threading
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# the apod fields we keep (the rest of the json is dropped)
+FIELDS = ('date', 'title', 'explanation', 'copyright', 'media_type', 'url',
+          'hdurl', 'thumbnail_url')
+
+# what we know about the local copy (NULL if we don't have one)
+FILE_FIELDS = ('path', 'size', 'sha')
+
+# the table of apods
+# NB: a rowid table (the fts table points at its rowids), keyed on the date
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS apod (
+    date            TEXT PRIMARY KEY,
+    title           TEXT NOT NULL DEFAULT '',
+    explanation     TEXT NOT NULL DEFAULT '',
+    copyright       TEXT NOT NULL DEFAULT '',
+    media_type      TEXT NOT NULL DEFAULT '',
+    url             TEXT NOT NULL DEFAULT '',
+    hdurl           TEXT NOT NULL DEFAULT '',
+    thumbnail_url   TEXT NOT NULL DEFAULT '',
+    path            TEXT,
+    size            INTEGER,
+    sha             TEXT
+);
+'''
+
+# the full-text index of the titles and explanations, kept up to date by
+# triggers
+# NB: an external content table, so the text isn't stored twice
+FTS_SCHEMA = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS apod_fts USING fts5(
+    title, explanation, content='apod', content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS apod_fts_insert AFTER INSERT ON apod BEGIN
+    INSERT INTO apod_fts (rowid, title, explanation)
+        VALUES (new.rowid, new.title, new.explanation);
+END;
+CREATE TRIGGER IF NOT EXISTS apod_fts_delete AFTER DELETE ON apod BEGIN
+    INSERT INTO apod_fts (apod_fts, rowid, title, explanation)
+        VALUES ('delete', old.rowid, old.title, old.explanation);
+END;
+CREATE TRIGGER IF NOT EXISTS apod_fts_update
+        AFTER UPDATE OF title, explanation ON apod BEGIN
+    INSERT INTO apod_fts (apod_fts, rowid, title, explanation)
+        VALUES ('delete', old.rowid, old.title, old.explanation);
+    INSERT INTO apod_fts (rowid, title, explanation)
+        VALUES (new.rowid, new.title, new.explanation);
+END;
+'''
+
+# add or update an apod
+# NB: an update without a local copy keeps the one we had
+UPSERT = '''
+INSERT INTO apod (date, title, explanation, copyright, media_type, url, hdurl,
+                  thumbnail_url, path, size, sha)
+    VALUES (:date, :title, :explanation, :copyright, :media_type, :url,
+            :hdurl, :thumbnail_url, :path, :size, :sha)
+    ON CONFLICT (date) DO UPDATE SET
+        title = excluded.title,
+        explanation = excluded.explanation,
+        copyright = excluded.copyright,
+        media_type = excluded.media_type,
+        url = excluded.url,
+        hdurl = excluded.hdurl,
+        thumbnail_url = excluded.thumbnail_url,
+        path = coalesce(excluded.path, path),
+        size = coalesce(excluded.size, size),
+        sha = coalesce(excluded.sha, sha)
+'''
+
+
+# ------------------------------------------------------------------------------
+# Define the apod index class
+# ------------------------------------------------------------------------------
+
+class ApodIndex:
+
+    """
+        A searchable index of every apod we have seen
+
+        The config only holds the latest apod, so this keeps the metadata of
+        each one (and the path, size and hash of our copy) in a SQLite
+        database, with a full-text index over the titles and explanations.
+        A search is an index lookup, so it takes milliseconds even with
+        every apod there has ever been.
+
+        Records are added in batches, each in one transaction, so a backfill
+        of thousands of days is a few commits, not thousands.
+
+        If SQLite was built without FTS5, searches fall back to LIKE, which
+        is slower but finds the same things.
+    """
+
+    # --------------------------------------------------------------------------
+    # Methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Initialize the class
+    # --------------------------------------------------------------------------
+    def __init__(self, db_path, fts=True):
+
+        """
+            Initialize the class
+
+            Paramaters:
+                db_path [str]: the database file
+                fts [bool]: False to search with LIKE even if FTS5 is there
+                    (for testing)
+        """
+
+        self.db_path = db_path
+        self.fts = fts
+
+        # the connection (opened when first needed)
+        # NB: steps run on worker threads, so the connection is shared
+        # between threads, one at a time
+        self.conn = None
+        self.lock = threading.Lock()
+
+    # --------------------------------------------------------------------------
+    # Add or update apods
+    # --------------------------------------------------------------------------
+    def add(self, records):
+
+        """
+            Add or update apods
+
+            Paramaters:
+                records [list]: the apod dicts (as the api sends them), with
+                    path, size and sha added if we have a copy
+
+            Returns:
+                [int]: the number of records written
+
+            Raises:
+                sqlite3.Error if the database can't be written
+
+            NB: all in one transaction, so a batch is written whole or not
+            at all
+        """
+
+        # only the fields we keep, and only real days
+        rows = []
+        for record in records:
+            if not record.get('date'):
+                continue
+            row = {name: str(record.get(name) or '') for name in FIELDS}
+            row.update({name: record.get(name) for name in FILE_FIELDS})
+            rows.append(row)
+        if not rows:
+            return 0
+
+        # write them
+        with self.lock:
+            conn = self.__get_conn()
+            with conn:
+                conn.executemany(UPSERT, rows)
+
+        # return the count
+        return len(rows)
+
+    # --------------------------------------------------------------------------
+    # Forget our copies of images that were deleted
+    # --------------------------------------------------------------------------
+    def forget(self, shas):
+
+        """
+            Forget our copies of images that were deleted
+
+            Paramaters:
+                shas [list]: the hashes of the deleted images
+
+            Returns:
+                [int]: the number of apods changed
+
+            Raises:
+                sqlite3.Error if the database can't be written
+
+            The apods are kept (so they can still be found), but their path,
+            size and sha are cleared, so a search doesn't point at a file
+            that isn't there.
+        """
+
+        # nothing to forget
+        shas = list(shas)
+        if not shas:
+            return 0
+
+        # clear them
+        marks = ', '.join('?' * len(shas))
+        with self.lock:
+            conn = self.__get_conn()
+            with conn:
+                cursor = conn.execute(
+                    'UPDATE apod SET path = NULL, size = NULL, sha = NULL '
+                    f'WHERE sha IN ({marks})', shas)
+
+        # return the count
+        return cursor.rowcount
+
+    # --------------------------------------------------------------------------
+    # Find apods
+    # --------------------------------------------------------------------------
+    def search(self, text='', start_date='', end_date='', media_type='',
+               limit=50):
+
+        """
+            Find apods
+
+            Paramaters:
+                text [str]: words that must all be in the title or
+                    explanation (each one also matches words it starts, i.e.
+                    'nebula' finds 'nebulae'), or '' for any
+                start_date [str]: the first date (YYYY-MM-DD), or '' for any
+                end_date [str]: the last date (YYYY-MM-DD), or '' for any
+                media_type [str]: 'image' or 'video', or '' for any
+                limit [int]: the most results (0 for no limit)
+
+            Returns:
+                [list]: a dict for each apod found, newest first
+
+            Raises:
+                sqlite3.Error if the database can't be read
+        """
+
+        # build the query
+        words = text.split()
+        wheres = []
+        params = []
+        with self.lock:
+            conn = self.__get_conn()
+            if words and self.fts:
+
+                # every word, as a prefix
+                # NB: each one is quoted, so its punctuation isn't fts syntax
+                query = ' '.join('"' + word.replace('"', '""') + '"*'
+                                 for word in words)
+                sql = ('SELECT apod.* FROM apod_fts '
+                       'JOIN apod ON apod.rowid = apod_fts.rowid')
+                wheres.append('apod_fts MATCH ?')
+                params.append(query)
+
+            else:
+
+                # every word, anywhere
+                sql = 'SELECT apod.* FROM apod'
+                for word in words:
+                    pattern = '%' + word.replace('\\', '\\\\') \
+                        .replace('%', '\\%').replace('_', '\\_') + '%'
+                    wheres.append("(title LIKE ? ESCAPE '\\' OR "
+                                  "explanation LIKE ? ESCAPE '\\')")
+                    params += [pattern, pattern]
+
+            # the dates and type
+            if start_date:
+                wheres.append('apod.date >= ?')
+                params.append(start_date)
+            if end_date:
+                wheres.append('apod.date <= ?')
+                params.append(end_date)
+            if media_type:
+                wheres.append('apod.media_type = ?')
+                params.append(media_type)
+            if wheres:
+                sql += ' WHERE ' + ' AND '.join(wheres)
+            sql += ' ORDER BY apod.date DESC'
+            if limit:
+                sql += ' LIMIT ?'
+                params.append(limit)
+
+            # run it
+            rows = conn.execute(sql, params).fetchall()
+
+        # return the results
+        return [dict(row) for row in rows]
+
+    # --------------------------------------------------------------------------
+    # Close the database
+    # --------------------------------------------------------------------------
+    def close(self):
+
+        """
+            Close the database
+        """
+
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+    # --------------------------------------------------------------------------
+    # Helpers
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Get the connection, opening the database if needed
+    # --------------------------------------------------------------------------
+    def __get_conn(self):
+
+        """
+            Get the connection, opening the database if needed
+
+            Returns:
+                [Connection]: the connection
+
+            Raises:
+                sqlite3.Error if the database can't be opened
+
+            NB: call with the lock held
+        """
+
+        # already open
+        if self.conn is not None:
+            return self.conn
+
+        # open it
+        # NB: wal, so a search can read while a backfill writes
+        conn = sqlite3.connect(self.db_path, timeout=10,
+                               check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+
+        # make the tables
+        with conn:
+            conn.executescript(SCHEMA)
+            if self.fts:
+                try:
+                    new = not conn.execute(
+                        "SELECT 1 FROM sqlite_master WHERE name = 'apod_fts'"
+                    ).fetchone()
+                    conn.executescript(FTS_SCHEMA)
+
+                    # index what was added without it
+                    if new:
+                        conn.execute("INSERT INTO apod_fts (apod_fts) "
+                                     "VALUES ('rebuild')")
+
+                except sqlite3.OperationalError:
+
+                    # no fts5 in this sqlite
+                    self.fts = False
+
+        # keep it
+        self.conn = conn
+        return conn
+
+# -)
@@ -0,0 +1,352 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: backends.py                                           |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+from abc import ABC, abstractmethod
+import os
+
+# NB: GObject is imported by GnomeBackend itself, so the file and memory
+# backends work on machines that don't have it
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# the gsettings schema for the desktop background
+GNOME_SCHEMA = 'org.gnome.desktop.background'
+
+# the keys we set (light and dark themes)
+GNOME_KEYS = ('picture-uri', 'picture-uri-dark')
+
+
+# ------------------------------------------------------------------------------
+# Define the base backend class
+# ------------------------------------------------------------------------------
+
+class Backend(ABC):
+
+    """
+        The base class for all wallpaper backends
+
+        A backend knows how to read and write the current wallpaper. set()
+        only writes when the value is different, and says whether it did.
+
+        NB: a backend that doesn't define both methods can't be created, so
+        it fails when the backend is picked, not halfway through a run
+    """
+
+    # the name used in the config file
+    name = ''
+
+    # --------------------------------------------------------------------------
+    # Get the current wallpaper
+    # --------------------------------------------------------------------------
+    @abstractmethod
+    def get(self):
+
+        """
+            Get the current wallpaper
+
+            Returns:
+                [str]: the path of the current wallpaper ('' if none)
+        """
+
+    # --------------------------------------------------------------------------
+    # Set the wallpaper if it is different
+    # --------------------------------------------------------------------------
+    @abstractmethod
+    def set(self, path):
+
+        """
+            Set the wallpaper if it is different
+
+            Paramaters:
+                path [str]: the path of the new wallpaper
+
+            Returns:
+                [bool]: True if anything was written
+        """
+
+
+# ------------------------------------------------------------------------------
+# Define the gnome backend class
+# ------------------------------------------------------------------------------
+
+class GnomeBackend(Backend):
+
+    """
+        Sets the GNOME desktop background through gsettings
+
+        All the keys are changed in one delayed-apply transaction, and only
+        the keys that actually differ are written, so an unchanged run makes
+        no dconf writes at all.
+    """
+
+    name = 'gnome'
+
+    # --------------------------------------------------------------------------
+    # Initialize the class
+    # --------------------------------------------------------------------------
+    def __init__(self):
+
+        """
+            Initialize the class
+
+            Raises:
+                ImportError if GObject is not installed
+                ValueError if the background schema is not installed
+        """
+
+        from gi.repository import Gio
+
+        # make sure the schema exists (Gio aborts the process if it doesn't)
+        source = Gio.SettingsSchemaSource.get_default()
+        if source is None or source.lookup(GNOME_SCHEMA, True) is None:
+            raise ValueError(f'no gsettings schema {GNOME_SCHEMA}')
+
+        # get system settings
+        self.gio = Gio
+        self.settings = Gio.Settings.new(GNOME_SCHEMA)
+
+        # older GNOMEs don't have the dark key
+        schema = self.settings.props.settings_schema
+        self.keys = [key for key in GNOME_KEYS if schema.has_key(key)]
+
+    # --------------------------------------------------------------------------
+    # Get the current wallpaper
+    # --------------------------------------------------------------------------
+    def get(self):
+
+        """
+            Get the current wallpaper
+
+            Returns:
+                [str]: the path of the current wallpaper ('' if none)
+        """
+
+        return self.settings.get_string(self.keys[0])
+
+    # --------------------------------------------------------------------------
+    # Set the wallpaper if it is different
+    # --------------------------------------------------------------------------
+    def set(self, path):
+
+        """
+            Set the wallpaper if it is different
+
+            Paramaters:
+                path [str]: the path of the new wallpaper
+
+            Returns:
+                [bool]: True if anything was written
+        """
+
+        # find the keys that need changing
+        keys = [key for key in self.keys
+                if self.settings.get_string(key) != path]
+        if not keys:
+            return False
+
+        # change them all in one transaction
+        self.settings.delay()
+        for key in keys:
+            self.settings.set_string(key, path)
+        self.settings.apply()
+
+        # make sure it's written before we exit
+        self.gio.Settings.sync()
+
+        # we changed something
+        return True
+
+
+# ------------------------------------------------------------------------------
+# Define the file backend class
+# ------------------------------------------------------------------------------
+
+class FileBackend(Backend):
+
+    """
+        Writes the wallpaper path to a text file
+
+        This is for desktops we can't set directly. Another tool (i.e.
+        'feh --bg-fill "$(cat ~/.config/spaceoddity/wallpaper.txt)"') can
+        pick it up from there.
+    """
+
+    name = 'file'
+
+    # --------------------------------------------------------------------------
+    # Initialize the class
+    # --------------------------------------------------------------------------
+    def __init__(self, file_path):
+
+        """
+            Initialize the class
+
+            Paramaters:
+                file_path [str]: the text file to write the path to
+        """
+
+        self.file_path = file_path
+
+    # --------------------------------------------------------------------------
+    # Get the current wallpaper
+    # --------------------------------------------------------------------------
+    def get(self):
+
+        """
+            Get the current wallpaper
+
+            Returns:
+                [str]: the path of the current wallpaper ('' if none)
+        """
+
+        try:
+            with open(self.file_path, 'r') as file:
+                return file.read().strip()
+        except OSError:
+            return ''
+
+    # --------------------------------------------------------------------------
+    # Set the wallpaper if it is different
+    # --------------------------------------------------------------------------
+    def set(self, path):
+
+        """
+            Set the wallpaper if it is different
+
+            Paramaters:
+                path [str]: the path of the new wallpaper
+
+            Returns:
+                [bool]: True if anything was written
+        """
+
+        # nothing to do
+        if self.get() == path:
+            return False
+
+        # write to a temp file and move it into place
+        tmp_path = f'{self.file_path}.tmp'
+        with open(tmp_path, 'w') as file:
+            file.write(f'{path}\n')
+        os.replace(tmp_path, self.file_path)
+
+        # we changed something
+        return True
+
+
+# ------------------------------------------------------------------------------
+# Define the memory backend class
+# ------------------------------------------------------------------------------
+
+class MemoryBackend(Backend):
+
+    """
+        Keeps the wallpaper in memory (for testing)
+    """
+
+    name = 'memory'
+
+    # --------------------------------------------------------------------------
+    # Initialize the class
+    # --------------------------------------------------------------------------
+    def __init__(self):
+
+        """
+            Initialize the class
+        """
+
+        # the current wallpaper and how many times it was written
+        self.path = ''
+        self.writes = 0
+
+    # --------------------------------------------------------------------------
+    # Get the current wallpaper
+    # --------------------------------------------------------------------------
+    def get(self):
+
+        """
+            Get the current wallpaper
+
+            Returns:
+                [str]: the path of the current wallpaper ('' if none)
+        """
+
+        return self.path
+
+    # --------------------------------------------------------------------------
+    # Set the wallpaper if it is different
+    # --------------------------------------------------------------------------
+    def set(self, path):
+
+        """
+            Set the wallpaper if it is different
+
+            Paramaters:
+                path [str]: the path of the new wallpaper
+
+            Returns:
+                [bool]: True if anything was written
+        """
+
+        # nothing to do
+        if self.path == path:
+            return False
+
+        # remember the new path
+        self.path = path
+        self.writes += 1
+        return True
+
+
+# ------------------------------------------------------------------------------
+# Get a backend by name
+# ------------------------------------------------------------------------------
+def get_backend(name, conf_dir):
+
+    """
+        Get a backend by name
+
+        Paramaters:
+            name [str]: 'gnome', 'file', 'memory', or 'auto' to use gnome if
+                we can and file if we can't
+            conf_dir [str]: the config folder (for the file backend)
+
+        Returns:
+            [Backend]: the backend
+
+        Raises:
+            ValueError if the name is unknown
+            ImportError or ValueError if gnome is asked for but not available
+    """
+
+    # the file backend's text file
+    file_path = os.path.join(conf_dir, 'wallpaper.txt')
+
+    # pick a backend
+    if name == 'gnome':
+        return GnomeBackend()
+    if name == 'file':
+        return FileBackend(file_path)
+    if name == 'memory':
+        return MemoryBackend()
+    if name == 'auto':
+        try:
+            return GnomeBackend()
+        except (ImportError, ValueError):
+            return FileBackend(file_path)
+
+    # unknown name
+    raise ValueError(f'unknown backend: {name}')
+
+# -)
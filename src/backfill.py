@@ -0,0 +1,411 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: backfill.py                                           |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+from concurrent.futures import ThreadPoolExecutor
+from downloader import Downloader
+from image_store import get_url_ext
+from urllib import parse
+import codecs
+import json
+import os
+import threading
+import time
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# the size of each chunk read from the metadata response
+CHUNK_SIZE = 64 * 1024
+
+# save the store index after this many images
+SAVE_EVERY = 50
+
+# write the apod index after this many days
+INDEX_BATCH = 500
+
+
+# ------------------------------------------------------------------------------
+# Parse a json array from a stream one element at a time
+# ------------------------------------------------------------------------------
+def iter_json_array(stream):
+
+    """
+        Parse a json array from a stream one element at a time
+
+        Paramaters:
+            stream [file]: a binary file-like object containing a json array
+
+        Returns:
+            [generator]: each element of the array, in order
+
+        Raises:
+            ValueError if the stream is not a json array
+
+        Only the current element (plus one chunk) is held in memory, so this
+        can parse a response of any size.
+    """
+
+    # set up the decoders
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+
+    # the unparsed text, and whether we have seen the opening bracket
+    buf = ''
+    started = False
+    eof = False
+
+    while True:
+
+        # skip whitespace and separators
+        buf = buf.lstrip()
+        if not started and buf:
+            if buf[0] != '[':
+                raise ValueError('expected a json array')
+            buf = buf[1:]
+            started = True
+            continue
+        if started and buf[:1] == ',':
+            buf = buf[1:]
+            continue
+        if started and buf[:1] == ']':
+            return
+
+        # try to parse the next element
+        if started and buf:
+            try:
+                item, end = decoder.raw_decode(buf)
+            except ValueError:
+                if eof:
+                    raise
+            else:
+                buf = buf[end:]
+                yield item
+                continue
+
+        # need more text
+        if eof:
+            raise ValueError('unexpected end of json array')
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            eof = True
+        buf += text_decoder.decode(chunk, final=eof)
+
+
+# ------------------------------------------------------------------------------
+# Define the per-host limiter class
+# ------------------------------------------------------------------------------
+
+class HostLimiter:
+
+    """
+        Limits how hard we hit each host
+
+        Each host gets at most 'per_host' requests in flight, and requests to
+        the same host start at least 'delay' seconds apart.
+    """
+
+    # --------------------------------------------------------------------------
+    # Methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Initialize the class
+    # --------------------------------------------------------------------------
+    def __init__(self, per_host, delay):
+
+        """
+            Initialize the class
+
+            Paramaters:
+                per_host [int]: the most requests in flight per host
+                delay [float]: the least time between request starts per host
+        """
+
+        self.per_host = per_host
+        self.delay = delay
+
+        # host -> semaphore, host -> next allowed start time
+        self.sems = {}
+        self.next_start = {}
+        self.lock = threading.Lock()
+
+    # --------------------------------------------------------------------------
+    # Wait until we may start a request to a url's host
+    # --------------------------------------------------------------------------
+    def acquire(self, url):
+
+        """
+            Wait until we may start a request to a url's host
+
+            Paramaters:
+                url [str]: the url we are about to get
+        """
+
+        # get the host's semaphore
+        host = parse.urlsplit(url).netloc
+        with self.lock:
+            sem = self.sems.setdefault(
+                host, threading.BoundedSemaphore(self.per_host))
+        sem.acquire()
+
+        # wait for our turn, then book the next one
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_start.get(host, now))
+            self.next_start[host] = start + self.delay
+        time.sleep(start - now)
+
+    # --------------------------------------------------------------------------
+    # Say we are done with a request to a url's host
+    # --------------------------------------------------------------------------
+    def release(self, url):
+
+        """
+            Say we are done with a request to a url's host
+
+            Paramaters:
+                url [str]: the url we got
+        """
+
+        host = parse.urlsplit(url).netloc
+        self.sems[host].release()
+
+
+# ------------------------------------------------------------------------------
+# Define the backfill class
+# ------------------------------------------------------------------------------
+
+class Backfill:
+
+    """
+        Fills the image store with every APOD image in a date range
+
+        The metadata for the whole range comes from one API call (using the
+        start_date and end_date parameters) and is parsed as it streams in.
+        The images are then fetched by a bounded thread pool, with a per-host
+        limit so we stay polite to the image server.
+
+        If there is an apod index, every day (image or not) is added to it,
+        in batches, from the thread that called run().
+    """
+
+    # --------------------------------------------------------------------------
+    # Methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Initialize the class
+    # --------------------------------------------------------------------------
+    def __init__(self, store, apod_url, http_client, concurrency=4,
+                 per_host=2, host_delay=0.5, log=print, index=None,
+                 keep=False):
+
+        """
+            Initialize the class
+
+            Paramaters:
+                store [ImageStore]: the store to put the images in
+                apod_url [str]: the APOD api url, including the api key
+                http_client [HTTPClient]: the client to fetch with (shared by
+                    all the pool threads)
+                concurrency [int]: the most downloads in flight
+                per_host [int]: the most downloads in flight per host
+                host_delay [float]: the least time between requests to a host
+                log [callable]: called with a message for each image
+                index [ApodIndex]: the index to add each day to (None for
+                    no index)
+                keep [bool]: True to keep the images from being evicted (by
+                    the store limits)
+        """
+
+        self.store = store
+        self.apod_url = apod_url
+        self.http_client = http_client
+        self.concurrency = max(1, concurrency)
+        self.limiter = HostLimiter(max(1, per_host), host_delay)
+        self.log = log
+        self.keep = keep
+
+        # counters and the days waiting for the index (guarded by lock)
+        self.lock = threading.Lock()
+        self.counts = {'new': 0, 'have': 0, 'skip': 0, 'fail': 0}
+        self.index = index
+        self.records = []
+
+    # --------------------------------------------------------------------------
+    # Download every image in a date range
+    # --------------------------------------------------------------------------
+    def run(self, start_date, end_date):
+
+        """
+            Download every image in a date range
+
+            Paramaters:
+                start_date [str]: the first date (YYYY-MM-DD)
+                end_date [str]: the last date (YYYY-MM-DD)
+
+            Returns:
+                [dict]: the number of new, already had, skipped and failed
+                images
+
+            Raises:
+                HTTPError or OSError if the metadata can't be fetched
+                ValueError if the metadata is not a json array
+        """
+
+        # get the metadata for the whole range in one call
+        query = parse.urlencode({'start_date': start_date,
+                                 'end_date': end_date})
+        # NB: a long range takes the api a while, so give it longer
+        response = self.http_client.open(f'{self.apod_url}&{query}',
+                                         gzip=True, timeout=60)
+
+        # NB: the semaphore keeps the pool's queue short, so we never hold
+        # more than a few entries in memory no matter how long the range is
+        slots = threading.BoundedSemaphore(self.concurrency * 2)
+
+        # fetch each image as its metadata arrives
+        with response:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                for apod_dict in iter_json_array(response):
+                    slots.acquire()
+                    future = pool.submit(self.__fetch, apod_dict)
+                    future.add_done_callback(lambda _f: slots.release())
+
+                    # index the days that are done, a batch at a time
+                    if len(self.records) >= INDEX_BATCH:
+                        self.__index()
+
+        # write the index once at the end
+        self.store.save()
+        self.__index()
+
+        # return the counts
+        return self.counts.copy()
+
+    # --------------------------------------------------------------------------
+    # Helpers
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Fetch the image for one day
+    # --------------------------------------------------------------------------
+    def __fetch(self, apod_dict):
+
+        """
+            Fetch the image for one day
+
+            Paramaters:
+                apod_dict [dict]: the APOD metadata for the day
+
+            This runs on a pool thread and never raises, it just counts.
+        """
+
+        # get the date and url
+        apod_date = apod_dict.get('date', '')
+        pic_url = apod_dict.get('hdurl') or apod_dict.get('url', '')
+
+        # skip videos and such
+        if apod_dict.get('media_type') != 'image' or not pic_url:
+            self.__count('skip', f'{apod_date}: not an image', apod_dict)
+            return
+
+        # skip images we already have (keeping them too, if asked)
+        # NB: lookup, not find_url, which would mark every archived image as
+        # just used (wrecking the lru order) and write the index each time
+        pic_dict = self.store.lookup(pic_url)
+        if pic_dict and os.path.exists(pic_dict['path']):
+            if self.keep:
+                self.store.keep(pic_dict['sha'], save=False)
+            self.__count('have', f'{apod_date}: already have it', apod_dict,
+                         pic_url)
+            return
+
+        # download to a name unique to this day
+        file_ext = get_url_ext(pic_url)
+        dl_path = os.path.join(self.store.store_dir,
+                               f'incoming_{apod_date}.{file_ext}')
+
+        # do the download
+        self.limiter.acquire(pic_url)
+        try:
+            downloader = Downloader(self.store.store_dir, self.http_client)
+            pic_hash = downloader.download(pic_url, dl_path)
+            self.store.add(dl_path, pic_hash, file_ext, pic_url, save=False,
+                           keep=self.keep)
+            self.__count('new', f'{apod_date}: {pic_url}', apod_dict,
+                         pic_url)
+        except Exception as error:
+            self.__count('fail', f'{apod_date}: {error}', apod_dict)
+        finally:
+            self.limiter.release(pic_url)
+
+    # --------------------------------------------------------------------------
+    # Bump a counter and log a message
+    # --------------------------------------------------------------------------
+    def __count(self, key, msg, apod_dict, pic_url=''):
+
+        """
+            Bump a counter, log a message, and queue the day for the index
+
+            Paramaters:
+                key [str]: the counter to bump
+                msg [str]: the message to log
+                apod_dict [dict]: the APOD metadata for the day
+                pic_url [str]: the url of the image in the store, if we have
+                    it
+        """
+
+        # add our copy to the metadata
+        if self.index is not None:
+            record = dict(apod_dict)
+            record.update(self.store.lookup(pic_url) or {})
+
+        with self.lock:
+            self.counts[key] += 1
+            if self.index is not None:
+                self.records.append(record)
+
+            # save the index now and then, so a crash doesn't lose much
+            if key == 'new' and self.counts['new'] % SAVE_EVERY == 0:
+                self.store.save()
+
+        self.log(f'{key}: {msg}')
+
+    # --------------------------------------------------------------------------
+    # Write the queued days to the index
+    # --------------------------------------------------------------------------
+    def __index(self):
+
+        """
+            Write the queued days to the index
+
+            NB: this is only called from the thread that called run(), since
+            the index is written one batch (one transaction) at a time
+        """
+
+        # take the queue
+        with self.lock:
+            records, self.records = self.records, []
+        if self.index is None or not records:
+            return
+
+        # write it
+        # NB: a broken index shouldn't stop the images
+        try:
+            count = self.index.add(records)
+            self.log(f'index: {count} days')
+        except Exception as error:
+            self.log(f'index: {error}')
+
+# -)
@@ -0,0 +1,367 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: captions.py                                           |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+import cairo
+import gi
+import hashlib
+import os
+import time
+
+gi.require_version('GdkPixbuf', '2.0')
+gi.require_version('Pango', '1.0')
+gi.require_version('PangoCairo', '1.0')
+
+from gi.repository import GdkPixbuf, Pango, PangoCairo  # noqa: E402
+
+# NB: requires:
+# gir1.2-gtk-3.0 python3-gi-cairo (apt)
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# the jpeg quality of the captioned images
+JPEG_QUALITY = '92'
+
+# the screen height the font size is for (it is scaled to the real height)
+BASE_HEIGHT = 1080
+
+# the most characters in a caption, and lines it can wrap to
+# NB: titles are short, but a long copyright line could make a tall layer
+MAX_CHARS = 300
+MAX_LINES = 3
+
+# the space around the text, and how dark the band behind it is
+PAD_FRACTION = 0.01
+BAND_ALPHA = 0.55
+
+# how many text layers to keep
+KEEP_LAYERS = 16
+
+
+# ------------------------------------------------------------------------------
+# Make the caption for an apod
+# ------------------------------------------------------------------------------
+def get_caption_text(apod_dict):
+
+    """
+        Make the caption for an apod
+
+        Paramaters:
+            apod_dict [dict]: the apod (as the api sends it)
+
+        Returns:
+            [str]: the title, then the date and copyright, or '' if there is
+            no title
+    """
+
+    # no title, no caption
+    title = ' '.join(apod_dict.get('title', '').split())
+    if not title:
+        return ''
+
+    # the date and copyright (which can have newlines in it)
+    line = apod_dict.get('date', '')
+    copyright = ' '.join(apod_dict.get('copyright', '').split())
+    if copyright:
+        line = f'{line}  © {copyright}'.strip()
+
+    # return the result
+    return f'{title}\n{line}'[:MAX_CHARS].strip()
+
+
+# ------------------------------------------------------------------------------
+# Define the captions class
+# ------------------------------------------------------------------------------
+
+class Captions:
+
+    """
+        Draws a caption along the bottom of a screen-sized image
+
+        The caption (the text on a dark band) is drawn once into a layer
+        the width of the screen and only as tall as the text, and kept as a
+        png named for the hash of its text, font and size. The same day on
+        the same screen (i.e. a re-run, or the upgrade in progressive mode)
+        reuses the layer, and coming back to a screen size reuses its layer,
+        so only the first run pays for Pango.
+
+        The captioned image is kept next to the derivative, named
+        '<source sha>_<width>x<height>_<layer hash>.jpg', so it is only made
+        once, and is removed with the derivatives when its source leaves the
+        store.
+
+        Captions have to fit in a budget: the memory for the image and layer
+        is worked out before anything is decoded, and the time is checked
+        between each step. Over budget, the caption is skipped (by raising),
+        and the wallpaper is set without it.
+    """
+
+    # --------------------------------------------------------------------------
+    # Methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Initialize the class
+    # --------------------------------------------------------------------------
+    def __init__(self, derived_dir, layer_dir, font='Sans Bold 14',
+                 max_seconds=1.0, max_bytes=32 * 1024 * 1024):
+
+        """
+            Initialize the class
+
+            Paramaters:
+                derived_dir [str]: the folder to keep captioned images in
+                layer_dir [str]: the folder to keep text layers in
+                font [str]: the Pango font (i.e. 'Sans Bold 14'), sized for
+                    a 1080 pixel high screen
+                max_seconds [float]: the most time to spend on a caption
+                max_bytes [int]: the most memory for the image and layer
+        """
+
+        self.derived_dir = derived_dir
+        self.layer_dir = layer_dir
+        self.font = font
+        self.max_seconds = max_seconds
+        self.max_bytes = max_bytes
+
+        # whether the last get() reused a layer or image (for logging)
+        self.last_cached = False
+
+        # make sure the folders exist
+        os.makedirs(derived_dir, exist_ok=True)
+        os.makedirs(layer_dir, exist_ok=True)
+
+    # --------------------------------------------------------------------------
+    # Get a captioned copy of an image
+    # --------------------------------------------------------------------------
+    def get(self, src_path, sha, text):
+
+        """
+            Get a captioned copy of an image
+
+            Paramaters:
+                src_path [str]: the screen-sized image
+                sha [str]: the sha256 of the original image
+                text [str]: the caption (lines split by newlines)
+
+            Returns:
+                [str]: the path to the captioned image
+
+            Raises:
+                ValueError if the caption would use more than max_bytes
+                TimeoutError if it takes more than max_seconds
+                GLib.Error if the image can't be decoded or saved
+        """
+
+        # start the clock
+        start = time.monotonic()
+        self.last_cached = True
+
+        # get the size without decoding it
+        _format, width, height = GdkPixbuf.Pixbuf.get_file_info(src_path)
+        if not width or not height:
+            raise ValueError(f'{src_path}: not an image')
+
+        # already made it
+        key = self.get_key(text, width, height)
+        dst_path = os.path.join(self.derived_dir,
+                                f'{sha}_{width}x{height}_{key[:16]}.jpg')
+        if os.path.exists(dst_path):
+            return dst_path
+
+        # get the text layer (drawing it if we have to)
+        layer = self.__get_layer(text, width, height, key, start)
+
+        # check the budget before decoding the image
+        # NB: the image is decoded as rgb, the layer is rgba
+        need = width * height * 3 + layer.get_width() * layer.get_height() * 4
+        if need > self.max_bytes:
+            raise ValueError(f'caption needs {need // 1024} KiB, budget is '
+                             f'{self.max_bytes // 1024} KiB')
+        self.__check_time(start)
+
+        # lay it along the bottom of the image
+        pixbuf = GdkPixbuf.Pixbuf.new_from_file(src_path)
+        layer_w = min(layer.get_width(), pixbuf.get_width())
+        layer_h = min(layer.get_height(), pixbuf.get_height())
+        y = pixbuf.get_height() - layer_h
+        layer.composite(pixbuf, 0, y, layer_w, layer_h, 0, y, 1, 1,
+                        GdkPixbuf.InterpType.NEAREST, 255)
+        self.__check_time(start)
+
+        # save to a temp file and move it into place
+        tmp_path = f'{dst_path}.tmp'
+        pixbuf.savev(tmp_path, 'jpeg', ['quality'], [JPEG_QUALITY])
+        os.replace(tmp_path, dst_path)
+
+        # return the new image
+        return dst_path
+
+    # --------------------------------------------------------------------------
+    # Get the hash of a caption
+    # --------------------------------------------------------------------------
+    def get_key(self, text, width, height):
+
+        """
+            Get the hash of a caption
+
+            Paramaters:
+                text [str]: the caption
+                width [int]: the screen width
+                height [int]: the screen height
+
+            Returns:
+                [str]: a hash of the text, font and size
+        """
+
+        data = f'{text}\0{self.font}\0{width}x{height}'.encode('utf-8')
+        return hashlib.sha1(data).hexdigest()
+
+    # --------------------------------------------------------------------------
+    # Helpers
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Get a text layer, drawing it if it isn't cached
+    # --------------------------------------------------------------------------
+    def __get_layer(self, text, width, height, key, start):
+
+        """
+            Get a text layer, drawing it if it isn't cached
+
+            Paramaters:
+                text [str]: the caption
+                width [int]: the screen width
+                height [int]: the screen height
+                key [str]: the hash of the caption
+                start [float]: when get() started (time.monotonic)
+
+            Returns:
+                [Pixbuf]: the layer (the width of the screen, the height of
+                the text)
+
+            Raises:
+                ValueError if the layer would use more than max_bytes
+                TimeoutError if it takes more than max_seconds
+        """
+
+        # reuse it (and mark it as used, so it is kept)
+        layer_path = os.path.join(self.layer_dir, f'{key}.png')
+        if os.path.exists(layer_path):
+            os.utime(layer_path)
+            return GdkPixbuf.Pixbuf.new_from_file(layer_path)
+        self.last_cached = False
+
+        # lay out the text, with the font scaled to the screen
+        # NB: at most MAX_LINES lines, the last one cut short with '...'
+        pad = max(2, round(height * PAD_FRACTION))
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 1, 1)
+        context = cairo.Context(surface)
+        layout = PangoCairo.create_layout(context)
+        PangoCairo.context_set_resolution(layout.get_context(),
+                                          96 * height / BASE_HEIGHT)
+        layout.set_font_description(Pango.FontDescription.from_string(
+            self.font))
+        layout.set_width((width - pad * 2) * Pango.SCALE)
+        layout.set_height(-MAX_LINES)
+        layout.set_wrap(Pango.WrapMode.WORD_CHAR)
+        layout.set_ellipsize(Pango.EllipsizeMode.END)
+        layout.set_text(text, -1)
+        _ink, logical = layout.get_pixel_extents()
+        layer_h = min(logical.height + pad * 2, height)
+
+        # check the budget before making the layer
+        need = width * layer_h * 4
+        if need > self.max_bytes:
+            raise ValueError(f'caption layer needs {need // 1024} KiB, '
+                             f'budget is {self.max_bytes // 1024} KiB')
+        self.__check_time(start)
+
+        # draw the band and the text on it
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, layer_h)
+        context = cairo.Context(surface)
+        context.set_source_rgba(0, 0, 0, BAND_ALPHA)
+        context.paint()
+        context.set_source_rgba(1, 1, 1, 1)
+        context.move_to(pad, pad)
+        PangoCairo.update_layout(context, layout)
+        PangoCairo.show_layout(context, layout)
+        surface.flush()
+        self.__check_time(start)
+
+        # save it, and make room for it
+        # NB: a png, so it loads back with its alpha (not premultiplied)
+        tmp_path = f'{layer_path}.tmp'
+        surface.write_to_png(tmp_path)
+        os.replace(tmp_path, layer_path)
+        surface.finish()
+        self.__collect_garbage(layer_path)
+
+        # return the layer
+        return GdkPixbuf.Pixbuf.new_from_file(layer_path)
+
+    # --------------------------------------------------------------------------
+    # Check the time budget
+    # --------------------------------------------------------------------------
+    def __check_time(self, start):
+
+        """
+            Check the time budget
+
+            Paramaters:
+                start [float]: when get() started (time.monotonic)
+
+            Raises:
+                TimeoutError if the caption has taken more than max_seconds
+
+            NB: a step can't be stopped halfway, so this is checked between
+            steps, before the next (slower) one
+        """
+
+        seconds = time.monotonic() - start
+        if self.max_seconds and seconds > self.max_seconds:
+            raise TimeoutError(f'caption took {seconds:.2f}s, budget is '
+                               f'{self.max_seconds:.2f}s')
+
+    # --------------------------------------------------------------------------
+    # Remove the least recently used layers
+    # --------------------------------------------------------------------------
+    def __collect_garbage(self, keep_path):
+
+        """
+            Remove the least recently used layers
+
+            Paramaters:
+                keep_path [str]: the layer just made (which is always kept)
+        """
+
+        # get the layers, newest first
+        layers = []
+        for name in os.listdir(self.layer_dir):
+            path = os.path.join(self.layer_dir, name)
+            try:
+                layers.append((os.stat(path).st_mtime, path))
+            except FileNotFoundError:
+                pass
+        layers.sort(reverse=True)
+
+        # remove the ones past the limit
+        for _mtime, path in layers[KEEP_LAYERS:]:
+            if path == keep_path:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+# -)
@@ -0,0 +1,374 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: conf_store.py                                         |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+import copy
+import json
+import os
+
+
+# ------------------------------------------------------------------------------
+# Write a json file atomically
+# ------------------------------------------------------------------------------
+def write_json_atomic(path, data, indent=None):
+
+    """
+        Write a json file atomically
+
+        Paramaters:
+            path [str]: the file to write
+            data [object]: the data to write
+            indent [int]: the json indent, or None for compact
+
+        Raises:
+            OSError if the file can't be written
+
+        The data goes to a temp file, which is fsynced and then renamed over
+        the real file, and the folder is fsynced so the rename sticks. A crash
+        at any point leaves either the old file or the new one, never half of
+        one.
+    """
+
+    # write and sync the temp file
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as file:
+        json.dump(data, file, indent=indent)
+        file.flush()
+        os.fsync(file.fileno())
+
+    # move it into place
+    os.replace(tmp_path, path)
+
+    # sync the folder so the rename is on disk
+    dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+# ------------------------------------------------------------------------------
+# Define the config store class
+# ------------------------------------------------------------------------------
+
+class ConfStore:
+
+    """
+        Keeps user settings and run state, and only writes what changed
+
+        All sections live in one dict (data), but they are saved to two
+        files: the user settings (which people may edit) and the volatile
+        run state (which changes every time a new picture arrives). A
+        snapshot of what is on disk is kept, so save() can tell exactly
+        which keys are dirty and skips a file if none of its keys are.
+
+        The data is checked against the defaults once, at load time. Missing
+        keys, and keys with the wrong type, are set to their default.
+    """
+
+    # --------------------------------------------------------------------------
+    # Methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Initialize the class
+    # --------------------------------------------------------------------------
+    def __init__(self, conf_path, state_path, dict_defs, state_sections):
+
+        """
+            Initialize the class
+
+            Paramaters:
+                conf_path [str]: the user settings file
+                state_path [str]: the run state file
+                dict_defs [dict]: the default value of every section and key
+                state_sections [list]: the names of the sections that are run
+                    state (the rest are user settings)
+        """
+
+        # set the file locations
+        self.conf_path = conf_path
+        self.state_path = state_path
+
+        # set the defaults and which sections go where
+        self.dict_defs = dict_defs
+        self.state_sections = list(state_sections)
+
+        # the live data, starting from (a deep copy of) the defaults
+        self.data = copy.deepcopy(dict_defs)
+
+        # what is on disk, per file
+        self.snapshots = {conf_path: {}, state_path: {}}
+
+    # --------------------------------------------------------------------------
+    # Load and check both files
+    # --------------------------------------------------------------------------
+    def load(self):
+
+        """
+            Load and check both files
+
+            Returns:
+                [list]: a message for each problem found and fixed
+
+            A missing or unreadable file is not an error here, it just means
+            defaults (which will be written on the next save).
+        """
+
+        # default return result
+        problems = []
+
+        # start from the defaults
+        self.data = copy.deepcopy(self.dict_defs)
+
+        # read each file
+        conf_dict = self.__read(self.conf_path, problems)
+        state_dict = self.__read(self.state_path, problems)
+
+        # NB: old versions kept everything in the conf file, so take any
+        # state found there (if the state file doesn't have it)
+        for section in self.state_sections:
+            if section in conf_dict and section not in state_dict:
+                state_dict[section] = conf_dict[section]
+
+        # merge the user settings and state over the defaults
+        self.__merge(conf_dict, self.__conf_sections(), problems)
+        self.__merge(state_dict, self.state_sections, problems)
+
+        # remember what is on disk
+        # NB: the snapshot is of the raw files, so anything fixed or moved
+        # above shows up as dirty and gets written on the next save
+        self.snapshots[self.conf_path] = copy.deepcopy(conf_dict)
+        self.snapshots[self.state_path] = copy.deepcopy(state_dict)
+
+        # return the result
+        return problems
+
+    # --------------------------------------------------------------------------
+    # Get the keys that differ from what is on disk
+    # --------------------------------------------------------------------------
+    def dirty_keys(self):
+
+        """
+            Get the keys that differ from what is on disk
+
+            Returns:
+                [list]: 'section.key' for each changed key
+        """
+
+        # check each file
+        dirty = []
+        for path in (self.conf_path, self.state_path):
+            dirty += self.__dirty_in(path)
+
+        # return the result
+        return dirty
+
+    # --------------------------------------------------------------------------
+    # Write any file that has dirty keys
+    # --------------------------------------------------------------------------
+    def save(self):
+
+        """
+            Write any file that has dirty keys
+
+            Returns:
+                [list]: the paths of the files that were written
+
+            Raises:
+                OSError if a file can't be written
+        """
+
+        # default return result
+        written = []
+
+        # check each file
+        for path in (self.conf_path, self.state_path):
+
+            # nothing changed
+            if not self.__dirty_in(path):
+                continue
+
+            # get this file's sections
+            if path == self.conf_path:
+                sections = self.__conf_sections()
+            else:
+                sections = self.state_sections
+            file_dict = {name: self.data[name] for name in sections
+                         if name in self.data}
+
+            # write it (user settings are indented for people to read)
+            indent = 4 if path == self.conf_path else None
+            write_json_atomic(path, file_dict, indent)
+
+            # remember what is on disk now
+            self.snapshots[path] = copy.deepcopy(file_dict)
+            written.append(path)
+
+        # return the result
+        return written
+
+    # --------------------------------------------------------------------------
+    # Helpers
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Get the names of the user settings sections
+    # --------------------------------------------------------------------------
+    def __conf_sections(self):
+
+        """
+            Get the names of the user settings sections
+
+            Returns:
+                [list]: every section that is not run state
+        """
+
+        return [name for name in self.data
+                if name not in self.state_sections]
+
+    # --------------------------------------------------------------------------
+    # Get the dirty keys for one file
+    # --------------------------------------------------------------------------
+    def __dirty_in(self, path):
+
+        """
+            Get the dirty keys for one file
+
+            Paramaters:
+                path [str]: the file to check
+
+            Returns:
+                [list]: 'section.key' for each changed key
+        """
+
+        # get this file's sections and snapshot
+        if path == self.conf_path:
+            sections = self.__conf_sections()
+        else:
+            sections = self.state_sections
+        snapshot = self.snapshots[path]
+
+        # a section on disk that we no longer have means a rewrite
+        dirty = [name for name in snapshot if name not in sections]
+
+        # compare each key
+        for name in sections:
+            section = self.data.get(name, {})
+            old_section = snapshot.get(name)
+            if not isinstance(old_section, dict):
+                dirty.append(name)
+                continue
+            keys = set(section) | set(old_section)
+            dirty += [f'{name}.{key}' for key in sorted(keys)
+                      if section.get(key) != old_section.get(key)]
+
+        # return the result
+        return dirty
+
+    # --------------------------------------------------------------------------
+    # Merge loaded sections over the defaults, checking types
+    # --------------------------------------------------------------------------
+    def __merge(self, file_dict, sections, problems):
+
+        """
+            Merge loaded sections over the defaults, checking types
+
+            Paramaters:
+                file_dict [dict]: the data loaded from a file
+                sections [list]: the sections that belong in that file
+                problems [list]: messages about bad values are added here
+        """
+
+        for name in sections:
+
+            # missing or bad section, keep the defaults
+            user_section = file_dict.get(name)
+            if user_section is None:
+                continue
+            if not isinstance(user_section, dict):
+                problems.append(f'{name}: not a section, using defaults')
+                continue
+
+            # check each key against its default
+            # NB: keys we have no default for are kept (i.e. the apod
+            # section holds whatever the api sends)
+            def_section = self.dict_defs.get(name, {})
+            for key, val in user_section.items():
+                if key in def_section and \
+                        not self.__same_type(val, def_section[key]):
+                    problems.append(f'{name}.{key}: bad value {val!r}, '
+                                    f'using {def_section[key]!r}')
+                    continue
+                self.data[name][key] = val
+
+    # --------------------------------------------------------------------------
+    # Check if a value has the same type as its default
+    # --------------------------------------------------------------------------
+    def __same_type(self, val, def_val):
+
+        """
+            Check if a value has the same type as its default
+
+            Paramaters:
+                val [object]: the loaded value
+                def_val [object]: the default value
+
+            Returns:
+                [bool]: True if the types match (an int is fine for a float,
+                and true/false are fine for an int)
+        """
+
+        # an int is fine where a float is expected
+        if isinstance(def_val, float) and not isinstance(val, bool):
+            return isinstance(val, (int, float))
+
+        # but a float is not fine where an int is expected
+        if isinstance(def_val, int) and isinstance(val, float):
+            return False
+
+        # otherwise the types must match
+        return isinstance(val, type(def_val))
+
+    # --------------------------------------------------------------------------
+    # Read a json file
+    # --------------------------------------------------------------------------
+    def __read(self, path, problems):
+
+        """
+            Read a json file
+
+            Paramaters:
+                path [str]: the file to read
+                problems [list]: a message is added here if it is bad
+
+            Returns:
+                [dict]: the file's data ({} if missing or bad)
+        """
+
+        # no file, no data
+        if not os.path.exists(path):
+            return {}
+
+        # read the file
+        try:
+            with open(path, 'r') as file:
+                file_dict = json.load(file)
+            if not isinstance(file_dict, dict):
+                raise ValueError('not a json object')
+        except (OSError, ValueError) as error:
+            problems.append(f'{os.path.basename(path)}: {error}')
+            return {}
+
+        # return the data
+        return file_dict
+
+# -)
@@ -67,8 +67,10 @@ def run():
         my_job = my_cron.new(command=cron_cmd, comment=prog_name)
 
     # set job time
+    # NB: this is frequent, but the script decides locally (no network) if a
+    # new apod could exist yet, so most runs exit almost immediately
     my_job.enable()
-    my_job.minute.every(10)
+    my_job.minute.every(2)
 
     # save job parameters
     my_cron.write()
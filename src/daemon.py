@@ -0,0 +1,204 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: daemon.py                                             |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+import logging
+import resource
+import signal
+import threading
+import time
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# NB: the wait uses a monotonic clock, which stops while a laptop is asleep, so
+# never sleep longer than this or we could miss a whole day after a resume
+MAX_SLEEP = 300
+
+# never wake more often than this, even if a check is due right away
+MIN_SLEEP = 60
+
+
+# ------------------------------------------------------------------------------
+# Define the daemon class
+# ------------------------------------------------------------------------------
+
+class Daemon:
+
+    """
+        Keeps a Main instance resident and runs it on an internal timer
+
+        Instead of cron starting a new interpreter every few minutes, the
+        daemon loads everything once and then sleeps until the scheduler says
+        a new apod could exist. SIGHUP reloads the config, SIGTERM (or SIGINT)
+        finishes the current run and shuts down.
+    """
+
+    # --------------------------------------------------------------------------
+    # Methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Initialize the class
+    # --------------------------------------------------------------------------
+    def __init__(self, main, max_sleep=MAX_SLEEP):
+
+        """
+            Initialize the class
+
+            Paramaters:
+                main [Main]: the Main instance to run
+                max_sleep [int]: the longest time to sleep between runs
+        """
+
+        # the main class
+        self.main = main
+        self.max_sleep = max_sleep
+
+        # flags set from signal handlers
+        self.wake = threading.Event()
+        self.stop = False
+        self.reload = False
+
+        # resource usage at the end of the last run
+        self.last_usage = None
+
+    # --------------------------------------------------------------------------
+    # Run the daemon until told to stop
+    # --------------------------------------------------------------------------
+    def run(self):
+
+        """
+            Run the daemon until told to stop
+        """
+
+        # set up the signal handlers
+        signal.signal(signal.SIGHUP, self.__on_sighup)
+        signal.signal(signal.SIGTERM, self.__on_sigterm)
+        signal.signal(signal.SIGINT, self.__on_sigterm)
+
+        # do the one-time setup
+        self.__log('start daemon')
+        self.main.run()
+
+        # loop until told to stop
+        while not self.stop:
+
+            # log resource use since the last run
+            self.__log_usage()
+
+            # sleep until the next check is due (or a signal wakes us)
+            wait = min(self.main.get_wait(), self.max_sleep)
+            wait = max(wait, MIN_SLEEP)
+            self.wake.wait(wait)
+            self.wake.clear()
+
+            # check for shutdown
+            if self.stop:
+                break
+
+            # check for reload
+            if self.reload:
+                self.reload = False
+                self.main.reload()
+
+            # do one pass of the pipeline
+            # NB: any unexpected error is logged, the daemon stays up
+            try:
+                self.main.run_steps()
+            except Exception as error:
+                logging.getLogger('spaceoddity.daemon').exception(error)
+
+        # log shutdown
+        self.__log('stop daemon')
+
+    # --------------------------------------------------------------------------
+    # Helpers
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Handle SIGHUP
+    # --------------------------------------------------------------------------
+    def __on_sighup(self, signum, frame):
+
+        """
+            Handle SIGHUP
+
+            Paramaters:
+                signum [int]: the signal number
+                frame [frame]: the current stack frame
+        """
+
+        # reload the config at the next wakeup, which is now
+        self.reload = True
+        self.wake.set()
+
+    # --------------------------------------------------------------------------
+    # Handle SIGTERM and SIGINT
+    # --------------------------------------------------------------------------
+    def __on_sigterm(self, signum, frame):
+
+        """
+            Handle SIGTERM and SIGINT
+
+            Paramaters:
+                signum [int]: the signal number
+                frame [frame]: the current stack frame
+
+            If a run is in progress, it is allowed to finish first.
+        """
+
+        # stop at the next wakeup, which is now
+        self.stop = True
+        self.wake.set()
+
+    # --------------------------------------------------------------------------
+    # Log cpu time and memory used since the last run
+    # --------------------------------------------------------------------------
+    def __log_usage(self):
+
+        """
+            Log cpu time and memory used since the last run
+
+            This is how the idle cost of the daemon is measured (see README).
+        """
+
+        # get the current usage
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        now = time.monotonic()
+        cpu = usage.ru_utime + usage.ru_stime
+
+        # log the cpu used since the last run
+        if self.last_usage:
+            last_now, last_cpu = self.last_usage
+            self.__log('usage: cpu %.3fs over %.0fs, max rss %s KiB',
+                       cpu - last_cpu, now - last_now, usage.ru_maxrss)
+
+        # remember for next time
+        self.last_usage = (now, cpu)
+
+    # --------------------------------------------------------------------------
+    # Print info message to log file and terminal
+    # --------------------------------------------------------------------------
+    def __log(self, msg, *args):
+
+        """
+            Print info message to log file and terminal
+
+            Paramaters:
+                msg [str]: the message, with %s for each arg
+                args [list]: the values for the message
+        """
+
+        logging.getLogger('spaceoddity.daemon').info(msg, *args)
+
+# -)
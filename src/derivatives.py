@@ -0,0 +1,200 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: derivatives.py                                        |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+import gi
+import math
+import os
+
+gi.require_version('Gdk', '3.0')
+gi.require_version('GdkPixbuf', '2.0')
+
+from gi.repository import Gdk, GdkPixbuf  # noqa: E402
+
+# NB: requires:
+# gir1.2-gtk-3.0 (apt)
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# the jpeg quality of the derivatives
+JPEG_QUALITY = '92'
+
+
+# ------------------------------------------------------------------------------
+# Get the size of each monitor in real pixels
+# ------------------------------------------------------------------------------
+def get_monitor_sizes():
+
+    """
+        Get the size of each monitor in real pixels
+
+        Returns:
+            [list]: a (width, height) tuple for each monitor, or an empty list
+            if there is no display
+    """
+
+    # default return result
+    sizes = []
+
+    # get the display (None if we are headless)
+    display = Gdk.Display.get_default()
+    if display is None:
+        return sizes
+
+    # get each monitor's size, scaled up for hidpi
+    for i in range(display.get_n_monitors()):
+        monitor = display.get_monitor(i)
+        geometry = monitor.get_geometry()
+        scale = monitor.get_scale_factor()
+        size = (geometry.width * scale, geometry.height * scale)
+        if size not in sizes:
+            sizes.append(size)
+
+    # return the result
+    return sizes
+
+
+# ------------------------------------------------------------------------------
+# Define the derivatives class
+# ------------------------------------------------------------------------------
+
+class Derivatives:
+
+    """
+        Makes pre-scaled, pre-cropped copies of an image for each display
+
+        The source is decoded straight at (close to) the target size, so the
+        full-size image is never in memory, then cropped to fill the screen.
+        Each derivative is named '<source sha>_<width>x<height>.jpg', so it
+        is only ever made once.
+    """
+
+    # --------------------------------------------------------------------------
+    # Methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Initialize the class
+    # --------------------------------------------------------------------------
+    def __init__(self, derived_dir):
+
+        """
+            Initialize the class
+
+            Paramaters:
+                derived_dir [str]: the folder to keep derivatives in
+        """
+
+        # set the folder and make sure it exists
+        self.derived_dir = derived_dir
+        os.makedirs(derived_dir, exist_ok=True)
+
+    # --------------------------------------------------------------------------
+    # Get a derivative of an image for a screen size
+    # --------------------------------------------------------------------------
+    def get(self, src_path, sha, width, height):
+
+        """
+            Get a derivative of an image for a screen size
+
+            Paramaters:
+                src_path [str]: the source image
+                sha [str]: the sha256 of the source image
+                width [int]: the screen width
+                height [int]: the screen height
+
+            Returns:
+                [str]: the path to the derivative, or src_path if the source
+                is no bigger than the screen
+
+            Raises:
+                GLib.Error if the image can't be decoded or saved
+        """
+
+        # already made it
+        dst_path = os.path.join(self.derived_dir,
+                                f'{sha}_{width}x{height}.jpg')
+        if os.path.exists(dst_path):
+            return dst_path
+
+        # get the source size without decoding it
+        _format, src_w, src_h = GdkPixbuf.Pixbuf.get_file_info(src_path)
+        if not src_w or not src_h:
+            return src_path
+
+        # the scale that makes the image just cover the screen
+        scale = max(width / src_w, height / src_h)
+
+        # not bigger than the screen, nothing to gain
+        if scale >= 1:
+            return src_path
+
+        # decode at the covering size
+        # NB: the loader picks a reduced decode mode (i.e. jpeg 1/2, 1/4,
+        # 1/8) before scaling, so peak memory follows the target size, not
+        # the source size
+        load_w = max(width, math.ceil(src_w * scale))
+        load_h = max(height, math.ceil(src_h * scale))
+        pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(src_path, load_w,
+                                                         load_h, False)
+
+        # crop the middle to the exact screen size
+        x = (pixbuf.get_width() - width) // 2
+        y = (pixbuf.get_height() - height) // 2
+        cropped = pixbuf.new_subpixbuf(x, y, width, height)
+
+        # save to a temp file and move it into place
+        tmp_path = f'{dst_path}.tmp'
+        cropped.savev(tmp_path, 'jpeg', ['quality'], [JPEG_QUALITY])
+        os.replace(tmp_path, dst_path)
+
+        # return the new derivative
+        return dst_path
+
+    # --------------------------------------------------------------------------
+    # Remove derivatives whose source is gone
+    # --------------------------------------------------------------------------
+    def collect_garbage(self, keep_shas):
+
+        """
+            Remove derivatives whose source is gone
+
+            Paramaters:
+                keep_shas [list]: the hashes of the sources we still have
+
+            Returns:
+                [list]: the paths that were removed
+        """
+
+        # default return result
+        removed = []
+
+        # check each derivative
+        keep_shas = set(keep_shas)
+        for name in os.listdir(self.derived_dir):
+            sha = name.split('_')[0]
+            if sha in keep_shas:
+                continue
+
+            # remove it
+            path = os.path.join(self.derived_dir, name)
+            try:
+                os.remove(path)
+                removed.append(path)
+            except FileNotFoundError:
+                pass
+
+        # return the result
+        return removed
+
+# -)
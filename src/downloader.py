@@ -0,0 +1,414 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: downloader.py                                         |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+from http.client import HTTPException
+from http_client import HTTPError
+from resilience import (BACKOFF_CAP, RETRY_STATUSES, backoff_delay,
+                        get_retry_after)
+from run_guard import DeadlineExceeded
+import hashlib
+import json
+import os
+import time
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# the size of each chunk read from the network
+CHUNK_SIZE = 64 * 1024
+
+
+# ------------------------------------------------------------------------------
+# Define the download error
+# ------------------------------------------------------------------------------
+
+class DownloadError(Exception):
+
+    """
+        Raised when a download can't be completed
+
+        status is the http status (0 if it wasn't an http error), and
+        retry_after the server's Retry-After (0 if none).
+    """
+
+    # --------------------------------------------------------------------------
+    # Initialize the class
+    # --------------------------------------------------------------------------
+    def __init__(self, msg, status=0, retry_after=0):
+
+        """
+            Initialize the class
+
+            Paramaters:
+                msg [str]: the error message
+                status [int]: the http status
+                retry_after [float]: the server's Retry-After
+        """
+
+        super().__init__(msg)
+        self.status = status
+        self.retry_after = retry_after
+
+
+# ------------------------------------------------------------------------------
+# Define the downloader class
+# ------------------------------------------------------------------------------
+
+class Downloader:
+
+    """
+        Streams a url to a file, with resume and an atomic finish
+
+        The data is written to a '.part' file named after the url, and hashed
+        as it arrives. A small '.part.json' file next to it remembers the url
+        and validators, so if the connection drops, the next attempt (in this
+        run or the next one) can ask for just the missing bytes with an HTTP
+        Range request. Only when the whole file is there is it renamed to its
+        final name, so a truncated file can never be used as a wallpaper.
+    """
+
+    # --------------------------------------------------------------------------
+    # Methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Initialize the class
+    # --------------------------------------------------------------------------
+    def __init__(self, part_dir, http_client, retries=3, progress=None,
+                 sleep=time.sleep):
+
+        """
+            Initialize the class
+
+            Paramaters:
+                part_dir [str]: the folder to keep partial downloads in
+                http_client [HTTPClient]: the client to download with
+                retries [int]: the number of attempts before giving up
+                progress [callable]: called as progress(done, total) after
+                    each chunk (total is 0 if unknown), or None
+                sleep [callable]: the sleep function between attempts (for
+                    testing)
+        """
+
+        self.part_dir = part_dir
+        self.http_client = http_client
+        self.retries = retries
+        self.progress = progress
+        self.sleep = sleep
+
+        # the http status and bytes received by the last download (over all
+        # attempts)
+        self.last_status = 0
+        self.last_bytes = 0
+
+    # --------------------------------------------------------------------------
+    # Download a url to a file
+    # --------------------------------------------------------------------------
+    def download(self, url, dst_path):
+
+        """
+            Download a url to a file
+
+            Paramaters:
+                url [str]: the url to download
+                dst_path [str]: the final path of the file
+
+            Returns:
+                [str]: the sha256 hex digest of the file
+
+            Raises:
+                DownloadError(str) if all attempts fail
+
+            Attempts are spaced out with jittered exponential backoff (or
+            the server's Retry-After). A status that won't get better by
+            trying again (i.e. 404), a Retry-After longer than BACKOFF_CAP,
+            or running out of time, ends it early.
+        """
+
+        # keep the last error for the exception message
+        last_error = None
+        self.last_status = 0
+        self.last_bytes = 0
+        retry_after = 0
+
+        # try a few times, resuming each time
+        attempts = max(1, self.retries)
+        for attempt in range(1, attempts + 1):
+            try:
+                return self.__try_download(url, dst_path)
+            except (OSError, HTTPException, DownloadError) as err:
+                last_error = err
+
+            # no point trying again
+            # NB: 416 means our part file was bad, and it's gone now
+            if isinstance(last_error, DeadlineExceeded):
+                break
+            status = getattr(last_error, 'status', 0)
+            if status and status not in RETRY_STATUSES and status != 416:
+                break
+            retry_after = get_retry_after(last_error)
+            if attempt == attempts or retry_after > BACKOFF_CAP:
+                break
+
+            # wait before the next attempt
+            self.sleep(max(backoff_delay(attempt), retry_after))
+
+        # all attempts failed, but leave the part file for next time
+        raise DownloadError(f'{url}: {last_error}', self.last_status,
+                            retry_after)
+
+    # --------------------------------------------------------------------------
+    # Helpers
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Make one attempt at downloading a url
+    # --------------------------------------------------------------------------
+    def __try_download(self, url, dst_path):
+
+        """
+            Make one attempt at downloading a url
+
+            Paramaters:
+                url [str]: the url to download
+                dst_path [str]: the final path of the file
+
+            Returns:
+                [str]: the sha256 hex digest of the file
+
+            Raises:
+                DownloadError(str) if the response is bad or short
+                OSError or HTTPException if the network or disk fails
+        """
+
+        # get the temp file names
+        # NB: these are named after the url, not dst_path, so a later run can
+        # find and resume them
+        url_hash = hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+        part_path = os.path.join(self.part_dir, f'download_{url_hash}.part')
+        meta_path = f'{part_path}.json'
+
+        # see how much we already have (and hash it)
+        # NB: without a validator, If-Range can't stop the server sending
+        # part of a newer file, so only resume a part file that has one
+        meta_dict = self.__load_meta(meta_path, url)
+        hasher = hashlib.sha256()
+        offset = 0
+        if meta_dict and meta_dict.get('validator'):
+            offset = self.__hash_part(part_path, hasher)
+
+        # build the request
+        headers = {}
+        if offset:
+            headers['Range'] = f'bytes={offset}-'
+            headers['If-Range'] = meta_dict['validator']
+
+        # do the request
+        try:
+            response = self.http_client.open(url, headers)
+        except HTTPError as err:
+
+            # our partial file is bigger than the real one, start over
+            self.last_status = err.code
+            if err.code == 416:
+                self.__remove(part_path, meta_path)
+            raise DownloadError(f'HTTP {err.code}', err.code,
+                                get_retry_after(err))
+
+        # get the total size, if the server tells us
+        self.last_status = response.status
+        length = int(response.headers.get('Content-Length', 0) or 0)
+        total = length
+
+        # 206 means append, anything else means the server sent it all
+        if response.status == 206:
+
+            # the part we asked for, of the file we started?
+            start, total = self.__get_content_range(
+                response.headers.get('Content-Range', ''))
+            total = total or offset + length
+            expected = meta_dict.get('total', 0) if meta_dict else 0
+            if start != offset or (expected and total != expected):
+
+                # no, so drop what we have and start over
+                # NB: the next try doesn't ask for a range, so it can only
+                # get here once
+                response.close()
+                self.__remove(part_path, meta_path)
+                if not offset:
+                    raise DownloadError('bad Content-Range: '
+                                        f'{response.headers["Content-Range"]}')
+                return self.__try_download(url, dst_path)
+            mode = 'ab'
+
+        else:
+            mode = 'wb'
+            offset = 0
+            hasher = hashlib.sha256()
+
+        # remember what we are downloading, so we can resume it
+        validator = response.headers.get('ETag') or \
+            response.headers.get('Last-Modified') or ''
+        self.__save_meta(meta_path, {'url': url, 'validator': validator,
+                                     'total': total})
+
+        # stream the body to the part file
+        done = offset
+        with response, open(part_path, mode) as file:
+            while True:
+                chunk = response.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                file.write(chunk)
+                hasher.update(chunk)
+                done += len(chunk)
+                self.last_bytes += len(chunk)
+                if self.progress:
+                    self.progress(done, total)
+
+            # make sure it's on disk before we rename
+            file.flush()
+            os.fsync(file.fileno())
+
+        # a short read means the connection dropped
+        if total and done < total:
+            raise DownloadError(f'short read ({done} of {total} bytes)')
+
+        # the file is complete, make it visible
+        os.replace(part_path, dst_path)
+        self.__remove(meta_path)
+
+        # return the hash
+        return hasher.hexdigest()
+
+    # --------------------------------------------------------------------------
+    # Hash the existing part file
+    # --------------------------------------------------------------------------
+    def __hash_part(self, part_path, hasher):
+
+        """
+            Hash the existing part file
+
+            Paramaters:
+                part_path [str]: the path to the part file
+                hasher [hash]: the hash object to update
+
+            Returns:
+                [int]: the size of the part file (0 if there is none)
+        """
+
+        # no part file, nothing to resume
+        if not os.path.exists(part_path):
+            return 0
+
+        # hash what we have
+        size = 0
+        with open(part_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(CHUNK_SIZE), b''):
+                hasher.update(chunk)
+                size += len(chunk)
+
+        # return the size
+        return size
+
+    # --------------------------------------------------------------------------
+    # Read the Content-Range of a 206
+    # --------------------------------------------------------------------------
+    def __get_content_range(self, value):
+
+        """
+            Read the Content-Range of a 206
+
+            Paramaters:
+                value [str]: the header (i.e. 'bytes 100-199/1000')
+
+            Returns:
+                [tuple]: the first byte sent (None if the header is bad) and
+                the size of the whole file (0 if the server didn't say)
+        """
+
+        # split it up
+        unit, _sep, rest = value.strip().partition(' ')
+        span, _sep, total = rest.partition('/')
+        start, _sep, end = span.partition('-')
+        if unit != 'bytes' or not start.isdigit() or not end.isdigit():
+            return None, 0
+
+        # return the start and the total
+        return int(start), int(total) if total.isdigit() else 0
+
+    # --------------------------------------------------------------------------
+    # Load the resume info for a part file
+    # --------------------------------------------------------------------------
+    def __load_meta(self, meta_path, url):
+
+        """
+            Load the resume info for a part file
+
+            Paramaters:
+                meta_path [str]: the path to the resume info file
+                url [str]: the url we are about to download
+
+            Returns:
+                [dict]: the resume info, or None if we can't resume
+        """
+
+        # read the file
+        try:
+            with open(meta_path, 'r') as file:
+                meta_dict = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        # only resume the same url
+        if meta_dict.get('url') != url:
+            return None
+
+        # return the resume info
+        return meta_dict
+
+    # --------------------------------------------------------------------------
+    # Save the resume info for a part file
+    # --------------------------------------------------------------------------
+    def __save_meta(self, meta_path, meta_dict):
+
+        """
+            Save the resume info for a part file
+
+            Paramaters:
+                meta_path [str]: the path to the resume info file
+                meta_dict [dict]: the resume info
+        """
+
+        with open(meta_path, 'w') as file:
+            json.dump(meta_dict, file)
+
+    # --------------------------------------------------------------------------
+    # Remove files, ignoring any that are missing
+    # --------------------------------------------------------------------------
+    def __remove(self, *paths):
+
+        """
+            Remove files, ignoring any that are missing
+
+            Paramaters:
+                paths [str]: the files to remove
+        """
+
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+# -)
@@ -0,0 +1,348 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: http_cache.py                                         |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+from email.utils import parsedate_to_datetime
+from http_client import HTTPError
+import json
+import os
+import time
+
+
+# ------------------------------------------------------------------------------
+# Define the cache class
+# ------------------------------------------------------------------------------
+
+class HTTPCache:
+
+    """
+        A small on-disk HTTP cache for conditional GETs
+
+        This class remembers the body, ETag, Last-Modified and Cache-Control
+        freshness of each URL it fetches. If a cached response is still fresh,
+        no request is made at all. Otherwise an If-None-Match/If-Modified-Since
+        request is sent, and a 304 response is treated as "unchanged". Hit and
+        miss counters are kept in the cache file so bandwidth savings can be
+        tracked over time.
+    """
+
+    # --------------------------------------------------------------------------
+    # Methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Initialize the class
+    # --------------------------------------------------------------------------
+    def __init__(self, cache_path, http_client):
+
+        """
+            Initialize the class
+
+            Paramaters:
+                cache_path [str]: the path to the cache file
+                http_client [HTTPClient]: the client to fetch with
+        """
+
+        # set the cache file location and client
+        self.cache_path = cache_path
+        self.http_client = http_client
+
+        # set default cache dict
+        self.cache_dict = {
+            'entries':  {},
+            'stats': {
+                'hits':         0,
+                'misses':       0,
+                'bytes_saved':  0
+            }
+        }
+
+        # the http status and headers of the last fetch (0 and None if no
+        # request was made)
+        self.last_status = 0
+        self.last_headers = None
+
+        # load any existing cache
+        self.__load()
+
+    # --------------------------------------------------------------------------
+    # Get a url, using the cache when possible
+    # --------------------------------------------------------------------------
+    def fetch(self, url, force=False):
+
+        """
+            Get a url, using the cache when possible
+
+            Paramaters:
+                url [str]: the url to get
+                force [bool]: if True, ignore the cache and do a full GET
+
+            Returns:
+                [tuple]: the body of the response [bytes] and whether it
+                changed since the last fetch [bool]
+
+            Raises:
+                HTTPError or OSError if the request fails
+
+            The body is asked for gzipped (the json shrinks to a third).
+        """
+
+        # get the entry for this url
+        entries = self.cache_dict['entries']
+        entry = entries.get(url)
+
+        # if we have a fresh copy, don't even ask the server
+        self.last_status = 0
+        self.last_headers = None
+        # NB: save the stats, or a cron run's hit is lost when it exits
+        if not force and entry and time.time() < entry['expires']:
+            body = self.__hit(entry)
+            self.__save()
+            return body, False
+
+        # build the request, adding validators if we have them
+        headers = {}
+        if not force and entry:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        # do the request
+        try:
+            response = self.http_client.open(url, headers, gzip=True)
+        except HTTPError as err:
+            self.last_status = err.code
+            self.last_headers = err.headers
+            raise
+        self.last_status = response.status
+        self.last_headers = response.headers
+
+        # a 304 means our copy is still good
+        # NB: we only send validators when we have a copy, so a 304 without
+        # one is the server's mistake
+        if response.status == 304:
+            if not entry:
+                raise HTTPError(url, 304, 'Not Modified', response.headers)
+
+            # refresh the freshness info from the 304 headers
+            self.__update_entry(entry, response.headers)
+            body = self.__hit(entry)
+            self.__save()
+
+            # nothing new
+            return body, False
+
+        # read the new body
+        with response:
+            body = response.read()
+
+        # update the stats
+        stats = self.cache_dict['stats']
+        stats['misses'] += 1
+
+        # store the new entry (unless told not to)
+        if self.__parse_cache_control(response.headers).get('no-store'):
+            entries.pop(url, None)
+        else:
+            entry = {'body': body.decode('utf-8')}
+            self.__update_entry(entry, response.headers)
+            entries[url] = entry
+
+        # save the cache
+        self.__save()
+
+        # return the new body
+        return body, True
+
+    # --------------------------------------------------------------------------
+    # Get the hit/miss counters
+    # --------------------------------------------------------------------------
+    def get_stats(self):
+
+        """
+            Get the hit/miss counters
+
+            Returns:
+                [dict]: a copy of the hits, misses and bytes_saved counters
+        """
+
+        return self.cache_dict['stats'].copy()
+
+    # --------------------------------------------------------------------------
+    # Drop the cached copy of a url
+    # --------------------------------------------------------------------------
+    def forget(self, url):
+
+        """
+            Drop the cached copy of a url
+
+            Paramaters:
+                url [str]: the url to drop
+
+            The next fetch of the url is a full GET. This is for a body that
+            turned out to be bad (i.e. broken json), which the server would
+            otherwise keep saying is not modified.
+        """
+
+        if self.cache_dict['entries'].pop(url, None) is not None:
+            self.__save()
+
+    # --------------------------------------------------------------------------
+    # Helpers
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Record a cache hit and return the cached body
+    # --------------------------------------------------------------------------
+    def __hit(self, entry):
+
+        """
+            Record a cache hit and return the cached body
+
+            Paramaters:
+                entry [dict]: the cache entry that was hit
+
+            Returns:
+                [bytes]: the cached body
+        """
+
+        # get the cached body
+        body = entry['body'].encode('utf-8')
+
+        # update the stats
+        stats = self.cache_dict['stats']
+        stats['hits'] += 1
+        stats['bytes_saved'] += len(body)
+
+        # return the cached body
+        return body
+
+    # --------------------------------------------------------------------------
+    # Update an entry's validators and expiry time from response headers
+    # --------------------------------------------------------------------------
+    def __update_entry(self, entry, headers):
+
+        """
+            Update an entry's validators and expiry time from response headers
+
+            Paramaters:
+                entry [dict]: the cache entry to update
+                headers [Message]: the response headers
+        """
+
+        # keep the old validators if the server didn't send new ones
+        entry['etag'] = headers.get('ETag', entry.get('etag', ''))
+        entry['last_modified'] = headers.get('Last-Modified',
+                                             entry.get('last_modified', ''))
+
+        # default to "stale", so we always revalidate
+        now = time.time()
+        expires = now
+
+        # Cache-Control wins over Expires
+        cache_control = self.__parse_cache_control(headers)
+        if 'no-cache' in cache_control:
+            expires = now
+        elif 'max-age' in cache_control:
+            try:
+                expires = now + int(cache_control['max-age'])
+            except ValueError:
+                pass
+        elif headers.get('Expires'):
+            try:
+                expires = parsedate_to_datetime(headers['Expires']).timestamp()
+            except (TypeError, ValueError):
+                pass
+
+        # set the expiry time
+        entry['expires'] = expires
+
+    # --------------------------------------------------------------------------
+    # Split a Cache-Control header into a dict
+    # --------------------------------------------------------------------------
+    def __parse_cache_control(self, headers):
+
+        """
+            Split a Cache-Control header into a dict
+
+            Paramaters:
+                headers [Message]: the response headers
+
+            Returns:
+                [dict]: the directives, with value True if they have no value
+        """
+
+        # default return result
+        dict_res = {}
+
+        # split the header into directives
+        value = headers.get('Cache-Control', '')
+        for item in value.split(','):
+            item = item.strip().lower()
+            if not item:
+                continue
+
+            # split directive and value
+            if '=' in item:
+                key, val = item.split('=', 1)
+                dict_res[key.strip()] = val.strip().strip('"')
+            else:
+                dict_res[item] = True
+
+        # return the result
+        return dict_res
+
+    # --------------------------------------------------------------------------
+    # Load the cache file
+    # --------------------------------------------------------------------------
+    def __load(self):
+
+        """
+            Load the cache file
+
+            A missing or broken cache file just means an empty cache.
+        """
+
+        # no file, no cache
+        if not os.path.exists(self.cache_path):
+            return
+
+        # read cache file
+        try:
+            with open(self.cache_path, 'r') as file:
+                cache_dict = json.load(file)
+            self.cache_dict['entries'].update(cache_dict['entries'])
+            self.cache_dict['stats'].update(cache_dict['stats'])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    # --------------------------------------------------------------------------
+    # Save the cache file
+    # --------------------------------------------------------------------------
+    def __save(self):
+
+        """
+            Save the cache file
+
+            The file is written to a temp file and renamed, so a crash never
+            leaves a half-written cache behind.
+        """
+
+        # write to a temp file
+        tmp_path = f'{self.cache_path}.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump(self.cache_dict, file)
+
+        # move it into place
+        os.replace(tmp_path, self.cache_path)
+
+# -)
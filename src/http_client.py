@@ -0,0 +1,851 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: http_client.py                                        |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+from http import client
+from run_guard import DeadlineExceeded
+from urllib import parse, request
+import socket
+import ssl
+import threading
+import time
+import zlib
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# the user agent we send
+USER_AGENT = 'SpaceOddity'
+
+# how long an idle connection is kept for reuse (seconds)
+# NB: most servers drop idle connections after a minute or so, and reusing a
+# dropped one costs a failed request, so don't keep them longer than that
+IDLE_TIMEOUT = 30
+
+# the most idle connections kept for each host
+MAX_IDLE = 4
+
+# the most redirects followed for one request
+MAX_REDIRECTS = 5
+
+# redirect statuses
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+# errors that mean a reused connection was closed by the server while idle
+STALE_ERRORS = (client.RemoteDisconnected, client.BadStatusLine,
+                ConnectionResetError, BrokenPipeError)
+
+
+# ------------------------------------------------------------------------------
+# Define the http error
+# ------------------------------------------------------------------------------
+
+class HTTPError(OSError):
+
+    """
+        Raised when the server answers with an error status (400 or more)
+
+        code and status are both the http status (code is what urllib
+        called it), and headers are the response headers.
+    """
+
+    # --------------------------------------------------------------------------
+    # Initialize the class
+    # --------------------------------------------------------------------------
+    def __init__(self, url, status, reason, headers):
+
+        """
+            Initialize the class
+
+            Paramaters:
+                url [str]: the url that was asked for
+                status [int]: the http status
+                reason [str]: the status text
+                headers [HTTPMessage]: the response headers
+        """
+
+        super().__init__(f'HTTP Error {status}: {reason}')
+        self.url = url
+        self.code = status
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+
+
+# ------------------------------------------------------------------------------
+# Define the pooled connection classes
+# ------------------------------------------------------------------------------
+
+class PooledConnection(client.HTTPConnection):
+
+    """
+        An HTTPConnection that remembers when it was last used
+
+        It connects through its connector (which has the signature of
+        socket.create_connection, i.e. the client's address cache), and
+        makes its own proxy tunnel, so it needs none of http.client's
+        private hooks.
+    """
+
+    # when the connection went back to the pool, and whether it goes through
+    # a proxy
+    idle_since = 0.0
+    via_proxy = False
+
+    # how to open the socket, and the (host, port) to tunnel to through a
+    # proxy (None for no tunnel)
+    connector = staticmethod(socket.create_connection)
+    tunnel_address = None
+
+    # --------------------------------------------------------------------------
+    # Connect to the host
+    # --------------------------------------------------------------------------
+    def connect(self):
+
+        """
+            Connect to the host
+
+            Raises:
+                OSError if the host can't be reached or the proxy refuses
+                the tunnel
+        """
+
+        # the tcp connection
+        self.sock = self.connector((self.host, self.port), self.timeout,
+                                   self.source_address)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        # the proxy tunnel
+        if self.tunnel_address:
+            self.__tunnel()
+
+    # --------------------------------------------------------------------------
+    # Helpers
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Ask the proxy for a tunnel to the host
+    # --------------------------------------------------------------------------
+    def __tunnel(self):
+
+        """
+            Ask the proxy for a tunnel to the host
+
+            Raises:
+                OSError if the proxy refuses
+
+            NB: the Host header of each request comes from set_tunnel(), so
+            call that too
+        """
+
+        # ask for it
+        host, port = self.tunnel_address
+        target = f'{host}:{port}'
+        self.sock.sendall(f'CONNECT {target} HTTP/1.1\r\n'
+                          f'Host: {target}\r\n\r\n'.encode('ascii'))
+
+        # see what the proxy said
+        # NB: closing the response doesn't close the socket
+        response = client.HTTPResponse(self.sock, method='CONNECT')
+        try:
+            response.begin()
+        finally:
+            response.close()
+        if response.status != 200:
+            self.close()
+            raise OSError(f'tunnel connection failed: {response.status} '
+                          f'{response.reason}')
+
+
+class PooledHTTPSConnection(PooledConnection, client.HTTPSConnection):
+
+    """
+        An HTTPSConnection that resumes a previous TLS session
+
+        Resuming a session skips most of the handshake on a new connection
+        to a host we have talked to before.
+    """
+
+    # the session to resume
+    session = None
+
+    # --------------------------------------------------------------------------
+    # Initialize the class
+    # --------------------------------------------------------------------------
+    def __init__(self, host, port, timeout, context):
+
+        """
+            Initialize the class
+
+            Paramaters:
+                host [str]: the host (or proxy) to connect to
+                port [int]: its port
+                timeout [float]: the read timeout
+                context [SSLContext]: the context to make the tls connection
+        """
+
+        super().__init__(host, port, timeout=timeout, context=context)
+        self.ssl_context = context
+
+    # --------------------------------------------------------------------------
+    # Connect to the host
+    # --------------------------------------------------------------------------
+    def connect(self):
+
+        """
+            Connect to the host
+
+            This is HTTPSConnection.connect, but passing the session to
+            resume.
+
+            Raises:
+                OSError if the host can't be reached or the proxy refuses
+                the tunnel
+        """
+
+        # the tcp connection (and proxy tunnel, if any)
+        PooledConnection.connect(self)
+
+        # the tls handshake
+        host = self.tunnel_address[0] if self.tunnel_address else self.host
+        self.sock = self.ssl_context.wrap_socket(self.sock,
+                                                 server_hostname=host,
+                                                 session=self.session)
+
+
+# ------------------------------------------------------------------------------
+# Define the response class
+# ------------------------------------------------------------------------------
+
+class Response:
+
+    """
+        A response from HTTPClient
+
+        Reading it returns the decoded body (a gzip body is unzipped as it
+        is read). When the body has been read to the end, the connection
+        goes back to the pool. Close it (or use it in a with block) if you
+        stop reading early, and the connection is closed instead.
+    """
+
+    # --------------------------------------------------------------------------
+    # Methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Initialize the class
+    # --------------------------------------------------------------------------
+    def __init__(self, http_client, key, conn, response, url):
+
+        """
+            Initialize the class
+
+            Paramaters:
+                http_client [HTTPClient]: the client that made the request
+                key [tuple]: the pool key of the connection
+                conn [HTTPConnection]: the connection
+                response [HTTPResponse]: the raw response
+                url [str]: the url that answered (after any redirects)
+        """
+
+        self.http_client = http_client
+        self.key = key
+        self.conn = conn
+        self.response = response
+        self.url = url
+        self.status = response.status
+        self.headers = response.headers
+
+        # unzip gzip bodies
+        self.decoder = None
+        encoding = self.headers.get('Content-Encoding', '').lower()
+        if encoding in ('gzip', 'x-gzip'):
+            self.decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    # --------------------------------------------------------------------------
+    # Read some (or all) of the body
+    # --------------------------------------------------------------------------
+    def read(self, amt=None):
+
+        """
+            Read some (or all) of the body
+
+            Paramaters:
+                amt [int]: the most raw bytes to read, or None for all of it
+
+            Returns:
+                [bytes]: the (decoded) data, or b'' at the end
+
+            NB: a gzip body can decode to more than amt bytes
+        """
+
+        # already done
+        if self.conn is None:
+            return b''
+
+        # don't wait for data past the deadline
+        http_client = self.http_client
+        if http_client.deadline is not None and self.conn.sock:
+            self.conn.sock.settimeout(
+                http_client.get_timeout(self.conn.read_limit))
+
+        # read some raw data
+        try:
+            data = self.response.read(amt)
+        except TimeoutError:
+            http_client.check_deadline()
+            raise
+
+        # unzip it
+        if self.decoder:
+            raw = data
+            data = self.decoder.decompress(raw)
+
+            # keep reading until we have something to return (or the end)
+            while not data and raw and amt:
+                raw = self.response.read(amt)
+                data = self.decoder.decompress(raw)
+            if not raw or amt is None:
+                data += self.decoder.flush()
+
+        # give the connection back at the end
+        if self.response.isclosed():
+            self.close()
+
+        # return the data
+        return data
+
+    # --------------------------------------------------------------------------
+    # Finish with the response
+    # --------------------------------------------------------------------------
+    def close(self):
+
+        """
+            Finish with the response
+
+            The connection goes back to the pool if the whole body was read,
+            and is closed if not.
+        """
+
+        # already done
+        if self.conn is None:
+            return
+
+        # see if the connection can be used again
+        # NB: a body cut short by the server also leaves the response
+        # closed, but with bytes still owed
+        response = self.response
+        reusable = response.isclosed() and not response.will_close and \
+            not response.length
+
+        # give it back or close it
+        if reusable:
+            self.http_client.release(self.key, self.conn)
+        else:
+            response.close()
+            self.conn.close()
+        self.conn = None
+
+    # --------------------------------------------------------------------------
+    # Use the response in a with block
+    # --------------------------------------------------------------------------
+    def __enter__(self):
+
+        """
+            Use the response in a with block
+
+            Returns:
+                [Response]: self
+        """
+
+        return self
+
+    # --------------------------------------------------------------------------
+    # Close the response at the end of a with block
+    # --------------------------------------------------------------------------
+    def __exit__(self, *args):
+
+        """
+            Close the response at the end of a with block
+        """
+
+        self.close()
+
+
+# ------------------------------------------------------------------------------
+# Define the client class
+# ------------------------------------------------------------------------------
+
+class HTTPClient:
+
+    """
+        A small http client that keeps connections alive
+
+        One client is shared by everything that talks to the network (the
+        api fetch, the probes, the image download and backfill), so:
+
+        - connections are kept open and reused for each host
+        - one TLS context is loaded (the CA bundle is only read once), and
+          sessions are resumed on new connections to the same host
+        - host names are looked up once per process (and again if none of
+          the cached addresses answer)
+        - gzip is asked for (and unzipped) when the caller wants it
+
+        Like urllib, it goes through the proxy in http_proxy/https_proxy
+        (unless no_proxy says not to). It is safe to use from several threads.
+    """
+
+    # --------------------------------------------------------------------------
+    # Methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Initialize the class
+    # --------------------------------------------------------------------------
+    def __init__(self, connect_timeout=10, read_timeout=30):
+
+        """
+            Initialize the class
+
+            Paramaters:
+                connect_timeout [float]: the most seconds to wait for a
+                    connection
+                read_timeout [float]: the most seconds to wait for data
+        """
+
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+        # the run's Deadline, which cuts every timeout down to the time left
+        # (None for no limit)
+        self.deadline = None
+
+        # the shared tls context and the proxies (found when first needed)
+        self.ssl_context = None
+        self.proxies = None
+
+        # the idle connections, tls sessions and addresses for each host
+        # (guarded by lock)
+        self.lock = threading.Lock()
+        self.idle = {}
+        self.sessions = {}
+        self.addresses = {}
+
+        # counters, for the log
+        self.stats = {'requests': 0, 'connections': 0, 'reused': 0,
+                      'resumed': 0, 'lookups': 0}
+
+    # --------------------------------------------------------------------------
+    # Make a GET request
+    # --------------------------------------------------------------------------
+    def open(self, url, headers=None, gzip=False, timeout=None):
+
+        """
+            Make a GET request
+
+            Paramaters:
+                url [str]: the url to get
+                headers [dict]: extra request headers, or None
+                gzip [bool]: whether to ask for a gzip body (for text, not
+                    for images)
+                timeout [float]: the read timeout for this request, or None
+                    for the client's
+
+            Returns:
+                [Response]: the response (any status under 400, including
+                304)
+
+            Raises:
+                HTTPError if the status is 400 or more
+                OSError or HTTPException if the network fails
+
+            Redirects are followed. If the client has a deadline, no wait
+            goes past it (and DeadlineExceeded is raised when it does).
+        """
+
+        # build the headers
+        req_headers = {
+            'User-Agent':       USER_AGENT,
+            'Accept-Encoding':  'gzip' if gzip else 'identity'
+        }
+        req_headers.update(headers or {})
+
+        # follow redirects
+        for _i in range(MAX_REDIRECTS + 1):
+            response = self.__request(url, req_headers, timeout)
+            location = response.headers.get('Location')
+            if response.status not in REDIRECT_STATUSES or not location:
+                break
+
+            # finish with this one and go where it says
+            response.read()
+            response.close()
+            url = parse.urljoin(url, location)
+
+        # an error status
+        if response.status >= 400:
+            response.read()
+            response.close()
+            raise HTTPError(url, response.status, response.response.reason,
+                            response.headers)
+
+        # return the response
+        return response
+
+    # --------------------------------------------------------------------------
+    # Give a finished connection back to the pool
+    # --------------------------------------------------------------------------
+    def release(self, key, conn):
+
+        """
+            Give a finished connection back to the pool
+
+            Paramaters:
+                key [tuple]: the pool key (scheme, host, port)
+                conn [HTTPConnection]: the connection
+
+            Responses call this themselves when their body has been read.
+        """
+
+        with self.lock:
+
+            # remember the tls session, to resume on the next connection
+            session = getattr(conn.sock, 'session', None)
+            if session is not None:
+                self.sessions[key] = session
+
+            # keep the connection (if there is room)
+            conns = self.idle.setdefault(key, [])
+            if len(conns) < MAX_IDLE:
+                conn.idle_since = time.monotonic()
+                conns.append(conn)
+                return
+
+        # no room
+        conn.close()
+
+    # --------------------------------------------------------------------------
+    # Cut a timeout down to the time left before the deadline
+    # --------------------------------------------------------------------------
+    def get_timeout(self, limit):
+
+        """
+            Cut a timeout down to the time left before the deadline
+
+            Paramaters:
+                limit [float]: the timeout to use without a deadline
+
+            Returns:
+                [float]: the timeout to use
+
+            Raises:
+                DeadlineExceeded if there is no time left
+        """
+
+        if self.deadline is None:
+            return limit
+        return self.deadline.timeout(limit)
+
+    # --------------------------------------------------------------------------
+    # Raise if the deadline has passed
+    # --------------------------------------------------------------------------
+    def check_deadline(self):
+
+        """
+            Raise if the deadline has passed
+
+            Raises:
+                DeadlineExceeded if there is no time left
+
+            NB: called when a socket times out, to tell a timeout we caused
+            (by cutting it down) from a slow server
+        """
+
+        if self.deadline is not None and self.deadline.expired():
+            raise DeadlineExceeded(
+                f'out of time ({self.deadline.seconds}s budget)')
+
+    # --------------------------------------------------------------------------
+    # Close all idle connections
+    # --------------------------------------------------------------------------
+    def close(self):
+
+        """
+            Close all idle connections
+
+            The tls sessions and addresses are kept, so the client can still
+            be used.
+        """
+
+        # take all the connections
+        with self.lock:
+            conns = [conn for key in self.idle for conn in self.idle[key]]
+            self.idle.clear()
+
+        # and close them
+        for conn in conns:
+            conn.close()
+
+    # --------------------------------------------------------------------------
+    # Helpers
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Send one request (without following redirects)
+    # --------------------------------------------------------------------------
+    def __request(self, url, headers, timeout):
+
+        """
+            Send one request (without following redirects)
+
+            Paramaters:
+                url [str]: the url to get
+                headers [dict]: the request headers
+                timeout [float]: the read timeout, or None for the client's
+
+            Returns:
+                [Response]: the response (of any status)
+
+            Raises:
+                OSError or HTTPException if the network fails
+        """
+
+        # get the path and pool key
+        parts = parse.urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError(f'unsupported url: {url}')
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        key = (parts.scheme, parts.hostname, port)
+        path = parts.path or '/'
+        if parts.query:
+            path = f'{path}?{parts.query}'
+
+        # try a pooled connection, then a new one if the server had
+        # closed it
+        while True:
+            conn, reused = self.__get_connection(key)
+            if conn.via_proxy and key[0] == 'http':
+                path = url
+            conn.read_limit = timeout or self.read_timeout
+            conn.timeout = self.get_timeout(conn.read_limit)
+            if conn.sock:
+                conn.sock.settimeout(conn.timeout)
+
+            # send the request and get the status and headers
+            try:
+                conn.request('GET', path, headers=headers)
+                response = conn.getresponse()
+                break
+            except STALE_ERRORS:
+                conn.close()
+                if not reused:
+                    raise
+            except TimeoutError:
+                conn.close()
+                self.check_deadline()
+                raise
+            except BaseException:
+                conn.close()
+                raise
+
+        # count it
+        with self.lock:
+            self.stats['requests'] += 1
+
+        # wrap the response
+        # NB: 204 and 304 have no body, so they are already finished
+        res = Response(self, key, conn, response, url)
+        if response.status in (204, 304):
+            res.read()
+        return res
+
+    # --------------------------------------------------------------------------
+    # Get a connection for a host (an idle one if we have one)
+    # --------------------------------------------------------------------------
+    def __get_connection(self, key):
+
+        """
+            Get a connection for a host (an idle one if we have one)
+
+            Paramaters:
+                key [tuple]: the pool key (scheme, host, port)
+
+            Returns:
+                [tuple]: the connection [HTTPConnection] and whether it was
+                reused [bool]
+        """
+
+        # find an idle connection that is still fresh
+        stale = []
+        conn = None
+        with self.lock:
+            conns = self.idle.get(key, [])
+            now = time.monotonic()
+            while conns and conn is None:
+                candidate = conns.pop()
+                if now - candidate.idle_since < IDLE_TIMEOUT:
+                    conn = candidate
+                else:
+                    stale.append(candidate)
+            if conn:
+                self.stats['reused'] += 1
+            else:
+                self.stats['connections'] += 1
+            session = self.sessions.get(key)
+
+        # close the old ones
+        for candidate in stale:
+            candidate.close()
+
+        # reuse it
+        if conn:
+            return conn, True
+
+        # go through a proxy, if there is one
+        scheme, host, port = key
+        proxy = self.__get_proxy(scheme, host)
+        conn_host, conn_port = proxy or (host, port)
+
+        # make a new one
+        if scheme == 'https':
+            if self.ssl_context is None:
+                self.ssl_context = ssl.create_default_context()
+            conn = PooledHTTPSConnection(conn_host, conn_port,
+                                         timeout=self.read_timeout,
+                                         context=self.ssl_context)
+            if proxy:
+                conn.set_tunnel(host, port)
+                conn.tunnel_address = (host, port)
+            conn.session = session
+            if session is not None:
+                with self.lock:
+                    self.stats['resumed'] += 1
+        else:
+            conn = PooledConnection(conn_host, conn_port,
+                                    timeout=self.read_timeout)
+        conn.via_proxy = bool(proxy)
+
+        # connect through our address cache
+        conn.connector = self.__create_connection
+
+        # return the new connection
+        return conn, False
+
+    # --------------------------------------------------------------------------
+    # Open a socket to a host, using the address cache
+    # --------------------------------------------------------------------------
+    def __create_connection(self, address, timeout=None,
+                            source_address=None):
+
+        """
+            Open a socket to a host, using the address cache
+
+            Paramaters:
+                address [tuple]: the (host, port) to connect to
+                timeout [float]: the read timeout to set once connected
+                source_address [tuple]: the local address to bind, or None
+
+            Returns:
+                [socket]: the connected socket
+
+            Raises:
+                OSError if no address answers
+
+            This has the same signature as socket.create_connection. The
+            connect itself uses connect_timeout (or the time left before the
+            deadline, if that is less).
+        """
+
+        # try the cached addresses, then look them up again in case they
+        # have changed
+        with self.lock:
+            passes = (False, True) if address in self.addresses else (True,)
+        error = None
+        for fresh in passes:
+            for family, type_, proto, _name, sockaddr in \
+                    self.__resolve(address, fresh):
+                sock = socket.socket(family, type_, proto)
+                try:
+                    sock.settimeout(self.get_timeout(self.connect_timeout))
+                    if source_address:
+                        sock.bind(source_address)
+                    sock.connect(sockaddr)
+                    sock.settimeout(timeout)
+                    return sock
+                except OSError as err:
+                    error = err
+                    sock.close()
+
+        # nothing answered
+        raise error or OSError(f'could not resolve {address[0]}')
+
+    # --------------------------------------------------------------------------
+    # Look up the addresses of a host
+    # --------------------------------------------------------------------------
+    def __resolve(self, address, fresh=False):
+
+        """
+            Look up the addresses of a host
+
+            Paramaters:
+                address [tuple]: the (host, port) to look up
+                fresh [bool]: whether to skip the cache
+
+            Returns:
+                [list]: the getaddrinfo results
+        """
+
+        # use the cache
+        if not fresh:
+            with self.lock:
+                addresses = self.addresses.get(address)
+            if addresses:
+                return addresses
+
+        # ask the resolver
+        addresses = socket.getaddrinfo(address[0], address[1], 0,
+                                       socket.SOCK_STREAM)
+        with self.lock:
+            self.addresses[address] = addresses
+            self.stats['lookups'] += 1
+
+        # return the addresses
+        return addresses
+
+    # --------------------------------------------------------------------------
+    # Get the proxy for a host
+    # --------------------------------------------------------------------------
+    def __get_proxy(self, scheme, host):
+
+        """
+            Get the proxy for a host
+
+            Paramaters:
+                scheme [str]: 'http' or 'https'
+                host [str]: the host we want to reach
+
+            Returns:
+                [tuple]: the proxy's (host, port), or None for no proxy
+        """
+
+        # read the environment once
+        if self.proxies is None:
+            self.proxies = request.getproxies()
+
+        # no proxy for this scheme (or this host)
+        proxy = self.proxies.get(scheme)
+        if not proxy or request.proxy_bypass(host):
+            return None
+
+        # split it up
+        parts = parse.urlsplit(proxy if '://' in proxy else f'http://{proxy}')
+        return parts.hostname, parts.port or 80
@@ -0,0 +1,481 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: image_store.py                                        |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# the name of the index file in the store folder
+INDEX_NAME = 'index.json'
+
+# partial downloads older than this (in seconds) are given up on
+PART_MAX_AGE = 7 * 24 * 60 * 60
+
+
+# ------------------------------------------------------------------------------
+# Get the file extension of an image url
+# ------------------------------------------------------------------------------
+def get_url_ext(url):
+
+    """
+        Get the file extension of an image url
+
+        Paramaters:
+            url [str]: the url
+
+        Returns:
+            [str]: the extension (without the dot), or 'jpg' if it has none
+
+        NB: from the url's path, since a url may have a query string, or no
+        extension (or a dot in the host name only)
+    """
+
+    from urllib.parse import urlsplit
+    return os.path.splitext(urlsplit(url).path)[1][1:] or 'jpg'
+
+
+# ------------------------------------------------------------------------------
+# Define the store class
+# ------------------------------------------------------------------------------
+
+class ImageStore:
+
+    """
+        A content-addressed image store with size-bounded LRU eviction
+
+        Each image is stored as '<sha256>.<ext>' in the store folder, and an
+        index file maps each hash to its size, source url and last use time.
+        Adding an image we already have is a no-op. Eviction removes the
+        least recently used images until the store is under both its byte
+        and count limits. Kept images (i.e. a backfilled archive) are never
+        evicted, and don't count against the limits.
+
+        The store is safe to use from several threads (i.e. backfill).
+    """
+
+    # --------------------------------------------------------------------------
+    # Methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Initialize the class
+    # --------------------------------------------------------------------------
+    def __init__(self, store_dir, max_bytes, max_count):
+
+        """
+            Initialize the class
+
+            Paramaters:
+                store_dir [str]: the folder to keep images in
+                max_bytes [int]: the most bytes to keep (0 for no limit)
+                max_count [int]: the most images to keep (0 for no limit)
+        """
+
+        # set the store location and limits
+        self.store_dir = store_dir
+        self.index_path = os.path.join(store_dir, INDEX_NAME)
+        self.max_bytes = max_bytes
+        self.max_count = max_count
+
+        # the index (hash -> entry dict) and a reverse map (url -> hash)
+        self.index_dict = {}
+        self.url_dict = {}
+
+        # guards the index when used from several threads
+        self.lock = threading.RLock()
+
+        # create the folder and load the index
+        os.makedirs(store_dir, exist_ok=True)
+        self.__load()
+
+    # --------------------------------------------------------------------------
+    # Hash a file
+    # --------------------------------------------------------------------------
+    @staticmethod
+    def hash_file(path):
+
+        """
+            Hash a file
+
+            Paramaters:
+                path [str]: the file to hash
+
+            Returns:
+                [str]: the sha256 hex digest of the file
+        """
+
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(64 * 1024), b''):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+    # --------------------------------------------------------------------------
+    # Get the path of an image we already downloaded from a url
+    # --------------------------------------------------------------------------
+    def find_url(self, url):
+
+        """
+            Get the path of an image we already downloaded from a url
+
+            Paramaters:
+                url [str]: the url the image came from
+
+            Returns:
+                [str]: the path to the image, or None if we don't have it
+        """
+
+        with self.lock:
+
+            # look for the url in the index
+            sha = self.url_dict.get(url)
+            if sha is None or sha not in self.index_dict:
+                return None
+
+            # make sure the file is still there
+            path = os.path.join(self.store_dir, self.index_dict[sha]['name'])
+            if not os.path.exists(path):
+                return None
+
+            # mark it used and return it
+            self.touch(sha)
+            return path
+
+    # --------------------------------------------------------------------------
+    # Get what we know about the image from a url, without using it
+    # --------------------------------------------------------------------------
+    def lookup(self, url):
+
+        """
+            Get what we know about the image from a url, without using it
+
+            Paramaters:
+                url [str]: the url the image came from
+
+            Returns:
+                [dict]: the image's path, size and sha, or None if we don't
+                have it
+
+            NB: unlike find_url, this doesn't touch the image (or write the
+            index), so it is safe for bookkeeping
+        """
+
+        # NB: images added without a url all map to ''
+        if not url:
+            return None
+
+        with self.lock:
+            sha = self.url_dict.get(url)
+            entry = self.index_dict.get(sha)
+            if entry is None:
+                return None
+            return {'path': os.path.join(self.store_dir, entry['name']),
+                    'size': entry['size'], 'sha': sha}
+
+    # --------------------------------------------------------------------------
+    # Add a file to the store
+    # --------------------------------------------------------------------------
+    def add(self, src_path, sha, ext, url='', save=True, keep=False):
+
+        """
+            Add a file to the store
+
+            Paramaters:
+                src_path [str]: the file to add (it is moved, not copied)
+                sha [str]: the sha256 hex digest of the file
+                ext [str]: the file extension (without the dot)
+                url [str]: the url the file came from
+                save [bool]: whether to write the index now (pass False when
+                    adding many files, then call save())
+                keep [bool]: True to never evict it
+
+            Returns:
+                [str]: the path of the image in the store
+
+            If we already have an image with the same hash, src_path is
+            removed and the existing path is returned.
+        """
+
+        # get the store path
+        name = f'{sha}.{ext}'
+        dst_path = os.path.join(self.store_dir, name)
+
+        with self.lock:
+
+            # already have it, just drop the new copy
+            if sha in self.index_dict and os.path.exists(dst_path):
+                if os.path.abspath(src_path) != os.path.abspath(dst_path):
+                    os.remove(src_path)
+                if url:
+                    self.index_dict[sha]['url'] = url
+                    self.url_dict[url] = sha
+                if keep:
+                    self.index_dict[sha]['keep'] = True
+                self.touch(sha, save)
+                return dst_path
+
+            # move it into place
+            os.replace(src_path, dst_path)
+
+            # add it to the index
+            self.index_dict[sha] = {
+                'name':         name,
+                'size':         os.path.getsize(dst_path),
+                'url':          url,
+                'last_used':    time.time()
+            }
+            if keep:
+                self.index_dict[sha]['keep'] = True
+            self.url_dict[url] = sha
+            if save:
+                self.save()
+
+        # return the store path
+        return dst_path
+
+    # --------------------------------------------------------------------------
+    # Mark an image as just used
+    # --------------------------------------------------------------------------
+    def touch(self, sha, save=True):
+
+        """
+            Mark an image as just used
+
+            Paramaters:
+                sha [str]: the hash of the image
+                save [bool]: whether to write the index now
+        """
+
+        with self.lock:
+            if sha in self.index_dict:
+                self.index_dict[sha]['last_used'] = time.time()
+                if save:
+                    self.save()
+
+    # --------------------------------------------------------------------------
+    # Never evict an image
+    # --------------------------------------------------------------------------
+    def keep(self, sha, save=True):
+
+        """
+            Never evict an image
+
+            Paramaters:
+                sha [str]: the hash of the image
+                save [bool]: whether to write the index now
+        """
+
+        with self.lock:
+            if sha in self.index_dict:
+                self.index_dict[sha]['keep'] = True
+                if save:
+                    self.save()
+
+    # --------------------------------------------------------------------------
+    # Remove least recently used images until we are under the limits
+    # --------------------------------------------------------------------------
+    def evict(self, pinned=()):
+
+        """
+            Remove least recently used images until we are under the limits
+
+            Paramaters:
+                pinned [list]: paths that must not be removed (i.e. the
+                    current wallpaper)
+
+            Returns:
+                [list]: the paths that were removed
+        """
+
+        # default return result
+        removed = []
+
+        # get the pinned file names
+        pinned_names = [os.path.basename(path) for path in pinned]
+
+        # NB: hold the lock for the whole pass
+        with self.lock:
+            self.__evict(pinned_names, removed)
+
+        # return the result
+        return removed
+
+    # --------------------------------------------------------------------------
+    # Remove files the index doesn't know about
+    # --------------------------------------------------------------------------
+    def collect_garbage(self):
+
+        """
+            Remove files the index doesn't know about
+
+            Returns:
+                [list]: the paths that were removed
+
+            This also drops index entries whose file has gone missing, and
+            partial downloads that have been sitting around too long.
+        """
+
+        # default return result
+        removed = []
+
+        with self.lock:
+
+            # drop entries whose file is gone
+            names = set(os.listdir(self.store_dir))
+            missing = [sha for sha, entry in self.index_dict.items()
+                       if entry['name'] not in names]
+            for sha in missing:
+                del self.index_dict[sha]
+            if missing:
+                self.save()
+
+            # get the names we want to keep
+            keep = {entry['name'] for entry in self.index_dict.values()}
+            keep.add(INDEX_NAME)
+
+        # check each file in the store
+        now = time.time()
+        for name in names:
+            path = os.path.join(self.store_dir, name)
+            if name in keep or not os.path.isfile(path):
+                continue
+
+            # give partial downloads a chance to resume
+            if '.part' in name and now - os.path.getmtime(path) < PART_MAX_AGE:
+                continue
+
+            # it's a stray
+            self.__remove(path)
+            removed.append(path)
+
+        # return the result
+        return removed
+
+    # --------------------------------------------------------------------------
+    # Save the index file
+    # --------------------------------------------------------------------------
+    def save(self):
+
+        """
+            Save the index file
+        """
+
+        with self.lock:
+
+            # write to a temp file and move it into place
+            tmp_path = f'{self.index_path}.tmp'
+            with open(tmp_path, 'w') as file:
+                json.dump(self.index_dict, file)
+            os.replace(tmp_path, self.index_path)
+
+    # --------------------------------------------------------------------------
+    # Helpers
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Remove least recently used images until we are under the limits
+    # --------------------------------------------------------------------------
+    def __evict(self, pinned_names, removed):
+
+        """
+            Remove least recently used images until we are under the limits
+
+            Paramaters:
+                pinned_names [list]: file names that must not be removed
+                removed [list]: the removed paths are added to this list
+        """
+
+        # get the totals (kept images don't count)
+        entries = [(sha, entry) for sha, entry in self.index_dict.items()
+                   if not entry.get('keep')]
+        total_bytes = sum(entry['size'] for _sha, entry in entries)
+        total_count = len(entries)
+
+        # oldest first
+        entries.sort(key=lambda item: item[1]['last_used'])
+
+        # remove until we are under both limits
+        for sha, entry in entries:
+            over_bytes = self.max_bytes and total_bytes > self.max_bytes
+            over_count = self.max_count and total_count > self.max_count
+            if not over_bytes and not over_count:
+                break
+
+            # never remove the current wallpaper
+            if entry['name'] in pinned_names:
+                continue
+
+            # remove the file and entry
+            path = os.path.join(self.store_dir, entry['name'])
+            self.__remove(path)
+            del self.index_dict[sha]
+            removed.append(path)
+
+            # update the totals
+            total_bytes -= entry['size']
+            total_count -= 1
+
+        # save the index if we changed it
+        if removed:
+            self.save()
+
+    # --------------------------------------------------------------------------
+    # Load the index file
+    # --------------------------------------------------------------------------
+    def __load(self):
+
+        """
+            Load the index file
+
+            A missing or broken index means an empty store (the files will be
+            cleaned up by collect_garbage).
+        """
+
+        # no file, empty store
+        if not os.path.exists(self.index_path):
+            return
+
+        # read index file
+        try:
+            with open(self.index_path, 'r') as file:
+                self.index_dict = json.load(file)
+        except (OSError, ValueError):
+            self.index_dict = {}
+
+        # build the reverse map
+        self.url_dict = {entry['url']: sha
+                         for sha, entry in self.index_dict.items()}
+
+    # --------------------------------------------------------------------------
+    # Remove a file, ignoring it if it's missing
+    # --------------------------------------------------------------------------
+    def __remove(self, path):
+
+        """
+            Remove a file, ignoring it if it's missing
+
+            Paramaters:
+                path [str]: the file to remove
+        """
+
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+# -)
@@ -29,6 +29,27 @@ dict_user = {
     ],
     "files": {
         "${SRC}/spaceoddity.py": "${HOME}/.spaceoddity",
+        "${SRC}/apod_index.py": "${HOME}/.spaceoddity",
+        "${SRC}/backends.py": "${HOME}/.spaceoddity",
+        "${SRC}/backfill.py": "${HOME}/.spaceoddity",
+        "${SRC}/captions.py": "${HOME}/.spaceoddity",
+        "${SRC}/conf_store.py": "${HOME}/.spaceoddity",
+        "${SRC}/daemon.py": "${HOME}/.spaceoddity",
+        "${SRC}/derivatives.py": "${HOME}/.spaceoddity",
+        "${SRC}/downloader.py": "${HOME}/.spaceoddity",
+        "${SRC}/http_cache.py": "${HOME}/.spaceoddity",
+        "${SRC}/http_client.py": "${HOME}/.spaceoddity",
+        "${SRC}/image_store.py": "${HOME}/.spaceoddity",
+        "${SRC}/log_pipe.py": "${HOME}/.spaceoddity",
+        "${SRC}/metrics.py": "${HOME}/.spaceoddity",
+        "${SRC}/mirror.py": "${HOME}/.spaceoddity",
+        "${SRC}/pic_select.py": "${HOME}/.spaceoddity",
+        "${SRC}/pipeline.py": "${HOME}/.spaceoddity",
+        "${SRC}/resilience.py": "${HOME}/.spaceoddity",
+        "${SRC}/run_guard.py": "${HOME}/.spaceoddity",
+        "${SRC}/scheduler.py": "${HOME}/.spaceoddity",
+        "${SRC}/shared_cache.py": "${HOME}/.spaceoddity",
+        "${SRC}/slideshow.py": "${HOME}/.spaceoddity",
         "${SRC}/LICENSE": "${HOME}/.spaceoddity",
         "${SRC}/VERSION": "${HOME}/.spaceoddity",
         "${SRC}/uninstall.py": "${HOME}/.spaceoddity",
@@ -0,0 +1,366 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: log_pipe.py                                           |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+from datetime import datetime
+from logging import handlers
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# the text log format
+TEXT_FORMAT = '%(asctime)s [%(levelname)-5s] %(run_id)s %(message)s'
+TEXT_DATE = '%Y-%m-%d %I:%M:%S %p'
+
+# the terminal format (i.e. 'INFO : start main script')
+ECHO_FORMAT = '%(levelname)-5s: %(message)s'
+
+# the level names allowed in the config file
+LEVELS = {
+    'debug':    logging.DEBUG,
+    'info':     logging.INFO,
+    'warning':  logging.WARNING,
+    'error':    logging.ERROR
+}
+
+
+# ------------------------------------------------------------------------------
+# Define the run id filter class
+# ------------------------------------------------------------------------------
+
+class RunIdFilter(logging.Filter):
+
+    """
+        Stamps each record with the id of the current run
+
+        This runs in the caller's thread (on the queue handler), so the id
+        is the one that was current when the message was logged, not when it
+        was written.
+    """
+
+    # --------------------------------------------------------------------------
+    # Initialize the class
+    # --------------------------------------------------------------------------
+    def __init__(self):
+
+        """
+            Initialize the class
+        """
+
+        super().__init__()
+        self.run_id = '-'
+
+    # --------------------------------------------------------------------------
+    # Stamp a record
+    # --------------------------------------------------------------------------
+    def filter(self, record):
+
+        """
+            Stamp a record
+
+            Paramaters:
+                record [LogRecord]: the record to stamp
+
+            Returns:
+                [bool]: always True (we don't drop anything)
+        """
+
+        record.run_id = self.run_id
+        return True
+
+
+# ------------------------------------------------------------------------------
+# Define the json formatter class
+# ------------------------------------------------------------------------------
+
+class JsonFormatter(logging.Formatter):
+
+    """
+        Formats each record as one line of json
+
+        The keys are ts, level, run_id, logger and msg (plus exc if there
+        was an exception), so the file can be read with jq or loaded a line
+        at a time.
+    """
+
+    # --------------------------------------------------------------------------
+    # Format a record
+    # --------------------------------------------------------------------------
+    def format(self, record):
+
+        """
+            Format a record
+
+            Paramaters:
+                record [LogRecord]: the record to format
+
+            Returns:
+                [str]: the record as a json object
+        """
+
+        # the basic keys
+        dict_line = {
+            'ts':       datetime.fromtimestamp(record.created).isoformat(
+                            timespec='milliseconds'),
+            'level':    record.levelname,
+            'run_id':   getattr(record, 'run_id', '-'),
+            'logger':   record.name,
+            'msg':      record.getMessage()
+        }
+
+        # any exception
+        if record.exc_info:
+            dict_line['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            dict_line['exc'] = record.exc_text
+
+        # return the line
+        return json.dumps(dict_line)
+
+
+# ------------------------------------------------------------------------------
+# Define the queue handler class
+# ------------------------------------------------------------------------------
+
+class TracebackQueueHandler(handlers.QueueHandler):
+
+    """
+        Queues records with their traceback kept apart from the message
+
+        The stock QueueHandler pastes the traceback onto the message, so the
+        json log would have it in msg instead of exc. This keeps it in
+        exc_text, which the text format still prints after the message.
+    """
+
+    # --------------------------------------------------------------------------
+    # Get a record ready for the queue
+    # --------------------------------------------------------------------------
+    def prepare(self, record):
+
+        """
+            Get a record ready for the queue
+
+            Paramaters:
+                record [LogRecord]: the record to queue
+
+            Returns:
+                [LogRecord]: a copy that can be pickled (the message is
+                formatted, and the traceback is text)
+        """
+
+        # format the traceback now (the frames won't be there later)
+        record = copy.copy(record)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(
+                record.exc_info)
+
+        # format the message now (the args may change later)
+        record.msg = record.getMessage()
+        record.message = record.msg
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+# ------------------------------------------------------------------------------
+# Define the log pipe class
+# ------------------------------------------------------------------------------
+
+class LogPipe:
+
+    """
+        Sends all logging through a queue to a background writer
+
+        The root logger gets a QueueHandler, so a log call only checks the
+        level, builds the message and puts it on a queue. A QueueListener
+        thread does the slow parts: timestamps, json, the rotating file and
+        the terminal.
+
+        Rotation is by size (RotatingFileHandler) or by day
+        (TimedRotatingFileHandler, rolled at midnight). Either way, old logs
+        are kept up to a fixed count, so history survives restarts but the
+        folder can't grow without bound.
+    """
+
+    # --------------------------------------------------------------------------
+    # Methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Initialize the class
+    # --------------------------------------------------------------------------
+    def __init__(self, log_path):
+
+        """
+            Initialize the class
+
+            Paramaters:
+                log_path [str]: the log file (rotated copies go next to it)
+        """
+
+        # set the file
+        self.log_path = log_path
+
+        # the queue and the handler that feeds it
+        self.queue = queue.SimpleQueue()
+        self.run_filter = RunIdFilter()
+        self.queue_handler = TracebackQueueHandler(self.queue)
+        self.queue_handler.addFilter(self.run_filter)
+
+        # the writer thread and the settings it was made with
+        self.listener = None
+        self.settings = None
+
+        # send everything through the queue
+        root = logging.getLogger()
+        root.addHandler(self.queue_handler)
+
+        # flush the queue when we exit
+        atexit.register(self.close)
+
+    # --------------------------------------------------------------------------
+    # Set up (or change) the log level, format and rotation
+    # --------------------------------------------------------------------------
+    def configure(self, level='info', fmt='text', rotate='size',
+                  max_bytes=1024 * 1024, backups=14, echo=True):
+
+        """
+            Set up (or change) the log level, format and rotation
+
+            Paramaters:
+                level [str]: 'debug', 'info', 'warning' or 'error'
+                fmt [str]: 'text' or 'json'
+                rotate [str]: 'size' to roll over at max_bytes, or 'time' to
+                    roll over at midnight
+                max_bytes [int]: the size to roll over at (for 'size')
+                backups [int]: how many old logs to keep
+                echo [bool]: whether to print to the terminal as well
+
+            Raises:
+                ValueError if level, fmt or rotate is unknown
+
+            The level is set on the root logger, so a message below it is
+            dropped before it is formatted or queued. The writer is only
+            rebuilt if something other than the level changed.
+        """
+
+        # check the settings
+        if level not in LEVELS:
+            raise ValueError(f'unknown log level: {level}')
+        if fmt not in ('text', 'json'):
+            raise ValueError(f'unknown log format: {fmt}')
+        if rotate not in ('size', 'time'):
+            raise ValueError(f'unknown log rotation: {rotate}')
+
+        # set the level
+        logging.getLogger().setLevel(LEVELS[level])
+
+        # nothing else changed
+        settings = (fmt, rotate, max_bytes, backups, echo)
+        if settings == self.settings:
+            return
+
+        # stop the old writer
+        self.stop()
+        self.settings = settings
+
+        # make the file handler
+        if rotate == 'size':
+            file_handler = handlers.RotatingFileHandler(
+                self.log_path, maxBytes=max_bytes, backupCount=backups,
+                delay=True)
+        else:
+            file_handler = handlers.TimedRotatingFileHandler(
+                self.log_path, when='midnight', backupCount=backups,
+                delay=True)
+
+        # set its format
+        if fmt == 'json':
+            file_handler.setFormatter(JsonFormatter())
+        else:
+            file_handler.setFormatter(logging.Formatter(TEXT_FORMAT,
+                                                        TEXT_DATE))
+        writers = [file_handler]
+
+        # make the terminal handler
+        if echo:
+            echo_handler = logging.StreamHandler(sys.stdout)
+            echo_handler.setFormatter(logging.Formatter(ECHO_FORMAT))
+            writers.append(echo_handler)
+
+        # start the writer thread
+        self.listener = handlers.QueueListener(self.queue, *writers)
+        self.listener.start()
+
+    # --------------------------------------------------------------------------
+    # Start a new run id
+    # --------------------------------------------------------------------------
+    def new_run(self):
+
+        """
+            Start a new run id
+
+            Returns:
+                [str]: the new id
+
+            Every message logged after this (until the next call) carries
+            the id, so the lines of one run can be pulled out of a log that
+            holds weeks of them.
+        """
+
+        self.run_filter.run_id = os.urandom(4).hex()
+        return self.run_filter.run_id
+
+    # --------------------------------------------------------------------------
+    # Write everything queued and stop the writer
+    # --------------------------------------------------------------------------
+    def stop(self):
+
+        """
+            Write everything queued and stop the writer
+        """
+
+        # no writer
+        if self.listener is None:
+            return
+
+        # flush the queue and close the files
+        self.listener.stop()
+        for handler in self.listener.handlers:
+            handler.close()
+        self.listener = None
+        self.settings = None
+
+    # --------------------------------------------------------------------------
+    # Stop the writer and stop taking messages
+    # --------------------------------------------------------------------------
+    def close(self):
+
+        """
+            Stop the writer and stop taking messages
+
+            After this, nothing more is queued (i.e. when a test makes a new
+            Main, the old one's pipe stops collecting its messages).
+        """
+
+        logging.getLogger().removeHandler(self.queue_handler)
+        self.stop()
+        atexit.unregister(self.close)
+
+# -)
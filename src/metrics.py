@@ -0,0 +1,364 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: metrics.py                                            |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+import contextlib
+import contextvars
+import json
+import os
+import time
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# the stage being timed
+# NB: a context variable, not an attribute, so stages that run at the same
+# time (in tasks or threads) each note to their own record
+CURRENT = contextvars.ContextVar('spaceoddity_stage', default=None)
+
+# the prefix of every metric name
+PREFIX = 'spaceoddity'
+
+# the outcomes a stage can have
+OUTCOMES = ('changed', 'unchanged', 'video', 'error')
+
+# the help text and type of each metric
+METRICS = {
+    'stage_start_seconds':      ('Time from the start of the last run until '
+                                 'each stage started', 'gauge'),
+    'stage_duration_seconds':   ('Wall time of each stage in the last run',
+                                 'gauge'),
+    'stage_bytes':              ('Bytes transferred by each stage in the '
+                                 'last run', 'gauge'),
+    'stage_http_status':        ('HTTP status of each stage in the last run '
+                                 '(0 if no request)', 'gauge'),
+    'stage_outcome':            ('Outcome of each stage in the last run',
+                                 'gauge'),
+    'run_duration_seconds':     ('Wall time of the last run', 'gauge'),
+    'first_paint_seconds':      ('Time from the start of the last run until '
+                                 'its new wallpaper was first set', 'gauge'),
+    'final_paint_seconds':      ('Time from the start of the last run until '
+                                 'its full-size wallpaper was set', 'gauge'),
+    'last_run_timestamp_seconds':   ('When the last run finished', 'gauge')
+}
+
+
+# ------------------------------------------------------------------------------
+# Define the metrics class
+# ------------------------------------------------------------------------------
+
+class Metrics:
+
+    """
+        Times each stage of a run and exports the results
+
+        Wrap each stage in stage(name), and call note() inside it to record
+        bytes, the http status or the outcome. A stage that returns without
+        an outcome is 'changed', and one that raises an Exception is 'error'.
+
+        finish_run() writes the last run to a node_exporter textfile (so
+        monitoring can alert on slow or failing stages) and appends it to a
+        rolling jsonl history (so you can look back without monitoring).
+        Runs where no stage ran (i.e. the scheduler said not yet) are not
+        written, so the idle path never touches the disk.
+    """
+
+    # --------------------------------------------------------------------------
+    # Methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Initialize the class
+    # --------------------------------------------------------------------------
+    def __init__(self, prom_path, history_path, history_runs=500):
+
+        """
+            Initialize the class
+
+            Paramaters:
+                prom_path [str]: the textfile to write (the name must end in
+                    .prom for node_exporter to read it)
+                history_path [str]: the jsonl history file
+                history_runs [int]: how many runs to keep in the history
+        """
+
+        # set the files
+        self.prom_path = prom_path
+        self.history_path = history_path
+        self.history_runs = history_runs
+
+        # the stages of this run
+        self.stages = []
+        self.run_start = time.monotonic()
+
+        # when the wallpaper was first and last set in this run (seconds
+        # from the start, None if it wasn't)
+        self.first_paint = None
+        self.final_paint = None
+
+    # --------------------------------------------------------------------------
+    # Start a new run
+    # --------------------------------------------------------------------------
+    def start_run(self):
+
+        """
+            Start a new run
+        """
+
+        self.stages = []
+        self.run_start = time.monotonic()
+        self.first_paint = None
+        self.final_paint = None
+
+    # --------------------------------------------------------------------------
+    # Time a stage
+    # --------------------------------------------------------------------------
+    @contextlib.contextmanager
+    def stage(self, name):
+
+        """
+            Time a stage
+
+            Paramaters:
+                name [str]: the name of the stage (used as a label)
+
+            Yields:
+                [dict]: the stage's record (see note)
+
+            NB: exceptions are always passed on, this only records them
+
+            NB: stages may overlap (see pipeline.py), so each record has its
+            start (seconds from the start of the run) as well as its length
+        """
+
+        # start the record
+        start = time.monotonic()
+        record = {'stage': name,
+                  'start': round(start - self.run_start, 4),
+                  'seconds': 0.0, 'bytes': 0, 'status': 0, 'outcome': ''}
+        self.stages.append(record)
+        token = CURRENT.set(record)
+
+        try:
+            yield record
+        except Exception:
+            record['outcome'] = 'error'
+            raise
+        finally:
+
+            # stop the clock
+            record['seconds'] = round(time.monotonic() - start, 4)
+            CURRENT.reset(token)
+
+            # no outcome and no error means it did its job
+            # NB: a stage that ends the run early (RunFinished) and didn't
+            # say why is also 'changed' up to that point
+            if not record['outcome']:
+                record['outcome'] = 'changed'
+
+    # --------------------------------------------------------------------------
+    # Record something about the current stage
+    # --------------------------------------------------------------------------
+    def note(self, outcome=None, nbytes=None, status=None):
+
+        """
+            Record something about the current stage
+
+            Paramaters:
+                outcome [str]: one of OUTCOMES
+                nbytes [int]: bytes transferred (added to the total)
+                status [int]: the http status
+
+            Raises:
+                ValueError if the outcome is unknown
+
+            This does nothing outside of a stage.
+        """
+
+        # not in a stage
+        record = CURRENT.get()
+        if record is None:
+            return
+
+        # set whatever we were given
+        if outcome is not None:
+            if outcome not in OUTCOMES:
+                raise ValueError(f'unknown outcome: {outcome}')
+            record['outcome'] = outcome
+        if nbytes:
+            record['bytes'] += nbytes
+        if status is not None:
+            record['status'] = status
+
+    # --------------------------------------------------------------------------
+    # Record that a new wallpaper was set
+    # --------------------------------------------------------------------------
+    def mark_paint(self):
+
+        """
+            Record that a new wallpaper was set
+
+            The first call in a run is the time until the user saw the new
+            picture, and the last is the time until they saw the one it
+            ended with (they differ in progressive mode).
+        """
+
+        seconds = round(time.monotonic() - self.run_start, 4)
+        if self.first_paint is None:
+            self.first_paint = seconds
+        self.final_paint = seconds
+
+    # --------------------------------------------------------------------------
+    # Write the textfile and history for this run
+    # --------------------------------------------------------------------------
+    def finish_run(self, run_id=''):
+
+        """
+            Write the textfile and history for this run
+
+            Paramaters:
+                run_id [str]: the run id (to match the history to the log)
+
+            Returns:
+                [bool]: True if anything was written
+
+            Raises:
+                OSError if a file can't be written
+        """
+
+        # nothing ran
+        if not self.stages:
+            return False
+
+        # the run totals
+        now = time.time()
+        run_seconds = round(time.monotonic() - self.run_start, 4)
+
+        # write the textfile
+        self.__write_prom(run_seconds, now)
+
+        # add to the history
+        dict_run = {
+            'ts':       round(now, 3),
+            'run_id':   run_id,
+            'seconds':  run_seconds,
+            'stages':   self.stages
+        }
+        if self.first_paint is not None:
+            dict_run['first_paint'] = self.first_paint
+            dict_run['final_paint'] = self.final_paint
+        self.__append_history(dict_run)
+
+        # don't write this run twice
+        self.stages = []
+
+        # we wrote something
+        return True
+
+    # --------------------------------------------------------------------------
+    # Helpers
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Write the node_exporter textfile
+    # --------------------------------------------------------------------------
+    def __write_prom(self, run_seconds, now):
+
+        """
+            Write the node_exporter textfile
+
+            Paramaters:
+                run_seconds [float]: the wall time of the run
+                now [float]: the time the run finished (epoch seconds)
+
+            Raises:
+                OSError if the file can't be written
+
+            NB: node_exporter may read the file at any time, so it is
+            written to a temp file and renamed, like the config
+        """
+
+        # the samples of each metric
+        samples = {name: [] for name in METRICS}
+        for record in self.stages:
+            label = f'stage="{record["stage"]}"'
+            samples['stage_start_seconds'].append((label, record['start']))
+            samples['stage_duration_seconds'].append(
+                (label, record['seconds']))
+            samples['stage_bytes'].append((label, record['bytes']))
+            samples['stage_http_status'].append((label, record['status']))
+
+            # one sample per outcome, so alerts can match on the label
+            for outcome in OUTCOMES:
+                value = 1 if record['outcome'] == outcome else 0
+                samples['stage_outcome'].append(
+                    (f'{label},outcome="{outcome}"', value))
+        samples['run_duration_seconds'].append(('', run_seconds))
+        if self.first_paint is not None:
+            samples['first_paint_seconds'].append(('', self.first_paint))
+            samples['final_paint_seconds'].append(('', self.final_paint))
+        samples['last_run_timestamp_seconds'].append(('', round(now, 3)))
+
+        # build the text
+        lines = []
+        for name, (help_text, kind) in METRICS.items():
+            full_name = f'{PREFIX}_{name}'
+            lines.append(f'# HELP {full_name} {help_text}')
+            lines.append(f'# TYPE {full_name} {kind}')
+            for label, value in samples[name]:
+                label = f'{{{label}}}' if label else ''
+                lines.append(f'{full_name}{label} {value}')
+        text = '\n'.join(lines) + '\n'
+
+        # write it atomically
+        tmp_path = f'{self.prom_path}.tmp'
+        with open(tmp_path, 'w') as file:
+            file.write(text)
+        os.replace(tmp_path, self.prom_path)
+
+    # --------------------------------------------------------------------------
+    # Add a run to the history, trimming it if it is too long
+    # --------------------------------------------------------------------------
+    def __append_history(self, dict_run):
+
+        """
+            Add a run to the history, trimming it if it is too long
+
+            Paramaters:
+                dict_run [dict]: the run to add
+
+            Raises:
+                OSError if the file can't be written
+
+            Appending a line is cheap, so that's what normally happens. The
+            file is only rewritten (keeping the newest history_runs lines)
+            when it gets a quarter over the limit.
+        """
+
+        # append the run
+        with open(self.history_path, 'a') as file:
+            file.write(json.dumps(dict_run) + '\n')
+
+        # see if it's time to trim
+        with open(self.history_path, 'r') as file:
+            lines = file.readlines()
+        if len(lines) <= self.history_runs + self.history_runs // 4:
+            return
+
+        # keep the newest runs
+        # NB: rewrite through a temp file, so a crash can't lose the history
+        tmp_path = f'{self.history_path}.tmp'
+        with open(tmp_path, 'w') as file:
+            file.writelines(lines[-self.history_runs:])
+        os.replace(tmp_path, self.history_path)
+
+# -)
@@ -0,0 +1,465 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: mirror.py                                             |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+from http import HTTPStatus
+from urllib import parse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import signal
+import threading
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# the paths we serve (the api path is the same as on api.nasa.gov, so a
+# client only has to change the host)
+API_PATH = '/planetary/apod'
+IMAGE_PATH = '/image'
+
+# how long a client may sit idle between requests (seconds)
+IDLE_TIMEOUT = 15
+
+# the longest request head we read (bytes)
+MAX_HEAD = 16 * 1024
+
+# a single byte range (we don't do multipart ranges)
+RANGE_PATTERN = re.compile(r'bytes=(\d*)-(\d*)$')
+
+
+# ------------------------------------------------------------------------------
+# Define the mirror server class
+# ------------------------------------------------------------------------------
+
+class MirrorServer:
+
+    """
+        Serves the shared cache to the other machines on a LAN
+
+        It answers two kinds of request:
+
+        - GET /planetary/apod: the current apod json, as the api sent it
+          (the query, i.e. the api key, is ignored)
+        - GET /image?url=<url>: the image the fetcher downloaded from <url>,
+          or 404 if that isn't the one we have
+
+        Both have ETags (and answer If-None-Match with 304), and images
+        answer Range and If-Range, so an interrupted download resumes. It
+        runs on asyncio, keeps connections alive, and sends images with
+        sendfile, so one box can serve a whole office.
+
+        The shared cache is filled by the fetch command (see SharedCache).
+        The server only reads it, and picks up a new apod.json when its
+        mtime changes.
+    """
+
+    # --------------------------------------------------------------------------
+    # Methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Initialize the class
+    # --------------------------------------------------------------------------
+    def __init__(self, shared_cache, host='', port=8080, log=None):
+
+        """
+            Initialize the class
+
+            Paramaters:
+                shared_cache [SharedCache]: the cache to serve
+                host [str]: the address to listen on ('' for all)
+                port [int]: the port to listen on (0 for any free one)
+                log [callable]: called as log(msg, *args) for errors, or None
+        """
+
+        self.shared_cache = shared_cache
+        self.host = host
+        self.port = port
+        self.log = log
+
+        # what we serve, loaded from apod.json when it changes
+        self.mtime = None
+        self.apod_body = b''
+        self.apod_etag = ''
+        self.image = None
+
+        # set once we are listening (port is the real port then)
+        self.ready = threading.Event()
+
+        # request counters
+        self.stats = {'requests': 0, 'connections': 0, 'bytes': 0}
+
+        # the loop and the event that stops it (set by serve)
+        self.loop = None
+        self.stop_event = None
+
+    # --------------------------------------------------------------------------
+    # Serve until stopped (or SIGTERM/SIGINT)
+    # --------------------------------------------------------------------------
+    def run(self):
+
+        """
+            Serve until stopped (or SIGTERM/SIGINT)
+
+            This blocks. The signals are only caught when it runs on the
+            main thread.
+        """
+
+        asyncio.run(self.serve())
+
+    # --------------------------------------------------------------------------
+    # Serve until stopped
+    # --------------------------------------------------------------------------
+    async def serve(self):
+
+        """
+            Serve until stopped
+        """
+
+        # get the loop and the stop event
+        self.loop = asyncio.get_running_loop()
+        self.stop_event = asyncio.Event()
+
+        # stop on a signal (only the main thread can have handlers)
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                self.loop.add_signal_handler(signum, self.stop_event.set)
+
+        # start listening
+        server = await asyncio.start_server(self.__handle,
+                                            self.host or None, self.port,
+                                            reuse_address=True, backlog=512,
+                                            limit=MAX_HEAD)
+        self.port = server.sockets[0].getsockname()[1]
+        self.ready.set()
+
+        # serve until told to stop
+        async with server:
+            await self.stop_event.wait()
+
+    # --------------------------------------------------------------------------
+    # Stop serving (from any thread)
+    # --------------------------------------------------------------------------
+    def stop(self):
+
+        """
+            Stop serving (from any thread)
+        """
+
+        # NB: the loop is closed if we already stopped
+        if self.loop is not None:
+            try:
+                self.loop.call_soon_threadsafe(self.stop_event.set)
+            except RuntimeError:
+                pass
+
+    # --------------------------------------------------------------------------
+    # Helpers
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Handle one client connection
+    # --------------------------------------------------------------------------
+    async def __handle(self, reader, writer):
+
+        """
+            Handle one client connection
+
+            Paramaters:
+                reader [StreamReader]: the client's requests
+                writer [StreamWriter]: our responses
+        """
+
+        self.stats['connections'] += 1
+
+        try:
+
+            # answer requests until the client is done (or idle too long)
+            keep_alive = True
+            while keep_alive:
+                try:
+                    head = await asyncio.wait_for(
+                        reader.readuntil(b'\r\n\r\n'), IDLE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self.__send(writer, 431, keep_alive=False)
+                    break
+                keep_alive = await self.__respond(head, writer)
+
+        except ConnectionError:
+            pass
+
+        except Exception as error:
+
+            # one bad request shouldn't take the server down
+            if self.log:
+                self.log('mirror error: %s', error)
+
+        finally:
+
+            # hang up
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    # --------------------------------------------------------------------------
+    # Answer one request
+    # --------------------------------------------------------------------------
+    async def __respond(self, head, writer):
+
+        """
+            Answer one request
+
+            Paramaters:
+                head [bytes]: the request line and headers
+                writer [StreamWriter]: where to send the response
+
+            Returns:
+                [bool]: whether to keep the connection open
+        """
+
+        self.stats['requests'] += 1
+
+        # split up the request
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, version = lines[0].split(' ')
+        except ValueError:
+            await self.__send(writer, 400, keep_alive=False)
+            return False
+        headers = {}
+        for line in lines[1:]:
+            name, _sep, value = line.partition(':')
+            if name:
+                headers[name.strip().lower()] = value.strip()
+
+        # HTTP/1.1 keeps the connection unless told not to
+        keep_alive = version == 'HTTP/1.1' and \
+            headers.get('connection', '').lower() != 'close'
+
+        # we only read
+        if method not in ('GET', 'HEAD'):
+            await self.__send(writer, 405, {'Allow': 'GET, HEAD'},
+                              keep_alive=keep_alive)
+            return keep_alive
+        head_only = method == 'HEAD'
+
+        # pick up a new apod.json
+        self.__load()
+
+        # route it
+        url = parse.urlsplit(target)
+        if url.path == API_PATH and self.apod_body:
+            await self.__send_apod(writer, headers, head_only, keep_alive)
+        elif url.path == IMAGE_PATH and self.image and \
+                parse.parse_qs(url.query).get('url') == [self.image['url']]:
+            await self.__send_image(writer, headers, head_only, keep_alive)
+        else:
+            await self.__send(writer, 404, keep_alive=keep_alive)
+
+        # return whether to keep going
+        return keep_alive
+
+    # --------------------------------------------------------------------------
+    # Send the apod json
+    # --------------------------------------------------------------------------
+    async def __send_apod(self, writer, headers, head_only, keep_alive):
+
+        """
+            Send the apod json
+
+            Paramaters:
+                writer [StreamWriter]: where to send it
+                headers [dict]: the request headers (lower case names)
+                head_only [bool]: whether this is a HEAD
+                keep_alive [bool]: whether to keep the connection open
+        """
+
+        # NB: no-cache, so clients always ask (a 304 is cheap)
+        res_headers = {
+            'Content-Type':     'application/json',
+            'ETag':             self.apod_etag,
+            'Cache-Control':    'no-cache'
+        }
+
+        # it hasn't changed
+        if headers.get('if-none-match') == self.apod_etag:
+            await self.__send(writer, 304, res_headers, keep_alive=keep_alive)
+            return
+
+        # send it
+        await self.__send(writer, 200, res_headers, self.apod_body,
+                          head_only=head_only, keep_alive=keep_alive)
+
+    # --------------------------------------------------------------------------
+    # Send the image (or part of it)
+    # --------------------------------------------------------------------------
+    async def __send_image(self, writer, headers, head_only, keep_alive):
+
+        """
+            Send the image (or part of it)
+
+            Paramaters:
+                writer [StreamWriter]: where to send it
+                headers [dict]: the request headers (lower case names)
+                head_only [bool]: whether this is a HEAD
+                keep_alive [bool]: whether to keep the connection open
+        """
+
+        # the image is named for its hash, so that's a strong etag
+        image = self.image
+        etag = f'"{image["sha256"]}"'
+        size = image['size']
+        res_headers = {
+            'Content-Type':     'application/octet-stream',
+            'ETag':             etag,
+            'Accept-Ranges':    'bytes'
+        }
+
+        # it hasn't changed
+        if headers.get('if-none-match') == etag:
+            await self.__send(writer, 304, res_headers, keep_alive=keep_alive)
+            return
+
+        # the whole image, or a range of it (if the client's copy is ours)
+        start, end = 0, size - 1
+        status = 200
+        range_value = headers.get('range', '')
+        if range_value and headers.get('if-range', etag) == etag:
+            match = RANGE_PATTERN.match(range_value)
+            if match and (match.group(1) or match.group(2)):
+                if not match.group(1):
+                    start = max(0, size - int(match.group(2)))
+                else:
+                    start = int(match.group(1))
+                    if match.group(2):
+                        end = min(end, int(match.group(2)))
+
+                # can't send that
+                if start >= size or start > end:
+                    res_headers['Content-Range'] = f'bytes */{size}'
+                    await self.__send(writer, 416, res_headers,
+                                      keep_alive=keep_alive)
+                    return
+
+                status = 206
+                res_headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+        # send it
+        await self.__send(writer, status, res_headers,
+                          path=image['path'], offset=start,
+                          count=end - start + 1, head_only=head_only,
+                          keep_alive=keep_alive)
+
+    # --------------------------------------------------------------------------
+    # Send a response
+    # --------------------------------------------------------------------------
+    async def __send(self, writer, status, headers=None, body=b'', path='',
+                     offset=0, count=0, head_only=False, keep_alive=True):
+
+        """
+            Send a response
+
+            Paramaters:
+                writer [StreamWriter]: where to send it
+                status [int]: the http status
+                headers [dict]: the response headers, or None
+                body [bytes]: the body (if not a file)
+                path [str]: the file to send the body from, or ''
+                offset [int]: where in the file to start
+                count [int]: how many bytes of the file to send
+                head_only [bool]: whether to leave out the body (for HEAD)
+                keep_alive [bool]: whether to keep the connection open
+        """
+
+        # the body length
+        length = count if path else len(body)
+        if status in (304, 416) or status >= 400 and not body:
+            length = 0
+
+        # the head
+        lines = [f'HTTP/1.1 {status} {HTTPStatus(status).phrase}',
+                 'Server: SpaceOddity']
+        for name, value in (headers or {}).items():
+            lines.append(f'{name}: {value}')
+        lines.append(f'Content-Length: {length}')
+        if not keep_alive:
+            lines.append('Connection: close')
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+
+        # the body
+        if head_only or not length:
+            await writer.drain()
+            return
+        if path:
+
+            # NB: sendfile goes straight from the page cache to the socket
+            await writer.drain()
+            with open(path, 'rb') as file:
+                await self.loop.sendfile(writer.transport, file, offset,
+                                         count)
+        else:
+            writer.write(body)
+            await writer.drain()
+        self.stats['bytes'] += length
+
+    # --------------------------------------------------------------------------
+    # Load apod.json if it has changed
+    # --------------------------------------------------------------------------
+    def __load(self):
+
+        """
+            Load apod.json if it has changed
+
+            NB: this only stats the file, unless the fetcher has published
+            something new
+        """
+
+        # see if it changed
+        try:
+            mtime = os.stat(self.shared_cache.apod_path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self.mtime:
+            return
+        self.mtime = mtime
+
+        # read it
+        self.apod_body = b''
+        self.image = None
+        try:
+            entry = self.shared_cache.read()
+        except (OSError, ValueError) as error:
+            if self.log:
+                self.log('could not read shared cache: %s', error)
+            return
+        if entry is None:
+            return
+
+        # the json, as the api sent it
+        self.apod_body = json.dumps(entry['apod']).encode('utf-8')
+        self.apod_etag = '"' + hashlib.sha1(self.apod_body).hexdigest() + '"'
+
+        # the image (none on a video day, or from an older fetcher)
+        image = entry.get('image')
+        if image and image.get('url'):
+            self.image = dict(image)
+            self.image['path'] = os.path.join(self.shared_cache.images_dir,
+                                              image['name'])
+
+# -)
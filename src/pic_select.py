@@ -0,0 +1,170 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: pic_select.py                                         |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+import struct
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# how much of each image to get when probing (enough for the header)
+PROBE_BYTES = 64 * 1024
+
+# jpeg start-of-frame markers (these hold the image size)
+JPEG_SOF = (0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+            0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF)
+
+
+# ------------------------------------------------------------------------------
+# Get the pixel size of an image from the start of its data
+# ------------------------------------------------------------------------------
+def get_image_size(data):
+
+    """
+        Get the pixel size of an image from the start of its data
+
+        Paramaters:
+            data [bytes]: the first few KiB of a jpeg, png or gif
+
+        Returns:
+            [tuple]: (width, height), or None if it can't be found
+    """
+
+    # png: the size is in the IHDR chunk
+    if data[:8] == b'\x89PNG\r\n\x1a\n' and len(data) >= 24:
+        return struct.unpack('>II', data[16:24])
+
+    # gif: the size is in the logical screen descriptor
+    if data[:6] in (b'GIF87a', b'GIF89a') and len(data) >= 10:
+        return struct.unpack('<HH', data[6:10])
+
+    # not a jpeg
+    if data[:2] != b'\xff\xd8':
+        return None
+
+    # jpeg: walk the segments until we find a start-of-frame
+    i = 2
+    while i + 9 < len(data):
+
+        # find the next marker
+        if data[i] != 0xFF:
+            i += 1
+            continue
+        marker = data[i + 1]
+
+        # padding or a marker with no length
+        if marker == 0xFF or 0xD0 <= marker <= 0xD9 or marker == 0x01:
+            i += 1 if marker == 0xFF else 2
+            continue
+
+        # found it
+        if marker in JPEG_SOF:
+            height, width = struct.unpack('>HH', data[i + 5:i + 9])
+            return width, height
+
+        # skip this segment
+        length = struct.unpack('>H', data[i + 2:i + 4])[0]
+        i += 2 + length
+
+    # ran out of data
+    return None
+
+
+# ------------------------------------------------------------------------------
+# Get the size in bytes and pixels of a remote image
+# ------------------------------------------------------------------------------
+def probe(url, http_client):
+
+    """
+        Get the size in bytes and pixels of a remote image
+
+        Paramaters:
+            url [str]: the url of the image
+            http_client [HTTPClient]: the client to ask with
+
+        Returns:
+            [tuple]: the size in bytes [int] (0 if unknown) and the size in
+            pixels [tuple] (None if unknown)
+
+        Raises:
+            HTTPError or OSError if the request fails
+
+        This asks for just the first few KiB with a Range request. The total
+        size comes from Content-Range (or Content-Length if the server
+        ignores the range), and the pixel size from the image header.
+    """
+
+    # ask for just the start of the file
+    headers = {'Range': f'bytes=0-{PROBE_BYTES - 1}'}
+    with http_client.open(url, headers) as response:
+        data = response.read(PROBE_BYTES)
+        headers = response.headers
+
+    # get the total size
+    size = 0
+    content_range = headers.get('Content-Range', '')
+    if '/' in content_range:
+        total = content_range.split('/')[-1]
+        size = int(total) if total.isdigit() else 0
+    elif headers.get('Content-Length', '').isdigit():
+        size = int(headers['Content-Length'])
+
+    # return the sizes
+    return size, get_image_size(data)
+
+
+# ------------------------------------------------------------------------------
+# Pick the best variant of an image for a screen
+# ------------------------------------------------------------------------------
+def choose(variants, screen, max_bytes):
+
+    """
+        Pick the best variant of an image for a screen
+
+        Paramaters:
+            variants [list]: a dict for each variant, with keys 'name',
+                'url', 'bytes' and 'pixels' (see probe)
+            screen [tuple]: the (width, height) of the biggest monitor, or
+                None if unknown
+            max_bytes [int]: the most bytes we want to download (0 for no
+                limit)
+
+        Returns:
+            [dict]: the chosen variant
+
+        The smallest variant that still covers the screen wins. If none of
+        them do, the biggest one that fits the budget wins. If none fit the
+        budget, the smallest one wins.
+    """
+
+    # variants we know the size of
+    known = [v for v in variants if v['bytes']]
+    if not known:
+        return variants[0]
+
+    # the ones that fit the budget
+    in_budget = [v for v in known if not max_bytes or v['bytes'] <= max_bytes]
+    if not in_budget:
+        return min(known, key=lambda v: v['bytes'])
+
+    # the ones that cover the screen
+    if screen:
+        covering = [v for v in in_budget if v['pixels'] and
+                    v['pixels'][0] >= screen[0] and
+                    v['pixels'][1] >= screen[1]]
+        if covering:
+            return min(covering, key=lambda v: v['bytes'])
+
+    # nothing covers it, so get as much as we can
+    return max(in_budget, key=lambda v: v['bytes'])
+
+# -)
@@ -0,0 +1,226 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: pipeline.py                                           |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+# NB: this is only imported once the scheduler says there is work to do, so
+# the idle path never loads asyncio
+import asyncio
+import contextlib
+
+
+# ------------------------------------------------------------------------------
+# Define the pipeline class
+# ------------------------------------------------------------------------------
+
+class Pipeline:
+
+    """
+        Runs the steps of a run, each as soon as the steps it needs are done
+
+        Each step names the steps it needs, and runs as an asyncio task once
+        they have finished. Blocking steps run in worker threads, so a step
+        that waits on the network doesn't hold up one that only needs the
+        disk (i.e. loading the store while the apod downloads). Steps that use
+        GObject run on the thread that called run(), since GTK and Gio
+        objects want to stay on one thread.
+
+        run() makes its own event loop and blocks until every step is done,
+        so cron and the daemon call it like any other method.
+
+        A step that raises (i.e. RunFinished, which ends a run early) stops
+        the pipeline: steps that haven't started are skipped, steps that are
+        running are waited for (a thread can't be stopped), and the first
+        error is raised from run(). A step added with always=True is like a
+        finally block: it waits for the steps it comes after, but runs even
+        if they (or any other step) didn't finish.
+    """
+
+    # --------------------------------------------------------------------------
+    # Methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Initialize the class
+    # --------------------------------------------------------------------------
+    def __init__(self, metrics=None, check=None):
+
+        """
+            Initialize the class
+
+            Paramaters:
+                metrics [Metrics]: times each step as a stage (None for no
+                    timing)
+                check [callable]: called with a step's name just before it
+                    starts, and may raise to stop the pipeline (i.e. when the
+                    run is out of time)
+        """
+
+        self.metrics = metrics
+        self.check = check
+
+        # the steps, in the order they were added
+        self.steps = []
+
+        # the first error a step raised
+        self.error = None
+
+    # --------------------------------------------------------------------------
+    # Add a step
+    # --------------------------------------------------------------------------
+    def add(self, name, func, after=(), main=False, always=False):
+
+        """
+            Add a step
+
+            Paramaters:
+                name [str]: the name of the step (and its stage)
+                func [callable]: the step, called with no arguments
+                after [list]: the names of the steps it needs
+                main [bool]: True to run it on the thread that called run(),
+                    instead of a worker thread
+                always [bool]: True to run it even if the pipeline is
+                    stopped, once the steps it comes after are done
+
+            Raises:
+                ValueError if the name is taken, or a step it needs hasn't
+                been added
+
+            NB: a step can only need steps added before it, so there can't be
+            a cycle
+        """
+
+        # check the names
+        names = [step['name'] for step in self.steps]
+        if name in names:
+            raise ValueError(f'step already added: {name}')
+        for need in after:
+            if need not in names:
+                raise ValueError(f'step {name} needs unknown step {need}')
+
+        # add it
+        self.steps.append({'name': name, 'func': func, 'after': tuple(after),
+                           'main': main, 'always': always})
+
+    # --------------------------------------------------------------------------
+    # Run every step
+    # --------------------------------------------------------------------------
+    def run(self):
+
+        """
+            Run every step
+
+            Raises:
+                the first error (or BaseException) a step raised
+        """
+
+        # run them all
+        self.error = None
+        asyncio.run(self.__run_all())
+
+        # pass on the first error
+        error, self.error = self.error, None
+        if error is not None:
+            raise error
+
+    # --------------------------------------------------------------------------
+    # Helpers
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Start a task for each step and wait for them all
+    # --------------------------------------------------------------------------
+    async def __run_all(self):
+
+        """
+            Start a task for each step and wait for them all
+        """
+
+        # each task waits for the tasks of the steps it needs
+        tasks = {}
+        for step in self.steps:
+            needs = [tasks[name] for name in step['after']]
+            tasks[step['name']] = asyncio.create_task(
+                self.__run_step(step, needs))
+
+        # wait for all of them
+        await asyncio.gather(*tasks.values())
+
+    # --------------------------------------------------------------------------
+    # Run one step once the steps it needs are done
+    # --------------------------------------------------------------------------
+    async def __run_step(self, step, needs):
+
+        """
+            Run one step once the steps it needs are done
+
+            Paramaters:
+                step [dict]: the step
+                needs [list]: the tasks of the steps it needs
+
+            Returns:
+                [bool]: True if the step ran to the end
+        """
+
+        # wait for the steps we need (and skip if any of them didn't finish)
+        for task in needs:
+            if not await task and not step['always']:
+                return False
+
+        # skip if another step stopped the pipeline
+        if self.error is not None and not step['always']:
+            return False
+
+        # run the step, timing it
+        # NB: the metrics stage is a context variable, which to_thread copies
+        # into the worker, so notes go to this step's record
+        try:
+            if self.check:
+                self.check(step['name'])
+            with self.__get_stage(step['name']):
+                if step['main']:
+                    step['func']()
+                else:
+                    await asyncio.to_thread(step['func'])
+
+        except asyncio.CancelledError:
+            raise
+
+        except BaseException as error:
+
+            # stop the pipeline (keeping the first error)
+            if self.error is None:
+                self.error = error
+            return False
+
+        # it ran to the end
+        return True
+
+    # --------------------------------------------------------------------------
+    # Get the timer for a step
+    # --------------------------------------------------------------------------
+    def __get_stage(self, name):
+
+        """
+            Get the timer for a step
+
+            Paramaters:
+                name [str]: the name of the step
+
+            Returns:
+                [contextmanager]: the metrics stage, or a dummy if there are
+                no metrics
+        """
+
+        if self.metrics is None:
+            return contextlib.nullcontext()
+        return self.metrics.stage(name)
+
+# -)
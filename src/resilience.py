@@ -0,0 +1,452 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: resilience.py                                         |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+from conf_store import write_json_atomic
+from run_guard import DeadlineExceeded
+import json
+import os
+import random
+import socket
+import time
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# the first backoff delay and the longest one, inside a run (seconds)
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+
+# the longest cool-down between runs (seconds)
+COOLDOWN_CAP = 6 * 60 * 60
+
+# http statuses that are worth trying again
+RETRY_STATUSES = (408, 425, 429, 500, 502, 503, 504)
+
+# the api's rate limit window (api.nasa.gov limits are per rolling hour)
+QUOTA_WINDOW = 60 * 60
+
+
+# ------------------------------------------------------------------------------
+# Get the http status of an error, if it has one
+# ------------------------------------------------------------------------------
+def get_status(error):
+
+    """
+        Get the http status of an error, if it has one
+
+        Paramaters:
+            error [Exception]: the error
+
+        Returns:
+            [int]: the status (0 if the error is not an http error)
+    """
+
+    return getattr(error, 'code', 0) or getattr(error, 'status', 0) or 0
+
+
+# ------------------------------------------------------------------------------
+# Get the Retry-After of an error, if it has one
+# ------------------------------------------------------------------------------
+def get_retry_after(error):
+
+    """
+        Get the Retry-After of an error, if it has one
+
+        Paramaters:
+            error [Exception]: the error
+
+        Returns:
+            [float]: the seconds to wait (0 if not given)
+
+        NB: only the seconds form is read, the date form is rare for APIs
+        and counts as not given
+    """
+
+    # get the header
+    headers = getattr(error, 'headers', None)
+    value = headers.get('Retry-After', '') if headers else ''
+    value = value or getattr(error, 'retry_after', 0)
+
+    # return it as a number
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+# ------------------------------------------------------------------------------
+# Check if an error is worth trying again
+# ------------------------------------------------------------------------------
+def is_retryable(error):
+
+    """
+        Check if an error is worth trying again
+
+        Paramaters:
+            error [Exception]: the error
+
+        Returns:
+            [bool]: True for network errors, timeouts, rate limits and
+            server errors, False for anything else (i.e. 404, bad json or
+            running out of time)
+    """
+
+    # the run is out of time, another try can't finish
+    if isinstance(error, DeadlineExceeded):
+        return False
+
+    # an http status says for itself
+    status = get_status(error)
+    if status:
+        return status in RETRY_STATUSES
+
+    # network trouble
+    return isinstance(error, (OSError, socket.timeout))
+
+
+# ------------------------------------------------------------------------------
+# Get a jittered exponential backoff delay
+# ------------------------------------------------------------------------------
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+
+    """
+        Get a jittered exponential backoff delay
+
+        Paramaters:
+            attempt [int]: how many attempts have failed so far (1 or more)
+            base [float]: the delay after the first failure
+            cap [float]: the longest delay
+
+        Returns:
+            [float]: a random delay between 0 and base * 2^(attempt - 1)
+            (capped)
+
+        NB: this is "full jitter", so desktops that fail at the same time
+        don't all retry at the same time
+    """
+
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+# ------------------------------------------------------------------------------
+# Call a function, retrying with backoff on errors worth retrying
+# ------------------------------------------------------------------------------
+def call_with_retry(func, retries, sleep=time.sleep, log=None):
+
+    """
+        Call a function, retrying with backoff on errors worth retrying
+
+        Paramaters:
+            func [callable]: the function to call (no args)
+            retries [int]: how many times to try again after the first
+            sleep [callable]: the sleep function (for testing)
+            log [callable]: called as log(msg, *args) before each retry, or
+                None
+
+        Returns:
+            [object]: whatever func returns
+
+        Raises:
+            the last error, if every attempt fails, the error is not worth
+            retrying, or the server says to wait longer than BACKOFF_CAP
+
+        A Retry-After from the server is used as the delay when it is
+        longer than the backoff.
+    """
+
+    attempt = 0
+    while True:
+        try:
+            return func()
+        except Exception as error:
+
+            # out of tries, or no point trying again
+            attempt += 1
+            if attempt > retries or not is_retryable(error):
+                raise
+
+            # wait, as long as the server asks (if we can)
+            retry_after = get_retry_after(error)
+            if retry_after > BACKOFF_CAP:
+                raise
+            delay = max(backoff_delay(attempt), retry_after)
+            if log:
+                log('retry %s of %s in %.1fs: %s', attempt, retries, delay,
+                    error)
+            sleep(delay)
+
+
+# ------------------------------------------------------------------------------
+# Define the failure gate class
+# ------------------------------------------------------------------------------
+
+class FailureGate:
+
+    """
+        Remembers failures and the api quota across runs
+
+        Each kind of request (i.e. 'api' or 'image') has a failure count and
+        a time before which it shouldn't be tried again. Each failure
+        doubles the cool-down (with jitter, up to COOLDOWN_CAP), a
+        Retry-After makes it at least that long, and a success clears it.
+
+        The api's X-RateLimit-Remaining is remembered too. When it gets down
+        to the reserve, the api is left alone until the window has passed,
+        and when it is low, calls are spread out over what is left of the
+        window, so the shared key never quite runs out.
+
+        The state is saved to a small json file, and only when it changes.
+    """
+
+    # --------------------------------------------------------------------------
+    # Methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Initialize the class
+    # --------------------------------------------------------------------------
+    def __init__(self, state_path, cooldown_base=300, quota_reserve=10):
+
+        """
+            Initialize the class
+
+            Paramaters:
+                state_path [str]: the file to keep the state in
+                cooldown_base [float]: the cool-down after the first failure
+                    (seconds)
+                quota_reserve [int]: the number of api calls to always keep
+                    in hand
+        """
+
+        # set the file and settings
+        self.state_path = state_path
+        self.cooldown_base = cooldown_base
+        self.quota_reserve = quota_reserve
+
+        # the state
+        self.state_dict = {'gates': {}, 'quota': {}}
+        self.__load()
+
+    # --------------------------------------------------------------------------
+    # Check if a kind of request may be made now
+    # --------------------------------------------------------------------------
+    def allowed(self, key, now=None):
+
+        """
+            Check if a kind of request may be made now
+
+            Paramaters:
+                key [str]: the kind of request (i.e. 'api')
+                now [float]: the current time (for testing), or None
+
+            Returns:
+                [tuple]: whether it is allowed [bool] and a reason [str]
+        """
+
+        # get the current time
+        if now is None:
+            now = time.time()
+
+        # cooling down after a failure
+        gate = self.state_dict['gates'].get(key)
+        if gate and now < gate['next_try']:
+            return False, (f'{key} cooling down for '
+                           f'{int(gate["next_try"] - now)}s after '
+                           f'{gate["failures"]} failure(s)')
+
+        # the quota only applies to the api
+        if key != 'api':
+            return True, ''
+
+        # nothing known about the quota, or the window has passed
+        quota = self.state_dict['quota']
+        if not quota or now - quota['seen'] >= QUOTA_WINDOW:
+            return True, ''
+
+        # too close to the limit, wait for the window
+        remaining = quota['remaining']
+        window_left = QUOTA_WINDOW - (now - quota['seen'])
+        if remaining <= self.quota_reserve:
+            return False, (f'api quota low ({remaining} left), waiting '
+                           f'{int(window_left)}s')
+
+        # running low, spread the rest out over the window
+        if remaining < quota['limit'] // 4:
+            spacing = window_left / (remaining - self.quota_reserve)
+            since = now - quota['seen']
+            if since < spacing:
+                return False, (f'api quota low ({remaining} left), next '
+                               f'call in {int(spacing - since)}s')
+
+        # ok to go
+        return True, ''
+
+    # --------------------------------------------------------------------------
+    # Get the seconds until a kind of request comes off its cool-down
+    # --------------------------------------------------------------------------
+    def wait(self, key, now=None):
+
+        """
+            Get the seconds until a kind of request comes off its cool-down
+
+            Paramaters:
+                key [str]: the kind of request (i.e. 'image')
+                now [float]: the current time (for testing), or None
+
+            Returns:
+                [float]: the seconds to wait (0 if it is not cooling down)
+        """
+
+        # get the current time
+        if now is None:
+            now = time.time()
+
+        # get the wait
+        gate = self.state_dict['gates'].get(key)
+        if not gate:
+            return 0
+        return max(0, gate['next_try'] - now)
+
+    # --------------------------------------------------------------------------
+    # Record a failure
+    # --------------------------------------------------------------------------
+    def failed(self, key, retry_after=0, now=None):
+
+        """
+            Record a failure
+
+            Paramaters:
+                key [str]: the kind of request (i.e. 'api')
+                retry_after [float]: the server's Retry-After (0 if none)
+                now [float]: the current time (for testing), or None
+
+            Returns:
+                [float]: the cool-down (seconds)
+        """
+
+        # get the current time
+        if now is None:
+            now = time.time()
+
+        # one more failure
+        gates = self.state_dict['gates']
+        gate = gates.setdefault(key, {'failures': 0, 'next_try': 0})
+        gate['failures'] += 1
+
+        # double the cool-down each time, with jitter, but respect the server
+        # NB: the jitter is only on the top half, so a cool-down is never
+        # less than half what it should be
+        full = min(COOLDOWN_CAP,
+                   self.cooldown_base * 2 ** (gate['failures'] - 1))
+        cooldown = max(random.uniform(full / 2, full), retry_after)
+        gate['next_try'] = now + cooldown
+
+        # save and return the cool-down
+        self.__save()
+        return cooldown
+
+    # --------------------------------------------------------------------------
+    # Record a success
+    # --------------------------------------------------------------------------
+    def succeeded(self, key):
+
+        """
+            Record a success
+
+            Paramaters:
+                key [str]: the kind of request (i.e. 'api')
+        """
+
+        # clear the failures (if there were any)
+        if self.state_dict['gates'].pop(key, None) is not None:
+            self.__save()
+
+    # --------------------------------------------------------------------------
+    # Remember the api quota from a response's headers
+    # --------------------------------------------------------------------------
+    def note_quota(self, headers, now=None):
+
+        """
+            Remember the api quota from a response's headers
+
+            Paramaters:
+                headers [Message]: the response headers (or None)
+                now [float]: the current time (for testing), or None
+        """
+
+        # get the headers
+        if not headers:
+            return
+        try:
+            remaining = int(headers.get('X-RateLimit-Remaining', ''))
+        except ValueError:
+            return
+        try:
+            limit = int(headers.get('X-RateLimit-Limit', ''))
+        except ValueError:
+            limit = remaining
+
+        # remember them
+        self.state_dict['quota'] = {
+            'remaining':    remaining,
+            'limit':        limit,
+            'seen':         time.time() if now is None else now
+        }
+        self.__save()
+
+    # --------------------------------------------------------------------------
+    # Helpers
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Load the state
+    # --------------------------------------------------------------------------
+    def __load(self):
+
+        """
+            Load the state
+
+            A missing or bad file just means no failures.
+        """
+
+        # no file
+        if not os.path.exists(self.state_path):
+            return
+
+        # read it
+        try:
+            with open(self.state_path, 'r') as file:
+                state_dict = json.load(file)
+            self.state_dict['gates'] = dict(state_dict.get('gates', {}))
+            self.state_dict['quota'] = dict(state_dict.get('quota', {}))
+        except (OSError, ValueError, AttributeError, TypeError):
+            pass
+
+    # --------------------------------------------------------------------------
+    # Save the state
+    # --------------------------------------------------------------------------
+    def __save(self):
+
+        """
+            Save the state
+
+            NB: losing this file only means forgetting a cool-down, so a
+            write error is not worth failing a run for
+        """
+
+        try:
+            write_json_atomic(self.state_path, self.state_dict)
+        except OSError:
+            pass
+
+# -)
@@ -0,0 +1,268 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: run_guard.py                                          |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+import fcntl
+import os
+import time
+
+
+# ------------------------------------------------------------------------------
+# Define the deadline error
+# ------------------------------------------------------------------------------
+
+class DeadlineExceeded(TimeoutError):
+
+    """
+        Raised when a run is out of time
+
+        NB: this is a TimeoutError, so code that handles network timeouts
+        handles it too, but it is never worth trying again
+    """
+
+
+# ------------------------------------------------------------------------------
+# Define the run lock class
+# ------------------------------------------------------------------------------
+
+class RunLock:
+
+    """
+        Makes sure only one run uses a config folder at a time
+
+        Cron starts a new run every couple of minutes, whether or not the
+        last one is done (i.e. a big download on a slow line). Without a lock
+        they would race on the config, the image store and the old files.
+
+        The lock is an flock on a file in the config folder, so it goes away
+        by itself if the process dies. The file holds the pid of the owner,
+        for the log. It can be taken more than once by the same owner (i.e.
+        run() and then run_steps()), and is let go by the last release().
+    """
+
+    # --------------------------------------------------------------------------
+    # Methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Initialize the class
+    # --------------------------------------------------------------------------
+    def __init__(self, lock_path):
+
+        """
+            Initialize the class
+
+            Paramaters:
+                lock_path [str]: the lock file
+        """
+
+        self.lock_path = lock_path
+
+        # the open lock file and how many times we took it
+        self.fd = None
+        self.count = 0
+
+    # --------------------------------------------------------------------------
+    # Take the lock, if no one else has it
+    # --------------------------------------------------------------------------
+    def acquire(self):
+
+        """
+            Take the lock, if no one else has it
+
+            Returns:
+                [bool]: True if we have the lock, False if another process
+                does
+
+            Raises:
+                OSError if the lock file can't be opened
+        """
+
+        # we already have it
+        if self.count:
+            self.count += 1
+            return True
+
+        # try to take it, without waiting
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+
+        # say who has it
+        os.ftruncate(fd, 0)
+        os.write(fd, f'{os.getpid()}\n'.encode('ascii'))
+
+        # we have it
+        self.fd = fd
+        self.count = 1
+        return True
+
+    # --------------------------------------------------------------------------
+    # Let go of the lock
+    # --------------------------------------------------------------------------
+    def release(self):
+
+        """
+            Let go of the lock
+
+            NB: the file is left in place, removing it would let a waiting
+            process lock a file that is about to be gone
+        """
+
+        # not ours
+        if not self.count:
+            return
+
+        # let go on the last release
+        self.count -= 1
+        if not self.count:
+            os.close(self.fd)
+            self.fd = None
+
+    # --------------------------------------------------------------------------
+    # Get the pid of whoever has the lock
+    # --------------------------------------------------------------------------
+    def get_owner(self):
+
+        """
+            Get the pid of whoever has the lock
+
+            Returns:
+                [str]: the pid, or '?' if it can't be read
+        """
+
+        try:
+            with open(self.lock_path, 'r') as file:
+                return file.read().strip() or '?'
+        except OSError:
+            return '?'
+
+
+# ------------------------------------------------------------------------------
+# Define the deadline class
+# ------------------------------------------------------------------------------
+
+class Deadline:
+
+    """
+        The time left for a run
+
+        A run gets one budget, and each stage gets what is left of it: the
+        network timeouts are cut down to the time left, retries don't sleep
+        past it, and no stage starts after it. So a run ends (and saves what
+        it has, i.e. a part file to resume) before cron starts the next one.
+    """
+
+    # --------------------------------------------------------------------------
+    # Methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Initialize the class
+    # --------------------------------------------------------------------------
+    def __init__(self, seconds, clock=time.monotonic, sleep=time.sleep):
+
+        """
+            Initialize the class
+
+            Paramaters:
+                seconds [float]: the budget, or 0 for no limit
+                clock [callable]: the clock (for testing)
+                sleep [callable]: the sleep function (for testing)
+        """
+
+        self.seconds = seconds
+        self.clock = clock
+        self.sleep_func = sleep
+        self.end = clock() + seconds if seconds else None
+
+    # --------------------------------------------------------------------------
+    # Get the time left
+    # --------------------------------------------------------------------------
+    def remaining(self):
+
+        """
+            Get the time left
+
+            Returns:
+                [float]: the seconds left (may be negative), or inf if there
+                is no limit
+        """
+
+        if self.end is None:
+            return float('inf')
+        return self.end - self.clock()
+
+    # --------------------------------------------------------------------------
+    # Check if the time is up
+    # --------------------------------------------------------------------------
+    def expired(self):
+
+        """
+            Check if the time is up
+
+            Returns:
+                [bool]: True if there is no time left
+        """
+
+        return self.remaining() <= 0
+
+    # --------------------------------------------------------------------------
+    # Cut a timeout down to the time left
+    # --------------------------------------------------------------------------
+    def timeout(self, limit):
+
+        """
+            Cut a timeout down to the time left
+
+            Paramaters:
+                limit [float]: the timeout we would use without a deadline
+
+            Returns:
+                [float]: the smaller of limit and the time left
+
+            Raises:
+                DeadlineExceeded if there is no time left
+        """
+
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f'out of time ({self.seconds}s budget)')
+        return min(limit, remaining)
+
+    # --------------------------------------------------------------------------
+    # Sleep, unless that would go past the deadline
+    # --------------------------------------------------------------------------
+    def sleep(self, seconds):
+
+        """
+            Sleep, unless that would go past the deadline
+
+            Paramaters:
+                seconds [float]: how long to sleep
+
+            Raises:
+                DeadlineExceeded if there isn't time to sleep and then do
+                something
+
+            NB: this is passed as the sleep function to the retry loops, so
+            they give up instead of waiting for a try that can't finish
+        """
+
+        if seconds >= self.remaining():
+            raise DeadlineExceeded(f'no time to wait {seconds:.1f}s '
+                                   f'({self.seconds}s budget)')
+        self.sleep_func(seconds)
+
+# -)
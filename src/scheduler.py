@@ -0,0 +1,279 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: scheduler.py                                          |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+import json
+import os
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# APOD is published from the US east coast
+APOD_TZ_NAME = 'America/New_York'
+
+# NB: cron never fires at exactly the same second, so allow a little slack
+# when comparing against the poll interval
+POLL_SLACK = 30
+
+
+# ------------------------------------------------------------------------------
+# Define the scheduler class
+# ------------------------------------------------------------------------------
+
+class Scheduler:
+
+    """
+        Decides locally whether a new APOD could exist yet
+
+        The scheduler looks at the date of the last APOD we saw and works out
+        when the next one can be published (midnight in APOD's time zone).
+        Before that time, there is no point going to the network. For a short
+        window after it, we poll often, since the new picture usually shows
+        up within a couple of hours. After that, we poll slowly in case it is
+        late.
+    """
+
+    # --------------------------------------------------------------------------
+    # Methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Initialize the class
+    # --------------------------------------------------------------------------
+    def __init__(self, state_path, burst_window=120, burst_interval=2,
+                 slow_interval=30):
+
+        """
+            Initialize the class
+
+            Paramaters:
+                state_path [str]: the path to the scheduler's state file
+                burst_window [int]: minutes after publish time to poll often
+                burst_interval [int]: minutes between polls in the window
+                slow_interval [int]: minutes between polls after the window
+        """
+
+        # set the state file location
+        self.state_path = state_path
+
+        # set the intervals (in seconds)
+        self.burst_window = burst_window * 60
+        self.burst_interval = burst_interval * 60
+        self.slow_interval = slow_interval * 60
+
+        # get the publish time zone
+        self.apod_tz = self.__get_apod_tz()
+
+        # the time of the last network check (epoch seconds)
+        self.last_check = 0
+        self.__load()
+
+    # --------------------------------------------------------------------------
+    # Check if we should go to the network
+    # --------------------------------------------------------------------------
+    def is_due(self, last_date, now=None):
+
+        """
+            Check if we should go to the network
+
+            Paramaters:
+                last_date [str]: the 'date' field of the last APOD we saw
+                    (YYYY-MM-DD)
+                now [datetime]: the current time (for testing), or None for
+                    the real time
+
+            Returns:
+                [tuple]: whether a check is due [bool] and a reason [str]
+        """
+
+        # get the current time
+        if now is None:
+            now = datetime.now(timezone.utc)
+
+        # find when the next apod can appear
+        publish_time = self.__get_publish_time(last_date)
+        if publish_time is None:
+            return True, 'no previous apod date'
+
+        # too early, a new one can't exist yet
+        if now < publish_time:
+            return False, f'next apod not before {publish_time.isoformat()}'
+
+        # pick the poll interval based on how long ago it could have appeared
+        since_publish = (now - publish_time).total_seconds()
+        if since_publish < self.burst_window:
+            interval = self.burst_interval
+        else:
+            interval = self.slow_interval
+
+        # check if we polled recently enough
+        since_check = now.timestamp() - self.last_check
+        if since_check < interval - POLL_SLACK:
+            return False, f'last check was {int(since_check)}s ago'
+
+        # time to check
+        return True, 'new apod may be available'
+
+    # --------------------------------------------------------------------------
+    # Get the number of seconds until a check is due
+    # --------------------------------------------------------------------------
+    def get_wait(self, last_date, now=None):
+
+        """
+            Get the number of seconds until a check is due
+
+            Paramaters:
+                last_date [str]: the 'date' field of the last APOD we saw
+                    (YYYY-MM-DD)
+                now [datetime]: the current time (for testing), or None for
+                    the real time
+
+            Returns:
+                [float]: the number of seconds until is_due would return True
+        """
+
+        # get the current time
+        if now is None:
+            now = datetime.now(timezone.utc)
+
+        # no date, check often until we get one
+        since_check = now.timestamp() - self.last_check
+        publish_time = self.__get_publish_time(last_date)
+        if publish_time is None:
+            return max(0, self.burst_interval - POLL_SLACK - since_check)
+
+        # too early, wait for publish time
+        if now < publish_time:
+            return (publish_time - now).total_seconds()
+
+        # pick the poll interval based on how long ago it could have appeared
+        since_publish = (now - publish_time).total_seconds()
+        if since_publish < self.burst_window:
+            interval = self.burst_interval
+        else:
+            interval = self.slow_interval
+
+        # wait for the rest of the interval
+        return max(0, interval - POLL_SLACK - since_check)
+
+    # --------------------------------------------------------------------------
+    # Remember that we went to the network
+    # --------------------------------------------------------------------------
+    def mark_checked(self, now=None):
+
+        """
+            Remember that we went to the network
+
+            Paramaters:
+                now [datetime]: the current time (for testing), or None for
+                    the real time
+        """
+
+        # get the current time
+        if now is None:
+            now = datetime.now(timezone.utc)
+
+        # save the check time
+        self.last_check = now.timestamp()
+        self.__save()
+
+    # --------------------------------------------------------------------------
+    # Helpers
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Get the time the apod after last_date can be published
+    # --------------------------------------------------------------------------
+    def __get_publish_time(self, last_date):
+
+        """
+            Get the time the apod after last_date can be published
+
+            Paramaters:
+                last_date [str]: the 'date' field of the last APOD we saw
+
+            Returns:
+                [datetime]: midnight of the next day in APOD's time zone, or
+                None if last_date is missing or bad
+        """
+
+        # parse the date
+        try:
+            apod_date = date.fromisoformat(last_date)
+        except (TypeError, ValueError):
+            return None
+
+        # the next one appears at midnight the next day
+        next_date = apod_date + timedelta(days=1)
+        return datetime.combine(next_date, time(0, 0), tzinfo=self.apod_tz)
+
+    # --------------------------------------------------------------------------
+    # Get the time zone APOD is published in
+    # --------------------------------------------------------------------------
+    def __get_apod_tz(self):
+
+        """
+            Get the time zone APOD is published in
+
+            Returns:
+                [tzinfo]: the APOD time zone
+
+            If the system has no tz database, fall back to Eastern Standard
+            Time, which is at worst an hour late in the summer.
+        """
+
+        try:
+            return ZoneInfo(APOD_TZ_NAME)
+        except Exception:
+            return timezone(timedelta(hours=-5))
+
+    # --------------------------------------------------------------------------
+    # Load the state file
+    # --------------------------------------------------------------------------
+    def __load(self):
+
+        """
+            Load the state file
+
+            A missing or broken state file just means we never checked.
+        """
+
+        # no file, never checked
+        if not os.path.exists(self.state_path):
+            return
+
+        # read state file
+        try:
+            with open(self.state_path, 'r') as file:
+                state_dict = json.load(file)
+            self.last_check = float(state_dict['last_check'])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    # --------------------------------------------------------------------------
+    # Save the state file
+    # --------------------------------------------------------------------------
+    def __save(self):
+
+        """
+            Save the state file
+        """
+
+        # write to a temp file and move it into place
+        tmp_path = f'{self.state_path}.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump({'last_check': self.last_check}, file)
+        os.replace(tmp_path, self.state_path)
+
+# -)
@@ -0,0 +1,296 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: shared_cache.py                                       |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+from conf_store import write_json_atomic
+from contextlib import contextmanager
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# the file names in the cache folder
+APOD_NAME = 'apod.json'
+LOCK_NAME = '.lock'
+IMAGES_NAME = 'images'
+
+# the size of each chunk read when hashing
+CHUNK_SIZE = 64 * 1024
+
+
+# ------------------------------------------------------------------------------
+# Define the shared cache class
+# ------------------------------------------------------------------------------
+
+class SharedCache:
+
+    """
+        A system-wide cache of the current apod and its image
+
+        One privileged fetcher (i.e. a system cron job) downloads the apod
+        and publishes it here, and every user on the machine reads it from
+        here, so a lab of N seats makes one request instead of N. The folder
+        holds:
+
+        - apod.json: the apod dict, plus the name, size, sha256 and source
+          url of its image (no image on a video day)
+        - images/<sha256>.<ext>: the last few images, readable by everyone
+        - .lock: flocked, exclusive while publishing and shared while
+          reading, so a reader never sees an apod.json that doesn't match
+          the images
+
+        Readers check the size and hash of the image before using it, and
+        never write anything.
+    """
+
+    # --------------------------------------------------------------------------
+    # Methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Initialize the class
+    # --------------------------------------------------------------------------
+    def __init__(self, cache_dir, keep=7):
+
+        """
+            Initialize the class
+
+            Paramaters:
+                cache_dir [str]: the shared folder (i.e.
+                    /var/cache/spaceoddity)
+                keep [int]: the most images to keep (at least 1)
+        """
+
+        self.cache_dir = cache_dir
+        self.apod_path = os.path.join(cache_dir, APOD_NAME)
+        self.lock_path = os.path.join(cache_dir, LOCK_NAME)
+        self.images_dir = os.path.join(cache_dir, IMAGES_NAME)
+        self.keep = max(1, keep)
+
+    # --------------------------------------------------------------------------
+    # Read the published entry
+    # --------------------------------------------------------------------------
+    def read(self):
+
+        """
+            Read the published entry
+
+            Returns:
+                [dict]: the apod dict ('apod') and image info ('image', None
+                on a video day), or None if nothing has been published
+
+            Raises:
+                OSError if the folder can't be read
+                ValueError if apod.json is broken
+        """
+
+        # nothing published yet
+        if not os.path.exists(self.lock_path):
+            return None
+
+        # read it (while no one is publishing)
+        with self.__lock(exclusive=False):
+            try:
+                with open(self.apod_path, 'r') as file:
+                    entry = json.load(file)
+            except FileNotFoundError:
+                return None
+
+        # check the shape
+        if not isinstance(entry, dict) or \
+                not isinstance(entry.get('apod'), dict):
+            raise ValueError(f'{self.apod_path}: not an apod entry')
+
+        # return the entry
+        return entry
+
+    # --------------------------------------------------------------------------
+    # Check the image of an entry and get its path
+    # --------------------------------------------------------------------------
+    def verify(self, entry):
+
+        """
+            Check the image of an entry and get its path
+
+            Paramaters:
+                entry [dict]: the entry from read()
+
+            Returns:
+                [str]: the path of the image
+
+            Raises:
+                ValueError if the entry has no image, or the file is missing
+                or doesn't match its size and hash
+        """
+
+        # get the image info
+        image = entry.get('image')
+        if not image:
+            raise ValueError('the shared apod has no image')
+        path = os.path.join(self.images_dir, os.path.basename(image['name']))
+
+        # check the size first (it's cheap)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            raise ValueError(f'{path}: missing')
+        if size != image['size']:
+            raise ValueError(f'{path}: size {size}, expected {image["size"]}')
+
+        # then the hash
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(CHUNK_SIZE), b''):
+                hasher.update(chunk)
+        if hasher.hexdigest() != image['sha256']:
+            raise ValueError(f'{path}: hash does not match')
+
+        # return the path
+        return path
+
+    # --------------------------------------------------------------------------
+    # Publish an apod (and its image) for the other users
+    # --------------------------------------------------------------------------
+    def publish(self, apod_dict, pic_path='', pic_url=''):
+
+        """
+            Publish an apod (and its image) for the other users
+
+            Paramaters:
+                apod_dict [dict]: the apod dict
+                pic_path [str]: the image, named '<sha256>.<ext>' (as in the
+                    image store), or '' on a video day
+                pic_url [str]: the url the image came from (so a mirror can
+                    serve it under that url)
+
+            Returns:
+                [bool]: True if anything changed, False if it was already
+                published
+
+            Raises:
+                OSError if the folder can't be written
+
+            The image is copied in before apod.json points to it, and old
+            images are removed after, so a reader always finds the image it
+            was told about.
+        """
+
+        # make the folders (readable by everyone)
+        os.makedirs(self.images_dir, mode=0o755, exist_ok=True)
+
+        # describe the image
+        image = None
+        if pic_path:
+            name = os.path.basename(pic_path)
+            image = {
+                'name':     name,
+                'size':     os.path.getsize(pic_path),
+                'sha256':   os.path.splitext(name)[0],
+                'url':      pic_url
+            }
+        entry = {'apod': apod_dict, 'image': image}
+
+        with self.__lock(exclusive=True):
+
+            # already published
+            try:
+                with open(self.apod_path, 'r') as file:
+                    if json.load(file) == entry:
+                        return False
+            except (OSError, ValueError):
+                pass
+
+            # copy the image in
+            if image:
+                dst_path = os.path.join(self.images_dir, image['name'])
+                if not os.path.exists(dst_path):
+                    tmp_path = f'{dst_path}.tmp'
+                    shutil.copyfile(pic_path, tmp_path)
+                    os.chmod(tmp_path, 0o644)
+                    os.replace(tmp_path, dst_path)
+
+            # point to it
+            write_json_atomic(self.apod_path, entry)
+            os.chmod(self.apod_path, 0o644)
+
+            # drop the oldest images
+            self.__prune(image['name'] if image else '')
+
+        # it changed
+        return True
+
+    # --------------------------------------------------------------------------
+    # Helpers
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Hold the cache lock
+    # --------------------------------------------------------------------------
+    @contextmanager
+    def __lock(self, exclusive):
+
+        """
+            Hold the cache lock
+
+            Paramaters:
+                exclusive [bool]: True to publish, False to read
+
+            NB: readers open the lock file read-only, which is all flock
+            needs, so they don't need write access to the folder
+        """
+
+        # the fetcher makes the lock file, readers only open it
+        if exclusive:
+            fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        else:
+            fd = os.open(self.lock_path, os.O_RDONLY)
+
+        # hold the lock until the block is done
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+        finally:
+            os.close(fd)
+
+    # --------------------------------------------------------------------------
+    # Remove the oldest images
+    # --------------------------------------------------------------------------
+    def __prune(self, current):
+
+        """
+            Remove the oldest images
+
+            Paramaters:
+                current [str]: the name of the published image (never
+                    removed)
+
+            NB: a few old ones are kept, so a user who hasn't run since
+            isn't left pointing at a missing wallpaper
+        """
+
+        # newest first
+        paths = [entry.path for entry in os.scandir(self.images_dir)
+                 if entry.is_file() and entry.name != current]
+        paths.sort(key=os.path.getmtime, reverse=True)
+
+        # remove all but the newest few
+        for path in paths[self.keep - 1:]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+# -)
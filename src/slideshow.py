@@ -0,0 +1,211 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: slideshow.py                                          |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+from xml.sax.saxutils import escape
+import hashlib
+import os
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# the first line of the file, which holds the signature of what it shows
+SIGNATURE_PREFIX = '<!-- spaceoddity slideshow '
+SIGNATURE_SUFFIX = ' -->'
+
+# when the slideshow starts
+# NB: fixed, so the same images always make the same file (GNOME works out
+# where it is in the show from the time since this)
+START_TIME = ('<starttime><year>2000</year><month>1</month><day>1</day>'
+              '<hour>0</hour><minute>0</minute><second>0</second>'
+              '</starttime>')
+
+
+# ------------------------------------------------------------------------------
+# Define the slideshow class
+# ------------------------------------------------------------------------------
+
+class Slideshow:
+
+    """
+        Builds a GNOME background slideshow from the images in the archive
+
+        GNOME reads the slideshow file once and moves through the images by
+        itself, so the rotation costs nothing: no process wakes up, and the
+        network is never needed. The file only has to change when the
+        images do.
+
+        The first line of the file holds a signature of the images and
+        timings it shows. build() only writes the file if that has changed,
+        and is_current() checks the file's time against the archive's index
+        (two stats), so a run can tell that there is nothing to do without
+        loading anything.
+
+        NB: GNOME watches the file, so a rewrite is picked up even though the
+        wallpaper setting doesn't change
+    """
+
+    # --------------------------------------------------------------------------
+    # Methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Initialize the class
+    # --------------------------------------------------------------------------
+    def __init__(self, xml_path, seconds=1800, transition=2.0):
+
+        """
+            Initialize the class
+
+            Paramaters:
+                xml_path [str]: the slideshow file
+                seconds [float]: how long each image is shown (including the
+                    transition)
+                transition [float]: how long it takes to fade to the next
+                    image (0 for no fade)
+        """
+
+        self.xml_path = xml_path
+        self.seconds = max(float(seconds), 1.0)
+        self.transition = min(max(float(transition), 0.0), self.seconds / 2)
+
+    # --------------------------------------------------------------------------
+    # Check if the file is newer than the archive
+    # --------------------------------------------------------------------------
+    def is_current(self, index_path):
+
+        """
+            Check if the file is newer than the archive
+
+            Paramaters:
+                index_path [str]: the archive's index file (which is written
+                    whenever an image is added or removed)
+
+            Returns:
+                [bool]: True if the file exists and is at least as new as the
+                index
+        """
+
+        try:
+            xml_time = os.stat(self.xml_path).st_mtime
+        except OSError:
+            return False
+        try:
+            return xml_time >= os.stat(index_path).st_mtime
+        except OSError:
+            return True
+
+    # --------------------------------------------------------------------------
+    # Write the file, if the images have changed
+    # --------------------------------------------------------------------------
+    def build(self, paths):
+
+        """
+            Write the file, if the images have changed
+
+            Paramaters:
+                paths [list]: the images to show, in order
+
+            Returns:
+                [bool]: True if the file was written
+
+            Raises:
+                OSError if the file can't be written
+
+            NB: if nothing changed, the file is touched instead, so
+            is_current() is True until the archive changes again
+        """
+
+        # see if anything changed
+        signature = self.get_signature(paths)
+        if signature == self.read_signature():
+            os.utime(self.xml_path)
+            return False
+
+        # build the text
+        lines = [f'{SIGNATURE_PREFIX}{signature}{SIGNATURE_SUFFIX}',
+                 '<background>', f'  {START_TIME}']
+        static = self.seconds - self.transition if len(paths) > 1 else \
+            self.seconds
+        for i, path in enumerate(paths):
+            lines += ['  <static>',
+                      f'    <duration>{static:.1f}</duration>',
+                      f'    <file>{escape(path)}</file>',
+                      '  </static>']
+
+            # fade into the next one (the last fades into the first)
+            if len(paths) > 1 and self.transition:
+                next_path = paths[(i + 1) % len(paths)]
+                lines += ['  <transition type="overlay">',
+                          f'    <duration>{self.transition:.1f}</duration>',
+                          f'    <from>{escape(path)}</from>',
+                          f'    <to>{escape(next_path)}</to>',
+                          '  </transition>']
+        lines.append('</background>')
+
+        # write it atomically (GNOME may be reading it)
+        tmp_path = f'{self.xml_path}.tmp'
+        with open(tmp_path, 'w') as file:
+            file.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, self.xml_path)
+
+        # we wrote it
+        return True
+
+    # --------------------------------------------------------------------------
+    # Get the signature of a slideshow
+    # --------------------------------------------------------------------------
+    def get_signature(self, paths):
+
+        """
+            Get the signature of a slideshow
+
+            Paramaters:
+                paths [list]: the images to show, in order
+
+            Returns:
+                [str]: a hash of the images and timings
+
+            NB: images in the store are named for their hash, so their paths
+            are enough to tell if they changed
+        """
+
+        hasher = hashlib.sha1()
+        hasher.update(f'{self.seconds}:{self.transition}\n'.encode('utf-8'))
+        for path in paths:
+            hasher.update(path.encode('utf-8') + b'\n')
+        return hasher.hexdigest()
+
+    # --------------------------------------------------------------------------
+    # Read the signature of the current file
+    # --------------------------------------------------------------------------
+    def read_signature(self):
+
+        """
+            Read the signature of the current file
+
+            Returns:
+                [str]: the signature, or '' if there is no file (or it isn't
+                ours)
+        """
+
+        try:
+            with open(self.xml_path, 'r') as file:
+                line = file.readline().strip()
+        except OSError:
+            return ''
+        if not line.startswith(SIGNATURE_PREFIX) or \
+                not line.endswith(SIGNATURE_SUFFIX):
+            return ''
+        return line[len(SIGNATURE_PREFIX):-len(SIGNATURE_SUFFIX)]
+
+# -)
@@ -7,14 +7,13 @@
 # ------------------------------------------------------------------------------
 
 # TODO: test all conditions (no internet, bad url, etc)
+# NB: the network cases are now in tests/test_faults.py, run against the
+# stand-in server in tests/apod_server.py
 # no conf dir: OK
 # No log file: OK
-# NEXT: No cfg: doesn't delete old file if no cfg
-#       put image in folder, next download, delete all contents of folder
-#       then put new image in folder before setting picture-uri
-#       or delete everything in .config that isn't spaceoddit.cfg or spaceoddity.log
+# No cfg: OK (image store evicts/collects strays)
 # bad cfg: OK
-# NEXT: old filepath key missing: meh, might not delete old file (see above)
+# old filepath key missing: OK (no longer used)
 # not enabled: OK
 # bad apod url: OK
 # no internet: OK
@@ -43,13 +42,20 @@
 # Imports
 # ------------------------------------------------------------------------------
 
-from datetime import datetime
-from gi.repository.Gio import Settings as gsettings
-from urllib import request
+from conf_store import ConfStore
+from log_pipe import LogPipe
+from run_guard import Deadline, RunLock
+from scheduler import Scheduler
 import json
 import logging
 import os
-import shutil
+import sys
+import time
+
+# NB: most runs find there is nothing to do, and exit without touching the
+# network. To keep that path fast, anything it doesn't need (GObject, urllib,
+# argparse, and the modules that use them) is imported in the method that
+# uses it, not here. See tests/bench_startup.py.
 
 # ------------------------------------------------------------------------------
 # Constants
@@ -57,6 +63,40 @@ import shutil
 
 DEBUG = 1
 
+# the url to load json from
+APOD_URL = 'https://api.nasa.gov/planetary/apod?api_key='\
+    '2h4peiV1XvWqA0bHBxVK21D3QmyBgHtwIyRxo8dm'
+
+# the pipeline options for a step that uses GObject, and for one that runs
+# even if the run is ending (see pipeline.py)
+MAIN = {'main': True}
+ALWAYS = {'always': True}
+
+# a rough size of an apod image, to tell if a backfill fits in the store
+# NB: hdurl images are mostly 1-5 MB
+BACKFILL_IMAGE_BYTES = 3 * 1024 * 1024
+
+
+# ------------------------------------------------------------------------------
+# Define an exception that ends a run early
+# ------------------------------------------------------------------------------
+
+class RunFinished(BaseException):
+
+    """
+        Raised by a step to end the current run early
+
+        Paramaters:
+            save [bool]: whether the config dict should be saved
+
+        NB: this is a BaseException (like the SystemExit it replaces) so the
+        'except Exception' blocks in the steps don't swallow it.
+    """
+
+    def __init__(self, save=True):
+        super().__init__()
+        self.save = save
+
 
 # ------------------------------------------------------------------------------
 # Define the main class
@@ -94,26 +134,146 @@ class Main:
         home_dir = os.path.expanduser('~')
         self.conf_dir = os.path.join(home_dir, '.config', self.prog_name)
         self.conf_path = os.path.join(self.conf_dir, f'{self.prog_name}.cfg')
+        self.state_path = os.path.join(self.conf_dir, 'state.json')
+        self.store_dir = os.path.join(self.conf_dir, 'images')
+        self.derived_dir = os.path.join(self.conf_dir, 'derived')
+        self.caption_dir = os.path.join(self.conf_dir, 'captions')
+        self.slideshow_path = os.path.join(self.conf_dir, 'slideshow.xml')
+        self.index_path = os.path.join(self.conf_dir, 'apod.db')
+        cache_path = os.path.join(self.conf_dir, 'http_cache.json')
+        self.sched_path = os.path.join(self.conf_dir, 'schedule.json')
         log_path = os.path.join(self.conf_dir, f'{self.prog_name}.log')
 
         # set default config dict
         self.conf_dict_def = {
             'general': {
-                'enabled':          1
+                'enabled':          1,
+                'scale_to_screen':  1,
+                'backend':          'auto',
+                'run_timeout':      100.0,
+                'video_thumbnails': 1,
+                'progressive':      0,
+                'slideshow':        0,
+                'caption':          0
+            },
+            'schedule': {
+                'burst_window':     120,
+                'burst_interval':   2,
+                'slow_interval':    30
             },
             'apod': {
+                'date':             '',
                 'media_type':       '',
                 'hdurl':            '',
                 'url':              '',
             },
+            'store': {
+                'max_megabytes':    200,
+                'max_count':        30
+            },
+            'slideshow': {
+                'seconds':          1800,
+                'transition':       2.0
+            },
+            'caption': {
+                'font':             'Sans Bold 14',
+                'max_seconds':      1.0,
+                'max_megabytes':    32
+            },
+            'backfill': {
+                'concurrency':      4,
+                'per_host':         2,
+                'host_delay':       0.5
+            },
+            'network': {
+                'apod_url':             '',
+                'mirror_url':           '',
+                'probe_variants':       1,
+                'max_image_megabytes':  0,
+                'retries':              2,
+                'cooldown_minutes':     5,
+                'quota_reserve':        10,
+                'connect_timeout':      10.0,
+                'read_timeout':         30.0
+            },
+            'shared': {
+                'mode':             '',
+                'dir':              '/var/cache/spaceoddity',
+                'keep':             7,
+                'serve_host':       '',
+                'serve_port':       8080
+            },
             'files': {
-                'old_filepath':     '',
-                'filepath':         ''
+                'filepath':         '',
+                'wallpaper':        ''
+            },
+            'run': {
+                'variant':          '',
+                'bytes':            0,
+                'bytes_saved':      0,
+                'pending':          0,
+                'no_image':         ''
+            },
+            'metrics': {
+                'textfile_dir':     '',
+                'history_runs':     500
+            },
+            'log': {
+                'level':            'info',
+                'format':           'text',
+                'rotate':           'size',
+                'max_megabytes':    1,
+                'backups':          14,
+                'echo':             1
             }
         }
 
+        # the config store (user settings and run state in separate files)
+        self.conf_store = ConfStore(self.conf_path, self.state_path,
+                                    self.conf_dict_def,
+                                    ['apod', 'files', 'run'])
+
         # user config dict (set to defaults before trying to load file)
-        self.conf_dict = self.conf_dict_def.copy()
+        self.conf_dict = self.conf_store.data
+
+        # the scheduler, image store, backend and metrics (created when
+        # first needed)
+        self.scheduler = None
+        self.store = None
+        self.backend = None
+        self.metrics = None
+        self.gate = None
+        self.shared_cache = None
+
+        # the search index of every apod we have seen (created when first
+        # needed), and whether this run has anything new for it
+        self.index = None
+        self.index_dirty = False
+
+        # set when a run is only retrying a failed image (not asking the api)
+        self.retry_only = False
+
+        # in progressive mode, the full-size image to get after the small one
+        # is set, and its download (running in the background)
+        self.upgrade_url = ''
+        self.upgrade = None
+
+        # what is on the screen when a run starts, and the screen sizes (read
+        # while the apod downloads)
+        self.shown_path = ''
+        self.screen_sizes = None
+
+        # only one run at a time, and each run has a time budget (set when it
+        # starts)
+        self.run_lock = RunLock(os.path.join(self.conf_dir,
+                                             f'{self.prog_name}.lock'))
+        self.deadline = None
+
+        # our part in the shared cache for this run ('fetch', 'use' or ''),
+        # and whether (and to where) the fetch command is filling it
+        self.shared_mode = ''
+        self.fetcher = False
+        self.fetch_dir = ''
 
         # create config folder if it does not exist
         try:
@@ -124,20 +284,22 @@ class Main:
             print(f'could not create conf dir: {error}')
 
             # this is a fatal error
-            self.__exit()
-
-        # remove old log file
-        # NB: don't log anything here, just print (no logger yet)
-        if os.path.exists(log_path):
-            try:
-                os.remove(log_path)
-            except Exception as error:
-                print(f'could not remove old log file: {error}')
-
-        # set up logging
-        logging.basicConfig(filename=log_path, level=logging.DEBUG,
-                            format='%(asctime)s [%(levelname)-5s] %(message)s',
-                            datefmt='%Y-%m-%d %I:%M:%S %p')
+            exit()
+
+        # set up logging (with the defaults until the conf file is loaded)
+        # NB: the log is no longer removed at startup, it rotates instead
+        self.logger = logging.getLogger(self.prog_name)
+        self.log_pipe = LogPipe(log_path)
+        self.run_id = ''
+        self.__configure_log()
+
+        # the http client shared by every network stage, and the http cache
+        # for the apod json (created when first needed)
+        # NB: the client lives as long as we do, so the daemon and backfill
+        # reuse its connections, tls sessions and dns lookups
+        self.http_client = None
+        self.cache_path = cache_path
+        self.http_cache = None
 
     # --------------------------------------------------------------------------
     # Run the script
@@ -145,50 +307,340 @@ class Main:
     def run(self):
 
         """
-            Description
+            Run the script once
+
+            This is what cron calls. It loads the config, does one pass of
+            the pipeline, and returns.
+        """
+
+        # init the config dict from user settings
+        # NB: even if another run has the lock, so the daemon (which calls
+        # this once and then run_steps) never runs on, or saves, defaults
+        # (the config is only ever replaced whole, so this is safe to read)
+        self.__load_conf()
+
+        # only one run at a time (cron may start us while a slow run is
+        # still going)
+        if not self.__lock_run():
+            return
+        try:
+
+            # clean up any images left over from before the store
+            self.__collect_garbage()
+
+            # call each step in the process
+            self.run_steps()
+
+        finally:
+            self.run_lock.release()
+
+    # --------------------------------------------------------------------------
+    # Run one pass of the pipeline
+    # --------------------------------------------------------------------------
+    def run_steps(self):
+
+        """
+            Run one pass of the pipeline
+
+            This runs the download -> set -> cleanup steps using the config
+            already in memory, so the daemon can call it over and over
+            without reloading anything.
+        """
+
+        # only one run at a time (the daemon may wake while a cron run is
+        # still going)
+        if not self.__lock_run():
+            return
+        try:
+            self.__run_pass()
+        finally:
+            self.run_lock.release()
+
+    # --------------------------------------------------------------------------
+    # Fill the image store with every image in a date range
+    # --------------------------------------------------------------------------
+    def backfill(self, start_date, end_date, concurrency=0, keep=False):
+
+        """
+            Fill the image store with every image in a date range
 
             Paramaters:
-                dict_defs [dict]: desc
+                start_date [str]: the first date (YYYY-MM-DD)
+                end_date [str]: the last date (YYYY-MM-DD)
+                concurrency [int]: the most downloads in flight, or 0 to use
+                    the config value
+                keep [bool]: True to keep the images for good (the store
+                    limits never evict them)
+
+            Without keep, a range that won't fit in the store limits is
+            refused, since the next normal run would evict most of it.
+        """
 
-            Returns:
-                dict_res [dict]: desc
+        # log start (with a new id, to find this run's lines later)
+        self.run_id = self.log_pipe.new_run()
+        self.__logi('=======================================================')
+        self.__logi('start backfill: %s to %s', start_date, end_date)
+
+        # init the config dict from user settings
+        self.__load_conf()
+
+        # get the backfill settings
+        back_dict = self.conf_dict['backfill']
+        if not concurrency:
+            concurrency = back_dict['concurrency']
+
+        # the next normal run evicts anything over the store limits, so
+        # don't download what it would throw away
+        store = self.__get_store()
+        if not keep and not self.__check_backfill_fits(store, start_date,
+                                                       end_date):
+            self.__logi('exit backfill')
+            self.__logi('-------------------------------------------------'
+                        '------')
+            return
+
+        # fetch the range (keeping runs out of the store until we're done)
+        from backfill import Backfill
+        if not self.__lock_run():
+            return
+        try:
+            backfill = Backfill(store, self.__get_apod_url(),
+                                self.__get_http_client(),
+                                concurrency=concurrency,
+                                per_host=back_dict['per_host'],
+                                host_delay=back_dict['host_delay'],
+                                log=self.__logd,
+                                index=self.__get_index(),
+                                keep=keep)
+            counts = backfill.run(start_date, end_date)
+
+            # log success
+            self.__logi('backfill done: %s', counts)
+
+        except Exception as error:
+
+            # log error
+            self.__loge('could not backfill: %s', error)
+
+        finally:
+            self.run_lock.release()
+
+        # log that we are finished with backfill
+        self.__logi('exit backfill')
+        self.__logi('-------------------------------------------------------')
+
+    # --------------------------------------------------------------------------
+    # Fill the shared cache for the other users on this machine
+    # --------------------------------------------------------------------------
+    def fetch(self, shared_dir=''):
+
+        """
+            Fill the shared cache for the other users on this machine
+
+            Paramaters:
+                shared_dir [str]: the shared folder, or '' to use the config
+                    value
+
+            This is what the system job calls. It downloads like a normal
+            run (with its own config, http cache and image store), but
+            doesn't set a wallpaper, and publishes the result to the shared
+            folder.
+        """
+
+        # run as the fetcher
+        self.fetcher = True
+        self.fetch_dir = shared_dir
+        self.run()
+
+    # --------------------------------------------------------------------------
+    # Serve the shared cache to the other machines on the lan
+    # --------------------------------------------------------------------------
+    def serve(self, shared_dir='', host=None, port=None):
 
-            Raises:
-                Exception(str) if
         """
+            Serve the shared cache to the other machines on the lan
 
-        # print version number to terminal
-        self.__print_version()
+            Paramaters:
+                shared_dir [str]: the shared folder, or '' to use the config
+                    value
+                host [str]: the address to listen on, or None to use the
+                    config value
+                port [int]: the port to listen on, or None to use the config
+                    value
+
+            This blocks until SIGTERM or Ctrl-C. The fetch command keeps the
+            folder up to date, and other machines point their mirror_url at
+            us.
+        """
 
-        # log start
+        # log start (with a new id, to find this run's lines later)
+        self.run_id = self.log_pipe.new_run()
         self.__logi('=======================================================')
-        self.__logi('start main script')
 
         # init the config dict from user settings
         self.__load_conf()
 
-        # check to see if we are enabled
-        general_dict = self.conf_dict['general']
-        if general_dict['enabled']:
+        # get the serve settings
+        shared_dict = self.conf_dict['shared']
+        if host is None:
+            host = shared_dict['serve_host']
+        if port is None:
+            port = shared_dict['serve_port']
+        self.__logi('start serve: %s on %s:%d',
+                    shared_dir or shared_dict['dir'], host or '*', port)
+
+        # serve until stopped
+        from mirror import MirrorServer
+        self.fetch_dir = shared_dir
+        server = MirrorServer(self.__get_shared_cache(), host, port,
+                              log=self.__loge)
+        try:
+            server.run()
+        except OSError as error:
+            self.__loge('could not serve: %s', error)
 
-            # call each step in the process
-            self.download_apod_dict()
-            self.download_image()
-            self.set_image()
-            self.delete_old_image()
+        # log exit
+        self.__logi('exit serve: %s', server.stats)
+        self.__logi('-------------------------------------------------------')
 
-        else:
+    # --------------------------------------------------------------------------
+    # Search the apods we have seen
+    # --------------------------------------------------------------------------
+    def search(self, text='', year='', start_date='', end_date='',
+               media_type='', limit=50):
+
+        """
+            Search the apods we have seen
+
+            Paramaters:
+                text [str]: words that must all be in the title or
+                    explanation, or '' for any
+                year [str]: the year (YYYY), or '' for any (overrides the
+                    dates)
+                start_date [str]: the first date (YYYY-MM-DD), or '' for any
+                end_date [str]: the last date (YYYY-MM-DD), or '' for any
+                media_type [str]: 'image' or 'video', or '' for any
+                limit [int]: the most results (0 for no limit)
+
+            Returns:
+                [list]: a dict for each apod found, newest first (see
+                ApodIndex.search)
+
+            This only reads the index (which every run and backfill add to),
+            so it needs no network and no lock.
+        """
+
+        # a year is a range of dates
+        if year:
+            start_date = f'{year}-01-01'
+            end_date = f'{year}-12-31'
+
+        # search the index
+        try:
+            return self.__get_index().search(text, start_date, end_date,
+                                             media_type, limit)
+        except Exception as error:
+            self.__loge('could not search: %s', error)
+            return []
+
+    # --------------------------------------------------------------------------
+    # Reload the config file
+    # --------------------------------------------------------------------------
+    def reload(self):
+
+        """
+            Reload the config file
+
+            The daemon calls this on SIGHUP.
+        """
+
+        # log reload
+        self.__logi('reload conf file')
+
+        # reload the config and drop any state built from it
+        self.__load_conf()
+        self.scheduler = None
+        self.store = None
+        self.backend = None
+        self.metrics = None
+        self.gate = None
+        self.shared_cache = None
+
+        # the timeouts may have changed
+        if self.http_client is not None:
+            self.http_client.close()
+        self.http_client = None
+        self.http_cache = None
+
+    # --------------------------------------------------------------------------
+    # Get the number of seconds until the next check is due
+    # --------------------------------------------------------------------------
+    def get_wait(self):
+
+        """
+            Get the number of seconds until the next check is due
+
+            Returns:
+                [float]: the number of seconds the daemon can sleep
+        """
 
-            # log the enabled state
-            self.__logi('main script disabled')
+        # ask the scheduler
+        last_date = self.conf_dict['apod'].get('date', '')
+        wait = self.__get_scheduler().get_wait(last_date)
 
-        # exit gracefully
-        self.__exit()
+        # a failed image is retried when its cool-down is over
+        if self.conf_dict['run']['pending']:
+            wait = min(wait, self.__get_gate().wait('image'))
+
+        # return the result
+        return wait
 
     # --------------------------------------------------------------------------
     # Steps
     # --------------------------------------------------------------------------
 
+    # --------------------------------------------------------------------------
+    # Get ready for the later steps while the network is busy
+    # --------------------------------------------------------------------------
+    def prepare_run(self):
+
+        """
+            Get ready for the later steps while the network is busy
+
+            This needs nothing from the apod, so it runs at the same time as
+            the apod step. It loads the image store, makes the backend and
+            reads the current wallpaper (so cleanup never removes it), and
+            gets the screen sizes. A failure here is only logged, the step
+            that needs the thing will report it.
+        """
+
+        # load the store
+        try:
+            self.__get_store()
+        except Exception as error:
+            self.__logd('could not load store: %s', error)
+
+        # the fetcher doesn't set a wallpaper
+        if self.shared_mode == 'fetch':
+            return
+
+        # make the backend and see what's on the screen now
+        try:
+            self.shown_path = self.__get_backend().get()
+            self.__logd('current wallpaper: %s', self.shown_path)
+        except Exception as error:
+            self.__logd('could not read current wallpaper: %s', error)
+
+        # get the screen sizes (if a later step will want them)
+        # NB: here, so GDK is only used from this thread
+        general_dict = self.conf_dict['general']
+        if general_dict['scale_to_screen'] or \
+                self.conf_dict['network']['probe_variants']:
+            try:
+                self.__logd('screen sizes: %s', self.__get_screen_sizes())
+            except Exception as error:
+                self.__logd('could not get screen sizes: %s', error)
+
     # --------------------------------------------------------------------------
     # Get json from api.nasa.gov
     # --------------------------------------------------------------------------
@@ -207,38 +659,82 @@ class Main:
                 Exception(str) if
         """
 
-        # the url to load json from
-        apod_url = 'https://api.nasa.gov/planetary/apod?api_key='\
-            '2h4peiV1XvWqA0bHBxVK21D3QmyBgHtwIyRxo8dm'
+        # we already have the apod, only its image needs another try
+        if self.retry_only:
+            self.__logi('retry the image, not asking the api')
+            self.__note('unchanged')
+            return
+
+        # the gate key of whoever answers (the mirror, or the api)
+        gate = self.__get_gate()
+        source = 'api'
 
         # get the json and format it
         try:
 
             # get the current apod dict
             old_apod_dict = self.conf_dict['apod'].copy()
+            pending = self.conf_dict['run']['pending']
+
+            # NB: if we have no apod data (new or reset cfg), the cache can't
+            # tell us anything useful, so do a full get
+            force = not self.__get_pic_url()
+
+            # get json from the mirror or the api (or from the cache)
+            response_text, changed, source, apod_url = \
+                self.__fetch_apod_json(force)
+            self.__note(status=self.http_cache.last_status,
+                        nbytes=len(response_text) if changed else 0)
+
+            # log the cache counters
+            stats = self.http_cache.get_stats()
+            self.__logi('http cache: %s', stats)
+
+            # 304 or still fresh, so don't parse json or save the config
+            # (unless the image failed last time)
+            if not changed and not pending:
+                self.__logi('the apod data has not changed')
+                gate.succeeded(source)
+                self.__note('unchanged')
+                self.__exit(save=False)
+
+            # parse the new json
+            # NB: the cache has the body now, so if it's bad, forget it or
+            # every later run would get a 304 for it
+            try:
+                apod_dict = json.loads(response_text)
+            except ValueError:
+                self.http_cache.forget(apod_url)
+                raise
+            gate.succeeded(source)
 
-            # get json from url
-            response = request.urlopen(apod_url)
-            response_text = response.read()
-            apod_dict = json.loads(response_text)
-
-            # apply new dict to config
+            # apply new dict to config (and remember it)
             self.conf_dict['apod'] = apod_dict
+            self.index_dirty = True
 
             # log success
-            self.__logd(f'get data from server: {apod_dict}')
+            self.__logd('get data from server: %s', apod_dict)
 
             # check if url is the same
-            if self.__check_same_url(old_apod_dict):
+            if not pending and self.__check_same_url(old_apod_dict):
 
                 # same url, do nothing
                 self.__logi('the apod picture has not changed')
+                self.__note('unchanged')
                 self.__exit()
 
         except Exception as error:
 
             # log error
-            self.__loge(f'could not get data from server: {error}')
+            self.__loge('could not get data from server: %s', error)
+            if self.http_cache is not None:
+                self.__note(status=self.http_cache.last_status)
+            self.__note('error')
+
+            # don't ask again for a while
+            from resilience import get_retry_after
+            cooldown = gate.failed(source, get_retry_after(error))
+            self.__logi('%s cooling down for %ds', source, cooldown)
 
             # this is a fatal error
             self.__exit()
@@ -270,330 +766,1789 @@ class Main:
 
             # do the image stuff
             self.__apod_is_image()
+
+        elif self.conf_dict['general']['video_thumbnails'] and \
+                apod_dict.get('thumbnail_url'):
+
+            # NB: the thumbnail is small, but better than nothing all day
+            self.__logi('apod is a %s, use its thumbnail', media_type)
+            self.__apod_is_image()
+
         else:
 
             # do the not image stuff
             self.__apod_is_not_image()
 
     # --------------------------------------------------------------------------
-    # Set the wallpaper
+    # Make screen-sized copies of the image
     # --------------------------------------------------------------------------
-    def set_image(self):
+    def make_derivative(self):
 
         """
-            Description
-
-            Paramaters:
-                dict_defs [dict]: desc
+            Make screen-sized copies of the image
 
-            Returns:
-                dict_res [dict]: desc
-
-            Raises:
-                Exception(str) if
+            Makes a pre-scaled, pre-cropped copy of the downloaded image for
+            each monitor, so the compositor never has to decode and scale the
+            full-size image. GNOME uses one picture for all monitors, so the
+            copy for the biggest monitor becomes the wallpaper. Any failure
+            here just means we use the full-size image.
         """
 
-        # get path to downloaded image
+        # default to the full-size image
         files_dict = self.conf_dict['files']
+        files_dict['wallpaper'] = ''
+
+        # check to see if we are enabled
+        if not self.conf_dict['general']['scale_to_screen']:
+            self.__note('unchanged')
+            return
+
+        # get the source image and its hash (which is its name in the store)
         pic_path = files_dict['filepath']
+        sha = os.path.splitext(os.path.basename(pic_path))[0]
 
-        # get system settings
-        settings = gsettings.new('org.gnome.desktop.background')
+        try:
 
-        # set variant for both light and dark themes
-        settings.set_string('picture-uri', pic_path)
-        settings.set_string('picture-uri-dark', pic_path)
+            # get the screen sizes, biggest first
+            sizes = self.__get_screen_sizes()
+            if not sizes:
+                self.__logd('no monitors found, using full-size image')
+                self.__note('unchanged')
+                return
 
-        # save settings
-        settings.apply()
-        settings.sync()
+            # make a derivative for each screen size
+            from derivatives import Derivatives
+            derivs = Derivatives(self.derived_dir)
+            paths = [derivs.get(pic_path, sha, w, h) for w, h in sizes]
 
-        # log success
-        self.__logi('set image')
+            # use the one for the biggest screen
+            files_dict['wallpaper'] = paths[0]
 
-    # --------------------------------------------------------------------------
-    # Delete old image
-    # --------------------------------------------------------------------------
-    def delete_old_image(self):
+            # log success
+            self.__logd('make derivatives: %s', paths)
 
-        """
-            Description
+        except Exception as error:
 
-            Paramaters:
-                dict_defs [dict]: desc
+            # log error
+            self.__loge('could not make derivatives: %s', error)
+            self.__note('error')
 
-            Returns:
-                dict_res [dict]: desc
+    # --------------------------------------------------------------------------
+    # Draw the caption on the wallpaper
+    # --------------------------------------------------------------------------
+    def make_caption(self):
 
-            Raises:
-                Exception(str) if
+        """
+            Draw the caption on the wallpaper
+
+            Makes a copy of the screen-sized image with the title, date and
+            copyright along the bottom, which becomes the wallpaper. The text
+            layer and the captioned copy are both cached, so only the first
+            run for a day (and screen size) draws anything. Any failure here
+            (including going over the caption's time or memory budget) just
+            means we use the image without a caption.
         """
 
-        # get previous path name
+        # check to see if we are enabled
+        if not self.conf_dict['general']['caption']:
+            self.__note('unchanged')
+            return
+
+        # get the image to caption (the derivative, or the original if it
+        # is no bigger than the screen)
+        # NB: an original bigger than the screen would have to be decoded
+        # whole, which is over any sane budget, so it is left alone
         files_dict = self.conf_dict['files']
-        old_filepath = files_dict['old_filepath']
+        pic_path = files_dict['wallpaper']
+        if not pic_path:
+            self.__logd('no screen-sized image, skipping caption')
+            self.__note('unchanged')
+            return
+        sha = os.path.splitext(os.path.basename(pic_path))[0].split('_')[0]
 
-        # if it exists, delete it
-        if os.path.exists(old_filepath):
-            try:
-                os.remove(old_filepath)
+        try:
 
-                # log success
-                self.__logd(f'delete old image: {old_filepath}')
+            # get the text
+            from captions import Captions, get_caption_text
+            text = get_caption_text(self.conf_dict['apod'])
+            if not text:
+                self.__logd('no title, skipping caption')
+                self.__note('unchanged')
+                return
+
+            # draw it (or reuse it)
+            cap_dict = self.conf_dict['caption']
+            captions = Captions(self.derived_dir, self.caption_dir,
+                                cap_dict['font'], cap_dict['max_seconds'],
+                                int(cap_dict['max_megabytes'] * 1024 * 1024))
+            files_dict['wallpaper'] = captions.get(pic_path, sha, text)
 
-            except Exception as error:
+            # log success
+            if captions.last_cached:
+                self.__note('unchanged')
+            self.__logd('make caption: %s', files_dict['wallpaper'])
 
-                # log error
-                self.__loge(f'could not delete old image: {error}')
+        except Exception as error:
 
-    # --------------------------------------------------------------------------
-    # Helpers
-    # --------------------------------------------------------------------------
+            # log error
+            self.__loge('could not make caption: %s', error)
+            self.__note('error')
 
     # --------------------------------------------------------------------------
-    # Load dictionary data from a file
+    # Set the wallpaper
     # --------------------------------------------------------------------------
-    def __load_conf(self):
+    def set_image(self):
 
         """
-            Description
-
-            Paramaters:
-                dict_defs [dict]: desc
-
-            Returns:
-                dict_res [dict]: desc
+            Set the wallpaper
 
-            Raises:
-                Exception(str) if
+            The backend only writes if the wallpaper is actually different,
+            so an unchanged run doesn't wake up dconf or the compositor.
         """
 
-        # create default dict if file does not exist
-        if not os.path.exists(self.conf_path):
-            self.conf_dict = self.conf_dict_def.copy()
-            self.__save_conf()
+        # get path to the screen-sized image (or the downloaded one)
+        files_dict = self.conf_dict['files']
+        pic_path = files_dict['wallpaper'] or files_dict['filepath']
 
-        # read config file
-        with open(self.conf_path, 'r') as file:
-            try:
-                self.conf_dict = json.load(file)
+        try:
 
-                # NB: there is probably a better way to do this
-                # this is mainly to make sure no one futzed with the config
-                # file manually and deleted or mistyped a key
-                # also note we don't do any value type checking (i.e. string or
-                # int) and no value clamping/validation
-                # basically, DON'T EDIT THE FILE BY HAND!!!
+            # set the wallpaper (if it changed)
+            backend = self.__get_backend()
+            changed = backend.set(pic_path)
 
-                # set defaults for any missing sections
+            # log success (and how long the user waited for it)
+            if changed:
+                self.__get_metrics().mark_paint()
+                self.__logi('set image (%s)', backend.name)
+            else:
+                self.__logi('image already set (%s)', backend.name)
+                self.__note('unchanged')
+
+        except Exception as error:
 
-                # get two dicts (src and dst)
-                dict_def = self.conf_dict_def
-                dict_user = self.conf_dict
+            # log error
+            self.__loge('could not set image: %s', error)
+            self.__note('error')
 
-                # iterate over src, adding any missing keys to dst
-                for key in dict_def.keys():
-                    if key not in dict_user.keys():
-                        dict_user[key] = dict_def[key]
+            # this is a fatal error
+            self.__exit()
 
-                # do second-level kv defaults
-                for key in dict_def.keys():
+    # --------------------------------------------------------------------------
+    # Swap in the full-size image once it has downloaded
+    # --------------------------------------------------------------------------
+    def upgrade_image(self):
 
-                    # get two dicts (src and dst)
-                    dict_def_2 = dict_def[key]
-                    dict_user_2 = dict_user[key]
+        """
+            Swap in the full-size image once it has downloaded
 
-                    # iterate over src, adding any missing keys to dst
-                    for key in dict_def_2.keys():
-                        if key not in dict_user_2.keys():
-                            dict_user_2[key] = dict_def_2[key]
+            In progressive mode, the image step gets the small variant (which
+            is set right away) and starts the full-size one downloading in
+            the background. This waits for that download, then makes its
+            derivative and sets it. If it fails, the small one stays up, and
+            the next run tries again (resuming what we got).
+        """
 
-                # log success
-                self.__logd(f'load conf file: {self.conf_dict}')
+        # nothing to swap in
+        upgrade = self.upgrade
+        if upgrade is None:
+            self.__note('unchanged')
+            return
+        self.upgrade = None
+
+        # wait for it
+        # NB: it can't outlast the run, the deadline cuts its timeouts
+        downloader = upgrade['downloader']
+        run_dict = self.conf_dict['run']
+        gate = self.__get_gate()
+        try:
+            try:
+                pic_hash = upgrade['future'].result()
+            finally:
+                self.__note(status=downloader.last_status,
+                            nbytes=downloader.last_bytes)
 
-            except Exception as error:
+            # move it into the store
+            pic_path = self.__get_store().add(upgrade['path'], pic_hash,
+                                              upgrade['ext'], upgrade['url'])
 
-                # if config file error, set defaults and save to file
-                self.conf_dict = self.conf_dict_def.copy()
-                self.__save_conf()
+        except Exception as error:
 
-                # log error
-                self.__loge(f'could not load conf file: {error}')
+            # log error
+            self.__loge('could not download full-size image: %s', error)
+            self.__note('error')
+
+            # keep the small one, and try again later
+            run_dict['pending'] = 1
+            cooldown = gate.failed('image', getattr(error, 'retry_after', 0))
+            self.__logi('image cooling down for %ds', cooldown)
+            return
+
+        # swap it in
+        self.conf_dict['files']['filepath'] = pic_path
+        run_dict['variant'] = upgrade['name']
+        run_dict['pending'] = 0
+        gate.succeeded('image')
+        self.index_dirty = True
+        self.__logi('swap in full-size image: %s', pic_path)
+        self.make_derivative()
+        self.make_caption()
+        self.set_image()
+
+        # NB: the steps above note their own outcomes, but this stage
+        # changed the wallpaper
+        self.__note('changed')
 
     # --------------------------------------------------------------------------
-    # Save dictionary data to a file
+    # Show every image in the store as a slideshow
     # --------------------------------------------------------------------------
-    def __save_conf(self):
+    def make_slideshow(self):
 
         """
-            Description
-
-            Paramaters:
-                dict_defs [dict]: desc
+            Show every image in the store as a slideshow
 
-            Returns:
-                dict_res [dict]: desc
+            In slideshow mode, this replaces the derivative step. It builds a
+            GNOME slideshow file of the whole store, which becomes the
+            wallpaper, so GNOME rotates through the archive by itself, even
+            with no network. The file is only written when the images in the
+            store change.
 
-            Raises:
-                Exception(str) if
+            With scale_to_screen on, the file lists a screen-sized copy of
+            each image (made once, like the derivative step's), so GNOME
+            doesn't decode and scale a full-size image at every transition.
         """
 
-        # open the file and write json
-        with open(self.conf_path, 'w') as file:
-            try:
-                json.dump(self.conf_dict, file, indent=4)
+        # get the settings
+        files_dict = self.conf_dict['files']
+        show_dict = self.conf_dict['slideshow']
 
-                # log success
-                self.__logd(f'save conf file: {self.conf_dict}')
+        try:
 
-            except Exception as error:
+            # get every image we have
+            # NB: in hash order, so showing (or adding) one doesn't shuffle
+            # the rest
+            store = self.__get_store()
+            with store.lock:
+                names = [entry['name'] for _sha, entry in
+                         sorted(store.index_dict.items())]
+            paths = [os.path.join(store.store_dir, name) for name in names]
+            paths = [path for path in paths if os.path.exists(path)]
+
+            # nothing to show yet
+            if not paths:
+                self.__logi('no images for slideshow yet')
+                self.__note('unchanged')
+                return
+
+            # show screen-sized copies
+            if self.conf_dict['general']['scale_to_screen']:
+                paths = self.__get_slideshow_copies(paths)
+
+            # build it (if the images changed)
+            from slideshow import Slideshow
+            show = Slideshow(self.slideshow_path, show_dict['seconds'],
+                             show_dict['transition'])
+            changed = show.build(paths)
+
+            # it is the wallpaper
+            files_dict['wallpaper'] = self.slideshow_path
+
+            # log success
+            if changed:
+                self.__logi('make slideshow of %d images', len(paths))
+            else:
+                self.__logd('slideshow is up to date')
+                self.__note('unchanged')
 
-                # log error
-                self.__loge(f'could not save conf file: {error}')
+        except Exception as error:
+
+            # log error
+            self.__loge('could not make slideshow: %s', error)
+            self.__note('error')
 
     # --------------------------------------------------------------------------
-    # Get the image when it is an actual image
+    # Delete old images
     # --------------------------------------------------------------------------
-    def __apod_is_image(self):
+    def delete_old_image(self):
 
         """
-            Description
+            Delete old images
 
-            Paramaters:
+            Evicts the least recently used images from the store until it is
+            under its size and count limits, never touching the current
+            wallpaper.
+        """
+
+        # get the current wallpaper, which we must not delete
+        files_dict = self.conf_dict['files']
+        pic_path = files_dict['filepath']
+        keep_shas = {os.path.splitext(os.path.basename(pic_path))[0]}
+
+        # and the one on the screen when the run started, in case the new
+        # one isn't set (this can run at the same time as the set step)
+        # NB: it may be a screen-sized copy, named for its source's hash
+        if self.shown_path:
+            name = os.path.basename(self.shown_path)
+            keep_shas.add(os.path.splitext(name)[0].split('_')[0])
+
+        # trim the store to its limits and remove any strays
+        try:
+            store = self.__get_store()
+            pinned = [pic_path] + [store.index_dict[sha]['name']
+                                   for sha in keep_shas
+                                   if sha in store.index_dict]
+            removed = store.evict(pinned=pinned)
+            removed += store.collect_garbage()
+
+            # the index must not point at what we removed
+            # NB: only open the database if there is something to forget
+            if removed:
+                self.__get_index().forget(
+                    {os.path.splitext(os.path.basename(path))[0]
+                     for path in removed})
+
+            # remove screen-sized copies of anything we removed
+            # NB: no folder means we never made any (and GObject isn't needed)
+            # NB: the wallpaper may not be in the store (i.e. it's in the
+            # shared cache), but its copies are still in use
+            if os.path.isdir(self.derived_dir):
+                from derivatives import Derivatives
+                derivs = Derivatives(self.derived_dir)
+                keep_shas.update(store.index_dict.keys())
+                removed += derivs.collect_garbage(keep_shas)
+
+            # log success
+            for path in removed:
+                self.__logd('delete old image: %s', path)
+            if not removed:
+                self.__note('unchanged')
+
+        except Exception as error:
+
+            # log error
+            self.__loge('could not delete old image: %s', error)
+            self.__note('error')
+
+    # --------------------------------------------------------------------------
+    # Add the apod to the search index
+    # --------------------------------------------------------------------------
+    def index_apod(self):
+
+        """
+            Add the apod to the search index
+
+            The config only holds the latest apod, so each new one (and our
+            copy of its image) is added to the index, to search later. This
+            runs even if the image failed, and does nothing (not even open
+            the database) if the run didn't get anything new.
+        """
+
+        # nothing new
+        apod_dict = self.conf_dict['apod']
+        if not self.index_dirty or not apod_dict.get('date'):
+            self.__note('unchanged')
+            return
+        self.index_dirty = False
+
+        try:
+
+            # add our copy (the biggest one we have)
+            record = dict(apod_dict)
+            store = self.__get_store()
+            for name in ('hdurl', 'url', 'thumbnail_url'):
+                pic_dict = store.lookup(apod_dict.get(name, ''))
+                if pic_dict:
+                    record.update(pic_dict)
+                    break
+
+            # add it
+            self.__get_index().add([record])
+
+            # log success
+            self.__logd('index apod: %s (%s)', apod_dict['date'],
+                        record.get('path'))
+
+        except Exception as error:
+
+            # log error
+            self.__loge('could not index apod: %s', error)
+            self.__note('error')
+
+    # --------------------------------------------------------------------------
+    # Get the apod and image from the shared cache
+    # --------------------------------------------------------------------------
+    def read_shared(self):
+
+        """
+            Get the apod and image from the shared cache
+
+            This replaces the apod and image steps for a user of the shared
+            cache. Nothing goes to the network: the fetcher has already
+            downloaded everything, so this only checks the image and points
+            the wallpaper at it.
+        """
+
+        # read what the fetcher published
+        cache = self.__get_shared_cache()
+        try:
+            entry = cache.read()
+        except (OSError, ValueError) as error:
+            self.__loge('could not read shared cache: %s', error)
+            self.__note('error')
+            self.__exit(save=False)
+
+        # nothing there yet
+        if entry is None:
+            self.__logi('shared cache is empty: %s', cache.cache_dir)
+            self.__note('unchanged')
+            self.__exit(save=False)
+
+        # the same apod and image as last time (which we already checked)
+        apod_dict = entry['apod']
+        image = entry.get('image')
+        if apod_dict.get('media_type') != 'image' and \
+                not self.conf_dict['general']['video_thumbnails']:
+            image = None
+        files_dict = self.conf_dict['files']
+        shared_path = os.path.join(cache.images_dir, image['name']) \
+            if image else ''
+        if apod_dict.get('date') == self.conf_dict['apod'].get('date') and \
+                (not image or files_dict['filepath'] == shared_path):
+            self.__logi('the shared apod has not changed')
+            self.__note('unchanged')
+            self.__exit(save=False)
+
+        # check the image before we take anything
+        # NB: a bad image keeps the old apod, so the scheduler keeps looking
+        if image:
+            try:
+                files_dict['filepath'] = cache.verify(entry)
+            except (OSError, ValueError) as error:
+                self.__loge('could not use shared image: %s', error)
+                self.__note('error')
+                self.__exit(save=False)
+
+        # take the new apod
+        self.conf_dict['apod'] = apod_dict
+        self.conf_dict['run']['pending'] = 0
+        self.__logd('get data from shared cache: %s', apod_dict)
+
+        # no image today
+        if not image:
+            self.__apod_is_not_image()
+            return
+
+        # log success
+        self.__logi('use shared image: %s', files_dict['filepath'])
+
+    # --------------------------------------------------------------------------
+    # Publish the apod and image to the shared cache
+    # --------------------------------------------------------------------------
+    def publish_shared(self):
+
+        """
+            Publish the apod and image to the shared cache
+
+            This runs after the other steps when we are the fetcher. An
+            image that failed (and will be retried) is not published, so the
+            users keep the last good one until it comes in.
+        """
+
+        # nothing good to publish
+        apod_dict = self.conf_dict['apod']
+        if self.conf_dict['run']['pending'] or not apod_dict.get('date'):
+            self.__logi('nothing new to publish')
+            self.__note('unchanged')
+            return
+
+        # the image and where it came from (on a video day, the thumbnail if
+        # we got one)
+        pic_path = ''
+        pic_url = ''
+        if apod_dict.get('media_type') == 'image' or \
+                self.conf_dict['run']['variant'] == 'thumbnail_url':
+            pic_path = self.conf_dict['files']['filepath']
+            sha = os.path.splitext(os.path.basename(pic_path))[0]
+            pic_url = self.__get_store().index_dict.get(sha, {}).get('url', '')
+
+        # publish it
+        cache = self.__get_shared_cache()
+        try:
+            changed = cache.publish(apod_dict, pic_path, pic_url)
+        except OSError as error:
+            self.__loge('could not publish to shared cache: %s', error)
+            self.__note('error')
+            return
+
+        # log success
+        if changed:
+            self.__logi('publish to shared cache: %s', cache.cache_dir)
+        else:
+            self.__logd('shared cache is up to date')
+            self.__note('unchanged')
+
+    # --------------------------------------------------------------------------
+    # Helpers
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Run one pass of the pipeline, holding the run lock
+    # --------------------------------------------------------------------------
+    def __run_pass(self):
+
+        """
+            Run one pass of the pipeline, holding the run lock
+        """
+
+        # log start (with a new id, to find this run's lines later)
+        self.run_id = self.log_pipe.new_run()
+        self.__logi('=======================================================')
+        self.__logi('start main script')
+
+        # start timing, and the clock on the run's budget
+        metrics = self.__get_metrics()
+        metrics.start_run()
+        self.deadline = Deadline(self.conf_dict['general']['run_timeout'])
+
+        # look at the screen again (it may have changed since the last pass)
+        self.shown_path = ''
+        self.screen_sizes = None
+
+        # assume we need to save the config
+        save = True
+
+        try:
+
+            # check to see if we are enabled
+            general_dict = self.conf_dict['general']
+            if general_dict['enabled']:
+
+                # see if a new apod could exist yet (no network)
+                # NB: in slideshow mode, the archive may still need showing
+                network = self.__check_schedule()
+                if not network and not self.__check_slideshow():
+                    self.__exit(save=False)
+
+                # we have real work to do, so log the version
+                self.__print_version()
+
+                # call each step in the process, as soon as the steps it
+                # needs are done, timing each one
+                # NB: a step that runs out of time fails like any other (and
+                # an image is resumed next run), but no step starts late
+                from pipeline import Pipeline
+                pipeline = Pipeline(metrics, self.__check_time)
+                for name, step, after, options in self.__get_steps(network):
+                    pipeline.add(name, step, after, **options)
+                pipeline.run()
+
+            else:
+
+                # log the enabled state
+                self.__logi('main script disabled')
+
+        except RunFinished as finished:
+
+            # a step ended the run early
+            save = finished.save
+
+        # share what we have with the other users
+        # NB: even if nothing changed, so a new (or wiped) cache folder is
+        # filled on the next run
+        if self.shared_mode == 'fetch' and metrics.stages:
+            with metrics.stage('publish'):
+                self.publish_shared()
+
+        # finish gracefully
+        self.__finish(save)
+
+    # --------------------------------------------------------------------------
+    # Take the run lock, or log who has it
+    # --------------------------------------------------------------------------
+    def __lock_run(self):
+
+        """
+            Take the run lock, or log who has it
+
+            Returns:
+                [bool]: True if we have the lock, False if another run does
+        """
+
+        # try to take it
+        try:
+            if self.run_lock.acquire():
+                return True
+        except OSError as error:
+
+            # NB: a lock we can't make shouldn't stop the only run there is
+            self.__loge('could not lock: %s', error)
+            return True
+
+        # another run has it, so leave it alone
+        self.__logi('another run is still going (pid %s), exit',
+                    self.run_lock.get_owner())
+        return False
+
+    # --------------------------------------------------------------------------
+    # Load dictionary data from a file
+    # --------------------------------------------------------------------------
+    def __load_conf(self):
+
+        """
+            Load dictionary data from a file
+
+            Loads the user settings and run state, checking every key against
+            its default. Anything missing or of the wrong type is set to its
+            default (and will be written on the next save).
+        """
+
+        # load and check both files
+        problems = self.conf_store.load()
+        self.conf_dict = self.conf_store.data
+
+        # apply the log settings
+        self.__configure_log()
+
+        # log any problems
+        for problem in problems:
+            self.__loge('conf file problem: %s', problem)
+
+        # log success
+        self.__logd('load conf file: %s', self.conf_dict)
+
+    # --------------------------------------------------------------------------
+    # Save dictionary data to a file
+    # --------------------------------------------------------------------------
+    def __save_conf(self):
+
+        """
+            Save dictionary data to a file
+
+            Only files with changed keys are written, and each write is
+            atomic, so an unchanged run doesn't touch the disk and a crash
+            never leaves a half-written file.
+        """
+
+        try:
+
+            # get the changed keys
+            dirty = self.conf_store.dirty_keys()
+            if not dirty:
+                self.__logd('conf not changed, not saving')
+                return
+
+            # write the files with changes
+            written = self.conf_store.save()
+
+            # log success
+            self.__logd('save conf file: %s (%s)', written,
+                        ', '.join(dirty))
+
+        except Exception as error:
+
+            # log error
+            self.__loge('could not save conf file: %s', error)
+
+    # --------------------------------------------------------------------------
+    # Get the image when it is an actual image
+    # --------------------------------------------------------------------------
+    def __apod_is_image(self):
+
+        """
+            Description
+
+            Paramaters:
+                dict_defs [dict]: desc
+
+            Returns:
+                dict_res [dict]: desc
+
+            Raises:
+                Exception(str) if
+        """
+
+        # get the image store
+        store = self.__get_store()
+
+        # get the url to the best variant of the image
+        pic_url = self.__choose_pic_url()
+
+        # we may already have this one (i.e. the config was reset)
+        run_dict = self.conf_dict['run']
+        pic_path = store.find_url(pic_url)
+        if pic_path:
+            self.conf_dict['files']['filepath'] = pic_path
+            run_dict['pending'] = 0
+            self.__logd('image already in store: %s', pic_path)
+            self.__note('unchanged')
+            self.__start_upgrade()
+            return
+
+        # create a download path
+        from image_store import get_url_ext
+        file_ext = get_url_ext(pic_url)
+        dl_path = os.path.join(store.store_dir, f'incoming.{file_ext}')
+
+        # try to download image
+        gate = self.__get_gate()
+        try:
+
+            # download the chosen image (from the mirror if we can)
+            pic_hash = self.__download_pic(pic_url, dl_path)
+
+            # move it into the store (a no-op if we already have it)
+            pic_path = store.add(dl_path, pic_hash, file_ext, pic_url)
+
+            # set pathname
+            self.conf_dict['files']['filepath'] = pic_path
+            run_dict['pending'] = 0
+            gate.succeeded('image')
+            self.index_dirty = True
+
+            # log success
+            self.__logd('download image: %s', pic_path)
+
+            # get the full-size one while this one is set
+            self.__start_upgrade()
+
+        except Exception as error:
+
+            # log error
+            self.__loge('could not download image: %s', error)
+            self.__note('error')
+
+            # try again later (resuming what we got)
+            run_dict['pending'] = 1
+            cooldown = gate.failed('image', getattr(error, 'retry_after', 0))
+            self.__logi('image cooling down for %ds', cooldown)
+
+            # this is a fatal error
+            self.__exit()
+
+    # --------------------------------------------------------------------------
+    # Start downloading the full-size image in the background
+    # --------------------------------------------------------------------------
+    def __start_upgrade(self):
+
+        """
+            Start downloading the full-size image in the background
+
+            This does nothing unless __choose_pic_url picked a small variant
+            to show first. The upgrade step waits for it.
+        """
+
+        # nothing to get
+        url = self.upgrade_url
+        self.upgrade_url = ''
+        if not url:
+            return
+
+        # NB: a separate download path, so it can't meet the small one
+        from concurrent.futures import ThreadPoolExecutor
+        from downloader import Downloader
+        from image_store import get_url_ext
+        store = self.__get_store()
+        file_ext = get_url_ext(url)
+        dl_path = os.path.join(store.store_dir, f'upgrade.{file_ext}')
+        downloader = Downloader(
+            store.store_dir,
+            self.__get_http_client(),
+            retries=self.conf_dict['network']['retries'] + 1,
+            sleep=self.__get_sleep()
+        )
+
+        # start it (the executor goes away when the download is done)
+        executor = ThreadPoolExecutor(max_workers=1)
+        future = executor.submit(downloader.download, url, dl_path)
+        executor.shutdown(wait=False)
+        self.upgrade = {
+            'future':       future,
+            'downloader':   downloader,
+            'url':          url,
+            'name':         'hdurl',
+            'path':         dl_path,
+            'ext':          file_ext
+        }
+
+        # until it's in, this apod isn't done
+        self.conf_dict['run']['pending'] = 1
+        self.__logd('start full-size download: %s', url)
+
+    # --------------------------------------------------------------------------
+    # Get the apod json from the mirror, or from the api if that fails
+    # --------------------------------------------------------------------------
+    def __fetch_apod_json(self, force):
+
+        """
+            Get the apod json from the mirror, or from the api if that fails
+
+            Paramaters:
+                force [bool]: whether to skip the http cache
+
+            Returns:
+                [tuple]: the body, whether it changed, the gate key of
+                whoever answered ('mirror' or 'api') and the url asked
+
+            Raises:
+                Exception if the api fails (a mirror failure only cools the
+                mirror down)
+        """
+
+        # get the http cache
+        if self.http_cache is None:
+            from http_cache import HTTPCache
+            self.http_cache = HTTPCache(self.cache_path,
+                                        self.__get_http_client())
+        gate = self.__get_gate()
+
+        # ask the mirror once (it's on the lan, so it's up or it isn't)
+        mirror_url = self.__get_mirror_url('/planetary/apod')
+        if mirror_url:
+            try:
+                response_text, changed = self.http_cache.fetch(mirror_url,
+                                                               force)
+                self.__logd('get data from mirror: %s', mirror_url)
+                return response_text, changed, 'mirror', mirror_url
+            except Exception as error:
+                self.__mirror_failed(error)
+
+        # don't ask the api while cooling down after failures or low on quota
+        allowed, reason = gate.allowed('api')
+        if not allowed:
+            self.__logi('skip check: %s', reason)
+            self.__note('unchanged')
+            self.__exit(save=False)
+
+        # ask the api, retrying with backoff
+        apod_url = self.__get_apod_url()
+        from resilience import call_with_retry
+        try:
+            response_text, changed = call_with_retry(
+                lambda: self.http_cache.fetch(apod_url, force),
+                self.conf_dict['network']['retries'],
+                sleep=self.__get_sleep(), log=self.__logi)
+        finally:
+            gate.note_quota(self.http_cache.last_headers)
+
+        # return the result
+        return response_text, changed, 'api', apod_url
+
+    # --------------------------------------------------------------------------
+    # Download an image from the mirror, or from upstream if that fails
+    # --------------------------------------------------------------------------
+    def __download_pic(self, pic_url, dl_path):
+
+        """
+            Download an image from the mirror, or from upstream if that fails
+
+            Paramaters:
+                pic_url [str]: the upstream url of the image
+                dl_path [str]: where to put it
+
+            Returns:
+                [str]: the sha256 of the image
+
+            Raises:
+                DownloadError if the upstream download fails
+        """
+
+        # NB: this goes to a temp file first and is only renamed to dl_path
+        # when complete, so we never set a truncated image
+        from downloader import Downloader
+        from urllib.parse import urlencode
+        store = self.__get_store()
+        http_client = self.__get_http_client()
+
+        # try the mirror once
+        mirror_url = self.__get_mirror_url('/image?' +
+                                           urlencode({'url': pic_url}))
+        if mirror_url:
+            downloader = Downloader(store.store_dir, http_client, retries=1,
+                                    sleep=self.__get_sleep())
+            try:
+                pic_hash = downloader.download(mirror_url, dl_path)
+                self.__note(status=downloader.last_status,
+                            nbytes=downloader.last_bytes)
+                self.__logd('get image from mirror: %s', mirror_url)
+                return pic_hash
+            except Exception as error:
+
+                # NB: a 404 only means the mirror has a different image
+                if getattr(error, 'status', 0) == 404:
+                    self.__logi('mirror does not have %s', pic_url)
+                else:
+                    self.__mirror_failed(error)
+
+        # get it from upstream
+        downloader = Downloader(
+            store.store_dir,
+            http_client,
+            retries=self.conf_dict['network']['retries'] + 1,
+            sleep=self.__get_sleep()
+        )
+        try:
+            return downloader.download(pic_url, dl_path)
+        finally:
+            self.__note(status=downloader.last_status,
+                        nbytes=downloader.last_bytes)
+
+    # --------------------------------------------------------------------------
+    # Get a url on the mirror, if there is one we can use
+    # --------------------------------------------------------------------------
+    def __get_mirror_url(self, path):
+
+        """
+            Get a url on the mirror, if there is one we can use
+
+            Paramaters:
+                path [str]: the path (and query) on the mirror
+
+            Returns:
+                [str]: the url, or '' if there is no mirror or it is cooling
+                down
+        """
+
+        # no mirror
+        mirror_url = self.conf_dict['network']['mirror_url'].rstrip('/')
+        if not mirror_url:
+            return ''
+
+        # it failed lately
+        allowed, reason = self.__get_gate().allowed('mirror')
+        if not allowed:
+            self.__logd('skip mirror: %s', reason)
+            return ''
+
+        # return the url
+        return mirror_url + path
+
+    # --------------------------------------------------------------------------
+    # Leave the mirror alone for a while after it fails
+    # --------------------------------------------------------------------------
+    def __mirror_failed(self, error):
+
+        """
+            Leave the mirror alone for a while after it fails
+
+            Paramaters:
+                error [Exception]: what went wrong
+        """
+
+        from resilience import get_retry_after
+        cooldown = self.__get_gate().failed('mirror', get_retry_after(error))
+        self.__loge('mirror failed, using upstream: %s', error)
+        self.__logi('mirror cooling down for %ds', cooldown)
+
+    # --------------------------------------------------------------------------
+    # Set some fake data when debugging and APOD is not an image
+    # --------------------------------------------------------------------------
+    def __apod_is_not_image(self):
+
+        """
+            Description
+
+            Paramaters:
+                dict_defs [dict]: desc
+
+            Returns:
+                dict_res [dict]: desc
+
+            Raises:
+                Exception(str) if
+        """
+
+        # log failure
+        self.__logi('apod is not an image')
+        self.__note('video')
+
+        # remember there is nothing for this date, so later runs today
+        # don't ask again
+        run_dict = self.conf_dict['run']
+        run_dict['pending'] = 0
+        run_dict['variant'] = ''
+        run_dict['no_image'] = self.conf_dict['apod'].get('date', '')
+
+        if not DEBUG:
+
+            # nothing left to do
+            self.__exit()
+
+        else:
+
+            # NB: HOLY FORKING SHIRTBALLS THIS IS AN UGLY HACK!!!
+            # but I can't afford to go 24 hours without testing
+
+            # set picture url
+            fake_url = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                    '_test/test.jpg')
+
+            apod_dict = self.conf_dict['apod']
+            apod_dict['media_type'] = 'image'
+            apod_dict['hdurl'] = fake_url
+            apod_dict['url'] = fake_url
+
+            # get the url to the actual image
+            pic_url = self.__get_pic_url()
+
+            # create a download path
+            store = self.__get_store()
+            file_ext = pic_url.split('.')[-1]
+            dl_path = os.path.join(store.store_dir, f'incoming.{file_ext}')
+
+            # copy test image (simulates downloading)
+            import shutil
+            shutil.copy(pic_url, dl_path)
+            pic_hash = store.hash_file(dl_path)
+            pic_path = store.add(dl_path, pic_hash, file_ext, pic_url)
+
+            # set pathname
+            files_dict = self.conf_dict['files']
+            files_dict['filepath'] = pic_path
+
+            # log success
+            self.__logd('make fake image: %s', files_dict)
+
+    # --------------------------------------------------------------------------
+    # Get the most appropriate url to the full size image
+    # --------------------------------------------------------------------------
+    def __get_pic_url(self):
+
+        """
+            Description
+
+            Paramaters:
                 dict_defs [dict]: desc
 
             Returns:
-                dict_res [dict]: desc
+                dict_res [dict]: desc
+
+            Raises:
+                Exception(str) if
+        """
+
+        # default return result
+        pic_url = ''
+
+        # get current apod dict
+        apod_dict = self.conf_dict['apod']
+
+        # get most appropriate URL
+        if 'hdurl' in apod_dict.keys():
+            pic_url = apod_dict['hdurl']
+        elif 'url' in apod_dict.keys():
+            pic_url = apod_dict['url']
+
+        # return the result
+        return pic_url
+
+    # --------------------------------------------------------------------------
+    # Pick the variant of the image that best fits the screen and budget
+    # --------------------------------------------------------------------------
+    def __choose_pic_url(self):
+
+        """
+            Pick the variant of the image that best fits the screen and budget
+
+            Returns:
+                [str]: the url of the chosen variant
+
+            Each variant (url, hdurl) is probed for its size in bytes and
+            pixels, and the smallest one that still covers the biggest
+            monitor (within the byte budget) is chosen. The choice and the
+            bytes saved over hdurl are recorded in the 'run' section.
+        """
+
+        # get the variants, best first (on a video day, only the thumbnail)
+        apod_dict = self.conf_dict['apod']
+        names = ('hdurl', 'url')
+        if apod_dict.get('media_type') != 'image':
+            names = ('thumbnail_url',)
+        variants = []
+        for name in names:
+            url = apod_dict.get(name, '')
+            if url and url not in [v['url'] for v in variants]:
+                variants.append({'name': name, 'url': url, 'bytes': 0,
+                                 'pixels': None})
+
+        # reset the run info
+        run_dict = self.conf_dict['run']
+        run_dict['bytes_saved'] = 0
+
+        # no choice to make (or we can't make one)
+        if not variants:
+            return ''
+
+        # progressive: the small one now, and the full-size one once the
+        # small one is up
+        # NB: no probing, the point is to show something quickly (and not
+        # for the fetcher or with a mirror, where no one is looking, or for
+        # a slideshow, which only needs the one we keep)
+        store = self.__get_store()
+        net_dict = self.conf_dict['network']
+        general_dict = self.conf_dict['general']
+        self.upgrade_url = ''
+        if general_dict['progressive'] and not general_dict['slideshow'] \
+                and len(variants) > 1 and self.shared_mode == '' \
+                and not net_dict['mirror_url'] \
+                and not store.find_url(variants[0]['url']):
+            self.upgrade_url = variants[0]['url']
+            run_dict['variant'] = variants[-1]['name']
+            run_dict['bytes'] = 0
+            self.__logi('use image variant: %s, then %s',
+                        variants[-1]['name'], variants[0]['name'])
+            return variants[-1]['url']
+
+        # if we already have one of them, use it
+        for variant in variants:
+            if store.find_url(variant['url']):
+                run_dict['variant'] = variant['name']
+                return variant['url']
+
+        # probe each variant (if enabled and there is a choice)
+        # NB: a mirror only has the variant its fetcher chose, so take the
+        # first one (the fetcher picked it for the same kind of screen)
+        from pic_select import choose, probe
+        chosen = variants[0]
+        if net_dict['probe_variants'] and len(variants) > 1 and \
+                not net_dict['mirror_url']:
+            http_client = self.__get_http_client()
+            for variant in variants:
+                try:
+                    variant['bytes'], variant['pixels'] = \
+                        probe(variant['url'], http_client)
+                except Exception as error:
+                    self.__logd('could not probe %s: %s', variant['url'],
+                                error)
+            self.__logd('image variants: %s', variants)
+
+            # get the biggest screen
+            try:
+                sizes = self.__get_screen_sizes()
+            except Exception:
+                sizes = []
+            screen = sizes[0] if sizes else None
+
+            # pick one
+            max_bytes = net_dict['max_image_megabytes'] * 1024 * 1024
+            chosen = choose(variants, screen, max_bytes)
+
+        # record the choice and what it saved over the biggest variant
+        run_dict['variant'] = chosen['name']
+        run_dict['bytes'] = chosen['bytes']
+        if chosen['bytes'] and variants[0]['bytes']:
+            run_dict['bytes_saved'] = variants[0]['bytes'] - chosen['bytes']
+
+        # log the choice
+        self.__logi('use image variant: %s', run_dict)
+
+        # return the chosen url
+        return chosen['url']
+
+    # --------------------------------------------------------------------------
+    # Check if a new apod could have been published since the last one
+    # --------------------------------------------------------------------------
+    def __check_schedule(self):
+
+        """
+            Check if a new apod could have been published since the last one
+
+            Returns:
+                [bool]: True if we should go to the network
+
+            This decision is made locally, from the date of the last apod we
+            saw and the time of our last check, so most runs never open a
+            socket.
+        """
+
+        # ask the scheduler
+        sched = self.__get_scheduler()
+        last_date = self.conf_dict['apod'].get('date', '')
+        is_due, reason = sched.is_due(last_date)
+
+        # not time for a new apod, but the last image failed, so try it again
+        # (if it has cooled down)
+        self.retry_only = False
+        if not is_due and self.conf_dict['run']['pending']:
+            is_due, gate_reason = self.__get_gate().allowed('image')
+            if is_due:
+                self.retry_only = True
+                reason = f'retry the image for {last_date}'
+            else:
+                reason = gate_reason
+
+        # not due (even when debugging, so a debug build doesn't hammer the
+        # api every tick)
+        no_image = last_date and \
+            self.conf_dict['run']['no_image'] == last_date
+        if not is_due:
+            if no_image:
+                reason = f'no image for {last_date} ({reason})'
+            self.__logi('skip check: %s', reason)
+            return False
+
+        # remember that we are going to the network
+        self.__logd('check for new apod: %s', reason)
+        sched.mark_checked()
+        return True
+
+    # --------------------------------------------------------------------------
+    # Check if the slideshow needs to be built or set
+    # --------------------------------------------------------------------------
+    def __check_slideshow(self):
+
+        """
+            Check if the slideshow needs to be built or set
+
+            Returns:
+                [bool]: True if it does
+
+            This is only two stats, so a run with no apod due stays on the
+            fast path unless the store has changed since the slideshow was
+            built (i.e. by backfill), or it isn't the wallpaper yet.
+        """
+
+        # not in slideshow mode (or the shared cache is our archive)
+        if not self.conf_dict['general']['slideshow'] or self.fetcher or \
+                self.conf_dict['shared']['mode']:
+            return False
+
+        # see if the file is older than the store
+        from image_store import INDEX_NAME
+        from slideshow import Slideshow
+        index_path = os.path.join(self.store_dir, INDEX_NAME)
+        if self.conf_dict['files']['wallpaper'] == self.slideshow_path and \
+                Slideshow(self.slideshow_path).is_current(index_path):
+            return False
+
+        # log the reason
+        self.__logi('refresh slideshow from the store')
+        return True
+
+    # --------------------------------------------------------------------------
+    # End the run if it is out of time
+    # --------------------------------------------------------------------------
+    def __check_time(self, name):
+
+        """
+            End the run if it is out of time
+
+            Paramaters:
+                name [str]: the step that is about to start
+
+            Raises:
+                RunFinished if there is no time left
+        """
+
+        if self.deadline.expired():
+            self.__loge('out of time before the %s stage (%ss budget)',
+                        name, self.deadline.seconds)
+            self.__exit()
+
+    # --------------------------------------------------------------------------
+    # Get the steps for this run
+    # --------------------------------------------------------------------------
+    def __get_steps(self, network=True):
+
+        """
+            Get the steps for this run
+
+            Paramaters:
+                network [bool]: False if this run only refreshes the
+                    slideshow (no apod is due)
+
+            Returns:
+                [list]: the (name, method, the names of the steps it needs,
+                the options for Pipeline.add) of each step
+
+            The fetcher for the shared cache doesn't set a wallpaper (it
+            publishes after the steps), and a user of the shared cache reads
+            it instead of downloading. Each step starts as soon as the steps
+            it needs are done, so the prepare step runs while the network is
+            busy, and cleanup runs while the wallpaper is set. The steps that
+            use GObject run on our thread (see pipeline.py).
+
+            In slideshow mode, the wallpaper is a slideshow of the store. It
+            is refreshed once any new image is in (and old ones are out),
+            even if the network steps failed.
+        """
+
+        # get our part in the shared cache
+        mode = 'fetch' if self.fetcher else self.conf_dict['shared']['mode']
+        if mode not in ('', 'fetch', 'use'):
+            self.__loge('unknown shared mode: %s', mode)
+            mode = ''
+        self.shared_mode = mode
+
+        # where the image comes from (and the store, backend and screens,
+        # which don't need it)
+        if mode == 'use':
+            source = 'shared'
+            steps = [
+                ('shared',      self.read_shared,       (),     {}),
+                ('prepare',     self.prepare_run,       (),     MAIN)
+            ]
+        elif network:
+            source = 'image'
+            steps = [
+                ('apod',        self.download_apod_dict, (),    {}),
+                ('prepare',     self.prepare_run,       (),     MAIN),
+                ('image',       self.download_image,
+                    ('apod', 'prepare'),                        {})
+            ]
+        else:
+            source = 'prepare'
+            steps = [
+                ('prepare',     self.prepare_run,       (),     MAIN)
+            ]
+
+        # the fetcher only downloads (and keeps its store trim)
+        # NB: the apod is indexed once we have its image (or know we won't),
+        # even if the image failed, so we have its metadata
+        if mode == 'fetch':
+            return steps + [
+                ('cleanup',     self.delete_old_image,  ('image',), {}),
+                ('index',       self.index_apod,        ('image',), ALWAYS)
+            ]
+
+        # a slideshow of the store, once it is trim
+        if mode == '' and self.conf_dict['general']['slideshow']:
+            if network:
+                steps += [
+                    ('cleanup', self.delete_old_image,  ('image',), {}),
+                    ('index',   self.index_apod,        ('image',), ALWAYS)
+                ]
+                source = 'cleanup'
+            # NB: after prepare, which gets the screen sizes
+            needs = (source,) if source == 'prepare' else (source, 'prepare')
+            return steps + [
+                ('slideshow',   self.make_slideshow,    needs,      ALWAYS),
+                ('set',         self.set_image,         ('slideshow',),
+                    {'main': True, 'always': True})
+            ]
+
+        # and what we do with it
+        steps += [
+            ('derivative',  self.make_derivative,   (source, 'prepare'), {}),
+            ('caption',     self.make_caption,      ('derivative',),    {}),
+            ('set',         self.set_image,         ('caption',),       MAIN)
+        ]
+
+        # in progressive mode, do it again with the full-size image (and
+        # don't clean up or index until it is in the store)
+        if mode == '' and self.conf_dict['general']['progressive']:
+            steps.append(('upgrade', self.upgrade_image, ('set',), MAIN))
+            source = 'upgrade'
+
+        # and keep the store trim
+        steps.append(
+            ('cleanup',     self.delete_old_image,  (source, 'prepare'), {}))
+
+        # and remember the apod (not the shared cache's, which isn't ours)
+        if mode == '':
+            steps.append(('index', self.index_apod, (source,), ALWAYS))
+
+        # return the steps
+        return steps
+
+    # --------------------------------------------------------------------------
+    # Get the screen sizes, getting them if needed
+    # --------------------------------------------------------------------------
+    def __get_screen_sizes(self):
+
+        """
+            Get the screen sizes, getting them if needed
+
+            Returns:
+                [list]: the (width, height) of each monitor, biggest first (an
+                empty list if there is no display)
 
             Raises:
-                Exception(str) if
+                ImportError if GObject is not installed
         """
 
-        # get the url to the actual image
-        pic_url = self.__get_pic_url()
+        # ask the display once a run
+        if self.screen_sizes is None:
+            from derivatives import get_monitor_sizes
+            sizes = get_monitor_sizes()
+            sizes.sort(key=lambda size: size[0] * size[1], reverse=True)
+            self.screen_sizes = sizes
 
-        # create a download path
-        now = datetime.now()
-        str_now = now.strftime('%Y%m%d%H%M%S')
-        file_ext = pic_url.split('.')[-1]
-        pic_name = f'{self.prog_name}_{str_now}.{file_ext}'
-        pic_path = os.path.join(self.conf_dir, pic_name)
+        # return the sizes
+        return self.screen_sizes
 
-        # try to download image
-        try:
+    # --------------------------------------------------------------------------
+    # Get a screen-sized copy of each image in the slideshow
+    # --------------------------------------------------------------------------
+    def __get_slideshow_copies(self, paths):
 
-            # download the hi-res image
-            request.urlretrieve(pic_url, pic_path)
+        """
+            Get a screen-sized copy of each image in the slideshow
 
-            # set pathname
-            files_dict = self.conf_dict['files']
-            files_dict['old_filepath'] = files_dict['filepath']
-            files_dict['filepath'] = pic_path
+            Paramaters:
+                paths [list]: the images in the store
 
-            # log success
-            self.__logd(f'download image: {pic_path}')
+            Returns:
+                [list]: the copy for the biggest screen of each image, or the
+                image itself if there is no display or its copy can't be made
+
+            NB: the copies are named for their source's hash, like the
+            derivative step's, so cleanup removes them with their source
+        """
 
+        # get the biggest screen
+        try:
+            sizes = self.__get_screen_sizes()
+            from derivatives import Derivatives
         except Exception as error:
+            self.__logd('could not get screen sizes: %s', error)
+            return paths
+        if not sizes:
+            self.__logd('no monitors found, using full-size images')
+            return paths
+        width, height = sizes[0]
+
+        # make (or find) each copy
+        derivs = Derivatives(self.derived_dir)
+        copies = []
+        for path in paths:
+            sha = os.path.splitext(os.path.basename(path))[0]
+            try:
+                copies.append(derivs.get(path, sha, width, height))
+            except Exception as error:
+                self.__logd('could not make derivative of %s: %s', path,
+                            error)
+                copies.append(path)
 
-            # log error
-            self.__loge(f'could not download image: {error}')
+        # return the copies
+        return copies
 
-            # this is a fatal error
-            self.__exit()
+    # --------------------------------------------------------------------------
+    # Get the scheduler, creating it if needed
+    # --------------------------------------------------------------------------
+    def __get_scheduler(self):
+
+        """
+            Get the scheduler, creating it if needed
+
+            Returns:
+                [Scheduler]: the scheduler built from the current config
+        """
+
+        # create the scheduler from the schedule settings
+        if self.scheduler is None:
+            sched_dict = self.conf_dict['schedule']
+            self.scheduler = Scheduler(
+                self.sched_path,
+                burst_window=sched_dict['burst_window'],
+                burst_interval=sched_dict['burst_interval'],
+                slow_interval=sched_dict['slow_interval']
+            )
+
+        # return the scheduler
+        return self.scheduler
 
     # --------------------------------------------------------------------------
-    # Set some fake data when debugging and APOD is not an image
+    # Get the wallpaper backend, creating it if needed
     # --------------------------------------------------------------------------
-    def __apod_is_not_image(self):
+    def __get_backend(self):
 
         """
-            Description
+            Get the wallpaper backend, creating it if needed
+
+            Returns:
+                [Backend]: the backend named in the config
+        """
+
+        # create the backend from the general settings
+        if self.backend is None:
+            from backends import get_backend
+            name = self.conf_dict['general']['backend']
+            self.backend = get_backend(name, self.conf_dir)
+
+        # return the backend
+        return self.backend
+
+    # --------------------------------------------------------------------------
+    # Get the image store, creating it if needed
+    # --------------------------------------------------------------------------
+    def __get_store(self):
+
+        """
+            Get the image store, creating it if needed
+
+            Returns:
+                [ImageStore]: the image store built from the current config
+        """
+
+        # create the store from the store settings
+        if self.store is None:
+            from image_store import ImageStore
+            store_dict = self.conf_dict['store']
+            self.store = ImageStore(
+                self.store_dir,
+                max_bytes=store_dict['max_megabytes'] * 1024 * 1024,
+                max_count=store_dict['max_count']
+            )
+
+        # return the store
+        return self.store
+
+    # --------------------------------------------------------------------------
+    # Get the failure gate, creating it if needed
+    # --------------------------------------------------------------------------
+    def __get_gate(self):
+
+        """
+            Get the failure gate, creating it if needed
+
+            Returns:
+                [FailureGate]: the gate built from the current config
+        """
+
+        # create the gate from the network settings
+        if self.gate is None:
+            from resilience import FailureGate
+            net_dict = self.conf_dict['network']
+            self.gate = FailureGate(
+                os.path.join(self.conf_dir, 'failures.json'),
+                cooldown_base=net_dict['cooldown_minutes'] * 60,
+                quota_reserve=net_dict['quota_reserve']
+            )
+
+        # return the gate
+        return self.gate
+
+    # --------------------------------------------------------------------------
+    # Check if a backfill would survive the store limits
+    # --------------------------------------------------------------------------
+    def __check_backfill_fits(self, store, start_date, end_date):
+
+        """
+            Check if a backfill would survive the store limits
 
             Paramaters:
-                dict_defs [dict]: desc
+                store [ImageStore]: the image store
+                start_date [str]: the first date (YYYY-MM-DD)
+                end_date [str]: the last date (YYYY-MM-DD)
 
             Returns:
-                dict_res [dict]: desc
+                [bool]: True if the range fits (as far as we can tell before
+                downloading it)
 
-            Raises:
-                Exception(str) if
+            NB: the size is a guess (see BACKFILL_IMAGE_BYTES), the count
+            isn't
         """
 
-        # log failure
-        self.__logi('apod is not an image')
+        # get the number of days
+        from datetime import date
+        try:
+            days = (date.fromisoformat(end_date) -
+                    date.fromisoformat(start_date)).days + 1
+        except ValueError as error:
+            self.__loge('could not backfill: %s', error)
+            return False
 
-        if not DEBUG:
+        # what is in the store now (that counts against the limits)
+        entries = [entry for entry in store.index_dict.values()
+                   if not entry.get('keep')]
+        count = len(entries) + days
+        nbytes = sum(entry['size'] for entry in entries) + \
+            days * BACKFILL_IMAGE_BYTES
+
+        # it fits
+        if (not store.max_count or count <= store.max_count) and \
+                (not store.max_bytes or nbytes <= store.max_bytes):
+            return True
+
+        # say so loudly
+        self.__loge('not backfilling %d days: the next run would evict them '
+                    '(the store keeps %d images, %d MB). Pass --keep to keep '
+                    'them for good, or raise max_count and max_megabytes in '
+                    'the store section of %s', days, store.max_count,
+                    store.max_bytes // (1024 * 1024), self.conf_path)
+        return False
 
-            # nothing left to do
-            self.__exit()
+    # --------------------------------------------------------------------------
+    # Get the search index, creating it if needed
+    # --------------------------------------------------------------------------
+    def __get_index(self):
 
-        else:
+        """
+            Get the search index, creating it if needed
 
-            # NB: HOLY FORKING SHIRTBALLS THIS IS AN UGLY HACK!!!
-            # but I can't afford to go 24 hours without testing
+            Returns:
+                [ApodIndex]: the index of every apod we have seen
+        """
 
-            # set picture url
-            fake_url = os.path.join(os.path.dirname(os.path.abspath(__file__)),
-                                    '_test/test.jpg')
+        # create the index (the database is opened when first used)
+        if self.index is None:
+            from apod_index import ApodIndex
+            self.index = ApodIndex(self.index_path)
 
-            apod_dict = self.conf_dict['apod']
-            apod_dict['media_type'] = 'image'
-            apod_dict['hdurl'] = fake_url
-            apod_dict['url'] = fake_url
+        # return the index
+        return self.index
 
-            # get the url to the actual image
-            pic_url = self.__get_pic_url()
+    # --------------------------------------------------------------------------
+    # Get the shared cache, creating it if needed
+    # --------------------------------------------------------------------------
+    def __get_shared_cache(self):
 
-            # create a download path
-            now = datetime.now()
-            str_now = now.strftime('%Y%m%d%H%M%S')
-            file_ext = pic_url.split('.')[-1]
-            pic_name = f'{self.prog_name}_{str_now}.{file_ext}'
-            pic_path = os.path.join(self.conf_dir, pic_name)
+        """
+            Get the shared cache, creating it if needed
 
-            # copy test image (simulates downloading)
-            shutil.copy(pic_url, pic_path)
+            Returns:
+                [SharedCache]: the shared cache built from the current config
+                (or the folder given to the fetch command)
+        """
 
-            # set pathname
-            files_dict = self.conf_dict['files']
-            files_dict['old_filepath'] = files_dict['filepath']
-            files_dict['filepath'] = pic_path
+        # create the shared cache from the shared settings
+        if self.shared_cache is None:
+            from shared_cache import SharedCache
+            shared_dict = self.conf_dict['shared']
+            self.shared_cache = SharedCache(
+                self.fetch_dir or shared_dict['dir'],
+                keep=shared_dict['keep']
+            )
 
-            # log success
-            self.__logd(f'make fake image: {files_dict}')
+        # return the shared cache
+        return self.shared_cache
 
     # --------------------------------------------------------------------------
-    # Get the most appropriate url to the full size image
+    # Get the http client, creating it if needed
     # --------------------------------------------------------------------------
-    def __get_pic_url(self):
+    def __get_http_client(self):
 
         """
-            Description
+            Get the http client, creating it if needed
 
-            Paramaters:
-                dict_defs [dict]: desc
+            Returns:
+                [HTTPClient]: the client built from the current config
+        """
+
+        # create the client from the network settings
+        if self.http_client is None:
+            from http_client import HTTPClient
+            net_dict = self.conf_dict['network']
+            self.http_client = HTTPClient(
+                connect_timeout=net_dict['connect_timeout'],
+                read_timeout=net_dict['read_timeout']
+            )
+
+        # no wait goes past the end of the run
+        self.http_client.deadline = self.deadline
+
+        # return the client
+        return self.http_client
+
+    # --------------------------------------------------------------------------
+    # Get the sleep function for retries
+    # --------------------------------------------------------------------------
+    def __get_sleep(self):
+
+        """
+            Get the sleep function for retries
 
             Returns:
-                dict_res [dict]: desc
+                [callable]: the deadline's sleep (which won't wait past the
+                end of the run), or time.sleep outside a run
+        """
+
+        if self.deadline is not None:
+            return self.deadline.sleep
+        return time.sleep
+
+    # --------------------------------------------------------------------------
+    # Get the url of the APOD api
+    # --------------------------------------------------------------------------
+    def __get_apod_url(self):
 
-            Raises:
-                Exception(str) if
         """
+            Get the url of the APOD api
 
-        # default return result
-        pic_url = ''
+            Returns:
+                [str]: the apod_url from the config (i.e. a mirror or the test
+                server), or the real api if that is blank
+        """
 
-        # get current apod dict
-        apod_dict = self.conf_dict['apod']
+        # NB: thumbs=True adds a thumbnail_url on video days
+        apod_url = self.conf_dict['network']['apod_url'] or APOD_URL
+        if 'thumbs=' not in apod_url:
+            apod_url += ('&' if '?' in apod_url else '?') + 'thumbs=True'
 
-        # get most appropriate URL
-        if 'hdurl' in apod_dict.keys():
-            pic_url = apod_dict['hdurl']
-        elif 'url' in apod_dict.keys():
-            pic_url = apod_dict['url']
+        # return the url
+        return apod_url
 
-        # return the result
-        return pic_url
+    # --------------------------------------------------------------------------
+    # Get the metrics, creating them if needed
+    # --------------------------------------------------------------------------
+    def __get_metrics(self):
+
+        """
+            Get the metrics, creating them if needed
+
+            Returns:
+                [Metrics]: the metrics built from the current config
+        """
+
+        # create the metrics from the metrics settings
+        if self.metrics is None:
+            from metrics import Metrics
+            metrics_dict = self.conf_dict['metrics']
+            prom_dir = metrics_dict['textfile_dir'] or self.conf_dir
+            self.metrics = Metrics(
+                os.path.join(prom_dir, f'{self.prog_name}.prom'),
+                os.path.join(self.conf_dir, 'metrics.jsonl'),
+                history_runs=metrics_dict['history_runs']
+            )
+
+        # return the metrics
+        return self.metrics
+
+    # --------------------------------------------------------------------------
+    # Record something about the current stage
+    # --------------------------------------------------------------------------
+    def __note(self, outcome=None, nbytes=None, status=None):
+
+        """
+            Record something about the current stage
+
+            Paramaters:
+                outcome [str]: 'changed', 'unchanged', 'video' or 'error'
+                nbytes [int]: bytes transferred
+                status [int]: the http status
+
+            This does nothing outside of run_steps.
+        """
+
+        self.__get_metrics().note(outcome, nbytes, status)
+
+    # --------------------------------------------------------------------------
+    # Remove stray images from the config folder
+    # --------------------------------------------------------------------------
+    def __collect_garbage(self):
+
+        """
+            Remove stray images from the config folder
+
+            Images used to be saved as 'spaceoddity_<timestamp>.<ext>' in the
+            config folder, and any that were never deleted stayed forever.
+            This removes them all, except the current wallpaper.
+        """
+
+        # get the current wallpaper, which we must not delete
+        pic_path = self.conf_dict['files']['filepath']
+
+        # check each file in the config folder
+        for name in os.listdir(self.conf_dir):
+            path = os.path.join(self.conf_dir, name)
+            if not name.startswith(f'{self.prog_name}_') or path == pic_path:
+                continue
+
+            # remove the stray
+            try:
+                os.remove(path)
+                self.__logd('delete stray image: %s', path)
+            except Exception as error:
+                self.__loge('could not delete stray image: %s', error)
 
     # --------------------------------------------------------------------------
     # Check if new URL is same as old URL
@@ -633,68 +2588,83 @@ class Main:
         else:
             return False
 
+    # --------------------------------------------------------------------------
+    # Apply the log settings from the config dict
+    # --------------------------------------------------------------------------
+    def __configure_log(self):
+
+        """
+            Apply the log settings from the config dict
+
+            DEBUG always logs everything. A bad setting is logged and the
+            defaults are used instead.
+        """
+
+        # get the settings
+        log_dict = self.conf_dict['log']
+        level = 'debug' if DEBUG else log_dict['level']
+        max_bytes = int(log_dict['max_megabytes'] * 1024 * 1024)
+
+        # apply them
+        try:
+            self.log_pipe.configure(level, log_dict['format'],
+                                    log_dict['rotate'], max_bytes,
+                                    log_dict['backups'],
+                                    bool(log_dict['echo']))
+        except ValueError as error:
+            log_def = self.conf_dict_def['log']
+            self.log_pipe.configure(level, log_def['format'],
+                                    log_def['rotate'])
+            self.__loge('bad log setting: %s', error)
+
     # --------------------------------------------------------------------------
     # Print debug message to log file and terminal
     # --------------------------------------------------------------------------
-    def __logd(self, msg):
+    def __logd(self, msg, *args):
 
         """
-            Description
+            Print debug message to log file and terminal
 
             Paramaters:
-                dict_defs [dict]: desc
+                msg [str]: the message, with %s for each arg
+                args [list]: the values for the message
 
-            Returns:
-                dict_res [dict]: desc
-
-            Raises:
-                Exception(str) if
+            NB: the message is only built (msg % args) if debug is on, so
+            pass big values (i.e. the config dict) as args, not in an
+            f-string
         """
 
-        logging.debug(msg)
-        print('DEBUG:', msg)
+        self.logger.debug(msg, *args)
 
     # --------------------------------------------------------------------------
     # Print error message to log file and terminal
     # --------------------------------------------------------------------------
-    def __loge(self, msg):
+    def __loge(self, msg, *args):
 
         """
-            Description
+            Print error message to log file and terminal
 
             Paramaters:
-                dict_defs [dict]: desc
-
-            Returns:
-                dict_res [dict]: desc
-
-            Raises:
-                Exception(str) if
+                msg [str]: the message, with %s for each arg
+                args [list]: the values for the message
         """
 
-        logging.error(msg)
-        print('ERROR:', msg)
+        self.logger.error(msg, *args)
 
     # --------------------------------------------------------------------------
     # Print info message to log file and terminal
     # --------------------------------------------------------------------------
-    def __logi(self, msg):
+    def __logi(self, msg, *args):
 
         """
-            Description
+            Print info message to log file and terminal
 
             Paramaters:
-                dict_defs [dict]: desc
-
-            Returns:
-                dict_res [dict]: desc
-
-            Raises:
-                Exception(str) if
+                msg [str]: the message, with %s for each arg
+                args [list]: the values for the message
         """
 
-        logging.info(msg)
-        print('INFO :', msg)
+        self.logger.info(msg, *args)
 
     # --------------------------------------------------------------------------
     # Print version number to terminal
@@ -702,72 +2672,213 @@ class Main:
     def __print_version(self):
 
         """
-            Description
-
-            Paramaters:
-                dict_defs [dict]: desc
-
-            Returns:
-                dict_res [dict]: desc
+            Print version number to terminal
 
-            Raises:
-                Exception(str) if
+            NB: this reads a file, so it is only called on runs that do real
+            work, not on every start.
         """
 
-        # get current dir
-        src_dir = os.path.dirname(os.path.abspath(__file__))
+        # log the version
+        self.__logi('%s version %s', self.disp_name, get_version())
 
-        # get VERSION file
-        ver_path = os.path.join(src_dir, 'VERSION')
+    # --------------------------------------------------------------------------
+    # End the current run early, when we are done or on failure
+    # --------------------------------------------------------------------------
+    def __exit(self, save=True):
 
-        # read version number
-        with open(ver_path, 'r') as file:
-            try:
-                ver_num = file.readline()
-                ver_str = f'{self.disp_name} version {ver_num}'
+        """
+            End the current run early, when we are done or on failure
 
-                # log success
-                self.__logi(ver_str)
+            Paramaters:
+                save [bool]: whether to save the config dict to file
 
-            except Exception as error:
+            Raises:
+                RunFinished(save): always, to unwind back to run_steps
+        """
 
-                # log error
-                self.__loge(f'could not load VERSION file: {error}')
+        # unwind back to run_steps
+        raise RunFinished(save)
 
     # --------------------------------------------------------------------------
-    # Gracefully exit the script when we are done or on failure
+    # Gracefully finish a run
     # --------------------------------------------------------------------------
-    def __exit(self):
+    def __finish(self, save):
 
         """
-            Description
+            Gracefully finish a run
 
             Paramaters:
-                dict_defs [dict]: desc
-
-            Returns:
-                dict_res [dict]: desc
-
-            Raises:
-                Exception(str) if
+                save [bool]: whether to save the config dict to file
         """
 
         # save config dict to file
-        self.__save_conf()
+        if save:
+            self.__save_conf()
+
+        # don't leave a download running into the next run (i.e. when a step
+        # ended the run before the upgrade)
+        if self.upgrade is not None:
+            from concurrent.futures import wait
+            wait([self.upgrade['future']])
+            self.upgrade = None
+
+        # the budget is only for this run
+        self.deadline = None
+        if self.http_client is not None:
+            self.http_client.deadline = None
+
+        # export the stage timings (if any stages ran)
+        metrics = self.__get_metrics()
+        if metrics.stages:
+            self.__logd('stage timings: %s', metrics.stages)
+        if self.http_client is not None:
+            self.__logd('http client: %s', self.http_client.stats)
+        try:
+            metrics.finish_run(self.run_id)
+        except OSError as error:
+            self.__loge('could not write metrics: %s', error)
 
         # log that we are finished with script
         self.__logi('exit main script')
         self.__logi('-------------------------------------------------------')
 
-        # quit script
-        exit()
+# ------------------------------------------------------------------------------
+# Get the version number from the VERSION file
+# ------------------------------------------------------------------------------
+def get_version():
+
+    """
+        Get the version number from the VERSION file
+
+        Returns:
+            [str]: the version number, or '?' if the file can't be read
+    """
+
+    # get VERSION file
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    ver_path = os.path.join(src_dir, 'VERSION')
+
+    # read version number
+    try:
+        with open(ver_path, 'r') as file:
+            return file.readline().strip()
+    except OSError:
+        return '?'
+
+
+# ------------------------------------------------------------------------------
+# Get the command line options
+# ------------------------------------------------------------------------------
+def get_args():
+
+    """
+        Get the command line options
+
+        Returns:
+            [Namespace]: the parsed options
+    """
+
+    # NB: only imported when there are options to parse
+    import argparse
+
+    # get command line options
+    parser = argparse.ArgumentParser(prog='spaceoddity')
+    parser.add_argument('--version', action='version',
+                        version=f'%(prog)s {get_version()}')
+    parser.add_argument('--daemon', action='store_true',
+                        help='stay resident and check on an internal timer')
+    subparsers = parser.add_subparsers(dest='command')
+
+    # backfill command
+    backfill_parser = subparsers.add_parser(
+        'backfill', help='download every image in a date range')
+    backfill_parser.add_argument('--start-date', required=True,
+                                 help='the first date (YYYY-MM-DD)')
+    backfill_parser.add_argument('--end-date', required=True,
+                                 help='the last date (YYYY-MM-DD)')
+    backfill_parser.add_argument('--concurrency', type=int, default=0,
+                                 help='the most downloads at once')
+    backfill_parser.add_argument('--keep', action='store_true',
+                                 help='keep the images for good (the store '
+                                 'limits never evict them)')
+
+    # fetch command
+    fetch_parser = subparsers.add_parser(
+        'fetch', help='fill the shared cache for every user (system job)')
+    fetch_parser.add_argument('--shared-dir', default='',
+                              help='the shared folder (default: from the '
+                              'config)')
+
+    # serve command
+    serve_parser = subparsers.add_parser(
+        'serve', help='serve the shared cache to other machines')
+    serve_parser.add_argument('--shared-dir', default='',
+                              help='the shared folder (default: from the '
+                              'config)')
+    serve_parser.add_argument('--host', default=None,
+                              help='the address to listen on (default: from '
+                              'the config)')
+    serve_parser.add_argument('--port', type=int, default=None,
+                              help='the port to listen on (default: from the '
+                              'config)')
+
+    # search command
+    search_parser = subparsers.add_parser(
+        'search', help='search the apods we have seen')
+    search_parser.add_argument('words', nargs='*',
+                               help='words in the title or explanation')
+    search_parser.add_argument('--year', default='',
+                               help='only this year (YYYY)')
+    search_parser.add_argument('--start-date', default='',
+                               help='the first date (YYYY-MM-DD)')
+    search_parser.add_argument('--end-date', default='',
+                               help='the last date (YYYY-MM-DD)')
+    search_parser.add_argument('--media-type', default='',
+                               choices=['', 'image', 'video'],
+                               help='only images or videos')
+    search_parser.add_argument('--limit', type=int, default=50,
+                               help='the most results (0 for all)')
+
+    # parse the options
+    return parser.parse_args()
 
 
 # ------------------------------------------------------------------------------
 # Run the main class if we are not an import
 # ------------------------------------------------------------------------------
 if __name__ == '__main__':
+
+    # plain cron runs have no options, so don't pay for argparse
+    if len(sys.argv) > 1:
+        args = get_args()
+    else:
+        args = None
+
+    # create the main class
     main = Main()
-    main.run()
+
+    # run a command, once (cron) or forever (daemon)
+    if args and args.command == 'backfill':
+        main.backfill(args.start_date, args.end_date, args.concurrency,
+                      args.keep)
+    elif args and args.command == 'fetch':
+        main.fetch(args.shared_dir)
+    elif args and args.command == 'serve':
+        main.serve(args.shared_dir, args.host, args.port)
+    elif args and args.command == 'search':
+        for found in main.search(' '.join(args.words), args.year,
+                                 args.start_date, args.end_date,
+                                 args.media_type, args.limit):
+
+            # our copy if it's still there, else the original
+            where = found['path']
+            if not where or not os.path.exists(where):
+                where = found['hdurl'] or found['url']
+            print(f'{found["date"]}  {found["title"]}  {where}')
+    elif args and args.daemon:
+        from daemon import Daemon
+        Daemon(main).run()
+    else:
+        main.run()
 
 # -)
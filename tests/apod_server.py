@@ -0,0 +1,544 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: apod_server.py                                        |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+from http import server
+from urllib import parse
+import datetime
+import functools
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# the image we serve for every date
+TEST_IMAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          'test.jpg')
+
+# the api path (as on api.nasa.gov)
+API_PATH = '/planetary/apod'
+
+# how much to send between bandwidth sleeps
+CHUNK_SIZE = 16 * 1024
+
+
+# ------------------------------------------------------------------------------
+# Gzip a json body
+# ------------------------------------------------------------------------------
+@functools.lru_cache(maxsize=16)
+def gzip_json(data):
+
+    """
+        Gzip a json body
+
+        Paramaters:
+            data [bytes]: the json
+
+        Returns:
+            [bytes]: the gzipped json
+
+        NB: the answers are cached, because the deflate state is a few
+        hundred KiB and the benchmark traces memory in this process
+    """
+
+    return gzip.compress(data)
+
+
+# ------------------------------------------------------------------------------
+# Define the scenario class
+# ------------------------------------------------------------------------------
+
+class Scenario:
+
+    """
+        How the stand-in server should (mis)behave
+
+        Every field can be changed while the server is running, and takes
+        effect on the next request.
+    """
+
+    # --------------------------------------------------------------------------
+    # Initialize the class
+    # --------------------------------------------------------------------------
+    def __init__(self, **kwargs):
+
+        """
+            Initialize the class
+
+            Paramaters:
+                latency [float]: seconds to wait before each response
+                bandwidth [int]: the most bytes per second to send (0 for no
+                    limit)
+                truncate [int]: drop the connection after this many bytes of
+                    an image (0 to send it all)
+                api_status [int]: send this status for the json instead of
+                    200 (i.e. 429 or 503)
+                image_status [int]: send this status for images instead of 200
+                fail_count [int]: only send api_status/image_status for the
+                    first this many requests (0 for all of them)
+                retry_after [int]: the Retry-After header to send with an
+                    error status (0 for none)
+                media_type [str]: 'image', or 'video' for a video day
+                malformed [bool]: send broken json
+                date [str]: the apod date (YYYY-MM-DD)
+                max_age [int]: the Cache-Control max-age of the json (-1 for
+                    no header)
+                rate_remaining [int]: the X-RateLimit-Remaining to send with
+                    the json (-1 for no header)
+                small_image [int]: serve only this many bytes of the test
+                    image for the small variant (url), so it differs from
+                    hdurl (0 to serve the same image for both)
+        """
+
+        # the defaults are a well-behaved server
+        self.latency = 0.0
+        self.bandwidth = 0
+        self.truncate = 0
+        self.api_status = 0
+        self.image_status = 0
+        self.fail_count = 0
+        self.retry_after = 0
+        self.media_type = 'image'
+        self.malformed = False
+        self.date = '2026-01-01'
+        self.max_age = -1
+        self.rate_remaining = -1
+        self.small_image = 0
+
+        # set the ones we were given
+        for key, val in kwargs.items():
+            if not hasattr(self, key):
+                raise ValueError(f'unknown scenario field: {key}')
+            setattr(self, key, val)
+
+
+# ------------------------------------------------------------------------------
+# Define the request handler class
+# ------------------------------------------------------------------------------
+
+class Handler(server.BaseHTTPRequestHandler):
+
+    """
+        Answers the api and image requests for one ApodServer
+    """
+
+    # NB: HTTP/1.1 so Content-Length, Range and keep-alive behave like a real
+    # server
+    protocol_version = 'HTTP/1.1'
+
+    # NB: like a real server, or a response written in two parts (headers,
+    # then body) waits on the client's delayed ack on a reused connection
+    disable_nagle_algorithm = True
+
+    # --------------------------------------------------------------------------
+    # Count a new connection
+    # --------------------------------------------------------------------------
+    def setup(self):
+
+        """
+            Count a new connection
+        """
+
+        super().setup()
+        owner = self.server.owner
+        with owner.lock:
+            owner.connections += 1
+
+    # --------------------------------------------------------------------------
+    # Handle a GET
+    # --------------------------------------------------------------------------
+    def do_GET(self):
+
+        """
+            Handle a GET
+        """
+
+        # log the request
+        owner = self.server.owner
+        scenario = owner.scenario
+        with owner.lock:
+            owner.requests.append(self.path)
+            count = len(owner.requests)
+
+        # slow server
+        if scenario.latency:
+            time.sleep(scenario.latency)
+
+        # route it
+        url = parse.urlsplit(self.path)
+        if url.path == API_PATH:
+            self.__send_api(parse.parse_qs(url.query), scenario, count)
+        elif url.path.startswith('/image/'):
+            self.__send_image(url.path, scenario, count)
+        else:
+            self.__send_status(404)
+
+    # --------------------------------------------------------------------------
+    # Don't print every request
+    # --------------------------------------------------------------------------
+    def log_message(self, format, *args):
+
+        """
+            Don't print every request
+        """
+
+    # --------------------------------------------------------------------------
+    # Helpers
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Send the apod json
+    # --------------------------------------------------------------------------
+    def __send_api(self, query, scenario, count):
+
+        """
+            Send the apod json
+
+            Paramaters:
+                query [dict]: the parsed query string
+                scenario [Scenario]: how to behave
+                count [int]: how many requests we have had (including this)
+        """
+
+        # an error status
+        if scenario.api_status and \
+                (not scenario.fail_count or count <= scenario.fail_count):
+            self.__send_status(scenario.api_status, scenario.retry_after)
+            return
+
+        # a range of dates (backfill) or just one
+        if 'start_date' in query:
+            start = datetime.date.fromisoformat(query['start_date'][0])
+            end = datetime.date.fromisoformat(query['end_date'][0])
+            days = (end - start).days + 1
+            body = [self.__apod_dict(str(start + datetime.timedelta(i)),
+                                     scenario, query) for i in range(days)]
+        else:
+            body = self.__apod_dict(scenario.date, scenario, query)
+
+        # make the json (or break it)
+        data = json.dumps(body).encode('utf-8')
+        if scenario.malformed:
+            data = data[:len(data) // 2]
+
+        # gzip it if asked (like api.nasa.gov)
+        # NB: the zipped body is a different representation, so it gets a
+        # different etag
+        etag = '"' + hashlib.sha1(data).hexdigest()
+        zipped = 'gzip' in self.headers.get('Accept-Encoding', '')
+        if zipped:
+            data = gzip_json(data)
+            etag += '-gzip'
+        etag += '"'
+
+        # it hasn't changed
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.__send_rate_limit(scenario)
+            self.end_headers()
+            return
+
+        # send it
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('ETag', etag)
+        self.send_header('Vary', 'Accept-Encoding')
+        if zipped:
+            self.send_header('Content-Encoding', 'gzip')
+        self.__send_rate_limit(scenario)
+        if scenario.max_age >= 0:
+            self.send_header('Cache-Control', f'max-age={scenario.max_age}')
+        self.end_headers()
+        self.wfile.write(data)
+
+    # --------------------------------------------------------------------------
+    # Send an image (or part of one)
+    # --------------------------------------------------------------------------
+    def __send_image(self, path, scenario, count):
+
+        """
+            Send an image (or part of one)
+
+            Paramaters:
+                path [str]: the path asked for
+                scenario [Scenario]: how to behave
+                count [int]: how many requests we have had (including this)
+        """
+
+        # an error status
+        if scenario.image_status and \
+                (not scenario.fail_count or count <= scenario.fail_count):
+            self.__send_status(scenario.image_status, scenario.retry_after)
+            return
+
+        # the whole image, or the range asked for
+        # NB: a memoryview, so serving doesn't copy the image (the benchmark
+        # traces memory in this process, server included)
+        data = memoryview(self.server.owner.image)
+        etag = self.server.owner.image_etag
+        if scenario.small_image and not path.endswith('_hd.jpg'):
+            data = data[:scenario.small_image]
+            etag = etag[:-1] + '-small"'
+        total = len(data)
+        start = 0
+        match = re.match(r'bytes=(\d+)-(\d*)$', self.headers.get('Range', ''))
+        if match:
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else total - 1
+            end = min(end, total - 1)
+            if start >= total:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{total}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{total}')
+            data = data[start:end + 1]
+        else:
+            self.send_response(200)
+
+        # the headers
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('ETag', etag)
+        self.send_header('Accept-Ranges', 'bytes')
+        self.end_headers()
+
+        # the body, cut short and/or slowed down
+        limit = len(data)
+        if scenario.truncate:
+            limit = min(limit, max(0, scenario.truncate - start))
+        sent = 0
+        while sent < limit:
+            chunk = data[sent:min(sent + CHUNK_SIZE, limit)]
+            self.wfile.write(chunk)
+            sent += len(chunk)
+            if scenario.bandwidth:
+                time.sleep(len(chunk) / scenario.bandwidth)
+
+        # drop the connection on a truncated send
+        if limit < len(data):
+            self.close_connection = True
+
+    # --------------------------------------------------------------------------
+    # Send the rate limit headers (if the scenario has them)
+    # --------------------------------------------------------------------------
+    def __send_rate_limit(self, scenario):
+
+        """
+            Send the rate limit headers (if the scenario has them)
+
+            Paramaters:
+                scenario [Scenario]: how to behave
+        """
+
+        if scenario.rate_remaining >= 0:
+            self.send_header('X-RateLimit-Limit', '1000')
+            self.send_header('X-RateLimit-Remaining',
+                             str(scenario.rate_remaining))
+
+    # --------------------------------------------------------------------------
+    # Send an empty response with a status
+    # --------------------------------------------------------------------------
+    def __send_status(self, status, retry_after=0):
+
+        """
+            Send an empty response with a status
+
+            Paramaters:
+                status [int]: the http status
+                retry_after [int]: the Retry-After header (0 for none)
+        """
+
+        self.send_response(status)
+        if retry_after:
+            self.send_header('Retry-After', str(retry_after))
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    # --------------------------------------------------------------------------
+    # Make the apod dict for a date
+    # --------------------------------------------------------------------------
+    def __apod_dict(self, date, scenario, query):
+
+        """
+            Make the apod dict for a date
+
+            Paramaters:
+                date [str]: the date (YYYY-MM-DD)
+                scenario [Scenario]: how to behave
+                query [dict]: the parsed query string
+
+            Returns:
+                [dict]: what the api would send
+        """
+
+        # the base url of the server
+        base = self.server.owner.base_url
+
+        # a video day (with a thumbnail, if asked for)
+        if scenario.media_type == 'video':
+            apod_dict = {
+                'date':         date,
+                'media_type':   'video',
+                'title':        f'Video for {date}',
+                'url':          f'{base}/embed/{date}'
+            }
+            if query.get('thumbs', [''])[0].lower() == 'true':
+                apod_dict['thumbnail_url'] = f'{base}/image/{date}_thumb.jpg'
+            return apod_dict
+
+        # an image day
+        return {
+            'date':         date,
+            'media_type':   'image',
+            'title':        f'Image for {date}',
+            'url':          f'{base}/image/{date}.jpg',
+            'hdurl':        f'{base}/image/{date}_hd.jpg'
+        }
+
+
+# ------------------------------------------------------------------------------
+# Define the http server class
+# ------------------------------------------------------------------------------
+
+class QuietServer(server.ThreadingHTTPServer):
+
+    """
+        A ThreadingHTTPServer that doesn't print clients hanging up
+
+        Tests hang up on purpose (i.e. timeouts), so a broken pipe or reset
+        is not an error here.
+    """
+
+    # --------------------------------------------------------------------------
+    # Handle an error in a request
+    # --------------------------------------------------------------------------
+    def handle_error(self, request, client_address):
+
+        """
+            Handle an error in a request
+
+            Paramaters:
+                request [socket]: the client socket
+                client_address [tuple]: the client address
+        """
+
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+# ------------------------------------------------------------------------------
+# Define the server class
+# ------------------------------------------------------------------------------
+
+class ApodServer:
+
+    """
+        A local stand-in for the APOD api and its image host
+
+        It serves the json at API_PATH (with ETags, so the http cache gets
+        304s, and gzip if asked) and test.jpg for every image url (with
+        Range, so downloads can resume). It counts the requests and the
+        connections they came in on. The scenario says how to misbehave.
+    """
+
+    # --------------------------------------------------------------------------
+    # Methods
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    # Initialize the class
+    # --------------------------------------------------------------------------
+    def __init__(self, scenario=None):
+
+        """
+            Initialize the class
+
+            Paramaters:
+                scenario [Scenario]: how to behave (well-behaved if None)
+        """
+
+        # how to behave, and what was asked for
+        self.scenario = scenario or Scenario()
+        self.requests = []
+        self.connections = 0
+        self.lock = threading.Lock()
+
+        # the image we serve
+        with open(TEST_IMAGE, 'rb') as file:
+            self.image = file.read()
+        self.image_etag = '"' + hashlib.sha1(self.image).hexdigest() + '"'
+
+        # the server (on any free port)
+        self.httpd = QuietServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.owner = self
+        self.base_url = f'http://127.0.0.1:{self.httpd.server_port}'
+        self.thread = None
+
+    # --------------------------------------------------------------------------
+    # Get the api url to put in the config
+    # --------------------------------------------------------------------------
+    @property
+    def api_url(self):
+
+        """
+            Get the api url to put in the config
+
+            Returns:
+                [str]: the url, with a dummy api key like the real one
+        """
+
+        return f'{self.base_url}{API_PATH}?api_key=TEST'
+
+    # --------------------------------------------------------------------------
+    # Start serving in a thread
+    # --------------------------------------------------------------------------
+    def start(self):
+
+        """
+            Start serving in a thread
+
+            Returns:
+                [ApodServer]: self, for chaining
+        """
+
+        self.thread = threading.Thread(target=self.httpd.serve_forever,
+                                       daemon=True)
+        self.thread.start()
+        return self
+
+    # --------------------------------------------------------------------------
+    # Stop serving
+    # --------------------------------------------------------------------------
+    def stop(self):
+
+        """
+            Stop serving
+        """
+
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+# -)
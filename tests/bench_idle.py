@@ -0,0 +1,213 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: bench_idle.py                                         |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+import argparse
+import os
+import resource
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import time
+
+from bench_startup import make_sandbox
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# how many cron ticks to measure
+RUNS = 20
+
+# cron runs the script every 2 minutes
+RUNS_PER_DAY = 24 * 60 // 2
+
+# how long to give the daemon to start and do its first run
+SETTLE_SECONDS = 5
+
+
+# --------------------------------------------------------------------------
+# Methods
+# --------------------------------------------------------------------------
+
+# --------------------------------------------------------------------------
+# Measure a cron tick that finds nothing to do
+# --------------------------------------------------------------------------
+def measure_cron(src_dir, home_dir):
+
+    """
+        Measure a cron tick that finds nothing to do
+
+        Paramaters:
+            src_dir [str]: the dir holding the script
+            home_dir [str]: the HOME to run it with
+
+        Returns:
+            [tuple]: the median cpu seconds per tick [float] and the max rss
+            of a tick in KiB [int]
+    """
+
+    # run the script like cron does, measuring each child
+    cmd = [sys.executable, os.path.join(src_dir, 'spaceoddity.py')]
+    env = dict(os.environ, HOME=home_dir)
+    cpus = []
+    for _i in range(RUNS):
+        before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        subprocess.run(cmd, env=env, capture_output=True, check=True)
+        after = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpus.append(after.ru_utime + after.ru_stime - before.ru_utime -
+                    before.ru_stime)
+
+    # NB: ru_maxrss of the children is the biggest of them
+    rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return statistics.median(cpus), rss
+
+
+# --------------------------------------------------------------------------
+# Measure the daemon while it waits for the next apod
+# --------------------------------------------------------------------------
+def measure_daemon(src_dir, home_dir, seconds):
+
+    """
+        Measure the daemon while it waits for the next apod
+
+        Paramaters:
+            src_dir [str]: the dir holding the script
+            home_dir [str]: the HOME to run it with
+            seconds [float]: how long to watch it idle
+
+        Returns:
+            [tuple]: the cpu seconds used while idle [float] and its rss in
+            KiB [int]
+    """
+
+    # start it, and let it do its first run
+    cmd = [sys.executable, os.path.join(src_dir, 'spaceoddity.py'),
+           '--daemon']
+    env = dict(os.environ, HOME=home_dir)
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL)
+    try:
+        time.sleep(SETTLE_SECONDS)
+
+        # watch it idle
+        cpu_start = get_proc_cpu(proc.pid)
+        time.sleep(seconds)
+        cpu = get_proc_cpu(proc.pid) - cpu_start
+        rss = get_proc_rss(proc.pid)
+
+    finally:
+
+        # stop it
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+
+    # return the results
+    return cpu, rss
+
+
+# --------------------------------------------------------------------------
+# Get the cpu seconds a process has used
+# --------------------------------------------------------------------------
+def get_proc_cpu(pid):
+
+    """
+        Get the cpu seconds a process has used
+
+        Paramaters:
+            pid [int]: the process
+
+        Returns:
+            [float]: its user + system time
+    """
+
+    # NB: the name can have spaces in it, so split after it
+    with open(f'/proc/{pid}/stat', 'r') as file:
+        fields = file.read().rsplit(')', 1)[1].split()
+    ticks = int(fields[11]) + int(fields[12])
+    return ticks / os.sysconf('SC_CLK_TCK')
+
+
+# --------------------------------------------------------------------------
+# Get the resident memory of a process
+# --------------------------------------------------------------------------
+def get_proc_rss(pid):
+
+    """
+        Get the resident memory of a process
+
+        Paramaters:
+            pid [int]: the process
+
+        Returns:
+            [int]: its rss in KiB
+    """
+
+    with open(f'/proc/{pid}/status', 'r') as file:
+        for line in file:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+# --------------------------------------------------------------------------
+# Run the benchmark
+# --------------------------------------------------------------------------
+def run(argv=None):
+
+    """
+        Run the benchmark
+
+        Paramaters:
+            argv [list]: the command line options (None for sys.argv, so the
+                tests can call this too)
+
+        Returns:
+            [int]: 0 (this only measures, it has no baseline)
+    """
+
+    # get command line options
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=float, default=60,
+                        help='how long to watch the daemon idle')
+    args = parser.parse_args(argv)
+
+    # set up
+    src_dir, home_dir = make_sandbox()
+
+    # cron
+    tick_cpu, tick_rss = measure_cron(src_dir, home_dir)
+    print(f'cron tick (median of {RUNS}): cpu {tick_cpu * 1000:.1f} ms, '
+          f'max rss {tick_rss} KiB')
+    print(f'cron per day ({RUNS_PER_DAY} ticks): cpu '
+          f'{tick_cpu * RUNS_PER_DAY:.1f} s')
+
+    # daemon
+    idle_cpu, idle_rss = measure_daemon(src_dir, home_dir, args.seconds)
+    print(f'daemon idle ({args.seconds:.0f} s): cpu {idle_cpu * 1000:.1f} '
+          f'ms, rss {idle_rss} KiB')
+    print(f'daemon per day: cpu {idle_cpu * 86400 / args.seconds:.1f} s, '
+          f'{idle_rss} KiB held all day')
+
+    # clean up
+    shutil.rmtree(os.path.dirname(src_dir), ignore_errors=True)
+    return 0
+
+
+# ------------------------------------------------------------------------------
+# Run the main function if we are not an import
+# ------------------------------------------------------------------------------
+if __name__ == '__main__':
+    sys.exit(run())
+
+# -)
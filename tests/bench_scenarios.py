@@ -0,0 +1,240 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: bench_scenarios.py                                    |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+from apod_server import ApodServer, Scenario
+import argparse
+import harness
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# where the baseline lives
+BASELINE_PATH = os.path.join(harness.TESTS_DIR, 'bench_scenarios.json')
+
+# how many runs to time for each scenario
+RUNS = 5
+
+# a run this much slower (or bigger) than the baseline is a regression
+TOLERANCE = 1.5
+
+# NB: very short runs are mostly noise, so allow this much on top
+SLACK_MS = 15
+
+# each scenario: the server's behaviour, extra settings, and whether to do an
+# untimed run first (so the timed one sees a warm cache)
+SCENARIOS = {
+    'normal':           ({}, {}, False),
+    'not_modified':     ({}, {}, True),
+    'video':            ({'media_type': 'video'},
+                         {'general': {'video_thumbnails': 0}}, False),
+    'malformed_json':   ({'malformed': True}, {}, False),
+    'rate_limited':     ({'api_status': 429, 'retry_after': 60}, {}, False),
+    'api_error':        ({'api_status': 503}, {}, False),
+    'image_error':      ({'image_status': 503}, {}, False),
+    'truncated':        ({'truncate': 1024 * 1024}, {}, False),
+    'slow_api':         ({'latency': 0.1}, {}, False),
+    'capped':           ({'bandwidth': 32 * 1024 * 1024},
+                         {'network': {'probe_variants': 0}}, False),
+    'progressive':      ({'small_image': 64 * 1024,
+                          'bandwidth': 32 * 1024 * 1024},
+                         {'general': {'progressive': 1}}, False)
+}
+
+
+# --------------------------------------------------------------------------
+# Methods
+# --------------------------------------------------------------------------
+
+# --------------------------------------------------------------------------
+# Do one run of a scenario in a new home
+# --------------------------------------------------------------------------
+def run_once(server, conf_dict, prime, trace=False):
+
+    """
+        Do one run of a scenario in a new home
+
+        Paramaters:
+            server [ApodServer]: the running server (with the scenario set)
+            conf_dict [dict]: extra settings for make_main
+            prime [bool]: whether to do an untimed run first
+            trace [bool]: whether to measure peak memory
+
+        Returns:
+            [dict]: the wall time in ms, the peak memory in KiB (0 if not
+            traced), and the ms of each stage
+    """
+
+    # a new home for each run
+    home_dir = tempfile.mkdtemp(prefix='so_bench_')
+
+    try:
+
+        # warm up the cache with a well-behaved server
+        if prime:
+            scenario = server.scenario
+            server.scenario = Scenario()
+            main = harness.make_main(home_dir, server.api_url, conf_dict)
+            main.run()
+            harness.close_main(main)
+            server.scenario = scenario
+
+        # the timed run
+        main = harness.make_main(home_dir, server.api_url, conf_dict)
+        if trace:
+            tracemalloc.start()
+        start = time.perf_counter()
+        main.run()
+        wall_ms = (time.perf_counter() - start) * 1000
+        peak = 0
+        if trace:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        harness.close_main(main)
+
+        # get the stage timings
+        stages = harness.last_run(main).get('stages', {})
+        stage_ms = {name: record['seconds'] * 1000
+                    for name, record in stages.items()}
+
+    finally:
+        shutil.rmtree(home_dir, ignore_errors=True)
+
+    # return the results
+    return {'wall_ms': wall_ms, 'peak_kib': peak / 1024, 'stages': stage_ms}
+
+
+# --------------------------------------------------------------------------
+# Run one scenario several times
+# --------------------------------------------------------------------------
+def run_scenario(name):
+
+    """
+        Run one scenario several times
+
+        Paramaters:
+            name [str]: the key in SCENARIOS
+
+        Returns:
+            [dict]: the median run ms, the peak KiB and the median ms of
+            each stage
+    """
+
+    # start a server that behaves like the scenario
+    server_kw, conf_dict, prime = SCENARIOS[name]
+    server = ApodServer(Scenario(**server_kw)).start()
+
+    try:
+
+        # time the runs, then trace one for memory
+        # NB: tracing slows things down, so it is not timed
+        runs = [run_once(server, conf_dict, prime) for _i in range(RUNS)]
+        peak = run_once(server, conf_dict, prime, trace=True)['peak_kib']
+
+    finally:
+        server.stop()
+
+    # the median of each stage (over the runs that got to it)
+    stage_ms = {}
+    for run in runs:
+        for stage, ms in run['stages'].items():
+            stage_ms.setdefault(stage, []).append(ms)
+
+    # return the results
+    return {
+        'run_ms':   round(statistics.median(r['wall_ms'] for r in runs), 1),
+        'peak_kib': round(peak, 1),
+        'stages':   {stage: round(statistics.median(values), 1)
+                     for stage, values in stage_ms.items()}
+    }
+
+
+# --------------------------------------------------------------------------
+# Run the benchmark
+# --------------------------------------------------------------------------
+def run(argv=None):
+
+    """
+        Run the benchmark
+
+        Paramaters:
+            argv [list]: the command line options (None for sys.argv, so the
+                tests can call this too)
+
+        Returns:
+            [int]: 0 if everything passed, 1 if not
+    """
+
+    # get command line options
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--update', action='store_true',
+                        help='save the results as the new baseline')
+    parser.add_argument('scenarios', nargs='*', choices=[[]] + list(SCENARIOS),
+                        help='the scenarios to run (default: all)')
+    args = parser.parse_args(argv)
+
+    # load the baseline
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, 'r') as file:
+            baseline = json.load(file)
+
+    # run each scenario
+    res = 0
+    results = {}
+    for name in args.scenarios or SCENARIOS:
+        result = run_scenario(name)
+        results[name] = result
+        stages = ', '.join(f'{stage} {ms}' for stage, ms in
+                           result['stages'].items())
+        print(f'{name:16} {result["run_ms"]:8.1f} ms {result["peak_kib"]:9.1f}'
+              f' KiB   ({stages})')
+
+        # compare against the baseline
+        base = baseline.get(name)
+        if args.update or not base:
+            continue
+        if result['run_ms'] > base['run_ms'] * TOLERANCE + SLACK_MS:
+            print(f'FAIL: {name} run_ms {result["run_ms"]} > baseline '
+                  f'{base["run_ms"]} x {TOLERANCE} + {SLACK_MS}')
+            res = 1
+        if result['peak_kib'] > base['peak_kib'] * TOLERANCE:
+            print(f'FAIL: {name} peak_kib {result["peak_kib"]} > baseline '
+                  f'{base["peak_kib"]} x {TOLERANCE}')
+            res = 1
+
+    # save the new baseline (keeping scenarios we didn't run)
+    if args.update:
+        baseline.update(results)
+        with open(BASELINE_PATH, 'w') as file:
+            json.dump(baseline, file, indent=4)
+        print(f'saved baseline: {BASELINE_PATH}')
+
+    # return the result
+    return res
+
+
+# ------------------------------------------------------------------------------
+# Run the main function if we are not an import
+# ------------------------------------------------------------------------------
+if __name__ == '__main__':
+    sys.exit(run())
+
+# -)
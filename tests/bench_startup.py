@@ -0,0 +1,233 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: bench_startup.py                                      |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# where things are
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(TESTS_DIR), 'src')
+BASELINE_PATH = os.path.join(TESTS_DIR, 'bench_startup.json')
+
+# modules the no-change path must never import
+FORBIDDEN = ['gi', 'urllib.request', 'http.client', 'ssl', 'argparse']
+
+# how many cold starts to time
+RUNS = 20
+
+# a run this much slower than the baseline is a regression
+TOLERANCE = 1.5
+
+
+# --------------------------------------------------------------------------
+# Methods
+# --------------------------------------------------------------------------
+
+# --------------------------------------------------------------------------
+# Make a release-like copy of the script and a home with a current config
+# --------------------------------------------------------------------------
+def make_sandbox():
+
+    """
+        Make a release-like copy of the script and a home with a current config
+
+        Returns:
+            [tuple]: the script dir [str] and the home dir [str]
+
+        The script is copied with DEBUG = 0 (as in a release), and the config
+        says we already have today's apod, so every run takes the no-change
+        path.
+    """
+
+    # make the temp dirs
+    tmp_dir = tempfile.mkdtemp(prefix='so_bench_')
+    src_dir = os.path.join(tmp_dir, 'src')
+    home_dir = os.path.join(tmp_dir, 'home')
+    conf_dir = os.path.join(home_dir, '.config', 'spaceoddity')
+    shutil.copytree(SRC_DIR, src_dir)
+    os.makedirs(conf_dir)
+
+    # turn off DEBUG like a release does
+    script_path = os.path.join(src_dir, 'spaceoddity.py')
+    with open(script_path, 'r') as file:
+        text = file.read()
+    with open(script_path, 'w') as file:
+        file.write(text.replace('\nDEBUG = 1\n', '\nDEBUG = 0\n'))
+
+    # say we already have today's apod
+    today = datetime.now(ZoneInfo('America/New_York')).date().isoformat()
+    conf_dict = {'apod': {'date': today}}
+    with open(os.path.join(conf_dir, 'spaceoddity.cfg'), 'w') as file:
+        json.dump(conf_dict, file)
+
+    # return the dirs
+    return src_dir, home_dir
+
+
+# --------------------------------------------------------------------------
+# Run the script once
+# --------------------------------------------------------------------------
+def run_script(src_dir, home_dir, importtime=False):
+
+    """
+        Run the script once
+
+        Paramaters:
+            src_dir [str]: the dir holding the script
+            home_dir [str]: the HOME to run it with
+            importtime [bool]: whether to run with -X importtime
+
+        Returns:
+            [tuple]: the wall time in ms [float] and stderr [str]
+    """
+
+    # build the command
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ['-X', 'importtime']
+    cmd.append(os.path.join(src_dir, 'spaceoddity.py'))
+
+    # run it and time it
+    env = dict(os.environ, HOME=home_dir)
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, env=env, capture_output=True, text=True,
+                          check=True)
+    wall = (time.perf_counter() - start) * 1000
+
+    # return the results
+    return wall, proc.stderr
+
+
+# --------------------------------------------------------------------------
+# Parse -X importtime output
+# --------------------------------------------------------------------------
+def parse_importtime(stderr):
+
+    """
+        Parse -X importtime output
+
+        Paramaters:
+            stderr [str]: the stderr of a run with -X importtime
+
+        Returns:
+            [dict]: module name -> (self us, cumulative us)
+    """
+
+    # default return result
+    dict_res = {}
+
+    # each line is 'import time: self | cumulative | name'
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        parts = line[len('import time:'):].split('|')
+        name = parts[2].strip()
+        dict_res[name] = (int(parts[0]), int(parts[1]))
+
+    # return the result
+    return dict_res
+
+
+# --------------------------------------------------------------------------
+# Run the benchmark
+# --------------------------------------------------------------------------
+def run(argv=None):
+
+    """
+        Run the benchmark
+
+        Paramaters:
+            argv [list]: the command line options (None for sys.argv, so the
+                tests can call this too)
+
+        Returns:
+            [int]: 0 if everything passed, 1 if not
+    """
+
+    # get command line options
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--update', action='store_true',
+                        help='save the results as the new baseline')
+    args = parser.parse_args(argv)
+
+    # set up
+    src_dir, home_dir = make_sandbox()
+    res = 0
+
+    # check what the no-change path imports
+    _wall, stderr = run_script(src_dir, home_dir, importtime=True)
+    modules = parse_importtime(stderr)
+    import_us = sum(self_us for self_us, _cum in modules.values())
+    print(f'modules imported: {len(modules)}, total import time: '
+          f'{import_us / 1000:.1f} ms')
+
+    # show the slowest
+    print('slowest imports (cumulative):')
+    top = sorted(modules.items(), key=lambda item: item[1][1], reverse=True)
+    for name, (_self_us, cum_us) in top[:10]:
+        print(f'    {cum_us / 1000:7.1f} ms  {name}')
+
+    # check for forbidden modules
+    for name in FORBIDDEN:
+        if name in modules:
+            print(f'FAIL: no-change path imports {name}')
+            res = 1
+
+    # time some cold starts
+    walls = [run_script(src_dir, home_dir)[0] for _i in range(RUNS)]
+    cold_ms = statistics.median(walls)
+    print(f'cold start (median of {RUNS}): {cold_ms:.1f} ms')
+
+    # compare against the baseline
+    results = {'cold_start_ms': round(cold_ms, 1),
+               'import_ms': round(import_us / 1000, 1),
+               'modules': len(modules)}
+    if args.update:
+        with open(BASELINE_PATH, 'w') as file:
+            json.dump(results, file, indent=4)
+        print(f'saved baseline: {results}')
+    elif os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, 'r') as file:
+            baseline = json.load(file)
+        for key in ('cold_start_ms', 'import_ms'):
+            if results[key] > baseline[key] * TOLERANCE:
+                print(f'FAIL: {key} {results[key]} > baseline '
+                      f'{baseline[key]} x {TOLERANCE}')
+                res = 1
+
+    # clean up
+    shutil.rmtree(os.path.dirname(src_dir), ignore_errors=True)
+
+    # return the result
+    return res
+
+
+# ------------------------------------------------------------------------------
+# Run the main function if we are not an import
+# ------------------------------------------------------------------------------
+if __name__ == '__main__':
+    sys.exit(run())
+
+# -)
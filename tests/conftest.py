@@ -0,0 +1,61 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: conftest.py                                           |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+from apod_server import ApodServer, Scenario
+import harness
+import pytest
+
+
+# ------------------------------------------------------------------------------
+# A running stand-in server (change server.scenario to misbehave)
+# ------------------------------------------------------------------------------
+@pytest.fixture
+def server():
+
+    """
+        A running stand-in server (change server.scenario to misbehave)
+    """
+
+    apod_server = ApodServer(Scenario()).start()
+    yield apod_server
+    apod_server.stop()
+
+
+# ------------------------------------------------------------------------------
+# A function that makes Mains pointed at the server, in a temp home
+# ------------------------------------------------------------------------------
+@pytest.fixture
+def make_main(server, tmp_path):
+
+    """
+        A function that makes Mains pointed at the server, in a temp home
+
+        Every Main made shares the same home, so a second one sees what the
+        first left behind (like the next cron run would). Pass a home name
+        for a Main of another user.
+    """
+
+    mains = []
+
+    def _make_main(conf_dict=None, home=''):
+        home_dir = str(tmp_path / home) if home else str(tmp_path)
+        main = harness.make_main(home_dir, server.api_url, conf_dict)
+        mains.append(main)
+        return main
+
+    yield _make_main
+
+    # flush the logs
+    for main in mains:
+        harness.close_main(main)
+
+# -)
@@ -0,0 +1,150 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: harness.py                                            |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+import json
+import os
+import sys
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# where things are
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(TESTS_DIR), 'src')
+
+# the scripts import each other as siblings (like in ~/.spaceoddity)
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+import spaceoddity  # noqa: E402
+
+
+# ------------------------------------------------------------------------------
+# Make a Main that talks to a test server from a fake home dir
+# ------------------------------------------------------------------------------
+def make_main(home_dir, api_url, conf_dict=None):
+
+    """
+        Make a Main that talks to a test server from a fake home dir
+
+        Paramaters:
+            home_dir [str]: the HOME to use (the config goes in
+                .config/spaceoddity under it)
+            api_url [str]: the api url (see ApodServer.api_url)
+            conf_dict [dict]: any extra settings, by section
+
+        Returns:
+            [Main]: the Main (call close_main when done with it)
+
+        The config uses the memory backend, doesn't scale to the screen (so
+        GObject isn't needed), doesn't echo the log, and runs with DEBUG
+        off, like a release. The poll intervals are 0, so every run checks
+        the server (as long as the apod date is in the past), and there are
+        no retries inside a run, so failures don't sleep.
+    """
+
+    # the test settings
+    settings = {
+        'general':  {'backend': 'memory', 'scale_to_screen': 0},
+        'schedule': {'burst_interval': 0, 'slow_interval': 0},
+        'network':  {'apod_url': api_url, 'retries': 0},
+        'log':      {'echo': 0, 'level': 'debug'}
+    }
+    for section, section_dict in (conf_dict or {}).items():
+        settings.setdefault(section, {}).update(section_dict)
+
+    # write them (unless a config is already there)
+    conf_dir = os.path.join(home_dir, '.config', 'spaceoddity')
+    conf_path = os.path.join(conf_dir, 'spaceoddity.cfg')
+    os.makedirs(conf_dir, exist_ok=True)
+    if not os.path.exists(conf_path):
+        with open(conf_path, 'w') as file:
+            json.dump(settings, file)
+
+    # run like a release
+    spaceoddity.DEBUG = 0
+
+    # make the Main with our HOME
+    # NB: Main only looks at HOME when it is made
+    old_home = os.environ.get('HOME')
+    os.environ['HOME'] = home_dir
+    try:
+        main = spaceoddity.Main()
+    finally:
+        if old_home is None:
+            os.environ.pop('HOME')
+        else:
+            os.environ['HOME'] = old_home
+
+    # return the Main
+    return main
+
+
+# ------------------------------------------------------------------------------
+# Flush and detach a Main's log, and close its connections
+# ------------------------------------------------------------------------------
+def close_main(main):
+
+    """
+        Flush and detach a Main's log, and close its connections (and its
+        index)
+
+        Paramaters:
+            main [Main]: the Main from make_main
+    """
+
+    main.log_pipe.close()
+    if main.http_client is not None:
+        main.http_client.close()
+    if main.index is not None:
+        main.index.close()
+
+
+# ------------------------------------------------------------------------------
+# Get the metrics of a Main's last run
+# ------------------------------------------------------------------------------
+def last_run(main):
+
+    """
+        Get the metrics of a Main's last run
+
+        Paramaters:
+            main [Main]: the Main from make_main
+
+        Returns:
+            [dict]: the last line of metrics.jsonl, with the stages as a dict
+            by name (empty if no stage ran in the last run)
+    """
+
+    # no history yet
+    path = os.path.join(main.conf_dir, 'metrics.jsonl')
+    if not os.path.exists(path):
+        return {}
+
+    # get the last line
+    with open(path, 'r') as file:
+        lines = file.readlines()
+    dict_run = json.loads(lines[-1])
+
+    # it's from an earlier run
+    if dict_run['run_id'] != main.run_id:
+        return {}
+
+    # index the stages by name
+    dict_run['stages'] = {record['stage']: record
+                          for record in dict_run['stages']}
+
+    # return the run
+    return dict_run
+
+# -)
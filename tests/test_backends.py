@@ -0,0 +1,72 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: test_backends.py                                      |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+import os
+
+import pytest
+
+from backends import Backend, FileBackend, get_backend
+
+
+# ------------------------------------------------------------------------------
+# A backend missing a method can't be made
+# ------------------------------------------------------------------------------
+def test_abstract():
+
+    class HalfBackend(Backend):
+        def get(self):
+            return ''
+
+    with pytest.raises(TypeError):
+        HalfBackend()
+    with pytest.raises(TypeError):
+        Backend()
+
+
+# ------------------------------------------------------------------------------
+# The file backend only writes when the path changes
+# ------------------------------------------------------------------------------
+def test_file(tmp_path):
+
+    backend = get_backend('file', str(tmp_path))
+    assert isinstance(backend, FileBackend)
+    assert backend.get() == ''
+
+    assert backend.set('/a.jpg')
+    assert backend.get() == '/a.jpg'
+    mtime = os.stat(backend.file_path).st_mtime_ns
+
+    # the same path again writes nothing
+    assert not backend.set('/a.jpg')
+    assert os.stat(backend.file_path).st_mtime_ns == mtime
+    assert backend.set('/b.jpg')
+    assert backend.get() == '/b.jpg'
+
+
+# ------------------------------------------------------------------------------
+# The memory backend counts its writes
+# ------------------------------------------------------------------------------
+def test_memory(tmp_path):
+
+    backend = get_backend('memory', str(tmp_path))
+    assert backend.set('/a.jpg')
+    assert not backend.set('/a.jpg')
+    assert backend.writes == 1
+
+
+# ------------------------------------------------------------------------------
+# Unknown names are errors
+# ------------------------------------------------------------------------------
+def test_unknown(tmp_path):
+
+    with pytest.raises(ValueError):
+        get_backend('kde', str(tmp_path))
@@ -0,0 +1,38 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: test_benchmarks.py                                    |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+import bench_scenarios
+import bench_startup
+import pytest
+
+# NB: the baselines depend on the machine, so on new hardware record them
+# with --update first (see README.md), or skip these with -m 'not bench'
+
+
+# ------------------------------------------------------------------------------
+# The no-change path imports nothing heavy, and starts as fast as it did
+# ------------------------------------------------------------------------------
+@pytest.mark.bench
+def test_startup():
+
+    assert bench_startup.run([]) == 0
+
+
+# ------------------------------------------------------------------------------
+# No scenario is slower or bigger than it was
+# ------------------------------------------------------------------------------
+@pytest.mark.bench
+def test_scenarios():
+
+    assert bench_scenarios.run([]) == 0
+
+# -)
@@ -0,0 +1,99 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: test_captions.py                                      |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+import os
+
+import pytest
+
+from harness import last_run
+
+# NB: the server and make_main fixtures are in conftest.py
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# a real jpeg to caption
+TEST_JPG = os.path.join(os.path.dirname(__file__), 'test.jpg')
+
+
+# ------------------------------------------------------------------------------
+# Get the captions module, or skip if there is no GTK or pycairo
+# ------------------------------------------------------------------------------
+def get_captions():
+
+    """
+        Get the captions module, or skip if there is no GTK or pycairo
+
+        Returns:
+            [module]: captions
+    """
+
+    pytest.importorskip('gi')
+    pytest.importorskip('cairo')
+    import captions
+    return captions
+
+
+# ------------------------------------------------------------------------------
+# Captions are off by default
+# ------------------------------------------------------------------------------
+def test_off(server, make_main):
+
+    main = make_main()
+    main.run()
+
+    run = last_run(main)
+    assert run['stages']['caption']['outcome'] == 'unchanged'
+    assert main.backend.get() == main.conf_dict['files']['filepath']
+
+
+# ------------------------------------------------------------------------------
+# The text is drawn once, and reused for the same day and size
+# ------------------------------------------------------------------------------
+def test_cache(tmp_path):
+
+    captions = get_captions()
+    text = captions.get_caption_text({'title': 'A  Nebula\n',
+                                      'date': '2024-03-01',
+                                      'copyright': '\nSomeone'})
+    assert text == 'A Nebula\n2024-03-01  © Someone'
+
+    cap = captions.Captions(str(tmp_path / 'derived'),
+                            str(tmp_path / 'captions'))
+    path = cap.get(TEST_JPG, 'abc', text)
+    assert not cap.last_cached
+    assert os.path.basename(path).startswith('abc_')
+    assert len(os.listdir(tmp_path / 'captions')) == 1
+
+    # the same caption again
+    os.remove(path)
+    assert cap.get(TEST_JPG, 'abc', text) == path
+    assert cap.last_cached
+    assert len(os.listdir(tmp_path / 'captions')) == 1
+
+    # a new caption is a new layer
+    cap.get(TEST_JPG, 'abc', 'Another')
+    assert len(os.listdir(tmp_path / 'captions')) == 2
+
+
+# ------------------------------------------------------------------------------
+# A caption over budget is refused before the image is decoded
+# ------------------------------------------------------------------------------
+def test_budget(tmp_path):
+
+    captions = get_captions()
+    cap = captions.Captions(str(tmp_path / 'derived'),
+                            str(tmp_path / 'captions'), max_bytes=1024)
+    with pytest.raises(ValueError):
+        cap.get(TEST_JPG, 'abc', 'Title\n2024-03-01')
+    assert not os.listdir(tmp_path / 'derived')
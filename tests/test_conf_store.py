@@ -0,0 +1,134 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: test_conf_store.py                                    |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+import json
+
+import pytest
+
+from conf_store import ConfStore
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# the defaults (one settings section, one state section)
+DEFAULTS = {
+    'general':  {'enabled': 1, 'timeout': 10.0, 'backend': 'auto'},
+    'apod':     {'date': '', 'url': ''}
+}
+
+
+# ------------------------------------------------------------------------------
+# A store in a temp folder
+# ------------------------------------------------------------------------------
+@pytest.fixture
+def store(tmp_path):
+
+    """
+        A store in a temp folder
+    """
+
+    return ConfStore(str(tmp_path / 'conf.cfg'), str(tmp_path / 'state.json'),
+                     DEFAULTS, ['apod'])
+
+
+# ------------------------------------------------------------------------------
+# Write a json file
+# ------------------------------------------------------------------------------
+def write(path, data):
+
+    """
+        Write a json file
+
+        Paramaters:
+            path [str]: the file
+            data [object]: what to put in it
+    """
+
+    with open(path, 'w') as file:
+        json.dump(data, file)
+
+
+# ------------------------------------------------------------------------------
+# No files means defaults, written on the first save
+# ------------------------------------------------------------------------------
+def test_defaults(store):
+
+    assert store.load() == []
+    assert store.data == DEFAULTS
+    assert store.data is not DEFAULTS
+    assert sorted(store.save()) == sorted([store.conf_path, store.state_path])
+    assert store.save() == []
+
+
+# ------------------------------------------------------------------------------
+# Bad values are replaced by their defaults, and unknown keys are kept
+# ------------------------------------------------------------------------------
+def test_validate(store):
+
+    write(store.conf_path, {'general': {'enabled': 'yes', 'timeout': 5,
+                                        'backend': 'file', 'extra': 1}})
+    write(store.state_path, {'apod': 'not a section'})
+    problems = store.load()
+    assert len(problems) == 2
+    assert store.data['general'] == {'enabled': 1, 'timeout': 5,
+                                     'backend': 'file', 'extra': 1}
+    assert store.data['apod'] == DEFAULTS['apod']
+
+    # a float isn't an int, but true is
+    write(store.state_path, {})
+    write(store.conf_path, {'general': {'enabled': 1.5}})
+    assert len(store.load()) == 1
+    write(store.conf_path, {'general': {'enabled': True}})
+    assert store.load() == []
+
+
+# ------------------------------------------------------------------------------
+# A broken file is a problem, not a crash
+# ------------------------------------------------------------------------------
+def test_broken(store):
+
+    with open(store.conf_path, 'w') as file:
+        file.write('{')
+    assert len(store.load()) == 1
+    assert store.data == DEFAULTS
+
+
+# ------------------------------------------------------------------------------
+# State from an old all-in-one config moves to the state file
+# ------------------------------------------------------------------------------
+def test_migrate(store):
+
+    write(store.conf_path, {'general': {'enabled': 0},
+                            'apod': {'date': '2020-01-01'}})
+    assert store.load() == []
+    assert store.data['apod']['date'] == '2020-01-01'
+
+    # the next save moves it
+    assert sorted(store.save()) == sorted([store.conf_path, store.state_path])
+    with open(store.conf_path, 'r') as file:
+        assert 'apod' not in json.load(file)
+    with open(store.state_path, 'r') as file:
+        assert json.load(file)['apod']['date'] == '2020-01-01'
+
+
+# ------------------------------------------------------------------------------
+# Only the file with a changed key is written
+# ------------------------------------------------------------------------------
+def test_dirty(store):
+
+    store.load()
+    store.save()
+    store.data['apod']['date'] = '2026-01-01'
+    assert store.dirty_keys() == ['apod.date']
+    assert store.save() == [store.state_path]
+    assert store.dirty_keys() == []
@@ -0,0 +1,221 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: test_daemon.py                                        |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+import json
+import os
+import signal
+import threading
+
+from daemon import Daemon
+from harness import last_run
+import daemon
+import pytest
+
+# NB: the server and make_main fixtures are in conftest.py
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# the longest a test waits for the daemon to get somewhere
+TIMEOUT = 10
+
+# the shortest the daemon sleeps in a test
+# NB: a signal that comes just as the daemon goes to sleep is only seen by
+# python when the sleep is over, so this is how long it can be held up
+SLEEP = 0.2
+
+
+# ------------------------------------------------------------------------------
+# Shorten the daemon's sleep, and put back the signal handlers it replaces
+# ------------------------------------------------------------------------------
+@pytest.fixture(autouse=True)
+def signals(monkeypatch):
+
+    """
+        Shorten the daemon's sleep, and put back the signal handlers it
+        replaces
+    """
+
+    monkeypatch.setattr(daemon, 'MIN_SLEEP', SLEEP)
+    saved = {signum: signal.getsignal(signum) for signum in
+             (signal.SIGHUP, signal.SIGTERM, signal.SIGINT)}
+    yield
+    for signum, handler in saved.items():
+        signal.signal(signum, handler)
+
+
+# ------------------------------------------------------------------------------
+# Count the daemon's trips around its loop
+# ------------------------------------------------------------------------------
+def count_loops(main):
+
+    """
+        Count the daemon's trips around its loop
+
+        Paramaters:
+            main [Main]: the Main the daemon runs
+
+        Returns:
+            [list]: an Event for each trip, set when the daemon gets there
+            (i.e. asks how long to sleep)
+    """
+
+    loops = [threading.Event() for _i in range(10)]
+    calls = []
+    get_wait = main.get_wait
+
+    def counting_get_wait():
+        loops[min(len(calls), len(loops) - 1)].set()
+        calls.append(1)
+        return get_wait()
+
+    main.get_wait = counting_get_wait
+    return loops
+
+
+# ------------------------------------------------------------------------------
+# Send the daemon a signal once it gets somewhere
+# ------------------------------------------------------------------------------
+def send_at(event, signum):
+
+    """
+        Send the daemon a signal once it gets somewhere
+
+        Paramaters:
+            event [Event]: where the daemon has to get to
+            signum [int]: the signal to send
+
+        Returns:
+            [Thread]: the thread that sends it (join it before the test ends,
+            so the signal isn't sent after the handlers are put back)
+
+        NB: the signal is sent anyway after TIMEOUT, so a broken daemon
+        fails the test instead of hanging it
+    """
+
+    def wait_and_send():
+        event.wait(TIMEOUT)
+        os.kill(os.getpid(), signum)
+
+    thread = threading.Thread(target=wait_and_send, daemon=True)
+    thread.start()
+    return thread
+
+
+# ------------------------------------------------------------------------------
+# SIGHUP reloads the config before the next pass, SIGTERM stops the loop
+# ------------------------------------------------------------------------------
+def test_sighup(server, make_main):
+
+    main = make_main()
+    loops = count_loops(main)
+    reloads = []
+    reload = main.reload
+
+    def counting_reload():
+        reloads.append(1)
+        reload()
+
+    main.reload = counting_reload
+    passes = []
+    run_steps = main.run_steps
+
+    def counting_run_steps():
+        passes.append(1)
+        run_steps()
+
+    main.run_steps = counting_run_steps
+
+    # change the config once the daemon is asleep, then tell it
+    hup = threading.Event()
+
+    def edit():
+        loops[0].wait(TIMEOUT)
+        with open(main.conf_path, 'r') as file:
+            conf_dict = json.load(file)
+        conf_dict['slideshow']['seconds'] = 60
+        with open(main.conf_path, 'w') as file:
+            json.dump(conf_dict, file)
+        hup.set()
+
+    threads = [threading.Thread(target=edit, daemon=True),
+               send_at(hup, signal.SIGHUP), send_at(loops[1], signal.SIGTERM)]
+    threads[0].start()
+    Daemon(main).run()
+    for thread in threads:
+        thread.join()
+
+    # it reloaded once, did one more pass, and stopped without another
+    # NB: the first pass is the one main.run does before the loop
+    assert reloads == [1]
+    assert len(passes) == 2
+    assert main.conf_dict['slideshow']['seconds'] == 60
+    assert loops[1].is_set()
+    assert not loops[2].is_set()
+
+
+# ------------------------------------------------------------------------------
+# SIGTERM during a pass lets the pass finish, then stops
+# ------------------------------------------------------------------------------
+def test_sigterm_mid_pass(server, make_main):
+
+    main = make_main()
+    loops = count_loops(main)
+    passes = []
+    run_steps = main.run_steps
+
+    # NB: the first pass is the one main.run does before the loop
+    def terminated_run_steps():
+        if passes:
+            os.kill(os.getpid(), signal.SIGTERM)
+        run_steps()
+        passes.append(last_run(main))
+
+    main.run_steps = terminated_run_steps
+    Daemon(main).run()
+
+    # the pass the signal came in ran to the end, and no more started
+    assert len(passes) == 2
+    assert passes[1]['stages']
+    assert not loops[1].is_set()
+
+
+# ------------------------------------------------------------------------------
+# A pass that fails is logged, and the daemon carries on
+# ------------------------------------------------------------------------------
+def test_failing_pass(server, make_main, caplog):
+
+    main = make_main()
+    loops = count_loops(main)
+    passes = []
+    run_steps = main.run_steps
+
+    # NB: the first pass is the one main.run does before the loop
+    def failing_run_steps():
+        passes.append(1)
+        if len(passes) == 1:
+            run_steps()
+            return
+        raise RuntimeError('boom')
+
+    main.run_steps = failing_run_steps
+    thread = send_at(loops[3], signal.SIGTERM)
+    Daemon(main).run()
+    thread.join()
+
+    # it got back round the loop after each failure, and logged them
+    assert loops[3].is_set()
+    assert len(passes) >= 4
+    assert caplog.text.count('boom') >= 3
+
+# -)
@@ -0,0 +1,67 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: test_derivatives.py                                   |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+import os
+
+import pytest
+
+# NB: derivatives needs GTK, so skip if it isn't there
+pytest.importorskip('gi')
+
+from derivatives import Derivatives  # noqa: E402
+from gi.repository import GdkPixbuf  # noqa: E402
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# a real 2400x1600 jpeg
+TEST_JPG = os.path.join(os.path.dirname(__file__), 'test.jpg')
+
+
+# ------------------------------------------------------------------------------
+# A smaller screen gets a cropped copy, made once
+# ------------------------------------------------------------------------------
+def test_get(tmp_path):
+
+    derivs = Derivatives(str(tmp_path))
+    path = derivs.get(TEST_JPG, 'abc', 1280, 1024)
+    assert os.path.basename(path) == 'abc_1280x1024.jpg'
+    _format, width, height = GdkPixbuf.Pixbuf.get_file_info(path)
+    assert (width, height) == (1280, 1024)
+
+    # the second time it is just looked up
+    mtime = os.path.getmtime(path)
+    assert derivs.get(TEST_JPG, 'abc', 1280, 1024) == path
+    assert os.path.getmtime(path) == mtime
+
+
+# ------------------------------------------------------------------------------
+# A bigger screen uses the source as it is
+# ------------------------------------------------------------------------------
+def test_bigger_screen(tmp_path):
+
+    derivs = Derivatives(str(tmp_path))
+    assert derivs.get(TEST_JPG, 'abc', 3840, 2160) == TEST_JPG
+    assert not os.listdir(tmp_path)
+
+
+# ------------------------------------------------------------------------------
+# Derivatives of sources that are gone are removed
+# ------------------------------------------------------------------------------
+def test_collect_garbage(tmp_path):
+
+    derivs = Derivatives(str(tmp_path))
+    for name in ('keep_1x1.jpg', 'keep_2x2.jpg', 'gone_1x1.jpg'):
+        (tmp_path / name).write_bytes(b'x')
+    assert derivs.collect_garbage(['keep']) == [str(tmp_path / 'gone_1x1.jpg')]
+    assert sorted(os.listdir(tmp_path)) == ['keep_1x1.jpg', 'keep_2x2.jpg']
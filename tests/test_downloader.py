@@ -0,0 +1,147 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: test_downloader.py                                    |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+import glob
+import hashlib
+import json
+import os
+
+from downloader import DownloadError, Downloader
+from http_client import HTTPClient
+import pytest
+
+# NB: the server fixture is in conftest.py
+
+
+# ------------------------------------------------------------------------------
+# A client that is closed after the test
+# ------------------------------------------------------------------------------
+@pytest.fixture
+def http_client():
+
+    """
+        A client that is closed after the test
+    """
+
+    client = HTTPClient(connect_timeout=5, read_timeout=5)
+    yield client
+    client.close()
+
+
+# ------------------------------------------------------------------------------
+# A download cut off in one run is finished by the next
+# ------------------------------------------------------------------------------
+def test_resume(server, http_client, tmp_path):
+
+    url = f'{server.base_url}/image/2026-01-01_hd.jpg'
+    dst_path = str(tmp_path / 'image.jpg')
+
+    # the first run gets half
+    server.scenario.truncate = len(server.image) // 2
+    with pytest.raises(DownloadError):
+        Downloader(str(tmp_path), http_client, retries=1).download(url,
+                                                                   dst_path)
+    assert not os.path.exists(dst_path)
+    parts = glob.glob(str(tmp_path / '*.part'))
+    assert len(parts) == 1
+    assert os.path.exists(parts[0] + '.json')
+
+    # the next run (a new downloader) only gets the rest
+    server.scenario.truncate = 0
+    downloader = Downloader(str(tmp_path), http_client, retries=1)
+    sha = downloader.download(url, dst_path)
+    assert downloader.last_status == 206
+    assert downloader.last_bytes == len(server.image) // 2 + \
+        len(server.image) % 2
+    assert sha == hashlib.sha256(server.image).hexdigest()
+    with open(dst_path, 'rb') as file:
+        assert file.read() == server.image
+    assert not glob.glob(str(tmp_path / '*.part*'))
+
+
+# ------------------------------------------------------------------------------
+# Cut off a download halfway, leaving its part file
+# ------------------------------------------------------------------------------
+def download_half(server, http_client, tmp_path, url):
+
+    """
+        Cut off a download halfway, leaving its part file
+
+        Paramaters:
+            server [ApodServer]: the server
+            http_client [HTTPClient]: the client to download with
+            tmp_path [Path]: the folder for the part file
+            url [str]: the url to download
+
+        Returns:
+            [str]: the path of the part file's resume info
+    """
+
+    server.scenario.truncate = len(server.image) // 2
+    with pytest.raises(DownloadError):
+        Downloader(str(tmp_path), http_client, retries=1).download(
+            url, str(tmp_path / 'image.jpg'))
+    server.scenario.truncate = 0
+    return glob.glob(str(tmp_path / '*.part.json'))[0]
+
+
+# ------------------------------------------------------------------------------
+# A part of a different file isn't spliced onto the one we started
+# ------------------------------------------------------------------------------
+def test_resume_changed(server, http_client, tmp_path):
+
+    url = f'{server.base_url}/image/2026-01-01_hd.jpg'
+    dst_path = str(tmp_path / 'image.jpg')
+    download_half(server, http_client, tmp_path, url)
+
+    # the image changes, and the server ignores If-Range
+    server.image = server.image[:1000] + bytes(len(server.image))
+    downloader = Downloader(str(tmp_path), http_client, retries=1)
+    sha = downloader.download(url, dst_path)
+    assert downloader.last_status == 200
+    assert sha == hashlib.sha256(server.image).hexdigest()
+    with open(dst_path, 'rb') as file:
+        assert file.read() == server.image
+
+
+# ------------------------------------------------------------------------------
+# A part file with nothing to check it against is started over
+# ------------------------------------------------------------------------------
+def test_resume_no_validator(server, http_client, tmp_path):
+
+    url = f'{server.base_url}/image/2026-01-01_hd.jpg'
+    meta_path = download_half(server, http_client, tmp_path, url)
+    with open(meta_path, 'w') as file:
+        json.dump({'url': url, 'validator': ''}, file)
+
+    count = len(server.requests)
+    downloader = Downloader(str(tmp_path), http_client, retries=1)
+    downloader.download(url, str(tmp_path / 'image.jpg'))
+    assert downloader.last_status == 200
+    assert downloader.last_bytes == len(server.image)
+    assert len(server.requests) == count + 1
+
+
+# ------------------------------------------------------------------------------
+# A status that won't get better isn't retried
+# ------------------------------------------------------------------------------
+def test_not_found(server, http_client, tmp_path):
+
+    server.scenario.image_status = 404
+    url = f'{server.base_url}/image/2026-01-01_hd.jpg'
+    count = len(server.requests)
+    with pytest.raises(DownloadError) as info:
+        Downloader(str(tmp_path), http_client, retries=3,
+                   sleep=lambda _seconds: None).download(
+                       url, str(tmp_path / 'image.jpg'))
+    assert info.value.status == 404
+    assert len(server.requests) == count + 1
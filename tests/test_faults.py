@@ -0,0 +1,579 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: test_faults.py                                        |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import glob
+import json
+import os
+import time
+
+from harness import last_run
+from image_store import ImageStore
+from run_guard import RunLock
+import backends
+import pytest
+import spaceoddity
+
+# NB: the server and make_main fixtures are in conftest.py
+
+
+# ------------------------------------------------------------------------------
+# A normal day sets the wallpaper
+# ------------------------------------------------------------------------------
+def test_normal_day(server, make_main):
+
+    main = make_main()
+    main.run()
+
+    # the wallpaper is the stored image
+    run = last_run(main)
+    assert run['stages']['apod']['outcome'] == 'changed'
+    assert run['stages']['apod']['status'] == 200
+    assert run['stages']['image']['outcome'] == 'changed'
+    assert run['stages']['image']['bytes'] == len(server.image)
+    assert run['stages']['set']['outcome'] == 'changed'
+    assert main.backend.get() == main.conf_dict['files']['filepath']
+    assert os.path.getsize(main.backend.get()) == len(server.image)
+
+
+# ------------------------------------------------------------------------------
+# An unchanged apod is a 304 and nothing else
+# ------------------------------------------------------------------------------
+def test_not_modified(server, make_main):
+
+    make_main().run()
+
+    # the next run revalidates and stops
+    main = make_main()
+    count = len(server.requests)
+    main.run()
+    run = last_run(main)
+    assert run['stages']['apod']['status'] == 304
+    assert run['stages']['apod']['outcome'] == 'unchanged'
+    assert list(run['stages']) == ['apod', 'prepare', 'index']
+    assert len(server.requests) == count + 1
+
+
+# ------------------------------------------------------------------------------
+# Debugging still revalidates, instead of forcing a full get
+# ------------------------------------------------------------------------------
+def test_not_modified_debug(server, make_main, monkeypatch):
+
+    make_main().run()
+
+    main = make_main()
+    monkeypatch.setattr(spaceoddity, 'DEBUG', 1)
+    main.run()
+    run = last_run(main)
+    assert run['stages']['apod']['status'] == 304
+    assert run['stages']['apod']['outcome'] == 'unchanged'
+
+
+# ------------------------------------------------------------------------------
+# A video day (without thumbnails) doesn't change the wallpaper
+# ------------------------------------------------------------------------------
+def test_video_day(server, make_main):
+
+    server.scenario.media_type = 'video'
+    conf_dict = {'general': {'video_thumbnails': 0}}
+    main = make_main(conf_dict)
+    main.run()
+
+    run = last_run(main)
+    assert run['stages']['image']['outcome'] == 'video'
+    assert main.backend.writes == 0
+    assert main.conf_dict['run']['no_image'] == server.scenario.date
+
+
+# ------------------------------------------------------------------------------
+# A video day uses its thumbnail
+# ------------------------------------------------------------------------------
+def test_video_thumbnail(server, make_main):
+
+    server.scenario.media_type = 'video'
+    main = make_main()
+    main.run()
+
+    run = last_run(main)
+    assert run['stages']['set']['outcome'] == 'changed'
+    assert main.conf_dict['run']['variant'] == 'thumbnail_url'
+    assert [path for path in server.requests if 'thumbs=True' in path]
+    assert [path for path in server.requests if path.endswith('_thumb.jpg')]
+
+
+# ------------------------------------------------------------------------------
+# Once a date has no image, later runs that day don't go to the network
+# ------------------------------------------------------------------------------
+def test_no_image_remembered(server, make_main, monkeypatch):
+
+    # today's video, with nothing to show
+    today = datetime.now(ZoneInfo('America/New_York')).date().isoformat()
+    server.scenario.date = today
+    server.scenario.media_type = 'video'
+    conf_dict = {'general': {'video_thumbnails': 0}}
+    make_main(conf_dict).run()
+    count = len(server.requests)
+
+    # even when debugging
+    main = make_main(conf_dict)
+    monkeypatch.setattr(spaceoddity, 'DEBUG', 1)
+    main.run()
+    assert len(server.requests) == count
+    assert last_run(main) == {}
+
+
+# ------------------------------------------------------------------------------
+# A run soon after a check doesn't go to the network, even when debugging
+# ------------------------------------------------------------------------------
+def test_not_due_debug(server, make_main, monkeypatch):
+
+    conf_dict = {'schedule': {'burst_interval': 2, 'slow_interval': 30}}
+    make_main(conf_dict).run()
+    count = len(server.requests)
+
+    main = make_main(conf_dict)
+    monkeypatch.setattr(spaceoddity, 'DEBUG', 1)
+    main.run()
+    assert len(server.requests) == count
+    assert last_run(main) == {}
+    assert main.get_wait() > 0
+
+
+# ------------------------------------------------------------------------------
+# Broken json is an error, and nothing is set
+# ------------------------------------------------------------------------------
+def test_malformed_json(server, make_main):
+
+    server.scenario.malformed = True
+    main = make_main()
+    main.run()
+
+    run = last_run(main)
+    assert run['stages']['apod']['outcome'] == 'error'
+    assert list(run['stages']) == ['apod', 'prepare', 'index']
+    assert main.backend.writes == 0
+
+
+# ------------------------------------------------------------------------------
+# Rate limits and server errors from the api are errors
+# ------------------------------------------------------------------------------
+@pytest.mark.parametrize('status', [429, 500, 503])
+def test_api_errors(server, make_main, status):
+
+    server.scenario.api_status = status
+    main = make_main()
+    main.run()
+
+    run = last_run(main)
+    assert run['stages']['apod']['outcome'] == 'error'
+    assert run['stages']['apod']['status'] == status
+
+
+# ------------------------------------------------------------------------------
+# After an api failure, the next run doesn't ask until the cool-down is over
+# ------------------------------------------------------------------------------
+def test_api_cooldown(server, make_main):
+
+    server.scenario.api_status = 503
+    make_main().run()
+    count = len(server.requests)
+
+    # the server is fine now, but we are cooling down
+    server.scenario.api_status = 0
+    main = make_main()
+    main.run()
+    assert len(server.requests) == count
+    assert main.backend.writes == 0
+    assert main.gate.wait('api') > 0
+
+
+# ------------------------------------------------------------------------------
+# Debugging doesn't skip the cool-down or the quota
+# ------------------------------------------------------------------------------
+@pytest.mark.parametrize('fault', ['cooldown', 'quota'])
+def test_api_gate_debug(server, make_main, monkeypatch, fault):
+
+    # fail, or use up the quota
+    if fault == 'cooldown':
+        server.scenario.api_status = 503
+    else:
+        server.scenario.rate_remaining = 5
+    make_main().run()
+    count = len(server.requests)
+
+    # a debug run still waits
+    server.scenario.api_status = 0
+    main = make_main()
+    monkeypatch.setattr(spaceoddity, 'DEBUG', 1)
+    main.run()
+    assert len(server.requests) == count
+    assert last_run(main)['stages']['apod']['outcome'] == 'unchanged'
+
+
+# ------------------------------------------------------------------------------
+# A failure that goes away is retried inside the run
+# ------------------------------------------------------------------------------
+def test_api_retry(server, make_main):
+
+    server.scenario.api_status = 503
+    server.scenario.fail_count = 1
+    main = make_main({'network': {'retries': 1}})
+    main.run()
+
+    run = last_run(main)
+    assert run['stages']['apod']['status'] == 200
+    assert run['stages']['set']['outcome'] == 'changed'
+    assert main.gate.wait('api') == 0
+
+
+# ------------------------------------------------------------------------------
+# A long Retry-After isn't waited for inside the run, it sets the cool-down
+# ------------------------------------------------------------------------------
+def test_retry_after(server, make_main):
+
+    server.scenario.api_status = 429
+    server.scenario.retry_after = 3600
+    main = make_main({'network': {'retries': 2}})
+    main.run()
+
+    assert len(server.requests) == 1
+    assert main.gate.wait('api') > 3500
+
+
+# ------------------------------------------------------------------------------
+# A low quota stops the next call
+# ------------------------------------------------------------------------------
+def test_quota(server, make_main):
+
+    server.scenario.rate_remaining = 5
+    main = make_main()
+    main.run()
+
+    # that one worked, but the next has to wait for the window
+    assert main.backend.get()
+    allowed, reason = main.gate.allowed('api')
+    assert not allowed
+    assert 'quota' in reason
+
+
+# ------------------------------------------------------------------------------
+# An image host error is an error, and nothing is set
+# ------------------------------------------------------------------------------
+def test_image_error(server, make_main):
+
+    server.scenario.image_status = 503
+    main = make_main()
+    main.run()
+
+    run = last_run(main)
+    assert run['stages']['image']['outcome'] == 'error'
+    assert run['stages']['image']['status'] == 503
+    assert 'set' not in run['stages']
+
+
+# ------------------------------------------------------------------------------
+# A dropped connection never sets a partial image
+# ------------------------------------------------------------------------------
+def test_truncated_image(server, make_main):
+
+    server.scenario.truncate = len(server.image) // 2
+    main = make_main()
+    main.run()
+
+    # the image failed, and what we got is kept for resuming
+    run = last_run(main)
+    assert run['stages']['image']['outcome'] == 'error'
+    assert 'set' not in run['stages']
+    parts = glob.glob(os.path.join(main.store_dir, '*.part'))
+    assert len(parts) == 1
+    assert os.path.getsize(parts[0]) == server.scenario.truncate
+
+
+# ------------------------------------------------------------------------------
+# A failed image is retried (and resumed) without asking the api again
+# ------------------------------------------------------------------------------
+def test_truncated_image_resumes(server, make_main):
+
+    # today's apod, so the scheduler alone wouldn't run again
+    today = datetime.now(ZoneInfo('America/New_York')).date().isoformat()
+    server.scenario.date = today
+    server.scenario.truncate = len(server.image) // 2
+    conf_dict = {'network': {'cooldown_minutes': 0}}
+    make_main(conf_dict).run()
+
+    # the next run only gets the rest of the image
+    rest = len(server.image) - server.scenario.truncate
+    server.scenario.truncate = 0
+    count = len(server.requests)
+    main = make_main(conf_dict)
+    main.run()
+
+    run = last_run(main)
+    assert run['stages']['apod']['outcome'] == 'unchanged'
+    assert run['stages']['image']['bytes'] == rest
+    assert run['stages']['set']['outcome'] == 'changed'
+    assert not [path for path in server.requests[count:]
+                if 'planetary' in path]
+    assert main.conf_dict['run']['pending'] == 0
+
+
+# ------------------------------------------------------------------------------
+# Latency and bandwidth show up in the stage timings
+# ------------------------------------------------------------------------------
+def test_slow_server(server, make_main):
+
+    server.scenario.latency = 0.2
+    server.scenario.bandwidth = 20 * 1024 * 1024
+    main = make_main({'network': {'probe_variants': 0}})
+    main.run()
+
+    run = last_run(main)
+    assert run['stages']['apod']['seconds'] >= 0.2
+    min_secs = 0.2 + len(server.image) / server.scenario.bandwidth
+    assert run['stages']['image']['seconds'] >= min_secs * 0.9
+    assert run['stages']['set']['outcome'] == 'changed'
+
+
+# ------------------------------------------------------------------------------
+# Work that needs no network runs while the network is busy
+# ------------------------------------------------------------------------------
+def test_overlapping_stages(server, make_main, monkeypatch):
+
+    # a slow backend (i.e. GObject loading) and a slow api
+    def slow_get(self):
+        time.sleep(0.2)
+        return self.path
+    monkeypatch.setattr(backends.MemoryBackend, 'get', slow_get)
+    server.scenario.latency = 0.3
+    main = make_main({'network': {'probe_variants': 0}})
+    main.run()
+
+    # the backend was read while the apod downloaded
+    run = last_run(main)
+    apod = run['stages']['apod']
+    prepare = run['stages']['prepare']
+    assert prepare['start'] < apod['start'] + apod['seconds']
+    # NB: each time is rounded to 0.1 ms, so allow for that
+    end = apod['start'] + apod['seconds']
+    assert run['stages']['image']['start'] >= end - 1e-3
+    assert run['stages']['set']['outcome'] == 'changed'
+
+    # so the run took less than its stages added up
+    total = sum(record['seconds'] for record in run['stages'].values())
+    assert run['seconds'] < total - 0.1
+
+
+# ------------------------------------------------------------------------------
+# Progressive mode sets the small image first, then swaps in the full one
+# ------------------------------------------------------------------------------
+def test_progressive(server, make_main):
+
+    server.scenario.small_image = 64 * 1024
+    server.scenario.bandwidth = 8 * 1024 * 1024
+    main = make_main({'general': {'progressive': 1}})
+    main.run()
+
+    run = last_run(main)
+    assert run['stages']['set']['outcome'] == 'changed'
+    assert run['stages']['upgrade']['outcome'] == 'changed'
+    assert run['first_paint'] < run['final_paint'] / 2
+    with open(main.backend.get(), 'rb') as file:
+        assert file.read() == server.image
+    assert main.conf_dict['run']['variant'] == 'hdurl'
+    assert main.conf_dict['run']['pending'] == 0
+
+
+# ------------------------------------------------------------------------------
+# If the full image fails, the small one stays and the next run swaps it in
+# ------------------------------------------------------------------------------
+def test_progressive_retry(server, make_main):
+
+    server.scenario.small_image = 64 * 1024
+    server.scenario.truncate = 1024 * 1024
+    conf_dict = {'general': {'progressive': 1},
+                 'network': {'cooldown_minutes': 0}}
+    main = make_main(conf_dict)
+    main.run()
+
+    run = last_run(main)
+    assert run['stages']['set']['outcome'] == 'changed'
+    assert run['stages']['upgrade']['outcome'] == 'error'
+    assert os.path.getsize(main.backend.get()) == 64 * 1024
+    assert main.conf_dict['run']['pending'] == 1
+
+    # the next run only gets the rest of it
+    server.scenario.truncate = 0
+    main = make_main(conf_dict)
+    main.run()
+    run = last_run(main)
+    assert run['stages']['upgrade']['outcome'] == 'changed'
+    assert run['stages']['upgrade']['bytes'] == len(server.image) - 1024 * 1024
+    assert main.conf_dict['run']['pending'] == 0
+
+
+# ------------------------------------------------------------------------------
+# A run that is out of time stops the download, and the next one resumes it
+# ------------------------------------------------------------------------------
+def test_run_timeout(server, make_main):
+
+    server.scenario.bandwidth = 1024 * 1024
+    conf_dict = {'general': {'run_timeout': 1.0},
+                 'network': {'probe_variants': 0, 'cooldown_minutes': 0}}
+    main = make_main(conf_dict)
+    start = time.monotonic()
+    main.run()
+
+    # it gave up at the deadline, not when the image was done
+    assert time.monotonic() - start < 2
+    run = last_run(main)
+    assert run['stages']['image']['outcome'] == 'error'
+    assert 'set' not in run['stages']
+    assert main.conf_dict['run']['pending'] == 1
+
+    # the next run only gets the rest
+    got = run['stages']['image']['bytes']
+    server.scenario.bandwidth = 0
+    main = make_main(conf_dict)
+    main.run()
+    run = last_run(main)
+    assert run['stages']['image']['bytes'] == len(server.image) - got
+    assert run['stages']['set']['outcome'] == 'changed'
+
+
+# ------------------------------------------------------------------------------
+# A run doesn't start while another one has the lock
+# ------------------------------------------------------------------------------
+def test_overlapping_runs(server, make_main):
+
+    main = make_main()
+    other = RunLock(main.run_lock.lock_path)
+    assert other.acquire()
+    try:
+        main.run()
+    finally:
+        other.release()
+
+    assert not server.requests
+    assert last_run(main) == {}
+
+    # and runs once the lock is free
+    main.run()
+    assert last_run(main)['stages']['set']['outcome'] == 'changed'
+
+
+# ------------------------------------------------------------------------------
+# A daemon that starts while a cron run has the lock still uses the config
+# ------------------------------------------------------------------------------
+def test_daemon_starts_locked(server, make_main):
+
+    main = make_main()
+    other = RunLock(main.run_lock.lock_path)
+    assert other.acquire()
+    try:
+        main.run()
+    finally:
+        other.release()
+
+    # the daemon's next pass runs with (and keeps) the user's settings
+    main.run_steps()
+    assert last_run(main)['stages']['set']['outcome'] == 'changed'
+    with open(main.conf_path, 'r') as file:
+        conf_dict = json.load(file)
+    assert conf_dict['network']['apod_url'] == server.api_url
+    assert conf_dict['general']['backend'] == 'memory'
+
+
+# ------------------------------------------------------------------------------
+# Backfill gets a range of dates from the api
+# ------------------------------------------------------------------------------
+def test_backfill(server, make_main):
+
+    main = make_main({'store': {'max_count': 0, 'max_megabytes': 0}})
+    main.backfill('2026-01-01', '2026-01-03')
+
+    # one request for the json and one for each image
+    api = [path for path in server.requests if 'start_date' in path]
+    images = [path for path in server.requests if '/image/' in path]
+    assert len(api) == 1
+    assert len(images) == 3
+
+
+# ------------------------------------------------------------------------------
+# Backfilling days we already have doesn't mark them used, or save each one
+# ------------------------------------------------------------------------------
+def test_backfill_again(server, make_main, monkeypatch):
+
+    # NB: the server sends the same image for every day, and the store
+    # maps an image to one url, so use one day
+    conf_dict = {'store': {'max_count': 0, 'max_megabytes': 0}}
+    main = make_main(conf_dict)
+    main.backfill('2026-01-01', '2026-01-01')
+    with open(os.path.join(main.store_dir, 'index.json'), 'r') as file:
+        before = json.load(file)
+
+    # count the index writes
+    saves = []
+    save = ImageStore.save
+
+    def counting_save(self, *args, **kwargs):
+        saves.append(1)
+        return save(self, *args, **kwargs)
+
+    monkeypatch.setattr(ImageStore, 'save', counting_save)
+
+    # nothing new, one write at the end, and the lru order is as it was
+    count = len(server.requests)
+    main = make_main(conf_dict)
+    main.backfill('2026-01-01', '2026-01-01')
+    assert not [path for path in server.requests[count:] if '/image/' in path]
+    assert len(saves) == 1
+    assert main.store.index_dict == before
+
+
+# ------------------------------------------------------------------------------
+# A backfill the next run would evict is refused
+# ------------------------------------------------------------------------------
+def test_backfill_refused(server, make_main):
+
+    main = make_main({'store': {'max_count': 2, 'max_megabytes': 0}})
+    main.backfill('2026-01-01', '2026-01-03')
+    assert not [path for path in server.requests if '/image/' in path]
+
+
+# ------------------------------------------------------------------------------
+# A kept backfill survives the next run's eviction
+# ------------------------------------------------------------------------------
+def test_backfill_keep(server, make_main):
+
+    # NB: the server sends the same image for every day, so it is stored once
+    conf_dict = {'store': {'max_count': 1, 'max_megabytes': 0}}
+    main = make_main(conf_dict)
+    main.backfill('2025-01-01', '2025-01-03', keep=True)
+    kept = glob.glob(os.path.join(main.store_dir, '*.jpg'))
+    assert len(kept) == 1
+
+    # two more images that aren't kept
+    store = ImageStore(main.store_dir, 0, 0)
+    for i in range(2):
+        src_path = os.path.join(main.conf_dir, 'incoming.jpg')
+        with open(src_path, 'wb') as file:
+            file.write(f'image {i}'.encode('ascii'))
+        store.add(src_path, ImageStore.hash_file(src_path), 'jpg')
+
+    # the next run trims those, but not the kept one
+    main = make_main(conf_dict)
+    main.run()
+    assert os.path.exists(kept[0])
+    assert len(glob.glob(os.path.join(main.store_dir, '*.jpg'))) == 2
+
+# -)
@@ -0,0 +1,253 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: test_http_cache.py                                    |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+from email.message import Message
+from email.utils import formatdate
+import time
+
+from http_cache import HTTPCache
+from http_client import HTTPClient
+import pytest
+
+# NB: the server fixture is in conftest.py
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# the url the canned client answers
+URL = 'http://x/apod'
+
+# the body it sends
+BODY = b'{"date": "2026-01-01"}'
+
+
+# ------------------------------------------------------------------------------
+# A response with canned headers
+# ------------------------------------------------------------------------------
+class CannedResponse:
+
+    """
+        A response with canned headers
+
+        It has the parts of http_client.Response that HTTPCache uses.
+    """
+
+    # --------------------------------------------------------------------------
+    # Initialize the class
+    # --------------------------------------------------------------------------
+    def __init__(self, headers):
+
+        """
+            Initialize the class
+
+            Paramaters:
+                headers [dict]: the response headers
+        """
+
+        self.status = 200
+        self.headers = Message()
+        for key, val in headers.items():
+            self.headers[key] = val
+
+    # --------------------------------------------------------------------------
+    # Read the body
+    # --------------------------------------------------------------------------
+    def read(self):
+
+        """
+            Read the body
+
+            Returns:
+                [bytes]: the body
+        """
+
+        return BODY
+
+    # --------------------------------------------------------------------------
+    # Use as a context manager
+    # --------------------------------------------------------------------------
+    def __enter__(self):
+
+        """
+            Use as a context manager
+
+            Returns:
+                [CannedResponse]: self
+        """
+
+        return self
+
+    # --------------------------------------------------------------------------
+    # Leave the context manager
+    # --------------------------------------------------------------------------
+    def __exit__(self, *args):
+
+        """
+            Leave the context manager
+
+            Paramaters:
+                args [list]: the exception info, if any
+        """
+
+
+# ------------------------------------------------------------------------------
+# A client that always sends the same headers
+# ------------------------------------------------------------------------------
+class CannedClient:
+
+    """
+        A client that always sends the same headers
+    """
+
+    # --------------------------------------------------------------------------
+    # Initialize the class
+    # --------------------------------------------------------------------------
+    def __init__(self, headers):
+
+        """
+            Initialize the class
+
+            Paramaters:
+                headers [dict]: the response headers
+        """
+
+        self.headers = headers
+
+    # --------------------------------------------------------------------------
+    # Get a url
+    # --------------------------------------------------------------------------
+    def open(self, url, headers=None, gzip=False):
+
+        """
+            Get a url
+
+            Paramaters:
+                url [str]: the url
+                headers [dict]: the request headers (ignored)
+                gzip [bool]: whether to ask for gzip (ignored)
+
+            Returns:
+                [CannedResponse]: the response
+        """
+
+        return CannedResponse(self.headers)
+
+
+# ------------------------------------------------------------------------------
+# A client that is closed after the test
+# ------------------------------------------------------------------------------
+@pytest.fixture
+def http_client():
+
+    """
+        A client that is closed after the test
+    """
+
+    client = HTTPClient(connect_timeout=5, read_timeout=5)
+    yield client
+    client.close()
+
+
+# ------------------------------------------------------------------------------
+# A fresh copy is used without asking, and each run's hits are kept
+# ------------------------------------------------------------------------------
+def test_fresh(server, http_client, tmp_path):
+
+    server.scenario.max_age = 3600
+    cache_path = str(tmp_path / 'cache.json')
+    body, changed = HTTPCache(cache_path, http_client).fetch(server.api_url)
+    assert changed
+    count = len(server.requests)
+
+    # each cron run is a new cache, and none of them ask
+    for _i in range(2):
+        cache = HTTPCache(cache_path, http_client)
+        assert cache.fetch(server.api_url) == (body, False)
+        assert cache.last_status == 0
+    assert len(server.requests) == count
+    assert HTTPCache(cache_path, http_client).get_stats() == \
+        {'hits': 2, 'misses': 1, 'bytes_saved': 2 * len(body)}
+
+    # unless forced
+    cache = HTTPCache(cache_path, http_client)
+    assert cache.fetch(server.api_url, force=True)[1]
+    assert len(server.requests) == count + 1
+
+
+# ------------------------------------------------------------------------------
+# A stale copy is revalidated, and a 304 is a hit
+# ------------------------------------------------------------------------------
+def test_not_modified(server, http_client, tmp_path):
+
+    cache_path = str(tmp_path / 'cache.json')
+    body, _changed = HTTPCache(cache_path, http_client).fetch(server.api_url)
+
+    cache = HTTPCache(cache_path, http_client)
+    assert cache.fetch(server.api_url) == (body, False)
+    assert cache.last_status == 304
+    assert HTTPCache(cache_path, http_client).get_stats() == \
+        {'hits': 1, 'misses': 1, 'bytes_saved': len(body)}
+
+    # a forgotten copy is fetched whole
+    cache.forget(server.api_url)
+    assert cache.fetch(server.api_url) == (body, True)
+    assert cache.last_status == 200
+
+
+# ------------------------------------------------------------------------------
+# Cache-Control wins over Expires, and anything unreadable is stale
+# ------------------------------------------------------------------------------
+@pytest.mark.parametrize('headers, seconds', [
+    ({}, 0),
+    ({'Cache-Control': 'max-age=600'}, 600),
+    ({'Cache-Control': 'public, MAX-AGE="600"'}, 600),
+    ({'Cache-Control': 'no-cache, max-age=600'}, 0),
+    ({'Cache-Control': 'max-age=soon'}, 0),
+    ({'Expires': 900}, 900),
+    ({'Expires': 'whenever'}, 0),
+    ({'Cache-Control': 'max-age=60', 'Expires': 900}, 60)
+])
+def test_freshness(tmp_path, headers, seconds):
+
+    # NB: an Expires given in seconds is made into a date from now
+    headers = dict(headers)
+    if isinstance(headers.get('Expires'), int):
+        headers['Expires'] = formatdate(time.time() + headers['Expires'],
+                                        usegmt=True)
+
+    cache = HTTPCache(str(tmp_path / 'cache.json'), CannedClient(headers))
+    start = time.time()
+    cache.fetch(URL)
+    expires = cache.cache_dict['entries'][URL]['expires']
+    assert start + seconds - 2 <= expires <= time.time() + seconds + 1
+
+
+# ------------------------------------------------------------------------------
+# no-store isn't stored, and the validators are kept
+# ------------------------------------------------------------------------------
+def test_store(tmp_path):
+
+    cache = HTTPCache(str(tmp_path / 'cache.json'),
+                      CannedClient({'Cache-Control': 'no-store'}))
+    assert cache.fetch(URL) == (BODY, True)
+    assert URL not in cache.cache_dict['entries']
+
+    cache = HTTPCache(str(tmp_path / 'cache.json'), CannedClient(
+        {'ETag': '"abc"', 'Last-Modified': 'Thu, 01 Jan 2026 00:00:00 GMT'}))
+    cache.fetch(URL)
+    entry = HTTPCache(cache.cache_path, None).cache_dict['entries'][URL]
+    assert entry['etag'] == '"abc"'
+    assert entry['last_modified'] == 'Thu, 01 Jan 2026 00:00:00 GMT'
+    assert entry['body'] == BODY.decode('utf-8')
+
+# -)
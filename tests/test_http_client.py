@@ -0,0 +1,230 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: test_http_client.py                                   |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+import json
+import socket
+import threading
+
+from harness import last_run
+from http_client import HTTPClient, HTTPError, PooledConnection
+import pytest
+
+# NB: the server and make_main fixtures are in conftest.py
+
+
+# ------------------------------------------------------------------------------
+# A client that is closed after the test
+# ------------------------------------------------------------------------------
+@pytest.fixture
+def http_client():
+
+    """
+        A client that is closed after the test
+    """
+
+    client = HTTPClient(connect_timeout=5, read_timeout=5)
+    yield client
+    client.close()
+
+
+# ------------------------------------------------------------------------------
+# Requests to one host share a connection
+# ------------------------------------------------------------------------------
+def test_keep_alive(server, http_client):
+
+    for _i in range(3):
+        with http_client.open(server.api_url) as response:
+            response.read()
+
+    assert server.connections == 1
+    assert http_client.stats['reused'] == 2
+
+
+# ------------------------------------------------------------------------------
+# The json comes gzipped when asked for, and is unzipped
+# ------------------------------------------------------------------------------
+def test_gzip(server, http_client):
+
+    with http_client.open(server.api_url, gzip=True) as response:
+        assert response.headers['Content-Encoding'] == 'gzip'
+        apod_dict = json.loads(response.read())
+    assert apod_dict['date'] == server.scenario.date
+
+    # reading in chunks gives the same thing
+    with http_client.open(server.api_url, gzip=True) as response:
+        data = b''.join(iter(lambda: response.read(16), b''))
+    assert json.loads(data) == apod_dict
+
+
+# ------------------------------------------------------------------------------
+# A host is only looked up once
+# ------------------------------------------------------------------------------
+def test_dns_cache(server, http_client, monkeypatch):
+
+    lookups = []
+    getaddrinfo = socket.getaddrinfo
+
+    def counting_getaddrinfo(*args, **kwargs):
+        lookups.append(args[0])
+        return getaddrinfo(*args, **kwargs)
+
+    monkeypatch.setattr(socket, 'getaddrinfo', counting_getaddrinfo)
+
+    # a new connection each time, but only one lookup
+    for _i in range(3):
+        with http_client.open(server.api_url) as response:
+            response.read()
+        http_client.close()
+    assert server.connections == 3
+    assert len(lookups) == 1
+
+
+# ------------------------------------------------------------------------------
+# Error statuses raise, with the status and headers
+# ------------------------------------------------------------------------------
+def test_error_status(server, http_client):
+
+    server.scenario.api_status = 429
+    server.scenario.retry_after = 60
+    with pytest.raises(HTTPError) as info:
+        http_client.open(server.api_url)
+    assert info.value.status == 429
+    assert info.value.headers['Retry-After'] == '60'
+
+    # the connection is still good
+    server.scenario.api_status = 0
+    with http_client.open(server.api_url) as response:
+        response.read()
+    assert server.connections == 1
+
+
+# ------------------------------------------------------------------------------
+# Start a proxy that answers one CONNECT
+# ------------------------------------------------------------------------------
+def start_proxy(status):
+
+    """
+        Start a proxy that answers one CONNECT
+
+        Paramaters:
+            status [int]: the status to answer with (200 to make the tunnel)
+
+        Returns:
+            [tuple]: the proxy's (host, port) and the lines of the CONNECT
+            it got [list]
+    """
+
+    listener = socket.create_server(('127.0.0.1', 0))
+    lines = []
+
+    # copy one way until the socket closes
+    def pipe(src, dst):
+        try:
+            while data := src.recv(65536):
+                dst.sendall(data)
+        except OSError:
+            pass
+        finally:
+            dst.close()
+
+    # answer the CONNECT, then copy both ways
+    def serve():
+        sock, _address = listener.accept()
+        listener.close()
+        data = b''
+        while b'\r\n\r\n' not in data:
+            data += sock.recv(1024)
+        lines.extend(data.decode('ascii').split('\r\n')[:2])
+        if status != 200:
+            sock.sendall(f'HTTP/1.1 {status} No\r\n\r\n'.encode('ascii'))
+            sock.close()
+            return
+        host, port = lines[0].split()[1].rsplit(':', 1)
+        upstream = socket.create_connection((host, int(port)))
+        sock.sendall(b'HTTP/1.1 200 Connection established\r\n\r\n')
+        threading.Thread(target=pipe, args=(upstream, sock),
+                         daemon=True).start()
+        pipe(sock, upstream)
+
+    threading.Thread(target=serve, daemon=True).start()
+    return listener.getsockname(), lines
+
+
+# ------------------------------------------------------------------------------
+# A connection tunnels through a proxy, without http.client's private hooks
+# ------------------------------------------------------------------------------
+def test_proxy_tunnel(server):
+
+    host, port = server.httpd.server_address[:2]
+    path = server.api_url[len(server.base_url):]
+    proxy, lines = start_proxy(200)
+    conn = PooledConnection(*proxy, timeout=5)
+    conn.set_tunnel(host, port)
+    conn.tunnel_address = (host, port)
+    conn.request('GET', path)
+    response = conn.getresponse()
+    assert response.status == 200
+    assert json.loads(response.read())['date'] == server.scenario.date
+    conn.close()
+    assert lines == [f'CONNECT {host}:{port} HTTP/1.1',
+                     f'Host: {host}:{port}']
+
+    # a proxy that says no is an error
+    proxy, lines = start_proxy(407)
+    conn = PooledConnection(*proxy, timeout=5)
+    conn.tunnel_address = (host, port)
+    with pytest.raises(OSError, match='407'):
+        conn.connect()
+
+
+# ------------------------------------------------------------------------------
+# A slow server times out
+# ------------------------------------------------------------------------------
+def test_read_timeout(server):
+
+    server.scenario.latency = 0.5
+    http_client = HTTPClient(read_timeout=0.1)
+    with pytest.raises(TimeoutError):
+        http_client.open(server.api_url)
+
+
+# ------------------------------------------------------------------------------
+# A connection cut short is not reused
+# ------------------------------------------------------------------------------
+def test_truncated_not_reused(server, http_client):
+
+    server.scenario.truncate = 1024
+    url = f'{server.base_url}/image/test.jpg'
+    with http_client.open(url) as response:
+        assert len(response.read(len(server.image))) == 1024
+
+    # the next request needs a new connection
+    server.scenario.truncate = 0
+    with http_client.open(url) as response:
+        assert len(response.read()) == len(server.image)
+    assert server.connections == 2
+    assert http_client.stats['reused'] == 0
+
+
+# ------------------------------------------------------------------------------
+# A whole run (json, probes and image) uses one connection
+# ------------------------------------------------------------------------------
+def test_run_shares_connection(server, make_main):
+
+    main = make_main()
+    main.run()
+
+    assert last_run(main)['stages']['set']['outcome'] == 'changed'
+    assert len(server.requests) == 4
+    assert server.connections == 1
+
+# -)
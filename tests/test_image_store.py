@@ -0,0 +1,156 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: test_image_store.py                                   |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+import os
+import time
+
+from image_store import PART_MAX_AGE, ImageStore, get_url_ext
+
+
+# ------------------------------------------------------------------------------
+# Add an image made of some bytes
+# ------------------------------------------------------------------------------
+def add_image(store, data, url='', when=0, keep=False):
+
+    """
+        Add an image made of some bytes
+
+        Paramaters:
+            store [ImageStore]: the store to add to
+            data [bytes]: the image
+            url [str]: where it came from
+            when [float]: its last use time (0 for now)
+            keep [bool]: True to never evict it
+
+        Returns:
+            [str]: the path in the store
+    """
+
+    src_path = os.path.join(store.store_dir, 'incoming.tmp')
+    with open(src_path, 'wb') as file:
+        file.write(data)
+    sha = ImageStore.hash_file(src_path)
+    path = store.add(src_path, sha, 'jpg', url, keep=keep)
+    if when:
+        store.index_dict[sha]['last_used'] = when
+    return path
+
+
+# ------------------------------------------------------------------------------
+# The same bytes are stored once, and the index survives a reload
+# ------------------------------------------------------------------------------
+def test_add(tmp_path):
+
+    store = ImageStore(str(tmp_path), 0, 0)
+    path = add_image(store, b'one', 'http://x/1.jpg')
+    assert add_image(store, b'one', 'http://x/one.jpg') == path
+    assert len(store.index_dict) == 1
+    assert not os.path.exists(tmp_path / 'incoming.tmp')
+
+    store = ImageStore(str(tmp_path), 0, 0)
+    assert store.find_url('http://x/one.jpg') == path
+    assert store.lookup('http://x/one.jpg')['size'] == 3
+    assert store.lookup('') is None
+
+
+# ------------------------------------------------------------------------------
+# The least recently used go first, but never a pinned one
+# ------------------------------------------------------------------------------
+def test_evict_count(tmp_path):
+
+    store = ImageStore(str(tmp_path), 0, 3)
+    now = time.time()
+    old = add_image(store, b'old', when=now - 300)
+    pinned = add_image(store, b'pinned', when=now - 200)
+    used = add_image(store, b'used', when=now - 100)
+    add_image(store, b'new')
+
+    # using one makes it new again
+    store.touch(ImageStore.hash_file(used))
+    assert store.evict([pinned]) == [old]
+    assert not os.path.exists(old)
+    assert len(store.index_dict) == 3
+
+    assert store.evict([pinned]) == []
+
+    # a pinned one stays, even if it is the oldest
+    store.max_count = 1
+    assert len(store.evict([pinned])) == 2
+    assert os.path.exists(pinned)
+    assert len(store.index_dict) == 1
+
+
+# ------------------------------------------------------------------------------
+# The byte limit works the same way
+# ------------------------------------------------------------------------------
+def test_evict_bytes(tmp_path):
+
+    store = ImageStore(str(tmp_path), 10, 0)
+    now = time.time()
+    first = add_image(store, b'12345', when=now - 200)
+    second = add_image(store, b'67890', when=now - 100)
+    assert store.evict() == []
+    add_image(store, b'abc')
+    assert store.evict() == [first]
+    assert os.path.exists(second)
+
+
+# ------------------------------------------------------------------------------
+# Kept images are never evicted, and don't count
+# ------------------------------------------------------------------------------
+def test_keep(tmp_path):
+
+    store = ImageStore(str(tmp_path), 0, 1)
+    now = time.time()
+    kept = add_image(store, b'kept', when=now - 300)
+    store.keep(ImageStore.hash_file(kept))
+    add_image(store, b'also kept', when=now - 200, keep=True)
+    add_image(store, b'new')
+    assert store.evict() == []
+    old = add_image(store, b'newer', when=now - 100)
+    assert store.evict() == [old]
+
+
+# ------------------------------------------------------------------------------
+# The extension comes from the url's path
+# ------------------------------------------------------------------------------
+def test_url_ext():
+
+    assert get_url_ext('https://apod.nasa.gov/a/b.png') == 'png'
+    assert get_url_ext('https://x.com/b.jpeg?size=big.gif') == 'jpeg'
+    assert get_url_ext('https://img.youtube.com/vi/abc/0') == 'jpg'
+
+
+# ------------------------------------------------------------------------------
+# Strays and stale partial downloads are removed, fresh ones kept
+# ------------------------------------------------------------------------------
+def test_collect_garbage(tmp_path):
+
+    store = ImageStore(str(tmp_path), 0, 0)
+    keep = add_image(store, b'keep')
+    gone = add_image(store, b'gone')
+    os.remove(gone)
+
+    # a stray, a fresh part file and a stale one
+    stray = tmp_path / 'stray.jpg'
+    fresh = tmp_path / 'download_a.part'
+    stale = tmp_path / 'download_b.part'
+    for path in (stray, fresh, stale):
+        path.write_bytes(b'x')
+    old = time.time() - PART_MAX_AGE - 60
+    os.utime(stale, (old, old))
+
+    removed = store.collect_garbage()
+    assert sorted(removed) == sorted([str(stray), str(stale)])
+    assert os.path.exists(fresh)
+    assert os.path.exists(keep)
+    assert len(store.index_dict) == 1
@@ -0,0 +1,190 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: test_index.py                                         |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+import datetime
+import hashlib
+import os
+import time
+
+from apod_index import ApodIndex
+from harness import last_run
+
+# NB: the server and make_main fixtures are in conftest.py
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# words for the synthetic titles
+WORDS = ('nebula', 'galaxy', 'comet', 'aurora', 'eclipse', 'moon', 'mars',
+         'cluster', 'supernova', 'saturn', 'jupiter')
+
+
+# ------------------------------------------------------------------------------
+# Make a day's worth of records, as if the api had sent them
+# ------------------------------------------------------------------------------
+def make_records(count):
+
+    """
+        Make a day's worth of records, as if the api had sent them
+
+        Paramaters:
+            count [int]: how many days (back from 2026-01-01)
+
+        Returns:
+            [list]: the apod dicts
+    """
+
+    start = datetime.date(2026, 1, 1)
+    records = []
+    for i in range(count):
+        word = WORDS[i % len(WORDS)]
+        records.append({
+            'date':         str(start - datetime.timedelta(i)),
+            'title':        f'The {word.title()} {i}',
+            'explanation':  f'Day {i} shows a {word} and 100% of its glow.',
+            'media_type':   'video' if i % 10 == 0 else 'image',
+            'url':          f'http://x/{i}.jpg'
+        })
+    return records
+
+
+# ------------------------------------------------------------------------------
+# A year and a word find the right days, fast, in a big archive
+# ------------------------------------------------------------------------------
+def test_search(tmp_path):
+
+    index = ApodIndex(str(tmp_path / 'apod.db'))
+    assert index.add(make_records(20000)) == 20000
+
+    # every nebula image in 2020, newest first
+    start = time.perf_counter()
+    found = index.search('nebul', '2020-01-01', '2020-12-31', 'image', 0)
+    seconds = time.perf_counter() - start
+    assert found
+    assert seconds < 0.5
+    assert all(row['date'].startswith('2020-') for row in found)
+    assert all('Nebula' in row['title'] for row in found)
+    assert all(row['media_type'] == 'image' for row in found)
+    assert [row['date'] for row in found] == \
+        sorted((row['date'] for row in found), reverse=True)
+
+    # punctuation is just text
+    assert len(index.search('100%', limit=5)) == 5
+    assert index.search('"moon') == index.search('moon')
+
+    # updates replace the text (and keep the file info)
+    index.add([{'date': '2026-01-01', 'title': 'Renamed',
+                'path': '/a.jpg', 'size': 1, 'sha': 'a'}])
+    index.add([{'date': '2026-01-01', 'title': 'Renamed Again'}])
+    found = index.search('renamed')
+    assert len(found) == 1
+    assert found[0]['path'] == '/a.jpg'
+    index.close()
+
+
+# ------------------------------------------------------------------------------
+# Without fts, the same searches find the same days
+# ------------------------------------------------------------------------------
+def test_like(tmp_path):
+
+    fts_index = ApodIndex(str(tmp_path / 'fts.db'))
+    like_index = ApodIndex(str(tmp_path / 'like.db'), fts=False)
+    records = make_records(2000)
+    fts_index.add(records)
+    like_index.add(records)
+
+    for args in (('comet',), ('comet', '2025-01-01', '2025-12-31'),
+                 ('glow moon',), ('', '', '', 'video'), ('100%',)):
+        assert fts_index.search(*args, limit=0) == \
+            like_index.search(*args, limit=0)
+    fts_index.close()
+    like_index.close()
+
+
+# ------------------------------------------------------------------------------
+# A normal run adds the day, with our copy of the image
+# ------------------------------------------------------------------------------
+def test_run(server, make_main):
+
+    main = make_main()
+    main.run()
+
+    run = last_run(main)
+    assert run['stages']['index']['outcome'] != 'error'
+    found = main.search(year=server.scenario.date[:4])
+    assert [row['date'] for row in found] == [server.scenario.date]
+    assert found[0]['path'] == main.conf_dict['files']['filepath']
+    assert found[0]['sha']
+
+    # nothing new, so nothing written
+    main = make_main()
+    main.run()
+    assert last_run(main)['stages']['index']['outcome'] == 'unchanged'
+
+
+# ------------------------------------------------------------------------------
+# A backfill adds every day
+# ------------------------------------------------------------------------------
+def test_backfill(server, make_main):
+
+    main = make_main()
+    main.backfill('2024-03-01', '2024-03-03', keep=True)
+
+    found = main.search('image', '2024')
+    assert [row['date'] for row in found] == \
+        ['2024-03-03', '2024-03-02', '2024-03-01']
+    assert all(os.path.exists(row['path']) for row in found)
+
+
+# ------------------------------------------------------------------------------
+# Forgetting an image keeps the day, but not the path to our copy
+# ------------------------------------------------------------------------------
+def test_forget(tmp_path):
+
+    index = ApodIndex(str(tmp_path / 'apod.db'))
+    records = make_records(3)
+    for i, record in enumerate(records):
+        record.update({'path': f'/store/{i}.jpg', 'size': 10, 'sha': str(i)})
+    index.add(records)
+
+    assert index.forget([]) == 0
+    assert index.forget(['0', '2', 'other']) == 2
+    found = index.search()
+    assert len(found) == 3
+    assert [row['sha'] for row in found] == [None, '1', None]
+    assert found[0]['path'] is None
+    assert found[0]['size'] is None
+    index.close()
+
+
+# ------------------------------------------------------------------------------
+# An image evicted from the store is no longer in the index
+# ------------------------------------------------------------------------------
+def test_evicted(server, make_main):
+
+    conf_dict = {'store': {'max_count': 1}}
+    make_main(conf_dict).run()
+    old_date = server.scenario.date
+
+    # a new day, with a different image, pushes the old one out
+    server.scenario.date = '2024-03-02'
+    server.image += b'new'
+    server.image_etag = '"' + hashlib.sha1(server.image).hexdigest() + '"'
+    main = make_main(conf_dict)
+    main.run()
+    assert last_run(main)['stages']['set']['outcome'] == 'changed'
+
+    found = {row['date']: row for row in main.search()}
+    assert found[old_date]['path'] is None
+    assert found['2024-03-02']['path'] == main.conf_dict['files']['filepath']
+    assert os.path.exists(found['2024-03-02']['path'])
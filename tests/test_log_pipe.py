@@ -0,0 +1,117 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: test_log_pipe.py                                      |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+import glob
+import json
+import logging
+
+import pytest
+
+from log_pipe import LogPipe
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# the logger to write with
+LOGGER = logging.getLogger('test_log_pipe')
+
+
+# ------------------------------------------------------------------------------
+# A pipe to a temp log, closed (and the root level put back) after the test
+# ------------------------------------------------------------------------------
+@pytest.fixture
+def pipe(tmp_path):
+
+    """
+        A pipe to a temp log, closed (and the root level put back) after the
+        test
+    """
+
+    level = logging.getLogger().level
+    log_pipe = LogPipe(str(tmp_path / 'test.log'))
+    yield log_pipe
+    log_pipe.close()
+    logging.getLogger().setLevel(level)
+
+
+# ------------------------------------------------------------------------------
+# Json lines carry the level, run id and message
+# ------------------------------------------------------------------------------
+def test_json(pipe):
+
+    pipe.configure('info', 'json', echo=False)
+    run_id = pipe.new_run()
+    LOGGER.debug('dropped')
+    LOGGER.info('hello %s', 'world')
+    try:
+        raise ValueError('oops')
+    except ValueError:
+        LOGGER.exception('failed')
+    pipe.stop()
+
+    with open(pipe.log_path, 'r') as file:
+        lines = [json.loads(line) for line in file]
+    assert [line['msg'] for line in lines] == ['hello world', 'failed']
+    assert lines[0]['level'] == 'INFO'
+    assert lines[0]['run_id'] == run_id
+    assert lines[0]['logger'] == 'test_log_pipe'
+    assert 'ValueError: oops' in lines[1]['exc']
+
+
+# ------------------------------------------------------------------------------
+# Text lines carry the run id, and the traceback after the message
+# ------------------------------------------------------------------------------
+def test_text(pipe):
+
+    pipe.configure('debug', 'text', echo=False)
+    run_id = pipe.new_run()
+    LOGGER.debug('hello')
+    try:
+        raise ValueError('oops')
+    except ValueError:
+        LOGGER.exception('failed')
+    pipe.stop()
+
+    with open(pipe.log_path, 'r') as file:
+        text = file.read()
+    assert f'[DEBUG] {run_id} hello' in text
+    assert 'failed\nTraceback' in text
+    assert text.count('ValueError: oops') == 1
+
+
+# ------------------------------------------------------------------------------
+# Size rotation keeps a fixed number of old logs
+# ------------------------------------------------------------------------------
+def test_rotate(pipe):
+
+    pipe.configure('info', 'text', 'size', max_bytes=1024, backups=2,
+                   echo=False)
+    for i in range(200):
+        LOGGER.info('line %d %s', i, 'x' * 40)
+    pipe.stop()
+
+    paths = sorted(glob.glob(pipe.log_path + '*'))
+    assert paths == [pipe.log_path, pipe.log_path + '.1',
+                     pipe.log_path + '.2']
+    with open(pipe.log_path, 'r') as file:
+        assert 'line 199' in file.read()
+
+
+# ------------------------------------------------------------------------------
+# Bad settings are refused
+# ------------------------------------------------------------------------------
+def test_bad_settings(pipe):
+
+    for kwargs in ({'level': 'loud'}, {'fmt': 'xml'}, {'rotate': 'weekly'}):
+        with pytest.raises(ValueError):
+            pipe.configure(**kwargs)
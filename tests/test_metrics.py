@@ -0,0 +1,177 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: test_metrics.py                                       |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+import json
+
+import pytest
+
+from metrics import Metrics, METRICS, OUTCOMES, PREFIX
+
+
+# ------------------------------------------------------------------------------
+# Metrics in a temp folder
+# ------------------------------------------------------------------------------
+@pytest.fixture
+def metrics(tmp_path):
+
+    """
+        Metrics in a temp folder
+    """
+
+    return Metrics(str(tmp_path / 'spaceoddity.prom'),
+                   str(tmp_path / 'history.jsonl'), history_runs=4)
+
+
+# ------------------------------------------------------------------------------
+# Read the samples from a textfile
+# ------------------------------------------------------------------------------
+def read_prom(path):
+
+    """
+        Read the samples from a textfile
+
+        Paramaters:
+            path [str]: the textfile
+
+        Returns:
+            [dict]: the value of each sample, by name and labels
+    """
+
+    samples = {}
+    with open(path, 'r') as file:
+        for line in file:
+            if line.startswith('#'):
+                continue
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+    return samples
+
+
+# ------------------------------------------------------------------------------
+# Read the runs from a history file
+# ------------------------------------------------------------------------------
+def read_history(path):
+
+    """
+        Read the runs from a history file
+
+        Paramaters:
+            path [str]: the history file
+
+        Returns:
+            [list]: the runs, oldest first
+    """
+
+    with open(path, 'r') as file:
+        return [json.loads(line) for line in file]
+
+
+# ------------------------------------------------------------------------------
+# Each stage gets its timing, bytes, status and a one-hot outcome
+# ------------------------------------------------------------------------------
+def test_textfile(metrics):
+
+    metrics.start_run()
+    with metrics.stage('api'):
+        metrics.note(nbytes=100, status=200)
+        metrics.note(nbytes=50, outcome='unchanged')
+    with pytest.raises(OSError):
+        with metrics.stage('image'):
+            metrics.note(status=500)
+            raise OSError('boom')
+    metrics.mark_paint()
+    assert metrics.finish_run('abc')
+
+    samples = read_prom(metrics.prom_path)
+    api = 'stage="api"'
+    image = 'stage="image"'
+    assert samples[f'{PREFIX}_stage_bytes{{{api}}}'] == 150
+    assert samples[f'{PREFIX}_stage_http_status{{{api}}}'] == 200
+    assert samples[f'{PREFIX}_stage_http_status{{{image}}}'] == 500
+    assert samples[f'{PREFIX}_stage_start_seconds{{{api}}}'] >= 0
+    for outcome in OUTCOMES:
+        name = f'{PREFIX}_stage_outcome{{{api},outcome="{outcome}"}}'
+        assert samples[name] == (outcome == 'unchanged')
+        name = f'{PREFIX}_stage_outcome{{{image},outcome="{outcome}"}}'
+        assert samples[name] == (outcome == 'error')
+    assert f'{PREFIX}_first_paint_seconds' in samples
+    assert f'{PREFIX}_run_duration_seconds' in samples
+
+    # every metric is described, even if it has no samples
+    with open(metrics.prom_path, 'r') as file:
+        text = file.read()
+    for name in METRICS:
+        assert f'# HELP {PREFIX}_{name} ' in text
+        assert f'# TYPE {PREFIX}_{name} gauge' in text
+
+    # and the same run is in the history
+    runs = read_history(metrics.history_path)
+    assert len(runs) == 1
+    assert runs[0]['run_id'] == 'abc'
+    assert [stage['outcome'] for stage in runs[0]['stages']] == \
+        ['unchanged', 'error']
+
+
+# ------------------------------------------------------------------------------
+# A run where nothing ran writes nothing, and no paint means no paint metrics
+# ------------------------------------------------------------------------------
+def test_idle_run(metrics, tmp_path):
+
+    metrics.start_run()
+    assert not metrics.finish_run()
+    assert list(tmp_path.iterdir()) == []
+
+    # a stage with no outcome did its job
+    with metrics.stage('api'):
+        pass
+    assert metrics.finish_run()
+    samples = read_prom(metrics.prom_path)
+    assert f'{PREFIX}_first_paint_seconds' not in samples
+    assert samples[f'{PREFIX}_stage_outcome{{stage="api",outcome="changed"}}'] \
+        == 1
+
+    # and it isn't written twice
+    assert not metrics.finish_run()
+
+
+# ------------------------------------------------------------------------------
+# Notes are checked, and ignored outside of a stage
+# ------------------------------------------------------------------------------
+def test_note(metrics):
+
+    metrics.note(outcome='nonsense')
+    with metrics.stage('api'):
+        with pytest.raises(ValueError):
+            metrics.note(outcome='nonsense')
+    assert metrics.stages[0]['outcome'] == 'changed'
+
+
+# ------------------------------------------------------------------------------
+# The history keeps the newest runs once it gets a quarter over the limit
+# ------------------------------------------------------------------------------
+def test_history_trim(metrics):
+
+    for i in range(5):
+        metrics.start_run()
+        with metrics.stage('api'):
+            pass
+        metrics.finish_run(str(i))
+    assert len(read_history(metrics.history_path)) == 5
+
+    metrics.start_run()
+    with metrics.stage('api'):
+        pass
+    metrics.finish_run('5')
+    runs = read_history(metrics.history_path)
+    assert [run['run_id'] for run in runs] == ['2', '3', '4', '5']
+
+# -)
@@ -0,0 +1,184 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: test_mirror.py                                        |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+import threading
+
+from harness import last_run
+from http_client import HTTPClient, HTTPError
+from mirror import MirrorServer
+from shared_cache import SharedCache
+import pytest
+
+# NB: the server and make_main fixtures are in conftest.py
+
+
+# ------------------------------------------------------------------------------
+# A mirror of a shared folder that one fetch has filled
+# ------------------------------------------------------------------------------
+@pytest.fixture
+def mirror(server, make_main, tmp_path):
+
+    """
+        A mirror of a shared folder that one fetch has filled
+    """
+
+    # fill the folder
+    shared_dir = str(tmp_path / 'shared')
+    make_main(home='root').fetch(shared_dir)
+
+    # serve it (on any free port)
+    mirror = MirrorServer(SharedCache(shared_dir), '127.0.0.1', 0)
+    thread = threading.Thread(target=mirror.run, daemon=True)
+    thread.start()
+    assert mirror.ready.wait(5)
+    mirror.base_url = f'http://127.0.0.1:{mirror.port}'
+    yield mirror
+
+    # stop it
+    mirror.stop()
+    thread.join(5)
+
+
+# ------------------------------------------------------------------------------
+# A client that is closed after the test
+# ------------------------------------------------------------------------------
+@pytest.fixture
+def http_client():
+
+    """
+        A client that is closed after the test
+    """
+
+    client = HTTPClient(connect_timeout=5, read_timeout=5)
+    yield client
+    client.close()
+
+
+# ------------------------------------------------------------------------------
+# Make the settings for a client of the mirror
+# ------------------------------------------------------------------------------
+def mirror_conf(mirror_url):
+
+    """
+        Make the settings for a client of the mirror
+
+        Paramaters:
+            mirror_url [str]: the mirror's base url
+
+        Returns:
+            [dict]: the extra settings for make_main
+    """
+
+    return {'network': {'mirror_url': mirror_url}}
+
+
+# ------------------------------------------------------------------------------
+# Clients get the json and image from the mirror, not upstream
+# ------------------------------------------------------------------------------
+def test_client_uses_mirror(server, make_main, mirror):
+
+    count = len(server.requests)
+    for home in ('host1', 'host2'):
+        main = make_main(mirror_conf(mirror.base_url), home=home)
+        main.run()
+        assert last_run(main)['stages']['set']['outcome'] == 'changed'
+        with open(main.backend.get(), 'rb') as file:
+            assert file.read() == server.image
+
+    assert len(server.requests) == count
+    assert mirror.stats['requests'] == 4
+
+
+# ------------------------------------------------------------------------------
+# The json has an etag and answers If-None-Match
+# ------------------------------------------------------------------------------
+def test_apod_etag(mirror, http_client):
+
+    url = f'{mirror.base_url}/planetary/apod?api_key=DEMO_KEY'
+    with http_client.open(url) as response:
+        etag = response.headers['ETag']
+        assert response.read()
+
+    with http_client.open(url, {'If-None-Match': etag}) as response:
+        assert response.status == 304
+    assert mirror.stats['connections'] == 1
+
+
+# ------------------------------------------------------------------------------
+# The image answers ranges, and only under the url it came from
+# ------------------------------------------------------------------------------
+def test_image_range(server, mirror, http_client):
+
+    entry = SharedCache(mirror.shared_cache.cache_dir).read()
+    url = f'{mirror.base_url}/image?' + urlencode(
+        {'url': entry['image']['url']})
+
+    # part of it
+    with http_client.open(url, {'Range': 'bytes=10-19'}) as response:
+        assert response.status == 206
+        assert response.read() == server.image[10:20]
+
+    # the end of it
+    with http_client.open(url, {'Range': 'bytes=-5'}) as response:
+        assert response.read() == server.image[-5:]
+
+    # past the end
+    with pytest.raises(HTTPError) as info:
+        http_client.open(url, {'Range': f'bytes={len(server.image)}-'})
+    assert info.value.status == 416
+
+    # not ours
+    with pytest.raises(HTTPError) as info:
+        http_client.open(f'{mirror.base_url}/image?url=nope')
+    assert info.value.status == 404
+
+
+# ------------------------------------------------------------------------------
+# Many clients at once are all served
+# ------------------------------------------------------------------------------
+def test_many_clients(mirror):
+
+    url = f'{mirror.base_url}/planetary/apod'
+
+    def get(_i):
+        client = HTTPClient(connect_timeout=5, read_timeout=5)
+        try:
+            with client.open(url) as response:
+                return response.read()
+        finally:
+            client.close()
+
+    with ThreadPoolExecutor(32) as pool:
+        bodies = list(pool.map(get, range(64)))
+    assert len(set(bodies)) == 1
+
+
+# ------------------------------------------------------------------------------
+# A client falls back to upstream when the mirror is down
+# ------------------------------------------------------------------------------
+def test_mirror_down(server, make_main, mirror):
+
+    mirror.stop()
+    count = len(server.requests)
+
+    main = make_main(mirror_conf(mirror.base_url), home='host1')
+    main.run()
+    assert last_run(main)['stages']['set']['outcome'] == 'changed'
+    assert len(server.requests) > count
+
+    # and leaves the mirror alone for a while
+    allowed, _reason = main.gate.allowed('mirror')
+    assert not allowed
+
+# -)
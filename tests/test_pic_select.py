@@ -0,0 +1,72 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: test_pic_select.py                                    |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+import os
+import struct
+
+from pic_select import choose, get_image_size
+
+# ------------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------------
+
+# a real 2400x1600 jpeg
+TEST_JPG = os.path.join(os.path.dirname(__file__), 'test.jpg')
+
+# the two variants of a day: a small one and a big one
+SMALL = {'name': 'url', 'url': 'small', 'bytes': 300_000,
+         'pixels': (1200, 800)}
+BIG = {'name': 'hdurl', 'url': 'big', 'bytes': 3_000_000,
+       'pixels': (4800, 3200)}
+
+
+# ------------------------------------------------------------------------------
+# The size is read from the start of a jpeg, png or gif
+# ------------------------------------------------------------------------------
+def test_image_size():
+
+    with open(TEST_JPG, 'rb') as file:
+        assert get_image_size(file.read(64 * 1024)) == (2400, 1600)
+    png = b'\x89PNG\r\n\x1a\n\0\0\0\rIHDR' + struct.pack('>II', 640, 480)
+    assert get_image_size(png) == (640, 480)
+    assert get_image_size(b'GIF89a' + struct.pack('<HH', 32, 16)) == (32, 16)
+    assert get_image_size(b'not an image') is None
+    assert get_image_size(b'\xff\xd8\xff\xe0') is None
+
+
+# ------------------------------------------------------------------------------
+# The smallest variant that covers the screen wins
+# ------------------------------------------------------------------------------
+def test_covers_screen():
+
+    assert choose([BIG, SMALL], (1024, 768), 0) is SMALL
+    assert choose([SMALL, BIG], (1920, 1080), 0) is BIG
+    assert choose([SMALL, BIG], (7680, 4320), 0) is BIG
+
+
+# ------------------------------------------------------------------------------
+# The byte budget comes first
+# ------------------------------------------------------------------------------
+def test_budget():
+
+    assert choose([SMALL, BIG], (1920, 1080), 1_000_000) is SMALL
+    assert choose([SMALL, BIG], (1920, 1080), 100_000) is SMALL
+
+
+# ------------------------------------------------------------------------------
+# Without a screen size or probe results, take what we can
+# ------------------------------------------------------------------------------
+def test_unknown():
+
+    assert choose([SMALL, BIG], None, 0) is BIG
+    unknown = [dict(BIG, bytes=0), dict(SMALL, bytes=0)]
+    assert choose(unknown, (1920, 1080), 0) is unknown[0]
@@ -0,0 +1,112 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: test_pipeline.py                                      |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+import threading
+import time
+
+from metrics import Metrics
+from pipeline import Pipeline
+import pytest
+
+
+# ------------------------------------------------------------------------------
+# Ends a run early (like RunFinished, not an Exception)
+# ------------------------------------------------------------------------------
+class Finished(BaseException):
+
+    """
+        Ends a run early (like RunFinished, not an Exception)
+    """
+
+
+# ------------------------------------------------------------------------------
+# Metrics that are never written
+# ------------------------------------------------------------------------------
+@pytest.fixture
+def metrics(tmp_path):
+
+    """
+        Metrics that are never written
+    """
+
+    metrics = Metrics(str(tmp_path / 'test.prom'),
+                      str(tmp_path / 'history.jsonl'))
+    metrics.start_run()
+    return metrics
+
+
+# ------------------------------------------------------------------------------
+# Steps that don't need each other overlap, and the rest wait
+# ------------------------------------------------------------------------------
+def test_overlap(metrics):
+
+    def sleep(seconds, nbytes):
+        def step():
+            time.sleep(seconds)
+            metrics.note(nbytes=nbytes)
+        return step
+
+    pipeline = Pipeline(metrics)
+    pipeline.add('a', sleep(0.2, 1))
+    pipeline.add('b', sleep(0.2, 2))
+    pipeline.add('c', sleep(0, 3), after=('a', 'b'))
+    start = time.monotonic()
+    pipeline.run()
+    assert time.monotonic() - start < 0.35
+
+    # each step noted to its own record
+    records = {record['stage']: record for record in metrics.stages}
+    assert [records[name]['bytes'] for name in 'abc'] == [1, 2, 3]
+    assert records['b']['start'] < records['a']['seconds']
+    assert records['c']['start'] >= records['a']['seconds']
+
+
+# ------------------------------------------------------------------------------
+# Main steps run on our thread, the rest don't
+# ------------------------------------------------------------------------------
+def test_threads():
+
+    threads = {}
+    pipeline = Pipeline()
+    for name, main in (('worker', False), ('main', True)):
+        pipeline.add(name, lambda name=name: threads.update(
+            {name: threading.current_thread()}), main=main)
+    pipeline.run()
+    assert threads['main'] is threading.current_thread()
+    assert threads['worker'] is not threading.current_thread()
+
+
+# ------------------------------------------------------------------------------
+# A step that ends the run skips the steps that need it (unless they always
+# run)
+# ------------------------------------------------------------------------------
+def test_finished(metrics):
+
+    def finish():
+        raise Finished()
+
+    ran = []
+    pipeline = Pipeline(metrics)
+    pipeline.add('a', finish)
+    pipeline.add('b', lambda: ran.append('b'))
+    pipeline.add('c', lambda: ran.append('c'), after=('a',))
+    pipeline.add('d', lambda: ran.append('d'), after=('c',), always=True)
+    with pytest.raises(Finished):
+        pipeline.run()
+    assert ran == ['b', 'd']
+    assert [record['stage'] for record in metrics.stages] == ['a', 'b', 'd']
+
+    # and a step can't need one that isn't there (yet)
+    with pytest.raises(ValueError):
+        pipeline.add('d', finish, after=('e',))
+
+# -)
@@ -0,0 +1,115 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: test_scheduler.py                                     |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from scheduler import Scheduler
+
+
+# ------------------------------------------------------------------------------
+# Make a UTC time
+# ------------------------------------------------------------------------------
+def utc(*args):
+
+    """
+        Make a UTC time
+
+        Paramaters:
+            args [tuple]: year, month, day, hour, minute
+
+        Returns:
+            [datetime]: the time, in UTC
+    """
+
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+# ------------------------------------------------------------------------------
+# A scheduler with a fresh state file
+# ------------------------------------------------------------------------------
+@pytest.fixture
+def sched(tmp_path):
+
+    """
+        A scheduler with a fresh state file
+    """
+
+    return Scheduler(str(tmp_path / 'schedule.json'), burst_window=120,
+                     burst_interval=2, slow_interval=30)
+
+
+# ------------------------------------------------------------------------------
+# No date means check now
+# ------------------------------------------------------------------------------
+def test_no_date(sched):
+
+    assert sched.is_due('')[0]
+    assert sched.is_due('not a date')[0]
+    assert sched.get_wait('') == 0
+
+
+# ------------------------------------------------------------------------------
+# Nothing is due before midnight in New York, in summer and winter
+# ------------------------------------------------------------------------------
+@pytest.mark.parametrize('last_date, publish', [
+    ('2026-07-01', utc(2026, 7, 2, 4, 0)),      # EDT (UTC-4)
+    ('2026-01-10', utc(2026, 1, 11, 5, 0)),     # EST (UTC-5)
+    ('2026-03-07', utc(2026, 3, 8, 5, 0)),      # midnight before spring
+    ('2026-10-31', utc(2026, 11, 1, 4, 0)),     # midnight before fall back
+    ('2026-11-01', utc(2026, 11, 2, 5, 0))      # the day after
+])
+def test_publish_time(sched, last_date, publish):
+
+    before = publish - timedelta(seconds=1)
+    assert not sched.is_due(last_date, before)[0]
+    assert sched.get_wait(last_date, before) == pytest.approx(1)
+    assert sched.is_due(last_date, publish)[0]
+    assert sched.get_wait(last_date, publish) == 0
+
+
+# ------------------------------------------------------------------------------
+# Poll often just after publish time, then slowly
+# ------------------------------------------------------------------------------
+def test_intervals(sched):
+
+    publish = utc(2026, 7, 2, 4, 0)
+
+    # in the burst window
+    now = publish + timedelta(minutes=10)
+    sched.mark_checked(now)
+    assert not sched.is_due('2026-07-01', now + timedelta(seconds=60))[0]
+    assert sched.get_wait('2026-07-01', now) == 2 * 60 - 30
+    assert sched.is_due('2026-07-01', now + timedelta(minutes=2))[0]
+
+    # after it
+    now = publish + timedelta(hours=3)
+    sched.mark_checked(now)
+    assert not sched.is_due('2026-07-01', now + timedelta(minutes=10))[0]
+    assert sched.get_wait('2026-07-01', now) == 30 * 60 - 30
+    assert sched.is_due('2026-07-01', now + timedelta(minutes=30))[0]
+
+
+# ------------------------------------------------------------------------------
+# The last check survives a restart, and a broken state file is ignored
+# ------------------------------------------------------------------------------
+def test_state(tmp_path):
+
+    path = str(tmp_path / 'schedule.json')
+    now = utc(2026, 7, 2, 5, 0)
+    Scheduler(path).mark_checked(now)
+    assert Scheduler(path).last_check == now.timestamp()
+
+    with open(path, 'w') as file:
+        file.write('{')
+    assert Scheduler(path).last_check == 0
@@ -0,0 +1,142 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: test_shared_cache.py                                  |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+import os
+
+from harness import last_run
+import pytest
+
+# NB: the server and make_main fixtures are in conftest.py
+
+
+# ------------------------------------------------------------------------------
+# The shared folder (made by the first fetch)
+# ------------------------------------------------------------------------------
+@pytest.fixture
+def shared_dir(tmp_path):
+
+    """
+        The shared folder (made by the first fetch)
+    """
+
+    return str(tmp_path / 'shared')
+
+
+# ------------------------------------------------------------------------------
+# Make the settings for a user of the shared cache
+# ------------------------------------------------------------------------------
+def use_conf(shared_dir):
+
+    """
+        Make the settings for a user of the shared cache
+
+        Paramaters:
+            shared_dir [str]: the shared folder
+
+        Returns:
+            [dict]: the extra settings for make_main
+    """
+
+    return {'shared': {'mode': 'use', 'dir': shared_dir}}
+
+
+# ------------------------------------------------------------------------------
+# One fetch serves every user, without them going to the network
+# ------------------------------------------------------------------------------
+def test_fetch_once(server, make_main, shared_dir):
+
+    fetcher = make_main(home='root')
+    fetcher.fetch(shared_dir)
+    run = last_run(fetcher)
+    assert run['stages']['publish']['outcome'] == 'changed'
+    assert 'set' not in run['stages']
+    count = len(server.requests)
+
+    # each user gets the same image from the shared folder
+    for home in ('user1', 'user2', 'user3'):
+        main = make_main(use_conf(shared_dir), home=home)
+        main.run()
+        assert last_run(main)['stages']['set']['outcome'] == 'changed'
+        assert main.backend.get().startswith(shared_dir)
+    assert len(server.requests) == count
+
+    # and a user's next run doesn't change anything
+    main = make_main(use_conf(shared_dir), home='user1')
+    main.run()
+    assert last_run(main)['stages']['shared']['outcome'] == 'unchanged'
+
+
+# ------------------------------------------------------------------------------
+# A fetch with nothing new doesn't rewrite the shared folder
+# ------------------------------------------------------------------------------
+def test_fetch_unchanged(server, make_main, shared_dir):
+
+    make_main(home='root').fetch(shared_dir)
+    fetcher = make_main(home='root')
+    fetcher.fetch(shared_dir)
+
+    assert last_run(fetcher)['stages']['publish']['outcome'] == 'unchanged'
+
+
+# ------------------------------------------------------------------------------
+# A damaged shared image is not used
+# ------------------------------------------------------------------------------
+def test_bad_image(server, make_main, shared_dir):
+
+    make_main(home='root').fetch(shared_dir)
+
+    # break the image
+    images_dir = os.path.join(shared_dir, 'images')
+    path = os.path.join(images_dir, os.listdir(images_dir)[0])
+    with open(path, 'r+b') as file:
+        file.write(b'oops')
+
+    main = make_main(use_conf(shared_dir), home='user1')
+    main.run()
+    assert last_run(main)['stages']['shared']['outcome'] == 'error'
+    assert main.backend.writes == 0
+    assert main.conf_dict['apod']['date'] == ''
+
+
+# ------------------------------------------------------------------------------
+# A video day is published with its thumbnail, which users may skip
+# ------------------------------------------------------------------------------
+def test_video_day(server, make_main, shared_dir):
+
+    server.scenario.media_type = 'video'
+    make_main(home='root').fetch(shared_dir)
+
+    # a user who takes thumbnails
+    main = make_main(use_conf(shared_dir), home='user1')
+    main.run()
+    assert last_run(main)['stages']['set']['outcome'] == 'changed'
+
+    # and one who doesn't
+    conf_dict = use_conf(shared_dir)
+    conf_dict['general'] = {'video_thumbnails': 0}
+    main = make_main(conf_dict, home='user2')
+    main.run()
+    assert last_run(main)['stages']['shared']['outcome'] == 'video'
+    assert main.backend.writes == 0
+
+
+# ------------------------------------------------------------------------------
+# Users wait quietly until the fetcher has run
+# ------------------------------------------------------------------------------
+def test_empty_cache(server, make_main, shared_dir):
+
+    main = make_main(use_conf(shared_dir), home='user1')
+    main.run()
+    assert last_run(main)['stages']['shared']['outcome'] == 'unchanged'
+    assert not server.requests
+
+# -)
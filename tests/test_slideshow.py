@@ -0,0 +1,171 @@
+# ------------------------------------------------------------------------------
+# Project : SpaceOddity                                            /          \
+# Filename: test_slideshow.py                                     |     ()     |
+# Date    : 10/18/2026                                            |            |
+# Author  : cyclopticnerve                                        |   \____/   |
+# License : WTFPLv2                                                \          /
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+# Imports
+# ------------------------------------------------------------------------------
+
+import hashlib
+import os
+
+import pytest
+
+from harness import last_run
+from image_store import ImageStore
+from slideshow import Slideshow
+
+# NB: the server and make_main fixtures are in conftest.py
+
+
+# ------------------------------------------------------------------------------
+# Put some images in a Main's store, as if backfill had
+# ------------------------------------------------------------------------------
+def fill_store(main, count):
+
+    """
+        Put some images in a Main's store, as if backfill had
+
+        Paramaters:
+            main [Main]: the Main from make_main
+            count [int]: how many images to add
+
+        Returns:
+            [list]: the paths of the images in the store
+    """
+
+    store = ImageStore(main.store_dir, 0, 0)
+    paths = []
+    for i in range(count):
+        data = f'image {i}'.encode('ascii')
+        src_path = os.path.join(main.conf_dir, 'incoming.jpg')
+        with open(src_path, 'wb') as file:
+            file.write(data)
+        sha = hashlib.sha256(data).hexdigest()
+        paths.append(store.add(src_path, sha, 'jpg', f'http://x/{i}.jpg'))
+    return paths
+
+
+# ------------------------------------------------------------------------------
+# A normal day in slideshow mode shows the whole store
+# ------------------------------------------------------------------------------
+def test_slideshow(server, make_main):
+
+    main = make_main({'general': {'slideshow': 1}})
+    old_paths = fill_store(main, 2)
+    main.run()
+
+    run = last_run(main)
+    assert run['stages']['image']['outcome'] == 'changed'
+    assert run['stages']['slideshow']['outcome'] == 'changed'
+    assert main.backend.get() == main.slideshow_path
+
+    # with the new image in it
+    with open(main.slideshow_path, 'r') as file:
+        text = file.read()
+    for path in old_paths + [main.conf_dict['files']['filepath']]:
+        assert f'<file>{path}</file>' in text
+    assert text.count('<transition') == 3
+
+
+# ------------------------------------------------------------------------------
+# With no network, the slideshow is still made from the store
+# ------------------------------------------------------------------------------
+def test_offline(server, make_main):
+
+    server.scenario.api_status = 503
+    main = make_main({'general': {'slideshow': 1}})
+    paths = fill_store(main, 3)
+    main.run()
+
+    run = last_run(main)
+    assert run['stages']['apod']['outcome'] == 'error'
+    assert run['stages']['slideshow']['outcome'] == 'changed'
+    assert main.backend.get() == main.slideshow_path
+    with open(main.slideshow_path, 'r') as file:
+        assert file.read().count('<static>') == len(paths)
+
+
+# ------------------------------------------------------------------------------
+# With scale_to_screen, the slideshow shows screen-sized copies
+# ------------------------------------------------------------------------------
+def test_screen_copies(server, make_main, monkeypatch):
+
+    # NB: derivatives needs GTK, so skip if it isn't there
+    pytest.importorskip('gi')
+    import derivatives
+    monkeypatch.setattr(derivatives, 'get_monitor_sizes',
+                        lambda: [(1280, 1024)])
+
+    main = make_main({'general': {'slideshow': 1, 'scale_to_screen': 1}})
+    bad_paths = fill_store(main, 1)
+    main.run()
+
+    # the downloaded image is scaled, and one that can't be is shown as is
+    pic_path = main.conf_dict['files']['filepath']
+    sha = os.path.splitext(os.path.basename(pic_path))[0]
+    copy_path = os.path.join(main.derived_dir, f'{sha}_1280x1024.jpg')
+    with open(main.slideshow_path, 'r') as file:
+        text = file.read()
+    assert f'<file>{copy_path}</file>' in text
+    assert f'<file>{pic_path}</file>' not in text
+    assert f'<file>{bad_paths[0]}</file>' in text
+    assert os.path.exists(copy_path)
+
+
+# ------------------------------------------------------------------------------
+# With no screen sizes, the slideshow shows the full-size images
+# ------------------------------------------------------------------------------
+def test_no_screen(server, make_main, monkeypatch):
+
+    # NB: without GTK there are no sizes anyway
+    try:
+        import derivatives
+        monkeypatch.setattr(derivatives, 'get_monitor_sizes', lambda: [])
+    except ImportError:
+        pass
+
+    main = make_main({'general': {'slideshow': 1, 'scale_to_screen': 1}})
+    paths = fill_store(main, 2)
+    main.run()
+
+    assert last_run(main)['stages']['slideshow']['outcome'] == 'changed'
+    with open(main.slideshow_path, 'r') as file:
+        text = file.read()
+    for path in paths + [main.conf_dict['files']['filepath']]:
+        assert f'<file>{path}</file>' in text
+
+
+# ------------------------------------------------------------------------------
+# The file is only written when the store changes
+# ------------------------------------------------------------------------------
+def test_unchanged(tmp_path):
+
+    store_dir = tmp_path / 'images'
+    store_dir.mkdir()
+    index_path = str(store_dir / 'index.json')
+    with open(index_path, 'w') as file:
+        file.write('{}')
+    show = Slideshow(str(tmp_path / 'slideshow.xml'), seconds=60)
+    assert not show.is_current(index_path)
+
+    # the first build writes it, the next one doesn't
+    assert show.build(['/a.jpg', '/b.jpg'])
+    with open(show.xml_path, 'r') as file:
+        text = file.read()
+    assert not show.build(['/a.jpg', '/b.jpg'])
+    with open(show.xml_path, 'r') as file:
+        assert file.read() == text
+    assert show.is_current(index_path)
+
+    # until the store changes
+    os.utime(show.xml_path, (os.path.getmtime(index_path) - 10,) * 2)
+    assert not show.is_current(index_path)
+    assert show.build(['/a.jpg', '/b.jpg', '/c.jpg'])
+    assert show.is_current(index_path)
+
+# -)